@@ -0,0 +1,266 @@
+"""
+Admission control: bounded in-flight work per route class with early load shedding
+"""
+
+import asyncio
+import json
+import math
+import time
+from typing import Dict, Any, Optional
+from fastapi import HTTPException, Response
+from fastapi.security import HTTPAuthorizationCredentials
+import structlog
+
+from config.settings import settings
+from .auth import verify_api_key
+
+logger = structlog.get_logger(__name__)
+
+# Never shed: health checks, webhook ACKs and static pages
+EXEMPT_PREFIXES = ("/health", "/webhooks", "/static", "/docs", "/redoc", "/openapi.json")
+EXEMPT_PATHS = {"/", "/api", "/dashboard", "/docs-custom"}
+
+DEFAULT_LIMITS: Dict[str, Dict[str, float]] = {
+    "chat": {"max_in_flight": 64, "max_queue": 128, "max_wait": 5.0},
+    "batch": {"max_in_flight": 4, "max_queue": 0, "max_wait": 0.0},
+    "workflow": {"max_in_flight": 16, "max_queue": 32, "max_wait": 5.0},
+    "default": {"max_in_flight": 128, "max_queue": 256, "max_wait": 5.0}
+}
+
+DEGRADED_REPLIES = [
+    (("quote", "pricing", "price", "cost"),
+     "We're experiencing high demand right now. Please share your requirements and we'll follow up with a quote shortly."),
+    (("schedule", "meeting", "appointment", "calendar"),
+     "We're experiencing high demand right now. Please share your preferred time slots and we'll confirm your meeting shortly."),
+    (("lead", "prospect", "qualify"),
+     "We're experiencing high demand right now. Please share the lead details and we'll get back to you with an assessment shortly."),
+]
+DEGRADED_DEFAULT_REPLY = (
+    "We're experiencing high demand right now. Your message is important to us - "
+    "please try again in a moment."
+)
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Route class for a request, or None when it must never be shed"""
+    if path in EXEMPT_PATHS or path.startswith(EXEMPT_PREFIXES):
+        return None
+    if path.startswith("/agent/chat/batch"):
+        return "batch"
+    if path.startswith(("/agent/chat", "/agent/delegate", "/webchat")):
+        return "chat"
+    if path.startswith("/workflows"):
+        return "workflow"
+    return "default"
+
+
+def degraded_reply(message: str) -> Dict[str, Any]:
+    """Rule-based chat answer served instead of a 503 in degraded mode"""
+    message_lower = (message or "").lower()
+    reply = next(
+        (text for keywords, text in DEGRADED_REPLIES if any(word in message_lower for word in keywords)),
+        DEGRADED_DEFAULT_REPLY
+    )
+    return {
+        "response": reply,
+        "agent_type": "core",
+        "success": True,
+        "metadata": {"degraded": True, "mode": "rule_based"}
+    }
+
+
+class RouteClass:
+    """In-flight slots, wait queue and timing for one route class"""
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.max_in_flight = int(max_in_flight)
+        self.max_queue = int(max_queue)
+        self.max_wait = max_wait
+        self.semaphore = asyncio.Semaphore(self.max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+        self.avg_wait = 0.0       # EWMA of queue wait (seconds)
+        self.avg_service = 0.0    # EWMA of time holding a slot (seconds)
+        self.stats = {"admitted": 0, "rejected": 0, "degraded": 0, "timed_out": 0}
+
+    def retry_after(self) -> int:
+        """Rough seconds until a slot frees up for a new arrival"""
+        backlog = (self.waiting + 1) / max(1, self.max_in_flight)
+        return max(1, math.ceil(self.avg_service * backlog))
+
+    def _observe_wait(self, seconds: float):
+        self.avg_wait = 0.8 * self.avg_wait + 0.2 * seconds
+
+    async def acquire(self) -> bool:
+        """Take a slot; False means shed the request"""
+        if not self.semaphore.locked():
+            await self.semaphore.acquire()
+            self._observe_wait(0.0)
+        else:
+            # Queue is full, or waits already exceed the budget: fail fast
+            if self.waiting >= self.max_queue or self.avg_wait >= self.max_wait:
+                return False
+            self.waiting += 1
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                self.stats["timed_out"] += 1
+                self._observe_wait(self.max_wait)
+                return False
+            finally:
+                self.waiting -= 1
+            self._observe_wait(time.monotonic() - started)
+
+        self.in_flight += 1
+        self.stats["admitted"] += 1
+        return True
+
+    def release(self, service_seconds: float):
+        self.in_flight -= 1
+        self.avg_service = 0.8 * self.avg_service + 0.2 * service_seconds
+        self.semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "avg_wait_ms": round(self.avg_wait * 1000, 1),
+            "avg_service_ms": round(self.avg_service * 1000, 1)
+        }
+
+
+class AdmissionController:
+    """Per-route-class admission decisions"""
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None, degraded_mode: bool = False):
+        merged = {name: dict(limit) for name, limit in DEFAULT_LIMITS.items()}
+        for name, limit in (limits or {}).items():
+            merged.setdefault(name, dict(DEFAULT_LIMITS["default"])).update(limit)
+        self.classes = {name: RouteClass(name, **limit) for name, limit in merged.items()}
+        self.degraded_mode = degraded_mode
+
+    def get_class(self, name: str) -> RouteClass:
+        return self.classes.get(name) or self.classes["default"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "degraded_mode": self.degraded_mode,
+            "classes": {name: route_class.get_stats() for name, route_class in self.classes.items()}
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware that sheds load before it queues up inside the process
+
+    Each route class has a fixed number of in-flight slots and a short wait
+    queue. Requests beyond that (or when queued requests are already waiting
+    longer than ``max_wait``) get 503 with ``Retry-After`` straight away. In
+    degraded mode, shed ``POST /agent/chat`` requests get a rule-based reply
+    instead of an error, once the caller passes the same key and quota
+    check the route itself would apply. WebSockets and exempt paths pass
+    straight through.
+    """
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or get_admission_controller()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        name = classify(scope["method"], scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.controller.get_class(name)
+        if not await route_class.acquire():
+            await self._shed(route_class, scope, receive, send)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route_class.release(time.monotonic() - started)
+
+    async def _shed(self, route_class: RouteClass, scope, receive, send):
+        if (self.controller.degraded_mode and scope["method"] == "POST"
+                and scope["path"].rstrip("/") == "/agent/chat"):
+            # The route is never reached, so its key check has to happen here
+            response = Response()
+            try:
+                await verify_api_key(response, _bearer_credentials(scope))
+            except HTTPException as e:
+                headers = [(name.lower().encode(), str(value).encode()) for name, value in (e.headers or {}).items()]
+                await _send_json(send, e.status_code, {"detail": e.detail}, headers)
+                return
+
+            body = await _read_body(receive)
+            try:
+                message = json.loads(body or b"{}").get("message", "")
+            except (ValueError, AttributeError):
+                message = ""
+            route_class.stats["degraded"] += 1
+            quota_headers = [(name.encode(), value.encode()) for name, value in response.headers.items()
+                             if name.startswith("x-")]
+            await _send_json(send, 200, degraded_reply(message), [(b"x-degraded", b"true")] + quota_headers)
+            return
+
+        route_class.stats["rejected"] += 1
+        retry_after = route_class.retry_after()
+        logger.warning(f"Shedding {route_class.name} request", path=scope["path"], retry_after=retry_after)
+        await _send_json(
+            send, 503,
+            {"detail": "Server is busy, please retry later", "retry_after": retry_after},
+            [(b"retry-after", str(retry_after).encode())]
+        )
+
+
+def _bearer_credentials(scope) -> Optional[HTTPAuthorizationCredentials]:
+    """Bearer credentials from the raw headers, as ``HTTPBearer`` would parse them"""
+    authorization = dict(scope.get("headers") or []).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return HTTPAuthorizationCredentials(scheme=scheme, credentials=token)
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _send_json(send, status: int, content: Dict[str, Any], headers: list):
+    body = json.dumps(content).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())] + headers
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController(
+            limits=settings.ADMISSION_LIMITS,
+            degraded_mode=settings.ADMISSION_DEGRADED_MODE
+        )
+    return _controller
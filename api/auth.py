@@ -2,16 +2,37 @@
 Authentication utilities for API endpoints
 """
 
-from fastapi import HTTPException, Security, Depends
+import math
+from fastapi import HTTPException, Security, Depends, WebSocket, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Optional
+from typing import Optional, Dict, Callable, Union
 from config.settings import settings
+from core.runtime.metering import set_meter, register_owner_meter
+from .quotas import get_quota_manager, QuotaStatus, KeyPolicy
 
 # Security
 security = HTTPBearer(auto_error=False)
 
-async def verify_api_key(credentials: Optional[HTTPAuthorizationCredentials] = Security(security)):
-    """Verify API key for protected endpoints"""
+def _quota_headers(requests: QuotaStatus, tokens: Optional[QuotaStatus]) -> Dict[str, str]:
+    headers = {}
+    if requests.limit:
+        headers["X-RateLimit-Limit"] = str(int(requests.limit))
+        headers["X-RateLimit-Remaining"] = str(int(requests.remaining))
+    if tokens is not None:
+        headers["X-Token-Quota-Limit"] = str(int(tokens.limit))
+        headers["X-Token-Quota-Remaining"] = str(int(tokens.remaining))
+    return headers
+
+
+async def verify_api_key(response: Response,
+                         credentials: Optional[HTTPAuthorizationCredentials] = Security(security)):
+    """
+    Verify API key for protected endpoints and enforce its quotas
+    
+    Returns the key's policy (truthy) so routes can identify the caller.
+    Remaining request and token quota are returned in ``X-RateLimit-*`` and
+    ``X-Token-Quota-*`` headers; an exhausted quota answers 429.
+    """
     # If API key is not required, allow access
     if not settings.REQUIRE_API_KEY:
         return True
@@ -23,18 +44,92 @@ async def verify_api_key(credentials: Optional[HTTPAuthorizationCredentials] = S
             detail="API key required"
         )
     
-    api_key = credentials.credentials
-    valid_api_key = settings.API_KEY
-    
-    if not valid_api_key:
+    quotas = get_quota_manager()
+    if not quotas.policies:
         raise HTTPException(
             status_code=500,
             detail="Server configuration error: API key not set"
         )
-        
-    if api_key != valid_api_key:
+    
+    policy = quotas.authenticate(credentials.credentials)
+    if policy is None:
         raise HTTPException(
             status_code=401,
             detail="Invalid API key"
         )
-    return True
+    
+    response.headers.update(await enforce_quota(policy))
+    
+    def on_remaining(left: float):
+        response.headers["X-Token-Quota-Remaining"] = str(max(0, int(left)))
+    
+    # LLM calls made for this request are charged to the key (and its usage)
+    set_meter(meter_for(policy, on_remaining))
+    return policy
+
+
+async def enforce_quota(policy: Union[KeyPolicy, bool]) -> Dict[str, str]:
+    """
+    Take one request from the key's quota
+    
+    Returns the quota headers; raises 429 (with ``Retry-After``) when the
+    request or token quota is exhausted. A no-op when keys are not required.
+    """
+    if not isinstance(policy, KeyPolicy):
+        return {}
+    
+    requests, tokens = await get_quota_manager().check_request(policy)
+    headers = _quota_headers(requests, tokens)
+    
+    if not requests.allowed or (tokens is not None and not tokens.allowed):
+        retry_after = max(requests.retry_after, tokens.retry_after if tokens else 0.0)
+        raise HTTPException(
+            status_code=429,
+            detail="Request quota exceeded" if not requests.allowed else "LLM token quota exceeded",
+            headers={**headers, "Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+    return headers
+
+
+def meter_for(policy: Union[KeyPolicy, bool],
+              on_remaining: Optional[Callable[[float], None]] = None) -> Optional[Callable[[int], None]]:
+    """Meter that charges LLM tokens to the key (None when keys are not required)"""
+    if not isinstance(policy, KeyPolicy):
+        return None
+    quotas = get_quota_manager()
+    return lambda used: quotas.charge_tokens_nowait(policy, used, on_remaining)
+
+
+def caller_id(policy: Union[KeyPolicy, bool]) -> Optional[str]:
+    """Key hash of the caller, recorded on work that runs after the request (jobs)"""
+    return (policy.key_hash or None) if isinstance(policy, KeyPolicy) else None
+
+
+# Jobs are metered against the key that queued them
+register_owner_meter(lambda key_hash: meter_for(get_quota_manager().get_policy(key_hash) or False))
+
+
+async def verify_admin_api_key(policy=Depends(verify_api_key)):
+    """Verify the caller's key is an admin key (any caller when keys are not required)"""
+    if policy is not True and not policy.admin:
+        raise HTTPException(status_code=403, detail="Admin API key required")
+    return policy
+
+
+def verify_websocket_api_key(websocket: WebSocket) -> Union[KeyPolicy, bool, None]:
+    """
+    Verify API key for WebSocket connections (bearer header or ?api_key=)
+    
+    Returns the key's policy (truthy), or None for a missing or unknown key.
+    The caller enforces its quota per message with ``enforce_quota`` and
+    meters the connection with ``meter_for``, as ``verify_api_key`` does.
+    """
+    if not settings.REQUIRE_API_KEY:
+        return True
+    
+    api_key = websocket.query_params.get("api_key")
+    authorization = websocket.headers.get("authorization", "")
+    if not api_key and authorization.lower().startswith("bearer "):
+        api_key = authorization[7:]
+    
+    return get_quota_manager().authenticate(api_key)
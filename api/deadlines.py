@@ -0,0 +1,81 @@
+"""
+Per-request deadlines: set from a header or the route default, enforced down the call chain
+"""
+
+import json
+from typing import Optional
+import structlog
+
+from config.settings import settings
+from core.runtime.deadline import DeadlineExceeded, deadline_scope
+
+logger = structlog.get_logger(__name__)
+
+TIMEOUT_HEADER = b"x-request-timeout"
+
+
+def route_timeout(path: str) -> Optional[float]:
+    """Default budget for a path (longest matching prefix); None for no deadline"""
+    matches = [prefix for prefix in settings.REQUEST_TIMEOUTS if path.startswith(prefix)]
+    seconds = settings.REQUEST_TIMEOUTS[max(matches, key=len)] if matches else settings.REQUEST_TIMEOUT_DEFAULT
+    return seconds or None
+
+
+def request_timeout(path: str, header: Optional[bytes]) -> Optional[float]:
+    """Budget for a request: ``X-Request-Timeout`` (capped) or the route default"""
+    if header:
+        try:
+            seconds = float(header.decode("latin-1"))
+            if seconds > 0:
+                return min(seconds, settings.REQUEST_TIMEOUT_MAX)
+        except ValueError:
+            pass
+    return route_timeout(path)
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware that puts every HTTP request under a deadline
+
+    The deadline is read by the engines, the LLM call, tools and outbound
+    sends through ``core.runtime.deadline``. When it runs out before a
+    response has started, the client gets 504 naming the stage that ran
+    out of time.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header = dict(scope["headers"]).get(TIMEOUT_HEADER)
+        seconds = request_timeout(scope["path"], header)
+        if seconds is None:
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        with deadline_scope(seconds):
+            try:
+                await self.app(scope, receive, tracking_send)
+            except DeadlineExceeded as e:
+                if response_started:
+                    raise
+                logger.warning(f"Request to {scope['path']} exceeded its {seconds}s deadline during {e.stage}")
+                body = json.dumps({"detail": str(e), "stage": e.stage, "timeout_seconds": seconds}).encode("utf-8")
+                await send({
+                    "type": "http.response.start",
+                    "status": 504,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+                })
+                await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,158 @@
+"""
+Idempotency-Key support for retried POST requests
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable
+from fastapi import HTTPException, Response
+import structlog
+
+from config.settings import settings
+
+logger = structlog.get_logger(__name__)
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used with a different request body"""
+
+
+def fingerprint(payload: Any) -> str:
+    """Stable hash of a request payload"""
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "task", "created_at")
+
+    def __init__(self, fingerprint: str, task: asyncio.Task):
+        self.fingerprint = fingerprint
+        self.task = task
+        self.created_at = time.monotonic()
+
+
+def _succeeded(task: asyncio.Task) -> bool:
+    if task.cancelled() or task.exception() is not None:
+        return False
+    result = task.result()
+    return not (isinstance(result, dict) and "success" in result and not result["success"])
+
+
+class IdempotencyStore:
+    """
+    Results of recent requests keyed by Idempotency-Key
+
+    The first request for a key runs ``compute`` in its own task; retries
+    that arrive while it is running await the same task, and retries after
+    it finished get the stored result. Only successful results are kept: an
+    exception, or a result whose ``success`` is false, frees the key so the
+    client can retry. Entries expire after
+    ``ttl`` seconds and the oldest finished entries are evicted beyond
+    ``max_keys``.
+    """
+
+    def __init__(self, ttl: float = 86400.0, max_keys: int = 10000):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.stats = {"executed": 0, "replayed": 0, "joined": 0, "conflicts": 0, "evicted": 0}
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry.created_at < self.ttl:
+                break
+            del self._entries[key]
+
+        if len(self._entries) <= self.max_keys:
+            return
+        # Over capacity: drop the oldest finished entries, never in-flight ones
+        for key in [k for k, e in self._entries.items() if e.task.done()]:
+            if len(self._entries) <= self.max_keys:
+                break
+            del self._entries[key]
+            self.stats["evicted"] += 1
+
+    def _on_done(self, key: str, entry: _Entry):
+        def callback(task: asyncio.Task):
+            if not _succeeded(task):
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+        return callback
+
+    async def run(self, key: str, request_fingerprint: str,
+                  compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return ``(result, replayed)`` for ``key``, computing it at most once"""
+        self._evict()
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            if entry.fingerprint != request_fingerprint:
+                self.stats["conflicts"] += 1
+                raise IdempotencyConflict("Idempotency-Key was already used with a different request")
+            self.stats["replayed" if entry.task.done() else "joined"] += 1
+            return await asyncio.shield(entry.task), True
+
+        task = asyncio.ensure_future(compute())
+        entry = _Entry(request_fingerprint, task)
+        task.add_done_callback(self._on_done(key, entry))
+        self._entries[key] = entry
+        self.stats["executed"] += 1
+        self._evict()
+
+        # Shielded so a disconnecting first caller does not cancel the work
+        return await asyncio.shield(task), False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "keys": len(self._entries), "max_keys": self.max_keys}
+
+
+_store: Optional[IdempotencyStore] = None
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    global _store
+    if _store is None:
+        _store = IdempotencyStore(ttl=settings.IDEMPOTENCY_TTL, max_keys=settings.IDEMPOTENCY_MAX_KEYS)
+    return _store
+
+
+async def idempotent(idempotency_key: Optional[str], scope: str, payload: Dict[str, Any],
+                     compute: Callable[[], Awaitable[Any]], response: Optional[Response] = None,
+                     caller: Any = None) -> Any:
+    """
+    Run ``compute`` once per ``Idempotency-Key`` within ``scope``
+
+    Keys are private to the calling API key (``caller`` is the policy from
+    ``verify_api_key``), so two clients using the same key never see each
+    other's responses. Without a key the request runs normally. Replayed
+    results are marked with an ``Idempotent-Replayed: true`` response header.
+    """
+    if not idempotency_key:
+        return await compute()
+    if len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key longer than {MAX_KEY_LENGTH} characters")
+
+    try:
+        result, replayed = await get_idempotency_store().run(
+            f"{scope}:{getattr(caller, 'key_hash', None) or 'anonymous'}:{idempotency_key}",
+            fingerprint(payload), compute
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    if replayed:
+        logger.info(f"Replaying idempotent {scope} request")
+        if response is not None:
+            response.headers["Idempotent-Replayed"] = "true"
+    return result
@@ -8,14 +8,19 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, RedirectResponse
+from fastapi.responses import FileResponse, RedirectResponse, JSONResponse
 import structlog
 import os
 
+from core.runtime.bulkhead import BulkheadFull
+
 # Import route modules
 from .routes.agent import router as agent_router
 from .routes.webhooks import router as webhook_router
 from .routes.workflows import router as workflow_router
+from .routes.webchat import router as webchat_router
+from .routes.jobs import router as jobs_router
+from .routes.usage import router as usage_router
 
 # Configure logging
 structlog.configure(
@@ -47,6 +52,10 @@ async def lifespan(app: FastAPI):
     
     # Initialize core components
     try:
+        from core.runtime.jobs import get_job_manager
+        from workflows.automation import get_workflow_engine
+        get_job_manager().start()
+        get_workflow_engine().start()
         logger.info("✅ Core components initialized")
         logger.info("🌐 AI Agent system ready for requests")
         
@@ -58,6 +67,19 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("🛑 AI Agent system shutting down...")
+    
+    from integrations.outbound import close_outbound_sender
+    from .routes.webchat import close_web_chat
+    from core.runtime.jobs import close_job_manager
+    from core.runtime.bulkhead import shutdown_bulkheads
+    from workflows.automation import close_workflow_engine
+    from core.runtime.events import close_event_bus
+    await close_workflow_engine()
+    await close_event_bus()
+    await close_job_manager()
+    await close_outbound_sender()
+    await close_web_chat()
+    shutdown_bulkheads()
 
 
 # Create FastAPI application
@@ -73,6 +95,25 @@ app = FastAPI(
 # Import settings for CORS configuration
 from config.settings import settings
 
+# Per-request deadlines (innermost, so admission queueing is not charged to the budget)
+from .deadlines import DeadlineMiddleware
+app.add_middleware(DeadlineMiddleware)
+
+# Route each request's LLM work to its workload's bulkhead
+from .workloads import WorkloadMiddleware
+app.add_middleware(WorkloadMiddleware)
+
+
+@app.exception_handler(BulkheadFull)
+async def bulkhead_full_handler(request, exc: BulkheadFull):
+    """A saturated workload rejects new work instead of slowing the others"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+# Shed load early instead of queueing without bound (added before CORS so CORS wraps its 503s)
+if settings.ADMISSION_CONTROL_ENABLED:
+    from .admission import AdmissionMiddleware
+    app.add_middleware(AdmissionMiddleware)
+
 # Add CORS middleware with environment-aware configuration
 app.add_middleware(
     CORSMiddleware,
@@ -86,6 +127,9 @@ app.add_middleware(
 app.include_router(agent_router, prefix="/agent", tags=["agent"])
 app.include_router(webhook_router, prefix="/webhooks", tags=["webhooks"])
 app.include_router(workflow_router, prefix="/workflows", tags=["workflows"])
+app.include_router(webchat_router, prefix="/webchat", tags=["webchat"])
+app.include_router(jobs_router, prefix="/jobs", tags=["jobs"])
+app.include_router(usage_router, prefix="/usage", tags=["usage"])
 
 # Get the project root directory
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -131,6 +175,19 @@ async def health_check():
     }
 
 
+@app.get("/health/load")
+async def load_status():
+    """Admission control, bulkhead and deadline-exceeded state"""
+    from .admission import get_admission_controller
+    from core.runtime.deadline import get_deadline_stats
+    from core.runtime.bulkhead import get_bulkhead_stats
+    return {
+        **get_admission_controller().get_stats(),
+        "bulkheads": get_bulkhead_stats(),
+        "deadline_exceeded": get_deadline_stats()
+    }
+
+
 @app.get("/api")
 async def api_info():
     """Serve the API information page"""
@@ -148,7 +205,10 @@ async def api_info():
             "endpoints": {
                 "agent": "/agent",
                 "webhooks": "/webhooks", 
-                "workflows": "/workflows"
+                "workflows": "/workflows",
+                "webchat": "/webchat/ws",
+                "jobs": "/jobs",
+                "usage": "/usage"
             },
             "features": [
                 "Multi-agent AI architecture",
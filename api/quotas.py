@@ -0,0 +1,277 @@
+"""
+API keys with per-key request and LLM token quotas
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import Dict, Any, Optional, Tuple, List
+from pydantic import BaseModel
+import structlog
+
+from config.settings import settings
+from core.runtime.rate_limit import TokenBucket
+
+logger = structlog.get_logger(__name__)
+
+
+class KeyPolicy(BaseModel):
+    """
+    Limits for one API key (0 means unlimited)
+
+    Quotas and usage belong to the key itself (``key_hash``); ``name`` is
+    only a label and defaults to the start of the hash.
+    """
+    name: str = ""
+    key_hash: str = ""
+    requests_per_minute: float = 0
+    tokens_per_minute: float = 0
+    admin: bool = False
+
+
+    @property
+    def key_id(self) -> str:
+        """Identity used for buckets and usage counters"""
+        return self.key_hash or self.name
+
+
+def hash_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def load_key_policies() -> Dict[str, KeyPolicy]:
+    """
+    Configured keys, indexed by key hash
+
+    ``API_KEYS`` maps each key to its policy; a policy without a ``name``
+    is labelled with the first characters of the key hash. The legacy single
+    ``API_KEY`` is kept as an admin key named "default" with the default
+    limits.
+    """
+    policies: Dict[str, KeyPolicy] = {}
+    if settings.API_KEY:
+        policies[hash_key(settings.API_KEY)] = KeyPolicy(
+            name="default",
+            key_hash=hash_key(settings.API_KEY),
+            requests_per_minute=settings.DEFAULT_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.DEFAULT_TOKENS_PER_MINUTE,
+            admin=True
+        )
+    for api_key, policy in settings.API_KEYS.items():
+        key_hash = hash_key(api_key)
+        policies[key_hash] = KeyPolicy(**{
+            "requests_per_minute": settings.DEFAULT_REQUESTS_PER_MINUTE,
+            "tokens_per_minute": settings.DEFAULT_TOKENS_PER_MINUTE,
+            **policy,
+            "name": policy.get("name") or key_hash[:12],
+            "key_hash": key_hash
+        })
+    return policies
+
+
+class QuotaStatus(BaseModel):
+    """Outcome of a quota check"""
+    allowed: bool
+    limit: float
+    remaining: float
+    retry_after: float = 0.0
+
+
+class MemoryQuotaBackend:
+    """Token buckets and usage counters in this process"""
+
+    def __init__(self):
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._usage: Dict[str, Dict[str, Any]] = {}
+
+    def _bucket(self, bucket_id: str, per_minute: float) -> TokenBucket:
+        bucket = self._buckets.get(bucket_id)
+        if bucket is None or bucket.capacity != per_minute:
+            bucket = TokenBucket(per_minute / 60.0, capacity=per_minute)
+            self._buckets[bucket_id] = bucket
+        return bucket
+
+    async def take(self, bucket_id: str, per_minute: float, amount: float) -> Tuple[bool, float, float]:
+        bucket = self._bucket(bucket_id, per_minute)
+        wait = bucket.try_acquire(amount)
+        return wait <= 0, bucket.remaining(), wait
+
+    async def peek(self, bucket_id: str, per_minute: float) -> float:
+        return self._bucket(bucket_id, per_minute).remaining()
+
+    def charge_now(self, bucket_id: str, per_minute: float, amount: float) -> float:
+        return self._bucket(bucket_id, per_minute).charge(amount)
+
+    async def charge(self, bucket_id: str, per_minute: float, amount: float) -> float:
+        return self.charge_now(bucket_id, per_minute, amount)
+
+    def incr_usage_now(self, name: str, field: str, amount: int = 1):
+        usage = self._usage.setdefault(name, {"requests": 0, "rejected": 0, "llm_tokens": 0})
+        usage[field] = usage.get(field, 0) + amount
+        usage["last_seen"] = time.time()
+
+    async def incr_usage(self, name: str, field: str, amount: int = 1):
+        self.incr_usage_now(name, field, amount)
+
+    async def get_usage(self, name: str) -> Dict[str, Any]:
+        return dict(self._usage.get(name, {"requests": 0, "rejected": 0, "llm_tokens": 0}))
+
+
+# Refill, then optionally take/charge, atomically. KEYS[1]=bucket
+# ARGV: rate/sec, capacity, amount, now, mode (take|charge|peek)
+_BUCKET_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local amount = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 1
+if ARGV[5] == 'take' then
+    if tokens >= amount then tokens = tokens - amount else allowed = 0 end
+elseif ARGV[5] == 'charge' then
+    tokens = tokens - amount
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisQuotaBackend:
+    """Token buckets and usage counters in Redis, shared by all workers"""
+
+    def __init__(self, url: str, prefix: str = "quota"):
+        import redis.asyncio as redis
+
+        self.redis = redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.redis.register_script(_BUCKET_SCRIPT)
+
+    async def _run(self, bucket_id: str, per_minute: float, amount: float, mode: str) -> Tuple[bool, float]:
+        allowed, tokens = await self._script(
+            keys=[f"{self.prefix}:bucket:{bucket_id}"],
+            args=[per_minute / 60.0, per_minute, amount, time.time(), mode]
+        )
+        return bool(int(allowed)), float(tokens)
+
+    async def take(self, bucket_id: str, per_minute: float, amount: float) -> Tuple[bool, float, float]:
+        allowed, tokens = await self._run(bucket_id, per_minute, amount, "take")
+        wait = 0.0 if allowed else (amount - tokens) / (per_minute / 60.0)
+        return allowed, tokens, wait
+
+    async def peek(self, bucket_id: str, per_minute: float) -> float:
+        return (await self._run(bucket_id, per_minute, 0, "peek"))[1]
+
+    async def charge(self, bucket_id: str, per_minute: float, amount: float) -> float:
+        return (await self._run(bucket_id, per_minute, amount, "charge"))[1]
+
+    async def incr_usage(self, name: str, field: str, amount: int = 1):
+        key = f"{self.prefix}:usage:{name}"
+        await self.redis.hincrby(key, field, amount)
+        await self.redis.hset(key, "last_seen", time.time())
+
+    async def get_usage(self, name: str) -> Dict[str, Any]:
+        raw = await self.redis.hgetall(f"{self.prefix}:usage:{name}")
+        usage = {"requests": 0, "rejected": 0, "llm_tokens": 0}
+        for field, value in raw.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            usage[field] = float(value) if field == "last_seen" else int(value)
+        return usage
+
+
+class QuotaManager:
+    """Enforces request-rate and LLM-token quotas per API key"""
+
+    def __init__(self, policies: Optional[Dict[str, KeyPolicy]] = None, backend=None):
+        self.policies = policies if policies is not None else load_key_policies()
+        self.backend = backend or MemoryQuotaBackend()
+        self._pending: set = set()
+
+    def authenticate(self, api_key: Optional[str]) -> Optional[KeyPolicy]:
+        if not api_key:
+            return None
+        return self.policies.get(hash_key(api_key))
+
+    def get_policy(self, key_hash: Optional[str]) -> Optional[KeyPolicy]:
+        """Policy of a key known only by its hash (e.g. the submitter of a job)"""
+        return self.policies.get(key_hash) if key_hash else None
+
+    async def check_request(self, policy: KeyPolicy) -> Tuple[QuotaStatus, Optional[QuotaStatus]]:
+        """Take one request token and make sure the token budget is not in debt"""
+        requests = QuotaStatus(allowed=True, limit=0, remaining=0)
+        if policy.requests_per_minute:
+            allowed, left, wait = await self.backend.take(f"{policy.key_id}:requests", policy.requests_per_minute, 1)
+            requests = QuotaStatus(allowed=allowed, limit=policy.requests_per_minute,
+                                   remaining=max(0.0, left), retry_after=wait)
+
+        tokens = None
+        if policy.tokens_per_minute:
+            left = await self.backend.peek(f"{policy.key_id}:tokens", policy.tokens_per_minute)
+            rate = policy.tokens_per_minute / 60.0
+            tokens = QuotaStatus(allowed=left > 0, limit=policy.tokens_per_minute, remaining=max(0.0, left),
+                                 retry_after=0.0 if left > 0 else (1 - left) / rate)
+
+        allowed = requests.allowed and (tokens is None or tokens.allowed)
+        await self.backend.incr_usage(policy.key_id, "requests" if allowed else "rejected")
+        return requests, tokens
+
+    async def charge_tokens(self, policy: KeyPolicy, tokens: int) -> Optional[float]:
+        """Charge LLM tokens after the fact; returns the remaining token budget"""
+        await self.backend.incr_usage(policy.key_id, "llm_tokens", tokens)
+        if not policy.tokens_per_minute:
+            return None
+        return await self.backend.charge(f"{policy.key_id}:tokens", policy.tokens_per_minute, tokens)
+
+    def charge_tokens_nowait(self, policy: KeyPolicy, tokens: int, on_remaining=None):
+        """Charge from synchronous code (LLM call sites) without blocking"""
+        if isinstance(self.backend, MemoryQuotaBackend):
+            self.backend.incr_usage_now(policy.key_id, "llm_tokens", tokens)
+            if policy.tokens_per_minute:
+                left = self.backend.charge_now(f"{policy.key_id}:tokens", policy.tokens_per_minute, tokens)
+                if on_remaining is not None:
+                    on_remaining(left)
+            return
+
+        async def charge():
+            try:
+                left = await self.charge_tokens(policy, tokens)
+                if on_remaining is not None and left is not None:
+                    on_remaining(left)
+            except Exception as e:
+                logger.error(f"Failed to charge LLM tokens for {policy.name}: {str(e)}")
+
+        task = asyncio.ensure_future(charge())
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def get_usage(self, policy: KeyPolicy) -> Dict[str, Any]:
+        usage = await self.backend.get_usage(policy.key_id)
+        return {
+            "name": policy.name,
+            "requests_per_minute": policy.requests_per_minute or None,
+            "tokens_per_minute": policy.tokens_per_minute or None,
+            **usage
+        }
+
+    async def get_all_usage(self) -> List[Dict[str, Any]]:
+        return [await self.get_usage(policy) for policy in self.policies.values()]
+
+
+_manager: Optional[QuotaManager] = None
+
+
+def get_quota_manager() -> QuotaManager:
+    global _manager
+    if _manager is None:
+        backend = None
+        if settings.QUOTA_BACKEND == "redis":
+            try:
+                backend = RedisQuotaBackend(settings.REDIS_URL)
+                logger.info("Using Redis for API key quotas")
+            except ImportError:
+                logger.warning("QUOTA_BACKEND=redis but the redis package is not installed; using in-process quotas")
+        _manager = QuotaManager(backend=backend)
+    return _manager
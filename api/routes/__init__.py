@@ -5,5 +5,8 @@ API routes package
 from .agent import router as agent_router
 from .webhooks import router as webhook_router
 from .workflows import router as workflow_router
+from .webchat import router as webchat_router
+from .jobs import router as jobs_router
+from .usage import router as usage_router
 
-__all__ = ["agent_router", "webhook_router", "workflow_router"]
+__all__ = ["agent_router", "webhook_router", "workflow_router", "webchat_router", "jobs_router", "usage_router"]
@@ -4,9 +4,16 @@ Core agent API routes
 
 import sys
 import os
+import json
+import time
+import uuid
+import asyncio
 from pathlib import Path
-from fastapi import APIRouter, HTTPException, Depends
-from ..schemas.requests import ChatRequest, DelegationRequest
+from typing import Dict, Any, List, Optional, AsyncIterator
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, Query, Header
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from ..schemas.requests import ChatRequest, BatchChatItem, DelegationRequest
 from ..schemas.responses import AgentResponse, StatusResponse
 import structlog
 
@@ -16,6 +23,12 @@ logger = structlog.get_logger()
 
 # Import auth dependency
 from ..auth import verify_api_key
+from config.settings import settings
+from core.runtime.jobs import register_job_handler
+from core.runtime.deadline import DeadlineExceeded
+from core.runtime.bulkhead import BulkheadFull, BATCH, get_bulkhead, workload
+from .jobs import queue_job
+from ..idempotency import idempotent
 
 # Add the project root to the Python path
 project_root = Path(__file__).parent.parent.parent
@@ -41,65 +54,241 @@ except Exception as e:
 
 
 @router.post("/chat", response_model=dict)
-async def chat_with_agent(request: ChatRequest, _: bool = Depends(verify_api_key)):
+async def chat_with_agent(request: ChatRequest, response: Response,
+                          idempotency_key: Optional[str] = Header(None),
+                          caller=Depends(verify_api_key)):
     """
     Chat with the core AI agent
+    
+    Send an ``Idempotency-Key`` header to make retries safe: a repeated key
+    returns the stored response (or waits for the in-flight one) instead of
+    running the completion again.
     """
-    try:
-        if not AGENT_AVAILABLE or core_agent is None:
-            raise HTTPException(
-                status_code=503, 
-                detail="Core agent not available. Check server logs for import errors."
-            )
-            
+    if not AGENT_AVAILABLE or core_agent is None:
+        raise HTTPException(
+            status_code=503, 
+            detail="Core agent not available. Check server logs for import errors."
+        )
+    
+    async def chat() -> Dict[str, Any]:
         logger.info(f"Processing chat request from user: {request.user_id}")
         
-        response = await core_agent.process_message(
+        agent_response = await core_agent.process_message(
             message=request.message,
             user_id=request.user_id,
             context=request.context or {}
         )
         
         return {
-            "response": response.response,
-            "agent_type": response.agent_type,
-            "success": response.success,
-            "metadata": response.metadata
+            "response": agent_response.response,
+            "agent_type": agent_response.agent_type,
+            "success": agent_response.success,
+            "metadata": agent_response.metadata
         }
+    
+    try:
+        return await idempotent(idempotency_key, "agent.chat", request.model_dump(), chat, response, caller)
         
+    except (HTTPException, DeadlineExceeded, BulkheadFull):
+        raise
     except Exception as e:
         logger.error(f"Error processing chat: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
 
+def _parse_batch_items(body: bytes) -> List[Dict[str, Any]]:
+    """Parse a batch body: JSON array, {"items": [...]} or JSONL"""
+    text = body.decode("utf-8").strip()
+    if not text:
+        return []
+    
+    if text.startswith("["):
+        return json.loads(text)
+    
+    if text.startswith("{"):
+        try:
+            payload = json.loads(text)
+            if isinstance(payload, dict) and isinstance(payload.get("items"), list):
+                return payload["items"]
+        except json.JSONDecodeError:
+            pass  # Not a single object, so treat as JSONL
+    
+    items = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            items.append({"_parse_error": f"Line {line_number}: {str(e)}"})
+    return items
+
+
+async def _run_batch(items: List[Dict[str, Any]], concurrency: int) -> AsyncIterator[str]:
+    """Run items through the agent and yield NDJSON lines in completion order"""
+    results: asyncio.Queue = asyncio.Queue()
+    pending = iter(enumerate(items))
+    
+    batch_id = uuid.uuid4().hex[:12]
+    
+    async def process(index: int, raw: Dict[str, Any]) -> Dict[str, Any]:
+        item_id = raw.get("id", str(index)) if isinstance(raw, dict) else str(index)
+        started = time.perf_counter()
+        anonymous_user = None
+        try:
+            if not isinstance(raw, dict) or "_parse_error" in raw:
+                raise ValueError(raw.get("_parse_error") if isinstance(raw, dict) else "Item must be an object")
+            item = BatchChatItem(**raw)
+            if not item.user_id:
+                anonymous_user = f"batch:{batch_id}:{item_id}"
+            response = await core_agent.process_message(
+                message=item.message,
+                user_id=item.user_id or anonymous_user,
+                context=item.context or {}
+            )
+            result = {
+                "id": str(item_id),
+                "success": response.success,
+                "response": response.response,
+                "agent_type": response.agent_type,
+                "metadata": response.metadata
+            }
+        except (ValidationError, ValueError) as e:
+            result = {"id": str(item_id), "success": False, "error": f"Invalid item: {str(e)}"}
+        except Exception as e:
+            logger.error(f"Batch item {item_id} failed: {str(e)}")
+            result = {"id": str(item_id), "success": False, "error": str(e)}
+        finally:
+            # Items without a user are one-off: don't leave a conversation behind
+            if anonymous_user is not None:
+                core_agent.clear_memory(anonymous_user)
+        
+        result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+    
+    async def worker():
+        for index, raw in pending:
+            await results.put(await process(index, raw))
+    
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(items)))]
+    try:
+        for _ in range(len(items)):
+            yield json.dumps(await results.get(), default=str) + "\n"
+    finally:
+        # Client went away or batch finished: stop any remaining work
+        for task in workers:
+            task.cancel()
+
+
+@router.post("/chat/batch")
+async def chat_batch(request: Request, concurrency: Optional[int] = None,
+                     _: bool = Depends(verify_api_key)):
+    """
+    Run many chat prompts through the agent
+    
+    Accepts a JSON array, {"items": [...]}, or JSONL of
+    {"id", "message", "user_id", "context"} objects. Items run with bounded
+    concurrency (at most the batch bulkhead's ``max_concurrent``, see
+    BULKHEADS) and results stream back as NDJSON in completion order,
+    tagged with the item id. A failing item produces an error line and
+    does not abort the batch.
+    """
+    if not AGENT_AVAILABLE or core_agent is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Core agent not available. Check server logs for import errors."
+        )
+    
+    try:
+        items = _parse_batch_items(await request.body())
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch payload: {str(e)}")
+    
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Batch payload must be a list of items")
+    if len(items) > settings.BATCH_CHAT_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(items)} items (max {settings.BATCH_CHAT_MAX_ITEMS})"
+        )
+    
+    # The batch bulkhead's slots are the real limit; more workers would only queue
+    limit = get_bulkhead(BATCH).max_concurrent
+    concurrency = max(1, min(concurrency or limit, limit))
+    logger.info(f"Processing chat batch of {len(items)} items with concurrency {concurrency}")
+    
+    return StreamingResponse(_run_batch(items, concurrency), media_type="application/x-ndjson")
+
+
+async def _delegate(agent_type: str, task: str, context: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+    response = await core_agent.delegate_to_agent(
+        agent_type=agent_type,
+        task=task,
+        data=context,
+        user_id=user_id
+    )
+    return {
+        "response": response.response,
+        "agent_type": response.agent_type,
+        "success": response.success,
+        "metadata": response.metadata
+    }
+
+
+async def _delegate_job(payload: Dict[str, Any], report) -> Dict[str, Any]:
+    """Job handler for queued delegations"""
+    if not AGENT_AVAILABLE or core_agent is None:
+        raise RuntimeError("Core agent not available")
+    report({"stage": "delegating", "agent_type": payload["agent_type"]})
+    with workload(BATCH):
+        return await _delegate(**payload)
+
+
+register_job_handler("agent.delegate", _delegate_job)
+
+
 @router.post("/delegate", response_model=dict) 
-async def delegate_to_agent(request: DelegationRequest, _: bool = Depends(verify_api_key)):
+async def delegate_to_agent(request: DelegationRequest, response: Response,
+                            run_async: bool = Query(False, alias="async"),
+                            idempotency_key: Optional[str] = Header(None),
+                            caller=Depends(verify_api_key)):
     """
     Delegate a task to a specialist agent
+    
+    With ``?async=true`` the task is queued and a job id is returned
+    immediately; follow it at ``/jobs/{job_id}`` or ``/jobs/{job_id}/events``.
+    An ``Idempotency-Key`` header makes retries return the original result
+    (or job) instead of delegating again.
     """
-    try:
-        if not AGENT_AVAILABLE or core_agent is None:
-            raise HTTPException(
-                status_code=503,
-                detail="Core agent not available. Check server logs for import errors."
-            )
-            
-        logger.info(f"Delegating task to {request.agent_type} agent")
-        
-        response = await core_agent.delegate_to_agent(
-            agent_type=request.agent_type,
-            task=request.task,
-            data=request.context or {},
-            user_id=request.user_id or "default"
+    if not AGENT_AVAILABLE or core_agent is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Core agent not available. Check server logs for import errors."
         )
+    
+    payload = {
+        "agent_type": request.agent_type,
+        "task": request.task,
+        "context": request.context or {},
+        "user_id": request.user_id or "default"
+    }
+    if run_async:
+        async def queue() -> Dict[str, Any]:
+            return queue_job("agent.delegate", payload, caller)
         
-        return {
-            "response": response.response,
-            "agent_type": response.agent_type,
-            "success": response.success,
-            "metadata": response.metadata
-        }
+        response.status_code = 202
+        return await idempotent(idempotency_key, "agent.delegate.async", payload, queue, response, caller)
+    
+    async def delegate() -> Dict[str, Any]:
+        logger.info(f"Delegating task to {request.agent_type} agent")
+        return await _delegate(**payload)
+    
+    try:
+        return await idempotent(idempotency_key, "agent.delegate", payload, delegate, response, caller)
         
+    except (HTTPException, DeadlineExceeded, BulkheadFull):
+        raise
     except Exception as e:
         logger.error(f"Error delegating task: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error delegating task: {str(e)}")
@@ -0,0 +1,98 @@
+"""
+Background job API routes
+"""
+
+import asyncio
+import json
+from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
+import structlog
+
+from core.runtime.jobs import get_job_manager, QueueFullError
+from ..auth import verify_api_key, caller_id
+
+logger = structlog.get_logger(__name__)
+router = APIRouter(tags=["Jobs"])
+
+SSE_HEARTBEAT_SECONDS = 15.0
+
+
+def queue_job(kind: str, payload: Dict[str, Any], caller=None) -> Dict[str, Any]:
+    """Queue a job and describe where to follow it; its LLM tokens are charged to ``caller``"""
+    try:
+        job = get_job_manager().submit(kind, payload, owner=caller_id(caller))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+    logger.info(f"Queued {kind} job {job.job_id}")
+    return {
+        "job_id": job.job_id,
+        "status": job.status.value,
+        "status_url": f"/jobs/{job.job_id}",
+        "events_url": f"/jobs/{job.job_id}/events"
+    }
+
+
+def submit_job(kind: str, payload: Dict[str, Any], caller=None) -> JSONResponse:
+    """Queue a job and return 202 with where to follow it"""
+    return JSONResponse(status_code=202, content=queue_job(kind, payload, caller))
+
+
+@router.get("/stats")
+async def job_stats(_: bool = Depends(verify_api_key)):
+    """Job queue statistics"""
+    return get_job_manager().get_stats()
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, _: bool = Depends(verify_api_key)):
+    """Get job status, progress events and result"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job.public_dict()
+
+
+async def _sse(job_id: str):
+    events = get_job_manager().subscribe(job_id).__aiter__()
+    next_event = None
+    try:
+        while True:
+            next_event = next_event or asyncio.ensure_future(events.__anext__())
+            done, _ = await asyncio.wait({next_event}, timeout=SSE_HEARTBEAT_SECONDS)
+            if not done:
+                # Keep proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            try:
+                event = next_event.result()
+            except StopAsyncIteration:
+                break
+            next_event = None
+            yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+        job = get_job_manager().get(job_id)
+        if job is not None:
+            yield f"event: result\ndata: {json.dumps(job.public_dict(), default=str)}\n\n"
+    finally:
+        if next_event is not None:
+            next_event.cancel()
+        await events.aclose()
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str, _: bool = Depends(verify_api_key)):
+    """
+    Stream job progress as Server-Sent Events
+
+    Replays events so far, then streams new ones. Ends with a ``result``
+    event carrying the final job once it succeeds or fails.
+    """
+    if get_job_manager().get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return StreamingResponse(
+        _sse(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
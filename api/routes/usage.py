@@ -0,0 +1,26 @@
+"""
+API key usage routes
+"""
+
+from fastapi import APIRouter, Depends
+import structlog
+
+from ..auth import verify_api_key, verify_admin_api_key
+from ..quotas import get_quota_manager
+
+logger = structlog.get_logger(__name__)
+router = APIRouter(tags=["Usage"])
+
+
+@router.get("/")
+async def get_my_usage(policy=Depends(verify_api_key)):
+    """Request and LLM token usage for the calling API key"""
+    if policy is True:
+        return {"name": None, "detail": "API keys are not required; usage is not tracked per key"}
+    return await get_quota_manager().get_usage(policy)
+
+
+@router.get("/keys")
+async def get_all_usage(_=Depends(verify_admin_api_key)):
+    """Usage for every configured API key (admin only), for billing"""
+    return await get_quota_manager().get_all_usage()
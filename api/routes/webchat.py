@@ -0,0 +1,203 @@
+"""
+Web chat WebSocket transport
+"""
+
+import asyncio
+import uuid
+from typing import Dict, Any, Optional, Set
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+import structlog
+
+from config.settings import settings
+from core.runtime.metering import set_meter
+from ..auth import verify_websocket_api_key, enforce_quota, meter_for
+
+logger = structlog.get_logger(__name__)
+router = APIRouter(tags=["Web Chat"])
+
+_web_chat = None
+
+
+def get_web_chat():
+    """Get the shared WebChatIntegration (created on first use)"""
+    global _web_chat
+    if _web_chat is None:
+        from integrations.web_chat_integration import WebChatIntegration
+        _web_chat = WebChatIntegration()
+    return _web_chat
+
+
+async def close_web_chat():
+    """Stop the session sweeper and flush sessions to the store"""
+    global _web_chat
+    if _web_chat is not None:
+        await _web_chat.sessions.close()
+        _web_chat = None
+
+
+class WebChatConnection:
+    """
+    One browser socket bound to a web chat session
+
+    Outgoing frames go through a small bounded queue drained by a writer
+    task. When the browser reads slowly the queue fills, ``send`` blocks and
+    the LLM stream is consumed no faster than the client accepts it, so
+    memory per connection stays bounded. A client that does not accept a
+    frame within the send timeout is disconnected.
+
+    Every message and action frame takes a request from the caller's
+    quota, like an HTTP request would.
+    """
+
+    active: Set["WebChatConnection"] = set()
+    total_connections = 0
+
+    def __init__(self, websocket: WebSocket, session_id: str, policy=True):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.policy = policy
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=settings.WEBCHAT_WS_SEND_QUEUE_SIZE)
+        self.frames_sent = 0
+
+    async def send(self, frame: Dict[str, Any]):
+        await self.outbox.put(frame)
+
+    async def _writer(self):
+        while True:
+            frame = await self.outbox.get()
+            if frame is None:
+                return
+            await asyncio.wait_for(
+                self.websocket.send_json(frame),
+                timeout=settings.WEBCHAT_WS_SEND_TIMEOUT
+            )
+            self.frames_sent += 1
+
+    async def _handle(self, frame: Dict[str, Any]):
+        web_chat = get_web_chat()
+        frame_type = frame.get("type", "message")
+
+        if frame_type in ("message", "action"):
+            try:
+                await enforce_quota(self.policy)
+            except HTTPException as e:
+                await self.send({
+                    "type": "error",
+                    "error": e.detail,
+                    "retry_after": int(e.headers["Retry-After"])
+                })
+                return
+
+        if frame_type == "ping":
+            await self.send({"type": "pong"})
+
+        elif frame_type == "message":
+            text = (frame.get("text") or "").strip()
+            if not text:
+                await self.send({"type": "error", "error": "Empty message"})
+                return
+            async for event in web_chat.stream_message(self.session_id, text, frame.get("user_info")):
+                await self.send(event)
+
+        elif frame_type == "action":
+            result = await web_chat.handle_action(self.session_id, frame.get("action", ""), frame.get("data"))
+            await self.send({"type": "action_result", **result})
+
+        else:
+            await self.send({"type": "error", "error": f"Unknown frame type: {frame_type}"})
+
+    async def _reader(self):
+        while True:
+            try:
+                frame = await self.websocket.receive_json()
+            except (ValueError, KeyError):
+                # Not JSON (or a binary frame): tell the client and keep the socket open
+                await self.send({"type": "error", "error": "Frames must be JSON objects"})
+                continue
+            if not isinstance(frame, dict):
+                await self.send({"type": "error", "error": "Frames must be JSON objects"})
+                continue
+            try:
+                await self._handle(frame)
+            except Exception as e:
+                logger.error(f"Error handling web chat frame: {str(e)}")
+                await self.send({
+                    "type": "error",
+                    "error": str(e),
+                    "message": "I apologize, but I'm experiencing technical difficulties. Please try again in a moment."
+                })
+
+    async def run(self):
+        WebChatConnection.active.add(self)
+        WebChatConnection.total_connections += 1
+        writer = asyncio.create_task(self._writer())
+        try:
+            web_chat = get_web_chat()
+            existing = web_chat.sessions.get(self.session_id)
+            if existing is not None:
+                # Reconnect: resume the session instead of resetting it
+                web_chat.sessions.touch(existing)
+                await self.send({
+                    "type": "session",
+                    "session_id": self.session_id,
+                    "status": "resumed",
+                    "session_data": existing.to_dict()
+                })
+            else:
+                session = await web_chat.start_session(self.session_id)
+                await self.send({"type": "session", **session})
+
+            reader = asyncio.create_task(self._reader())
+            done, _ = await asyncio.wait({reader, writer}, return_when=asyncio.FIRST_COMPLETED)
+            reader.cancel()
+            for task in done:
+                if not task.cancelled() and task.exception() and not isinstance(task.exception(), WebSocketDisconnect):
+                    raise task.exception()
+
+        except WebSocketDisconnect:
+            pass
+        except asyncio.TimeoutError:
+            logger.warning(f"Closing slow web chat socket for session {self.session_id}")
+            await self.websocket.close(code=1013)
+        finally:
+            writer.cancel()
+            WebChatConnection.active.discard(self)
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        return {
+            "active_connections": len(cls.active),
+            "total_connections": cls.total_connections,
+            "queued_frames": sum(conn.outbox.qsize() for conn in cls.active),
+            "send_queue_size": settings.WEBCHAT_WS_SEND_QUEUE_SIZE
+        }
+
+
+@router.websocket("/ws")
+async def webchat_socket(websocket: WebSocket, session_id: Optional[str] = None):
+    """
+    Web chat over a single WebSocket
+
+    Client frames: {"type": "message", "text": ...}, {"type": "action",
+    "action": ..., "data": ...}, {"type": "ping"}. Server frames: session,
+    delta, message, suggested_actions, action_result, pong, error.
+    """
+    policy = verify_websocket_api_key(websocket)
+    if not policy:
+        await websocket.close(code=1008)
+        return
+
+    # The connection's tasks inherit this context, so LLM tokens are charged to the key
+    set_meter(meter_for(policy))
+    await websocket.accept()
+    connection = WebChatConnection(websocket, session_id or str(uuid.uuid4()), policy)
+    await connection.run()
+
+
+@router.get("/stats")
+async def webchat_stats():
+    """WebSocket connection statistics"""
+    return {
+        **WebChatConnection.get_stats(),
+        "sessions": get_web_chat().get_integration_status()
+    }
@@ -5,13 +5,28 @@ Webhook API routes for external platform integrations
 from fastapi import APIRouter, HTTPException, Request, BackgroundTasks
 from fastapi.responses import JSONResponse
 from ..schemas.requests import WebhookRequest
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Awaitable
 import structlog
+from config.settings import settings
+from core.runtime.deadline import deadline_scope, no_deadline
 
 logger = structlog.get_logger(__name__)
 router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
 
 
+async def _process_in_background(handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+                                 payload: Dict[str, Any]):
+    """
+    Run a webhook handler after the response was sent
+
+    Background tasks inherit the request's context, including its deadline,
+    which has usually run out by the time the agent replies. The handler
+    gets its own WEBHOOK_PROCESSING_TIMEOUT budget instead.
+    """
+    with no_deadline(), deadline_scope(settings.WEBHOOK_PROCESSING_TIMEOUT or None):
+        await handler(payload)
+
+
 @router.get("/whatsapp")
 async def whatsapp_webhook_verify(
     hub_mode: str = None,
@@ -51,14 +66,16 @@ async def whatsapp_webhook_handler(request: Request, background_tasks: Backgroun
         
         whatsapp_integration = WhatsAppIntegration(
             api_token=settings.WHATSAPP_API_TOKEN,
-            webhook_verify_token=settings.WHATSAPP_WEBHOOK_TOKEN
+            webhook_verify_token=settings.WHATSAPP_WEBHOOK_TOKEN,
+            max_concurrent_senders=settings.WHATSAPP_MAX_CONCURRENT_SENDERS
         )
         
         webhook_data = await request.json()
         
-        # Process in background to return quickly
+        # Process every message in the payload in background to return quickly
         background_tasks.add_task(
-            whatsapp_integration.handle_incoming_message,
+            _process_in_background,
+            whatsapp_integration.handle_webhook_batch,
             webhook_data
         )
         
@@ -82,7 +99,8 @@ async def telegram_webhook_handler(request: Request, background_tasks: Backgroun
         
         # Process in background
         background_tasks.add_task(
-            telegram_integration.handle_message,
+            _process_in_background,
+            telegram_integration.handle_update,
             update_data
         )
         
@@ -2,10 +2,10 @@
 Workflow automation API routes
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from ..schemas.requests import WorkflowRequest
 from ..schemas.responses import WorkflowResponse
-from typing import Dict, Any, List
+from typing import Dict, Any, Optional
 import structlog
 
 logger = structlog.get_logger(__name__)
@@ -13,17 +13,20 @@ router = APIRouter(prefix="/workflows", tags=["Workflows"])
 
 # Import auth dependency
 from ..auth import verify_api_key
+from core.runtime.jobs import register_job_handler
+from core.runtime.deadline import DeadlineExceeded
+from core.runtime.bulkhead import BulkheadFull, WORKFLOW, workload
+from .jobs import submit_job
+from workflows.automation import get_workflow_engine
 
 
 @router.post("/create", response_model=WorkflowResponse)
 async def create_workflow(request: WorkflowRequest, _: bool = Depends(verify_api_key)):
     """Create new automation workflow"""
     try:
-        from workflows.automation import WorkflowAutomation
+        workflow_automation = get_workflow_engine()
         
-        workflow_automation = WorkflowAutomation()
-        
-        workflow = await workflow_automation.create_workflow(
+        workflow_id = await workflow_automation.create_workflow(
             name=request.workflow_name,
             steps=request.steps,
             trigger_type=request.trigger_type,
@@ -31,47 +34,143 @@ async def create_workflow(request: WorkflowRequest, _: bool = Depends(verify_api
         )
         
         return WorkflowResponse(
-            workflow_id=workflow["id"],
+            workflow_id=workflow_id,
             status="created",
-            result=workflow
+            result=await workflow_automation.get_workflow_status(workflow_id)
         )
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error creating workflow: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _execute_workflow_job(payload: Dict[str, Any], report) -> Dict[str, Any]:
+    """Job handler for queued workflow executions"""
+    report({"stage": "executing", "workflow_id": payload["workflow_id"]})
+    with workload(WORKFLOW):
+        return await get_workflow_engine().execute_workflow(
+            payload["workflow_id"], payload.get("data"), resume=payload.get("resume", False)
+        )
+
+
+register_job_handler("workflow.execute", _execute_workflow_job)
+
+
 @router.post("/{workflow_id}/execute", response_model=WorkflowResponse)
-async def execute_workflow(workflow_id: str, data: Dict[str, Any] = None):
-    """Execute existing workflow"""
+async def execute_workflow(workflow_id: str, data: Dict[str, Any] = None,
+                           run_async: bool = Query(False, alias="async"),
+                           caller=Depends(verify_api_key)):
+    """
+    Execute existing workflow
+    
+    With ``?async=true`` the execution is queued and a job id is returned
+    immediately; follow it at ``/jobs/{job_id}`` or ``/jobs/{job_id}/events``.
+    """
+    workflow_automation = get_workflow_engine()
+    if workflow_id not in workflow_automation.store:
+        raise HTTPException(status_code=404, detail=f"Workflow {workflow_id} not found")
+    
+    if run_async:
+        return submit_job("workflow.execute", {"workflow_id": workflow_id, "data": data}, caller)
+    
     try:
-        from workflows.automation import WorkflowAutomation
-        
-        workflow_automation = WorkflowAutomation()
-        
         result = await workflow_automation.execute_workflow(workflow_id, data)
         
         return WorkflowResponse(
             workflow_id=workflow_id,
-            status="completed",
+            status=result["status"],
             result=result
         )
         
+    except (DeadlineExceeded, BulkheadFull):
+        raise
     except Exception as e:
         logger.error(f"Error executing workflow: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/", response_model=List[Dict[str, Any]])
-async def list_workflows():
-    """List all workflows"""
+@router.post("/{workflow_id}/pause", response_model=WorkflowResponse)
+async def pause_workflow(workflow_id: str, _: bool = Depends(verify_api_key)):
+    """Pause a running workflow; steps already running finish and are checkpointed"""
+    workflow_automation = get_workflow_engine()
+    if workflow_id not in workflow_automation.store:
+        raise HTTPException(status_code=404, detail=f"Workflow {workflow_id} not found")
+    if not await workflow_automation.pause_workflow(workflow_id):
+        raise HTTPException(status_code=409, detail="Only running or waiting workflows can be paused")
+    
+    return WorkflowResponse(
+        workflow_id=workflow_id,
+        status="paused",
+        result=await workflow_automation.get_workflow_status(workflow_id)
+    )
+
+
+@router.post("/{workflow_id}/resume", response_model=WorkflowResponse)
+async def resume_workflow(workflow_id: str, run_async: bool = Query(False, alias="async"),
+                          caller=Depends(verify_api_key)):
+    """
+    Resume a paused or failed workflow from its first incomplete step
+    
+    Completed steps are not re-run; their checkpointed results are reused.
+    """
+    workflow_automation = get_workflow_engine()
+    workflow = workflow_automation.store.get(workflow_id)
+    if workflow is None:
+        raise HTTPException(status_code=404, detail=f"Workflow {workflow_id} not found")
+    if workflow.status.value not in ("paused", "failed"):
+        raise HTTPException(status_code=409, detail=f"Workflow is {workflow.status.value}, not paused or failed")
+    
+    if run_async:
+        return submit_job("workflow.execute", {"workflow_id": workflow_id, "data": None, "resume": True}, caller)
+    
     try:
-        from workflows.automation import WorkflowAutomation
+        result = await workflow_automation.execute_workflow(workflow_id, resume=True)
+        
+        return WorkflowResponse(
+            workflow_id=workflow_id,
+            status=result["status"],
+            result=result
+        )
         
-        workflow_automation = WorkflowAutomation()
-        workflows = await workflow_automation.list_workflows()
-        return workflows
+    except (DeadlineExceeded, BulkheadFull):
+        raise
+    except Exception as e:
+        logger.error(f"Error resuming workflow: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/", response_model=Dict[str, Any])
+async def list_workflows(
+    status: Optional[str] = Query(None, description="Filter by status"),
+    trigger_type: Optional[str] = Query(None, description="Filter by trigger type"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500)
+):
+    """List workflows, a page at a time"""
+    try:
+        return await get_workflow_engine().list_workflows(
+            status=status, trigger_type=trigger_type, offset=offset, limit=limit
+        )
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error listing workflows: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/status", response_model=Dict[str, Any])
+async def get_automation_status():
+    """Workflow counts by status"""
+    return await get_workflow_engine().get_status()
+
+
+@router.get("/{workflow_id}", response_model=Dict[str, Any])
+async def get_workflow(workflow_id: str):
+    """Get one workflow and its step states"""
+    workflow = await get_workflow_engine().get_workflow_status(workflow_id)
+    if workflow is None:
+        raise HTTPException(status_code=404, detail=f"Workflow {workflow_id} not found")
+    return workflow
@@ -2,11 +2,12 @@
 API Schema definitions for the AI Agent system
 """
 
-from .requests import ChatRequest, DelegationRequest, WorkflowRequest
+from .requests import ChatRequest, BatchChatItem, DelegationRequest, WorkflowRequest
 from .responses import AgentResponse
 
 __all__ = [
     "ChatRequest",
+    "BatchChatItem",
     "DelegationRequest", 
     "WorkflowRequest",
     "AgentResponse"
@@ -13,11 +13,20 @@ class ChatRequest(BaseModel):
     context: Optional[Dict[str, Any]] = None
 
 
+class BatchChatItem(BaseModel):
+    """Schema for one item of a batch chat request"""
+    id: Optional[str] = None
+    message: str
+    user_id: Optional[str] = None
+    context: Optional[Dict[str, Any]] = None
+
+
 class DelegationRequest(BaseModel):
     """Schema for delegating tasks to specialized agents"""
     agent_type: str
     task: str
     context: Optional[Dict[str, Any]] = None
+    user_id: Optional[str] = None
 
 
 class WorkflowRequest(BaseModel):
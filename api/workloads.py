@@ -0,0 +1,37 @@
+"""
+Tags each HTTP request with its workload class so it runs in the right bulkhead
+"""
+
+from core.runtime.bulkhead import INTERACTIVE, WEBHOOK, WORKFLOW, BATCH, workload
+
+WORKLOAD_PREFIXES = (
+    ("/webhooks", WEBHOOK),
+    ("/agent/chat/batch", BATCH),
+    ("/workflows", WORKFLOW),
+)
+
+
+def classify_workload(path: str) -> str:
+    for prefix, name in WORKLOAD_PREFIXES:
+        if path.startswith(prefix):
+            return name
+    return INTERACTIVE
+
+
+class WorkloadMiddleware:
+    """
+    ASGI middleware that sets the workload for the request
+
+    Background tasks (e.g. webhook processing after the ACK) run inside the
+    same call, so they stay in the webhook bulkhead.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        with workload(classify_workload(scope["path"])):
+            await self.app(scope, receive, send)
@@ -0,0 +1,94 @@
+"""
+Workflow step graphs: independent branches in parallel vs the same steps in sequence
+
+Run from the repository root:  python -m benchmarks.dag
+
+Each workflow fans out to ``--branches`` specialist calls and joins them
+in a final step. The agent is a fixed-latency stub, so the numbers show
+wall-clock time saved by the graph for a given call latency.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+import structlog
+
+from core.engine.core_agent import AgentResponse
+from workflows.automation import WorkflowAutomation, WorkflowStatus
+
+SPECIALISTS = ["sales", "operations", "analytics", "marketing", "support"]
+
+
+class Agent:
+    """Answers every call after ``latency`` seconds"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def _answer(self, agent_type: str) -> AgentResponse:
+        await asyncio.sleep(self.latency)
+        return AgentResponse(agent_type=agent_type, response="ok", actions_taken=[], metadata={}, success=True)
+
+    async def process_message(self, message, user_id, context):
+        return await self._answer("core")
+
+    async def delegate_to_specialist(self, agent_type, task, context):
+        return await self._answer(agent_type)
+
+
+def steps(branches: int, graph: bool):
+    """Fan-out plus join; without ``graph`` every step waits for the one before it"""
+    fan_out = [
+        {"id": f"branch_{i}", "type": "agent_task",
+         "parameters": {"agent_type": SPECIALISTS[i % len(SPECIALISTS)], "task": f"part {i}"}}
+        for i in range(branches)
+    ]
+    join = {"id": "join", "type": "agent_task", "parameters": {"task": "combine the parts"}}
+    if graph:
+        for step in fan_out:
+            step["depends_on"] = []
+        join["depends_on"] = [step["id"] for step in fan_out]
+    return fan_out + [join]
+
+
+async def timed(engine: WorkflowAutomation, branches: int, graph: bool, runs: int) -> float:
+    elapsed = 0.0
+    for _ in range(runs):
+        workflow_id = await engine.create_workflow("fan-out", steps(branches, graph),
+                                                   parameters={"max_concurrency": branches})
+        started = time.perf_counter()
+        result = await engine.execute_workflow(workflow_id)
+        elapsed += time.perf_counter() - started
+        assert result["status"] == WorkflowStatus.COMPLETED.value
+    return elapsed / runs
+
+
+async def run(args):
+    engine = WorkflowAutomation(Agent(args.latency))
+    try:
+        print(f"{args.branches} branches + join, {args.latency * 1000:.0f} ms per call, "
+              f"mean of {args.runs} runs\n")
+        sequential = await timed(engine, args.branches, graph=False, runs=args.runs)
+        print(f"{'steps in sequence':<24} {sequential:8.3f} s")
+        graph = await timed(engine, args.branches, graph=True, runs=args.runs)
+        print(f"{'dependency graph':<24} {graph:8.3f} s")
+        print(f"{'speed-up':<24} {sequential / graph:8.2f}x")
+    finally:
+        await engine.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--branches", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.3, help="simulated agent call latency (seconds)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
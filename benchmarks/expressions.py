@@ -0,0 +1,55 @@
+"""
+Condition evaluation: compiled, cached safe expressions vs ``eval``
+
+Run from the repository root:  python -m benchmarks.expressions
+"""
+
+import argparse
+import time
+
+from workflows.expressions import compile_expression, evaluate
+
+EXPRESSIONS = [
+    "parameters['amount'] > 1000 and parameters['tier'] == 'gold'",
+    "'vip' in parameters['tags'] or len(parameters['tags']) > 3",
+    "step_results['score']['result']['value'] >= 0.5 if step_results else False",
+]
+
+NAMESPACE = {
+    "parameters": {"tier": "gold", "amount": 1200, "tags": ["vip", "eu"]},
+    "step_results": {"score": {"result": {"value": 0.9}}},
+    "workflow_id": "wf-1"
+}
+
+
+def timed(label: str, iterations: int, func) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {elapsed / iterations * 1e6:8.2f} us/eval")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+
+    for expression in EXPRESSIONS:
+        print(expression)
+        assert evaluate(expression, NAMESPACE) == eval(expression, {"__builtins__": {"len": len}}, NAMESPACE)
+
+        builtins = {"__builtins__": {"len": len}}
+        code = compile(expression, "<condition>", "eval")
+        baseline = timed("eval (parse every time)", args.iterations,
+                         lambda: eval(expression, builtins, NAMESPACE))
+        timed("eval (precompiled code)", args.iterations, lambda: eval(code, builtins, NAMESPACE))
+
+        compile_expression.cache_clear()
+        safe = timed("safe evaluate (cached)", args.iterations, lambda: evaluate(expression, NAMESPACE))
+        print(f"{'speed-up vs parsing eval':<32} {baseline / safe:8.2f}x\n")
+
+
+if __name__ == "__main__":
+    main()
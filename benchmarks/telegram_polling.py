@@ -0,0 +1,93 @@
+"""
+Telegram long polling: update throughput by chat concurrency
+
+Run from the repository root:  python -m benchmarks.telegram_polling
+
+getUpdates is served by an in-process Bot API stub and each update is
+handled by a fixed-latency stub, so the numbers show what dispatching
+chats concurrently gains for a given handler latency.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+
+import httpx
+import structlog
+
+from integrations.telegram_polling import OffsetStore, TelegramPoller
+
+
+class BotApi:
+    """getUpdates stub serving ``total`` updates spread over ``chats`` chats"""
+
+    def __init__(self, total: int, chats: int):
+        self.total = total
+        self.chats = chats
+
+    def __call__(self, request):
+        params = json.loads(request.content)
+        first = params.get("offset") or 0
+        result = [
+            {"update_id": update_id, "message": {"chat": {"id": update_id % self.chats}, "text": "hi"}}
+            for update_id in range(first, min(self.total, first + params["limit"]))
+        ]
+        return httpx.Response(200, json={"ok": True, "result": result})
+
+
+class Handler:
+    base_url = "https://api.telegram.test/bot0"
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def handle_update(self, update):
+        await asyncio.sleep(self.latency)
+        return {"status": "processed"}
+
+
+async def drain(args, max_concurrency: int) -> float:
+    """Poll until the stub has nothing left; returns elapsed seconds"""
+    with tempfile.TemporaryDirectory() as directory:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(BotApi(args.updates, args.chats)))
+        poller = TelegramPoller(Handler(args.latency), OffsetStore(os.path.join(directory, "offset.json")),
+                                batch_size=100, poll_timeout=0, max_concurrency=max_concurrency, client=client)
+        started = time.perf_counter()
+        handled = 0
+        while await poller.poll_once():
+            handled = poller.stats["updates"]
+        elapsed = time.perf_counter() - started
+        await client.aclose()
+    assert handled == args.updates
+    return elapsed
+
+
+async def run(args):
+    print(f"{args.updates} updates over {args.chats} chats, handler latency {args.latency * 1000:.0f} ms\n")
+    baseline = None
+    for concurrency in args.concurrency:
+        elapsed = await drain(args, concurrency)
+        baseline = baseline or elapsed
+        label = f"{concurrency} chat(s) at once"
+        print(f"{label:<24} {elapsed:8.3f} s  {args.updates / elapsed:8.1f} updates/s  "
+              f"{baseline / elapsed:6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--updates", type=int, default=500)
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated handler latency (seconds)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 5, 20])
+    args = parser.parse_args()
+
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
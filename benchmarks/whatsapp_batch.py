@@ -0,0 +1,86 @@
+"""
+WhatsApp webhook batches: concurrent senders vs one message at a time
+
+Run from the repository root:  python -m benchmarks.whatsapp_batch
+
+The agent is replaced by a fixed-latency stub and replies are not sent,
+so the numbers show what batch dispatch gains for a given agent latency.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+import structlog
+
+from core.engine.core_agent import AgentResponse
+from integrations.whatsapp_integration import WhatsAppIntegration
+
+
+def webhook(senders: int, messages_per_sender: int, per_change: int = 10):
+    """One payload with every sender's messages interleaved, spread over changes"""
+    messages = [
+        {"from": f"1555{sender:06d}", "id": f"wamid.{sender}.{n}", "type": "text", "text": {"body": f"message {n}"}}
+        for n in range(messages_per_sender) for sender in range(senders)
+    ]
+    changes = [{"value": {"messages": messages[start:start + per_change]}}
+               for start in range(0, len(messages), per_change)]
+    return {"entry": [{"changes": changes}]}
+
+
+def make_integration(latency: float, max_concurrent_senders: int) -> WhatsAppIntegration:
+    integration = WhatsAppIntegration(api_token="", max_concurrent_senders=max_concurrent_senders,
+                                      progressive=False)
+
+    async def process_message(message, user_id, context):
+        await asyncio.sleep(latency)
+        return AgentResponse(agent_type="core", response="ok", actions_taken=[], metadata={}, success=True)
+
+    async def send_message(phone_number, message, message_type="text"):
+        return {"status": "sent"}
+
+    integration.agent.process_message = process_message
+    integration.send_message = send_message
+    return integration
+
+
+async def sequential(integration: WhatsAppIntegration, payload):
+    for message in integration._iter_messages(payload):
+        await integration._process_message(message)
+
+
+async def run(args):
+    payload = webhook(args.senders, args.messages_per_sender)
+    total = args.senders * args.messages_per_sender
+    print(f"{total} messages from {args.senders} senders, agent latency {args.latency * 1000:.0f} ms\n")
+
+    integration = make_integration(args.latency, args.max_concurrent_senders)
+    started = time.perf_counter()
+    await sequential(integration, payload)
+    baseline = time.perf_counter() - started
+    print(f"{'one message at a time':<32} {baseline:8.3f} s  {total / baseline:8.1f} msg/s")
+
+    started = time.perf_counter()
+    result = await integration.handle_webhook_batch(payload)
+    batched = time.perf_counter() - started
+    assert result["message_count"] == total and result["failed"] == 0
+    label = f"batch ({args.max_concurrent_senders} senders at once)"
+    print(f"{label:<32} {batched:8.3f} s  {total / batched:8.1f} msg/s")
+    print(f"{'speed-up':<32} {baseline / batched:8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--senders", type=int, default=50)
+    parser.add_argument("--messages-per-sender", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated agent latency (seconds)")
+    parser.add_argument("--max-concurrent-senders", type=int, default=10)
+    args = parser.parse_args()
+
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ Configuration settings for the AI Agent system
 
 import os
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Optional, Dict, Any
 
 
 class Settings(BaseSettings):
@@ -21,7 +21,9 @@ class Settings(BaseSettings):
     # Agent Configuration
     DEFAULT_AGENT_TEMPERATURE: float = 0.7
     MAX_TOKENS: int = 1000
+    LLM_TIMEOUT_SECONDS: float = 60.0
     CONVERSATION_MEMORY_SIZE: int = 20
+    BATCH_CHAT_MAX_ITEMS: int = 10000
     GROQ_STREAMING: bool = False
     
     # Server Configuration
@@ -39,6 +41,12 @@ class Settings(BaseSettings):
     # API Security
     API_KEY: Optional[str] = None
     REQUIRE_API_KEY: bool = False
+    # Additional keys with per-key limits (0 = unlimited), e.g.
+    # API_KEYS='{"<key>": {"name": "crm", "requests_per_minute": 120, "tokens_per_minute": 50000}}'
+    API_KEYS: Dict[str, Dict[str, Any]] = {}
+    DEFAULT_REQUESTS_PER_MINUTE: float = 0
+    DEFAULT_TOKENS_PER_MINUTE: float = 0
+    QUOTA_BACKEND: str = "memory"  # memory or redis (uses REDIS_URL, shared across workers)
     
     @property
     def is_production(self) -> bool:
@@ -59,6 +67,115 @@ class Settings(BaseSettings):
     WHATSAPP_WEBHOOK_TOKEN: Optional[str] = None
     TWILIO_ACCOUNT_SID: Optional[str] = None
     TWILIO_AUTH_TOKEN: Optional[str] = None
+    WHATSAPP_MAX_CONCURRENT_SENDERS: int = 10
+    WHATSAPP_PHONE_NUMBER_ID: Optional[str] = None
+    WHATSAPP_API_BASE_URL: str = "https://graph.facebook.com/v17.0"
+    TELEGRAM_API_BASE_URL: str = "https://api.telegram.org"
+    TELEGRAM_POLL_TIMEOUT: int = 30
+    TELEGRAM_POLL_BATCH_SIZE: int = 100
+    TELEGRAM_POLL_CONCURRENCY: int = 20
+    TELEGRAM_POLL_OFFSET_FILE: str = ".telegram_offset.json"
+    
+    # Progressive Reply Configuration
+    PROGRESSIVE_REPLIES_ENABLED: bool = False
+    TELEGRAM_EDIT_INTERVAL: float = 1.5
+    WHATSAPP_MIN_CHUNK_CHARS: int = 300
+    
+    # Web Chat Configuration
+    WEBCHAT_WS_SEND_QUEUE_SIZE: int = 32
+    WEBCHAT_WS_SEND_TIMEOUT: float = 10.0
+    WEBCHAT_SESSION_TTL: float = 1800.0
+    WEBCHAT_MAX_SESSIONS: int = 10000
+    WEBCHAT_SWEEP_INTERVAL: float = 30.0
+    WEBCHAT_SESSION_DB: Optional[str] = None
+    WEBCHAT_SPECULATIVE_ENABLED: bool = False
+    WEBCHAT_SPECULATIVE_TOP_N: int = 2
+    WEBCHAT_SPECULATIVE_TTL: float = 120.0
+    WEBCHAT_SPECULATIVE_CONCURRENCY: int = 2
+    
+    # Outbound Delivery Configuration
+    OUTBOUND_DELIVERY_ENABLED: bool = False
+    OUTBOUND_MAX_RETRIES: int = 3
+    OUTBOUND_TIMEOUT_SECONDS: float = 10.0
+    OUTBOUND_DEAD_LETTER_SIZE: int = 1000
+    TELEGRAM_GLOBAL_RATE: float = 30.0
+    TELEGRAM_PER_CHAT_RATE: float = 1.0
+    WHATSAPP_GLOBAL_RATE: float = 80.0
+    WHATSAPP_PER_NUMBER_RATE: float = 1.0
+    CAMPAIGN_CONCURRENCY: int = 20
+    CAMPAIGN_SEND_RATE: float = 80.0
+    
+    # Background Job Configuration
+    JOB_WORKERS: int = 4
+    JOB_QUEUE_SIZE: int = 1000
+    JOB_RESULT_TTL: float = 3600.0
+    JOB_STORE: str = "memory"  # memory or sqlite
+    JOB_DB_PATH: str = "jobs.db"
+    
+    # Event Bus Configuration
+    EVENT_WORKERS: int = 4
+    EVENT_STORE: str = "memory"  # memory or sqlite (undelivered events survive restarts)
+    EVENT_DB_PATH: str = "events.db"
+    # Failed deliveries back off from EVENT_RETRY_BASE up to EVENT_RETRY_MAX seconds
+    EVENT_MAX_ATTEMPTS: int = 8
+    EVENT_RETRY_BASE: float = 1.0
+    EVENT_RETRY_MAX: float = 60.0
+    EVENT_DEAD_LETTER_MAX: int = 1000  # newest dead events kept for inspection
+    
+    # Idempotency Configuration
+    IDEMPOTENCY_TTL: float = 86400.0
+    IDEMPOTENCY_MAX_KEYS: int = 10000
+    
+    # Admission Control Configuration
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_DEGRADED_MODE: bool = False
+    # Per route class overrides (chat, batch, workflow, default), e.g.
+    # ADMISSION_LIMITS='{"chat": {"max_in_flight": 32, "max_queue": 64, "max_wait": 3}}'
+    ADMISSION_LIMITS: Dict[str, Dict[str, float]] = {}
+    
+    # Bulkhead Configuration
+    # Per workload (interactive, webhook, workflow, batch) overrides, e.g.
+    # BULKHEADS='{"workflow": {"max_concurrent": 4, "max_queue": 500}}'
+    BULKHEADS: Dict[str, Dict[str, int]] = {}
+    
+    # Workflow Configuration
+    # Steps of one workflow running at once (per workflow: parameters.max_concurrency)
+    WORKFLOW_MAX_CONCURRENCY: int = 4
+    WORKFLOW_STORE: str = "memory"  # memory or sqlite (workflows, step checkpoints, schedules)
+    WORKFLOW_DB_PATH: str = "workflows.db"
+    # Memoized agent_task/data_operation results (steps opt in with parameters.cache_ttl)
+    WORKFLOW_CACHE_MAX_ENTRIES: int = 10000
+    # Items processed at once by a "map" step (per step: parameters.concurrency)
+    WORKFLOW_MAP_CONCURRENCY: int = 8
+    # Map step JSONL sources and output files must be under this directory
+    WORKFLOW_DATA_DIR: str = "workflow_data"
+    # Events queued per event-triggered workflow while a run is in progress
+    WORKFLOW_EVENT_QUEUE_SIZE: int = 100
+    # Wait steps at least this long (seconds) hibernate instead of sleeping
+    WORKFLOW_HIBERNATE_AFTER: float = 60.0
+    # Schedules overdue by more than the grace period (e.g. after downtime):
+    # run_once (coalesce), skip, or catch_up (replay up to SCHEDULER_MAX_CATCH_UP runs)
+    SCHEDULER_MISFIRE_POLICY: str = "run_once"
+    SCHEDULER_MISFIRE_GRACE: float = 60.0
+    SCHEDULER_MAX_CATCH_UP: int = 10
+    SCHEDULER_JITTER: float = 0.0  # seconds; per workflow: parameters.jitter_seconds
+    
+    # Request Deadline Configuration
+    # Clients may send X-Request-Timeout (seconds) up to REQUEST_TIMEOUT_MAX;
+    # otherwise the longest matching path prefix sets the budget (0 = none)
+    REQUEST_TIMEOUT_DEFAULT: float = 60.0
+    REQUEST_TIMEOUT_MAX: float = 300.0
+    REQUEST_TIMEOUTS: Dict[str, float] = {
+        "/agent/chat": 30.0,
+        "/agent/chat/batch": 0.0,
+        "/agent/delegate": 60.0,
+        "/workflows": 120.0,
+        "/webhooks": 25.0,
+        "/jobs": 0.0
+    }
+    # Webhooks are acknowledged at once; the reply is produced in the background
+    # under this budget instead of the request's (0 = none)
+    WEBHOOK_PROCESSING_TIMEOUT: float = 120.0
     
     # Redis Configuration
     REDIS_URL: str = "redis://localhost:6379/0"
@@ -5,11 +5,16 @@ Simplified version using only Groq directly
 
 import asyncio
 import re
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, AsyncIterator
 from groq import Groq
 import structlog
 from pydantic import BaseModel
 
+from core.runtime.deadline import DeadlineExceeded, check_deadline, within_deadline, remaining
+from core.runtime.metering import record_llm_tokens, estimate_tokens
+from core.runtime.bulkhead import get_bulkhead, BulkheadFull
+from core.runtime.events import QUOTE_INTENT, publish_event
+
 try:
     from config import settings
 except ImportError:
@@ -18,6 +23,10 @@ except ImportError:
 
 logger = structlog.get_logger(__name__)
 
+# Bump whenever the system or specialist prompts change: memoized workflow
+# step results are keyed on it, so old answers stop being reused
+PROMPT_VERSION = "1"
+
 
 class AgentResponse(BaseModel):
     """Response model for agent interactions"""
@@ -92,17 +101,26 @@ class CoreAIAgent:
                 else:
                     groq_messages.append(msg)
             
-            # Call Groq API
-            completion = self.groq_client.chat.completions.create(
+            # Call Groq API on the workload's bulkhead threads, bounded by the request deadline
+            completion = await within_deadline("llm", get_bulkhead().call(
+                self.groq_client.chat.completions.create,
                 model=getattr(self, 'model', 'llama3-70b-8192'),
                 messages=groq_messages,
                 temperature=getattr(self, 'temperature', 0.7),
                 max_tokens=getattr(self, 'max_tokens', 1000),
-                stream=False  # For now, using non-streaming
-            )
+                stream=False,  # For now, using non-streaming
+                timeout=remaining(getattr(settings, 'LLM_TIMEOUT_SECONDS', 60.0))
+            ))
             
-            return completion.choices[0].message.content
+            content = completion.choices[0].message.content
+            usage = getattr(completion, "usage", None)
+            record_llm_tokens(getattr(usage, "total_tokens", 0) or estimate_tokens(
+                *(m.get("content", "") for m in groq_messages), content
+            ))
+            return content
             
+        except (DeadlineExceeded, BulkheadFull):
+            raise
         except Exception as e:
             logger.error(f"Error calling Groq API: {str(e)}")
             return f"I apologize, but I'm experiencing technical difficulties. Error: {str(e)}"
@@ -141,51 +159,28 @@ class CoreAIAgent:
     
     
     async def process_message(self, message: str, user_id: str = None, 
-                            context: Dict[str, Any] = None) -> AgentResponse:
+                            context: Dict[str, Any] = None, remember: bool = True) -> AgentResponse:
         """
         Process an incoming message and return a structured response
+        
+        With ``remember=False`` the conversation history is read but not
+        updated (used for speculative replies the user may never request).
         """
         
         try:
+            check_deadline("engine")
             logger.info(f"Processing message from user {user_id}: {message[:100]}...")
+            if remember:
+                self._publish_intents(message, user_id, context)
             
             # If using mock mode (placeholder API key)
             if self.groq_client is None:
                 return self._mock_response(message, user_id, context)
             
-            # Add to conversation memory
-            if user_id:
-                if user_id not in self.conversation_memory:
-                    self.conversation_memory[user_id] = []
-                
-                self.conversation_memory[user_id].append({
-                    "role": "user",
-                    "content": message,
-                    "timestamp": "2025-06-28T10:00:00Z"
-                })
-                
-                # Keep only last 10 messages
-                if len(self.conversation_memory[user_id]) > 10:
-                    self.conversation_memory[user_id] = self.conversation_memory[user_id][-10:]
-            
-            # Create system prompt
-            system_prompt = self._get_system_prompt(context)
-            
-            # Get recent conversation for context
-            recent_messages = []
-            if user_id and user_id in self.conversation_memory:
-                recent_messages = self.conversation_memory[user_id][-5:]  # Last 5 messages
-            
-            # Create messages for the LLM (using Groq format directly)
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            # Add recent conversation context
-            for msg in recent_messages[:-1]:  # Exclude the current message
-                if msg["role"] == "user":
-                    messages.append({"role": "user", "content": msg["content"]})
-            
-            # Add current message
-            messages.append({"role": "user", "content": message})
+            # Add to conversation memory and build the LLM messages
+            if remember:
+                self._remember(user_id, "user", message)
+            messages = self._build_llm_messages(message, user_id, context, current_in_memory=remember)
             
             # Call Groq LLM
             response_content = await self._call_groq_llm(messages)
@@ -194,12 +189,8 @@ class CoreAIAgent:
             formatted_response = self._format_response(response_content)
             
             # Store response in memory
-            if user_id:
-                self.conversation_memory[user_id].append({
-                    "role": "assistant", 
-                    "content": formatted_response,
-                    "timestamp": "2025-06-28T10:00:00Z"
-                })
+            if remember:
+                self._remember(user_id, "assistant", formatted_response)
             
             # Determine actions taken based on message content (but don't show them)
             actions_taken = []  # Hide actions from user
@@ -219,6 +210,8 @@ class CoreAIAgent:
             logger.info(f"Successfully processed message for user {user_id}")
             return agent_response
             
+        except (DeadlineExceeded, BulkheadFull):
+            raise
         except Exception as e:
             logger.error(f"Error processing message: {str(e)}")
             return AgentResponse(
@@ -229,6 +222,134 @@ class CoreAIAgent:
                 success=False
             )
     
+    async def stream_message(self, message: str, user_id: str = None,
+                             context: Dict[str, Any] = None,
+                             outcome: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Process a message and yield the response text as it is generated
+        
+        Yields raw text deltas. Conversation memory is updated with the
+        formatted response once the stream completes, like ``process_message``.
+        A failed completion yields an apology instead of raising; pass an
+        ``outcome`` dict to learn whether it succeeded (``success``, ``error``).
+        ``DeadlineExceeded`` and ``BulkheadFull`` propagate, as they do from
+        ``process_message``.
+        """
+        if outcome is None:
+            outcome = {}
+        outcome["success"] = True
+        self._publish_intents(message, user_id, context)
+        
+        if self.groq_client is None:
+            # Mock mode: replay the canned response in small chunks
+            mock = self._mock_response(message, user_id, context).response
+            words = mock.split(" ")
+            for i in range(0, len(words), 3):
+                yield " ".join(words[i:i + 3]) + (" " if i + 3 < len(words) else "")
+                await asyncio.sleep(0)
+            return
+        
+        self._remember(user_id, "user", message)
+        messages = self._build_llm_messages(message, user_id, context)
+        
+        chunks: List[str] = []
+        bulkhead = get_bulkhead()
+        try:
+            # The Groq client is synchronous; pull each chunk off the event loop,
+            # holding one of the workload's slots for the whole stream
+            async with bulkhead.slot():
+                stream = await within_deadline("llm", bulkhead.run_sync(
+                    self.groq_client.chat.completions.create,
+                    model=getattr(self, 'model', 'llama3-70b-8192'),
+                    messages=messages,
+                    temperature=getattr(self, 'temperature', 0.7),
+                    max_tokens=getattr(self, 'max_tokens', 1000),
+                    stream=True,
+                    timeout=remaining(getattr(settings, 'LLM_TIMEOUT_SECONDS', 60.0))
+                ))
+                iterator = iter(stream)
+                while True:
+                    chunk = await within_deadline("llm", bulkhead.run_sync(next, iterator, None))
+                    if chunk is None:
+                        break
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        chunks.append(delta)
+                        yield delta
+        except (DeadlineExceeded, BulkheadFull) as e:
+            outcome["success"] = False
+            outcome["error"] = str(e)
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming from Groq API: {str(e)}")
+            outcome["success"] = False
+            outcome["error"] = str(e)
+            if not chunks:
+                error_text = f"I apologize, but I'm experiencing technical difficulties. Error: {str(e)}"
+                chunks.append(error_text)
+                yield error_text
+        finally:
+            record_llm_tokens(estimate_tokens(*(m.get("content", "") for m in messages), *chunks))
+            self._remember(user_id, "assistant", self._format_response("".join(chunks)))
+    
+    def _publish_intents(self, message: str, user_id: Optional[str], context: Dict[str, Any] = None):
+        """Publish intents detected in a customer's message (quote requests)"""
+        platform = (context or {}).get("platform")
+        if not user_id or not platform:
+            return  # internal calls, e.g. workflow agent tasks
+        if "quote_inquiry_processed" in self._analyze_actions(message, ""):
+            publish_event(QUOTE_INTENT, {"user_id": user_id, "platform": platform, "text": message}, source="agent")
+    
+    def record_exchange(self, user_id: Optional[str], message: str, response: str):
+        """Add a user message and its reply to memory (e.g. a reply produced ahead of time)"""
+        self._remember(user_id, "user", message)
+        self._remember(user_id, "assistant", response)
+    
+    def _remember(self, user_id: Optional[str], role: str, content: str):
+        """Append a turn to the user's conversation memory (last 10 kept)"""
+        if not user_id:
+            return
+        
+        history = self.conversation_memory.setdefault(user_id, [])
+        history.append({
+            "role": role,
+            "content": content,
+            "timestamp": "2025-06-28T10:00:00Z"
+        })
+        
+        # Keep only last 10 messages
+        if len(history) > 10:
+            self.conversation_memory[user_id] = history[-10:]
+    
+    def _build_llm_messages(self, message: str, user_id: Optional[str],
+                            context: Dict[str, Any] = None,
+                            current_in_memory: bool = True) -> List[Dict[str, str]]:
+        """Build the Groq message list for a user message"""
+        # Create system prompt
+        system_prompt = self._get_system_prompt(context)
+        
+        # Get recent conversation for context
+        recent_messages = []
+        if user_id and user_id in self.conversation_memory:
+            recent_messages = self.conversation_memory[user_id][-5:]  # Last 5 messages
+            if current_in_memory:
+                recent_messages = recent_messages[:-1]  # Exclude the current message
+            else:
+                recent_messages = recent_messages[1:]
+        
+        # Create messages for the LLM (using Groq format directly)
+        messages = [{"role": "system", "content": system_prompt}]
+        
+        # Add recent conversation context
+        for msg in recent_messages:
+            if msg["role"] == "user":
+                messages.append({"role": "user", "content": msg["content"]})
+        
+        # Add current message
+        messages.append({"role": "user", "content": message})
+        
+        return messages
+    
     def _get_system_prompt(self, context: Dict[str, Any] = None) -> str:
         """Generate system prompt based on context"""
         
@@ -369,6 +490,7 @@ class CoreAIAgent:
             )
         
         try:
+            check_deadline("engine")
             agent_config = self.agents[agent_type]
             
             # Create specialized prompt for the agent
@@ -406,6 +528,8 @@ class CoreAIAgent:
                 success=True
             )
             
+        except (DeadlineExceeded, BulkheadFull):
+            raise
         except Exception as e:
             logger.error(f"Error delegating to {agent_type} agent: {str(e)}")
             return AgentResponse(
@@ -10,6 +10,9 @@ import structlog
 
 # Import settings first
 from config.settings import settings
+from core.runtime.deadline import DeadlineExceeded, check_deadline, within_deadline, remaining
+from core.runtime.metering import record_llm_tokens, estimate_tokens
+from core.runtime.bulkhead import get_bulkhead, BulkheadFull
 
 # Initialize logger
 logger = structlog.get_logger(__name__)
@@ -85,6 +88,8 @@ class CoreAIAgent:
             AgentResponse with the AI's response
         """
         try:
+            check_deadline("engine")
+            
             # Prepare conversation context
             conversation_context = self._build_conversation_context(message, user_id, context)
             
@@ -108,6 +113,8 @@ class CoreAIAgent:
                 }
             )
             
+        except (DeadlineExceeded, BulkheadFull):
+            raise
         except Exception as e:
             logger.error(f"Error processing message: {str(e)}")
             return AgentResponse(
@@ -156,6 +163,8 @@ class CoreAIAgent:
             
             return response
             
+        except (DeadlineExceeded, BulkheadFull):
+            raise
         except Exception as e:
             logger.error(f"Error delegating to {agent_type} agent: {str(e)}")
             return AgentResponse(
@@ -208,7 +217,10 @@ Provide helpful, professional responses tailored to business needs."""
             if not self.groq_client:
                 raise Exception("Groq client not initialized - check API key configuration")
                 
-            response = self.groq_client.chat.completions.create(
+            # Run the synchronous client on the workload's bulkhead threads,
+            # bounded by the request deadline
+            response = await within_deadline("llm", get_bulkhead().call(
+                self.groq_client.chat.completions.create,
                 model=self.model,
                 messages=[
                     {"role": "user", "content": conversation_context}
@@ -216,11 +228,17 @@ Provide helpful, professional responses tailored to business needs."""
                 temperature=0.7,
                 max_tokens=1500,
                 top_p=1,
-                stream=False
-            )
+                stream=False,
+                timeout=remaining(settings.LLM_TIMEOUT_SECONDS)
+            ))
             
-            return response.choices[0].message.content.strip()
+            content = response.choices[0].message.content.strip()
+            usage = getattr(response, "usage", None)
+            record_llm_tokens(getattr(usage, "total_tokens", 0) or estimate_tokens(conversation_context, content))
+            return content
             
+        except (DeadlineExceeded, BulkheadFull):
+            raise
         except Exception as e:
             logger.error(f"Groq API call failed: {str(e)}")
             raise Exception(f"AI service temporarily unavailable: {str(e)}")
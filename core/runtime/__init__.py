@@ -0,0 +1,17 @@
+"""
+Runtime utilities shared by the API, integrations and workflows
+"""
+
+from .rate_limit import TokenBucket, KeyedTokenBuckets
+from .deadline import DeadlineExceeded, deadline_scope, remaining, within_deadline
+from .bulkhead import Bulkhead, BulkheadFull, get_bulkhead, workload
+from .jobs import Job, JobStatus, JobManager, InMemoryJobStore, SQLiteJobStore, register_job_handler
+from .events import Event, EventBus, InMemoryEventStore, SQLiteEventStore, get_event_bus, publish_event
+
+__all__ = [
+    "TokenBucket", "KeyedTokenBuckets",
+    "DeadlineExceeded", "deadline_scope", "remaining", "within_deadline",
+    "Bulkhead", "BulkheadFull", "get_bulkhead", "workload",
+    "Job", "JobStatus", "JobManager", "InMemoryJobStore", "SQLiteJobStore", "register_job_handler",
+    "Event", "EventBus", "InMemoryEventStore", "SQLiteEventStore", "get_event_bus", "publish_event"
+]
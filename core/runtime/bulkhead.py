@@ -0,0 +1,171 @@
+"""
+Bulkheads: isolated concurrency pools per workload class
+
+Interactive chat, platform webhooks, workflows and batch jobs each get their
+own bulkhead: a bounded number of concurrent LLM calls, a bounded wait
+queue and a dedicated thread pool for the blocking Groq client. A flood in
+one class queues (and is eventually rejected) inside its own bulkhead and
+cannot take threads, connections or slots from the others.
+
+The current workload travels in a context variable, set once at the edge
+(HTTP middleware, webhook handlers, the job manager, the workflow engine).
+"""
+
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Callable
+import structlog
+
+from config.settings import settings
+
+logger = structlog.get_logger(__name__)
+
+INTERACTIVE = "interactive"
+WEBHOOK = "webhook"
+WORKFLOW = "workflow"
+BATCH = "batch"
+
+DEFAULT_BULKHEADS: Dict[str, Dict[str, int]] = {
+    INTERACTIVE: {"max_concurrent": 32, "max_queue": 256},
+    WEBHOOK: {"max_concurrent": 16, "max_queue": 1000},
+    WORKFLOW: {"max_concurrent": 8, "max_queue": 1000},
+    BATCH: {"max_concurrent": 4, "max_queue": 10000}
+}
+
+
+class BulkheadFull(Exception):
+    """The workload's queue is full"""
+
+    def __init__(self, name: str):
+        self.name = name
+        super().__init__(f"The {name} workload is at capacity, retry later")
+
+
+class Bulkhead:
+    """Concurrency slots, wait queue and thread pool for one workload class"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.active = 0
+        self.waiting = 0
+        self.stats = {"completed": 0, "rejected": 0, "total_wait_seconds": 0.0}
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrent, thread_name_prefix=f"bulkhead-{self.name}"
+            )
+        return self._executor
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of this workload's concurrency slots"""
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise BulkheadFull(self.name)
+
+        self.waiting += 1
+        started = time.monotonic()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.stats["total_wait_seconds"] += time.monotonic() - started
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.stats["completed"] += 1
+            self._semaphore.release()
+
+    async def run_sync(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking call on this workload's threads (context preserved)"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(context.run, func, *args, **kwargs)
+        )
+
+    async def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Take a slot and run a blocking call on this workload's threads"""
+        async with self.slot():
+            return await self.run_sync(func, *args, **kwargs)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        completed = self.stats["completed"]
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "completed": completed,
+            "rejected": self.stats["rejected"],
+            "avg_wait_ms": round(self.stats["total_wait_seconds"] / completed * 1000, 1) if completed else 0.0
+        }
+
+
+_workload: ContextVar[str] = ContextVar("workload", default=INTERACTIVE)
+_bulkheads: Dict[str, Bulkhead] = {}
+
+
+def _configured() -> Dict[str, Dict[str, int]]:
+    merged = {name: dict(limits) for name, limits in DEFAULT_BULKHEADS.items()}
+    for name, limits in settings.BULKHEADS.items():
+        merged.setdefault(name, dict(DEFAULT_BULKHEADS[INTERACTIVE])).update(limits)
+    return merged
+
+
+def get_bulkhead(name: Optional[str] = None) -> Bulkhead:
+    """Bulkhead for ``name`` (default: the current workload)"""
+    name = name or _workload.get()
+    bulkhead = _bulkheads.get(name)
+    if bulkhead is None:
+        limits = _configured().get(name) or _configured()[INTERACTIVE]
+        bulkhead = Bulkhead(name, int(limits["max_concurrent"]), int(limits["max_queue"]))
+        _bulkheads[name] = bulkhead
+    return bulkhead
+
+
+def current_workload() -> str:
+    return _workload.get()
+
+
+def set_workload(name: str):
+    """Tag the rest of this context (and tasks it spawns) with a workload class"""
+    _workload.set(name)
+
+
+@contextmanager
+def workload(name: str):
+    token = _workload.set(name)
+    try:
+        yield
+    finally:
+        _workload.reset(token)
+
+
+def get_bulkhead_stats() -> Dict[str, Any]:
+    return {name: get_bulkhead(name).get_stats() for name in _configured()}
+
+
+def shutdown_bulkheads():
+    for bulkhead in _bulkheads.values():
+        bulkhead.shutdown()
+    _bulkheads.clear()
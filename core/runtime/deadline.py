@@ -0,0 +1,124 @@
+"""
+Request deadlines propagated through the call chain
+
+A deadline is set once (per request, by the API) and carried in a context
+variable, so every stage below it (engine, LLM call, tools, outbound sends)
+can ask for the remaining budget without threading a parameter through
+every signature. ``asyncio`` tasks and ``asyncio.to_thread`` copy the
+context, so the deadline follows the work.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Awaitable, Any
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out during ``stage``"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        super().__init__(f"Deadline exceeded during {stage}")
+
+
+class Deadline:
+    """An absolute expiry on the monotonic clock"""
+
+    __slots__ = ("expires_at", "budget")
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+_exceeded: Dict[str, int] = {}
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def remaining(cap: Optional[float] = None) -> Optional[float]:
+    """Seconds left (at most ``cap``); None when there is no deadline and no cap"""
+    deadline = _current.get()
+    if deadline is None:
+        return cap
+    left = deadline.remaining()
+    return left if cap is None else min(cap, left)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """
+    Run the block under a deadline of ``seconds`` from now
+
+    Nested scopes can only tighten the budget, never extend it.
+    ``None`` keeps the enclosing deadline (if any).
+    """
+    if seconds is None:
+        yield _current.get()
+        return
+    new = Deadline(seconds)
+    outer = _current.get()
+    if outer is not None and outer.expires_at < new.expires_at:
+        new = outer
+    token = _current.set(new)
+    try:
+        yield new
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def no_deadline():
+    """Detach the block from the caller's deadline (background work)"""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def record_exceeded(stage: str):
+    _exceeded[stage] = _exceeded.get(stage, 0) + 1
+    logger.warning(f"Deadline exceeded during {stage}")
+
+
+def check_deadline(stage: str):
+    """Raise DeadlineExceeded if the budget is already spent"""
+    deadline = _current.get()
+    if deadline is not None and deadline.expired:
+        record_exceeded(stage)
+        raise DeadlineExceeded(stage)
+
+
+async def within_deadline(stage: str, awaitable: Awaitable[Any]) -> Any:
+    """Await ``awaitable`` with the remaining budget as its timeout"""
+    deadline = _current.get()
+    if deadline is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout=deadline.remaining())
+    except asyncio.TimeoutError:
+        if not deadline.expired:
+            raise  # a timeout of the awaitable's own, not ours
+        record_exceeded(stage)
+        raise DeadlineExceeded(stage)
+
+
+def get_deadline_stats() -> Dict[str, int]:
+    """Deadline-exceeded counts per stage"""
+    return dict(_exceeded)
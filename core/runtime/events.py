@@ -0,0 +1,407 @@
+"""
+In-process event bus for integrations, tools and the workflow engine
+
+Publishers emit typed events (``message.received``, ``crm.record_created``,
+``agent.quote_intent`` ...); each type has a pydantic model that its data is
+validated against. Subscribers register for one event type with an
+optional filter predicate (workflows compile theirs from an expression).
+Subscriptions are indexed by event type, so publishing only evaluates the
+filters of that type, and an event nobody wants is dropped without
+touching the store.
+
+Delivery is at-least-once: a matching event is written to the store with
+the subscriptions it still owes before anyone is called, and removed once
+every one of them has handled it. Failed deliveries are retried with
+exponential backoff and dead-lettered after ``EVENT_MAX_ATTEMPTS`` (the
+newest ``EVENT_DEAD_LETTER_MAX`` dead events are kept); events left in the
+store by a crash are redelivered on start. Handlers may
+therefore see an event more than once.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Callable, Awaitable, Type
+from pydantic import BaseModel, ConfigDict, Field
+import structlog
+
+from config.settings import settings
+from .deadline import no_deadline
+
+logger = structlog.get_logger(__name__)
+
+
+class EventData(BaseModel):
+    """Base for event payloads; fields beyond the declared ones are kept"""
+    model_config = ConfigDict(extra="allow")
+
+
+class MessageReceived(EventData):
+    """An inbound chat message on any platform"""
+    platform: str
+    user_id: str
+    text: str = ""
+    message_id: Optional[str] = None
+
+
+class RecordCreated(EventData):
+    """A CRM record (lead, deal, contact...) was created"""
+    record_type: str
+    record_id: str
+    data: Dict[str, Any] = Field(default_factory=dict)
+
+
+class RecordUpdated(EventData):
+    """Fields of a CRM record were updated"""
+    record_type: str
+    record_id: str
+    updates: Dict[str, Any] = Field(default_factory=dict)
+
+
+class QuoteIntent(EventData):
+    """An agent detected a pricing or quote request"""
+    user_id: str
+    platform: Optional[str] = None
+    text: str = ""
+
+
+class WorkflowFinished(EventData):
+    """A workflow run completed or failed"""
+    workflow_id: str
+    name: str
+    run_id: Optional[str] = None
+    status: str
+
+
+MESSAGE_RECEIVED = "message.received"
+RECORD_CREATED = "crm.record_created"
+RECORD_UPDATED = "crm.record_updated"
+QUOTE_INTENT = "agent.quote_intent"
+WORKFLOW_COMPLETED = "workflow.completed"
+WORKFLOW_FAILED = "workflow.failed"
+
+EVENT_TYPES: Dict[str, Type[EventData]] = {
+    MESSAGE_RECEIVED: MessageReceived,
+    RECORD_CREATED: RecordCreated,
+    RECORD_UPDATED: RecordUpdated,
+    QUOTE_INTENT: QuoteIntent,
+    WORKFLOW_COMPLETED: WorkflowFinished,
+    WORKFLOW_FAILED: WorkflowFinished
+}
+
+
+class Event(BaseModel):
+    """A published event and the subscriptions it has not been delivered to yet"""
+    event_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    type: str
+    source: str
+    data: Dict[str, Any] = Field(default_factory=dict)
+    occurred_at: str = Field(default_factory=lambda: datetime.now().isoformat())
+    pending: List[str] = Field(default_factory=list)
+    attempts: int = 0
+    status: str = "pending"  # pending or dead
+    error: Optional[str] = None
+
+
+# A handler receives the subscription id and the event; raising means "retry later"
+EventHandler = Callable[[str, Event], Awaitable[Any]]
+EventFilter = Callable[[Event], bool]
+
+
+class Subscription:
+    """One subscriber's interest in an event type"""
+
+    def __init__(self, subscription_id: str, event_type: str, handler: EventHandler,
+                 predicate: Optional[EventFilter] = None):
+        self.subscription_id = subscription_id
+        self.event_type = event_type
+        self.handler = handler
+        self.predicate = predicate
+
+    def matches(self, event: Event) -> bool:
+        if self.predicate is None:
+            return True
+        try:
+            return bool(self.predicate(event))
+        except Exception as e:
+            logger.warning(f"Filter of {self.subscription_id} skipped event {event.event_id}: {str(e)}")
+            return False
+
+
+class InMemoryEventStore:
+    """Undelivered events in process memory; only the newest ``max_dead`` dead events are kept"""
+
+    def __init__(self, max_dead: int = None):
+        self.max_dead = max_dead if max_dead is not None else settings.EVENT_DEAD_LETTER_MAX
+        self._pending: Dict[str, Event] = {}
+        self._dead: "OrderedDict[str, Event]" = OrderedDict()
+
+    def save(self, event: Event):
+        if event.status != "dead":
+            self._pending[event.event_id] = event
+            return
+        self._pending.pop(event.event_id, None)
+        self._dead[event.event_id] = event
+        while len(self._dead) > self.max_dead:
+            self._dead.popitem(last=False)
+
+    def delete(self, event_id: str):
+        self._pending.pop(event_id, None)
+        self._dead.pop(event_id, None)
+
+    def load_pending(self) -> List[Event]:
+        return list(self._pending.values())
+
+    def count_dead(self) -> int:
+        return len(self._dead)
+
+    def close(self):
+        pass
+
+
+class SQLiteEventStore:
+    """Undelivered events in a SQLite file, redelivered after a restart"""
+
+    def __init__(self, path: str, max_dead: int = None):
+        self.max_dead = max_dead if max_dead is not None else settings.EVENT_DEAD_LETTER_MAX
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        # Publishers may run in worker threads (e.g. tools)
+        self._lock = threading.Lock()
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "event_id TEXT PRIMARY KEY, data TEXT NOT NULL, status TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS events_status ON events (status)")
+        self.conn.commit()
+
+    def save(self, event: Event):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO events (event_id, data, status) VALUES (?, ?, ?)",
+                (event.event_id, event.model_dump_json(), event.status)
+            )
+            if event.status == "dead":
+                # Replacing a row gives it a new rowid, so the newest dead events sort last
+                self.conn.execute(
+                    "DELETE FROM events WHERE status = 'dead' AND rowid NOT IN "
+                    "(SELECT rowid FROM events WHERE status = 'dead' ORDER BY rowid DESC LIMIT ?)",
+                    (self.max_dead,)
+                )
+            self.conn.commit()
+
+    def delete(self, event_id: str):
+        with self._lock:
+            self.conn.execute("DELETE FROM events WHERE event_id = ?", (event_id,))
+            self.conn.commit()
+
+    def load_pending(self) -> List[Event]:
+        with self._lock:
+            rows = self.conn.execute("SELECT data FROM events WHERE status = 'pending'").fetchall()
+        return [Event.model_validate_json(row[0]) for row in rows]
+
+    def count_dead(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM events WHERE status = 'dead'").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+class EventBus:
+    """
+    Typed pub/sub with subscriptions indexed by event type
+
+    ``publish`` may be called from the event loop or from worker threads;
+    ``workers`` tasks deliver queued events. Handlers should be quick (the
+    workflow engine's only queues a run) and idempotent.
+    """
+
+    def __init__(self, store=None, workers: int = None, max_attempts: int = None,
+                 retry_base: float = None, retry_max: float = None):
+        self.store = store or InMemoryEventStore()
+        self.workers = workers or settings.EVENT_WORKERS
+        self.max_attempts = max_attempts or settings.EVENT_MAX_ATTEMPTS
+        self.retry_base = retry_base if retry_base is not None else settings.EVENT_RETRY_BASE
+        self.retry_max = retry_max if retry_max is not None else settings.EVENT_RETRY_MAX
+        self._subscriptions: Dict[str, Dict[str, Subscription]] = {}
+        self._live: Dict[str, Event] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self.stats = {"published": 0, "dropped": 0, "delivered": 0, "retried": 0, "dead": 0}
+
+    def start(self):
+        """Start delivering, beginning with events a previous process left undelivered"""
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        pending = self.store.load_pending()
+        for event in pending:
+            self._live[event.event_id] = event
+            self._queue.put_nowait(event.event_id)
+        if pending:
+            logger.info(f"Redelivering {len(pending)} undelivered events")
+        # Deliveries outlive whichever request published the event
+        with no_deadline():
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Event bus started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.store.close()
+
+    def subscribe(self, subscription_id: str, event_type: str, handler: EventHandler,
+                  predicate: Optional[EventFilter] = None) -> Subscription:
+        """Add or replace a subscription; raises ValueError for an unknown event type"""
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type {event_type!r}; use one of {', '.join(EVENT_TYPES)}")
+
+        self.unsubscribe(subscription_id)
+        subscription = Subscription(subscription_id, event_type, handler, predicate)
+        self._subscriptions.setdefault(event_type, {})[subscription_id] = subscription
+        return subscription
+
+    def unsubscribe(self, subscription_id: str) -> bool:
+        for subscriptions in self._subscriptions.values():
+            if subscriptions.pop(subscription_id, None) is not None:
+                return True
+        return False
+
+    def publish(self, event_type: str, data: Dict[str, Any], source: str = "system") -> Optional[Event]:
+        """
+        Publish an event; returns it, or None if no subscription wants it
+
+        Raises ValueError for an unknown type and pydantic's
+        ValidationError when ``data`` does not fit the type's model.
+        """
+        model = EVENT_TYPES.get(event_type)
+        if model is None:
+            raise ValueError(f"Unknown event type {event_type!r}")
+        subscriptions = list(self._subscriptions.get(event_type, {}).values())
+        if not subscriptions:
+            self.stats["dropped"] += 1
+            return None
+
+        event = Event(type=event_type, source=source, data=model.model_validate(data).model_dump())
+        event.pending = [sub.subscription_id for sub in subscriptions if sub.matches(event)]
+        if not event.pending:
+            self.stats["dropped"] += 1
+            return None
+
+        # Stored before anyone is called: a crash from here on means redelivery, not loss
+        self.store.save(event)
+        self.stats["published"] += 1
+        self._enqueue(event)
+        return event
+
+    def _enqueue(self, event: Event):
+        if self._loop is None:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return  # published before start (outside the loop): delivered from the store on start
+            self.start()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._deliver_later(event)
+        else:
+            self._loop.call_soon_threadsafe(self._deliver_later, event)
+
+    def _deliver_later(self, event: Event):
+        self._live[event.event_id] = event
+        self._queue.put_nowait(event.event_id)
+
+    async def _worker(self):
+        while True:
+            event_id = await self._queue.get()
+            event = self._live.get(event_id)
+            if event is not None:
+                await self._deliver(event)
+
+    async def _deliver(self, event: Event):
+        async def call(subscription_id: str) -> Optional[str]:
+            subscription = self._subscriptions.get(event.type, {}).get(subscription_id)
+            if subscription is None:
+                return None  # unsubscribed since: nothing left to deliver
+            try:
+                await subscription.handler(subscription_id, event)
+                return None
+            except Exception as e:
+                return str(e) or e.__class__.__name__
+
+        errors = await asyncio.gather(*(call(subscription_id) for subscription_id in event.pending))
+        failed = [(subscription_id, error) for subscription_id, error in zip(event.pending, errors) if error]
+        self.stats["delivered"] += len(event.pending) - len(failed)
+
+        if not failed:
+            self._live.pop(event.event_id, None)
+            self.store.delete(event.event_id)
+            return
+
+        event.pending = [subscription_id for subscription_id, _ in failed]
+        event.attempts += 1
+        event.error = "; ".join(f"{subscription_id}: {error}" for subscription_id, error in failed)
+        if event.attempts >= self.max_attempts:
+            event.status = "dead"
+            self._live.pop(event.event_id, None)
+            self.stats["dead"] += 1
+            logger.error(f"Giving up on event {event.event_id} ({event.type}) after "
+                         f"{event.attempts} attempts: {event.error}")
+        else:
+            delay = min(self.retry_max, self.retry_base * 2 ** (event.attempts - 1))
+            self.stats["retried"] += 1
+            logger.warning(f"Retrying event {event.event_id} ({event.type}) in {delay:.1f}s: {event.error}")
+            self._loop.call_later(delay, self._queue.put_nowait, event.event_id)
+        self.store.save(event)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "subscriptions": {event_type: len(subscriptions)
+                              for event_type, subscriptions in self._subscriptions.items() if subscriptions},
+            "in_flight": len(self._live),
+            "dead_letters": self.store.count_dead()
+        }
+
+
+_event_bus: Optional[EventBus] = None
+
+
+def get_event_bus() -> EventBus:
+    """Get the process-wide event bus (created on first use)"""
+    global _event_bus
+    if _event_bus is None:
+        store = SQLiteEventStore(settings.EVENT_DB_PATH) if settings.EVENT_STORE == "sqlite" else InMemoryEventStore()
+        _event_bus = EventBus(store=store)
+    return _event_bus
+
+
+def publish_event(event_type: str, data: Dict[str, Any], source: str = "system") -> Optional[Event]:
+    """
+    Publish on the process-wide bus without ever failing the caller
+
+    For integrations and tools, where a broken event must not break the
+    message or CRM operation that produced it.
+    """
+    try:
+        return get_event_bus().publish(event_type, data, source)
+    except Exception as e:
+        logger.error(f"Could not publish {event_type} event: {str(e)}")
+        return None
+
+
+async def close_event_bus():
+    global _event_bus
+    if _event_bus is not None:
+        await _event_bus.stop()
+        _event_bus = None
@@ -0,0 +1,333 @@
+"""
+Background job execution for long-running agent and workflow tasks
+"""
+
+import asyncio
+import sqlite3
+import time
+import uuid
+from datetime import datetime
+from enum import Enum
+from typing import Dict, Any, Optional, List, Callable, Awaitable
+from pydantic import BaseModel, Field
+import structlog
+
+from config.settings import settings
+from .deadline import no_deadline
+from .metering import metered, meter_for_owner
+
+logger = structlog.get_logger(__name__)
+
+
+class JobStatus(str, Enum):
+    """Job lifecycle status"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    @property
+    def is_terminal(self) -> bool:
+        return self in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+
+class Job(BaseModel):
+    """A unit of background work and its outcome"""
+    job_id: str
+    kind: str
+    status: JobStatus = JobStatus.QUEUED
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    events: List[Dict[str, Any]] = Field(default_factory=list)
+    created_at: str = Field(default_factory=lambda: datetime.now().isoformat())
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    expires_at: Optional[float] = None
+    owner: Optional[str] = None  # API key hash of the submitter; LLM tokens are charged to it
+
+    def public_dict(self) -> Dict[str, Any]:
+        """Job as returned by the API (without the input payload)"""
+        return self.model_dump(mode="json", exclude={"payload", "expires_at", "owner"})
+
+
+# A handler receives the payload and a ``report(dict)`` progress callback
+JobHandler = Callable[[Dict[str, Any], Callable[[Dict[str, Any]], None]], Awaitable[Any]]
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def register_job_handler(kind: str, handler: JobHandler):
+    """Register the coroutine that executes jobs of ``kind``"""
+    _handlers[kind] = handler
+
+
+class InMemoryJobStore:
+    """Job storage in process memory"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+
+    def save(self, job: Job):
+        self._jobs[job.job_id] = job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def load_unfinished(self) -> List[Job]:
+        return [job for job in self._jobs.values() if not job.status.is_terminal]
+
+    def delete_expired(self, now: float) -> int:
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.expires_at is not None and job.expires_at <= now]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return len(expired)
+
+    def close(self):
+        pass
+
+
+class SQLiteJobStore:
+    """Job storage in a SQLite file, shared across restarts"""
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at)")
+        self.conn.commit()
+
+    def save(self, job: Job):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO jobs (job_id, data, expires_at) VALUES (?, ?, ?)",
+            (job.job_id, job.model_dump_json(), job.expires_at)
+        )
+        self.conn.commit()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self.conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return Job.model_validate_json(row[0]) if row else None
+
+    def load_unfinished(self) -> List[Job]:
+        # Only finished jobs get an expiry
+        rows = self.conn.execute("SELECT data FROM jobs WHERE expires_at IS NULL").fetchall()
+        jobs = [Job.model_validate_json(row[0]) for row in rows]
+        return [job for job in jobs if not job.status.is_terminal]
+
+    def delete_expired(self, now: float) -> int:
+        cursor = self.conn.execute(
+            "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+        )
+        self.conn.commit()
+        return cursor.rowcount
+
+    def close(self):
+        self.conn.close()
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue cannot accept more work"""
+
+
+class JobManager:
+    """
+    Bounded worker pool with pluggable job storage
+
+    ``submit`` stores a queued job and returns immediately; ``workers``
+    tasks execute jobs from a bounded queue. Progress events are kept on the
+    job and pushed to live subscribers (SSE). Finished jobs are kept for
+    ``result_ttl`` seconds and then swept.
+
+    On start, jobs a previous process left in the store are recovered:
+    queued ones are queued again, and ones that were running fail as
+    interrupted (handlers are not assumed safe to re-run).
+    """
+
+    def __init__(self, store=None, workers: int = None, queue_size: int = None,
+                 result_ttl: float = None, sweep_interval: float = 60.0,
+                 handlers: Optional[Dict[str, JobHandler]] = None):
+        self.store = store or InMemoryJobStore()
+        self.workers = workers or settings.JOB_WORKERS
+        self.result_ttl = result_ttl if result_ttl is not None else settings.JOB_RESULT_TTL
+        self.sweep_interval = sweep_interval
+        self._queue_size = queue_size or settings.JOB_QUEUE_SIZE
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._handlers = handlers if handlers is not None else _handlers
+        self._live: Dict[str, Job] = {}
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self.stats = {"submitted": 0, "succeeded": 0, "failed": 0, "rejected": 0}
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._recover()
+        # Jobs outlive the request that queued them: never inherit its deadline
+        with no_deadline():
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+            self._tasks.append(asyncio.create_task(self._sweeper()))
+        logger.info(f"Job manager started with {self.workers} workers")
+
+    def _recover(self):
+        """Requeue jobs left queued by a previous process and fail those it left running"""
+        requeued = interrupted = 0
+        for job in sorted(self.store.load_unfinished(), key=lambda job: job.created_at):
+            if job.job_id in self._live:
+                continue
+            error = None
+            if job.status == JobStatus.RUNNING:
+                error = "Interrupted by a server restart"
+            elif job.kind not in self._handlers:
+                error = f"Unknown job kind: {job.kind}"
+            else:
+                try:
+                    self._queue.put_nowait(job.job_id)
+                    self._live[job.job_id] = job
+                    requeued += 1
+                    continue
+                except asyncio.QueueFull:
+                    error = "Job queue was full when the server restarted"
+            self._finish(job, JobStatus.FAILED, error=error)
+            interrupted += 1
+        if requeued or interrupted:
+            logger.info(f"Recovered jobs after restart: {requeued} requeued, {interrupted} failed")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.store.close()
+
+    def submit(self, kind: str, payload: Dict[str, Any], owner: Optional[str] = None) -> Job:
+        """Queue a job; raises QueueFullError when at capacity"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        self.start()
+
+        job = Job(job_id=str(uuid.uuid4()), kind=kind, payload=payload, owner=owner)
+        try:
+            self._queue.put_nowait(job.job_id)
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise QueueFullError("Job queue is full, retry later")
+
+        self._live[job.job_id] = job
+        self.store.save(job)
+        self.stats["submitted"] += 1
+        self._publish(job, {"type": "status", "status": job.status.value})
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._live.get(job_id) or self.store.get(job_id)
+
+    def _publish(self, job: Job, event: Dict[str, Any]):
+        event = {**event, "at": datetime.now().isoformat()}
+        job.events.append(event)
+        for queue in self._subscribers.get(job.job_id, []):
+            queue.put_nowait(event)
+
+    async def subscribe(self, job_id: str):
+        """Yield past and future events of a job until it finishes"""
+        job = self.get(job_id)
+        if job is None:
+            return
+
+        queue: asyncio.Queue = asyncio.Queue()
+        replay = list(job.events)
+        if not job.status.is_terminal:
+            self._subscribers.setdefault(job_id, []).append(queue)
+        try:
+            for event in replay:
+                yield event
+            if job.status.is_terminal:
+                return
+            # Subscribed in the same step as the snapshot, so nothing is missed or repeated
+            while True:
+                event = await queue.get()
+                yield event
+                if event.get("type") == "status" and JobStatus(event["status"]).is_terminal:
+                    return
+        finally:
+            subscribers = self._subscribers.get(job_id, [])
+            if queue in subscribers:
+                subscribers.remove(queue)
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            job = self._live.get(job_id)
+            if job is None:
+                continue
+            await self._execute(job)
+
+    async def _execute(self, job: Job):
+        job.status = JobStatus.RUNNING
+        job.started_at = datetime.now().isoformat()
+        self.store.save(job)
+        self._publish(job, {"type": "status", "status": job.status.value})
+
+        def report(progress: Dict[str, Any]):
+            self._publish(job, {"type": "progress", **progress})
+
+        try:
+            with metered(meter_for_owner(job.owner)):
+                result = await self._handlers[job.kind](job.payload, report)
+            self._finish(job, JobStatus.SUCCEEDED, result=result)
+        except Exception as e:
+            logger.error(f"Job {job.job_id} ({job.kind}) failed: {str(e)}")
+            self._finish(job, JobStatus.FAILED, error=str(e))
+
+    def _finish(self, job: Job, status: JobStatus, result: Any = None, error: Optional[str] = None):
+        job.status = status
+        job.result = result
+        job.error = error
+        self.stats["succeeded" if status == JobStatus.SUCCEEDED else "failed"] += 1
+        job.finished_at = datetime.now().isoformat()
+        job.expires_at = time.time() + self.result_ttl
+        self._publish(job, {"type": "status", "status": job.status.value})
+        self.store.save(job)
+        self._live.pop(job.job_id, None)
+
+    async def _sweeper(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                removed = self.store.delete_expired(time.time())
+                if removed:
+                    logger.info(f"Removed {removed} expired jobs")
+            except Exception as e:
+                logger.error(f"Error sweeping jobs: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "live": len(self._live)
+        }
+
+
+_job_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    """Get the process-wide job manager (created on first use)"""
+    global _job_manager
+    if _job_manager is None:
+        store = SQLiteJobStore(settings.JOB_DB_PATH) if settings.JOB_STORE == "sqlite" else InMemoryJobStore()
+        _job_manager = JobManager(store=store)
+    return _job_manager
+
+
+async def close_job_manager():
+    global _job_manager
+    if _job_manager is not None:
+        await _job_manager.stop()
+        _job_manager = None
@@ -0,0 +1,75 @@
+"""
+LLM token metering for the caller of the current request
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+_meter: ContextVar[Optional[Callable[[int], None]]] = ContextVar("llm_meter", default=None)
+
+# Maps an owner id (API key hash) to its meter, for work that outlives the request
+_owner_meters: Optional[Callable[[str], Optional[Callable[[int], None]]]] = None
+
+
+def set_meter(callback: Optional[Callable[[int], None]]):
+    """Charge LLM tokens used from here on (in this context) to ``callback``"""
+    _meter.set(callback)
+
+
+@contextmanager
+def metered(callback: Optional[Callable[[int], None]]):
+    token = _meter.set(callback)
+    try:
+        yield
+    finally:
+        _meter.reset(token)
+
+
+def register_owner_meter(resolver: Callable[[str], Optional[Callable[[int], None]]]):
+    """Register how background work (jobs) finds the meter of the caller that queued it"""
+    global _owner_meters
+    _owner_meters = resolver
+
+
+def meter_for_owner(owner: Optional[str]) -> Optional[Callable[[int], None]]:
+    if not owner or _owner_meters is None:
+        return None
+    return _owner_meters(owner)
+
+
+class TokenCount:
+    __slots__ = ("tokens",)
+
+    def __init__(self):
+        self.tokens = 0
+
+
+@contextmanager
+def counting():
+    """Count tokens used inside the block, still charging them to the current meter"""
+    count = TokenCount()
+    outer = _meter.get()
+
+    def meter(tokens: int):
+        count.tokens += tokens
+        if outer is not None:
+            outer(tokens)
+
+    token = _meter.set(meter)
+    try:
+        yield count
+    finally:
+        _meter.reset(token)
+
+
+def record_llm_tokens(tokens: int):
+    """Report tokens consumed by an LLM call; a no-op outside metered requests"""
+    callback = _meter.get()
+    if callback is not None and tokens:
+        callback(int(tokens))
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough token estimate (~4 characters per token) when the API reports no usage"""
+    return sum(len(text or "") for text in texts) // 4
@@ -0,0 +1,126 @@
+"""
+Token bucket rate limiting primitives
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, Optional
+
+
+class TokenBucket:
+    """
+    Classic token bucket
+    
+    Tokens refill continuously at ``rate`` per second up to ``capacity``.
+    Acquiring never blocks the event loop: callers either get a wait time
+    back (``try_acquire``) or sleep asynchronously (``acquire``).
+    """
+    
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+    
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+    
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens if available
+        
+        Returns:
+            float: 0.0 if the tokens were taken, otherwise the number of
+            seconds until enough tokens will be available
+        """
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+    
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Wait until tokens are available and take them
+        
+        Returns:
+            float: Total seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+    
+    def charge(self, tokens: float) -> float:
+        """
+        Take tokens unconditionally (for costs only known afterwards)
+        
+        The balance may go negative; the debt is paid off by refill before
+        ``try_acquire`` succeeds again.
+        
+        Returns:
+            float: The balance after charging
+        """
+        self._refill(time.monotonic())
+        self.tokens -= tokens
+        return self.tokens
+    
+    def remaining(self) -> float:
+        """Get the number of tokens currently available"""
+        self._refill(time.monotonic())
+        return self.tokens
+
+
+class KeyedTokenBuckets:
+    """
+    Lazily created token buckets per key (chat, phone number, API key...)
+    
+    The number of tracked keys is bounded; the least recently used bucket is
+    dropped first, which at worst grants that key a fresh burst.
+    """
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None, max_keys: int = 10000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+    
+    def get(self, key: Hashable) -> TokenBucket:
+        """Get (or create) the bucket for a key"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.capacity)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+    
+    def try_acquire(self, key: Hashable, tokens: float = 1.0) -> float:
+        return self.get(key).try_acquire(tokens)
+    
+    async def acquire(self, key: Hashable, tokens: float = 1.0) -> float:
+        return await self.get(key).acquire(tokens)
+    
+    def __len__(self) -> int:
+        return len(self._buckets)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "tracked_keys": len(self._buckets)
+        }
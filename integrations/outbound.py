@@ -0,0 +1,405 @@
+"""
+Outbound message delivery for chat platform integrations
+
+One shared keep-alive HTTP client, per-platform and per-chat token buckets,
+retries with jittered backoff, a dead-letter store and send latency metrics.
+Point the integrations' base URLs at a local stub of the Graph API / Bot API
+(or pass an ``httpx.AsyncClient`` with a mock transport) to test end to end.
+"""
+
+import asyncio
+import random
+import re
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Deque
+import httpx
+import structlog
+
+from config.settings import settings
+from core.runtime.rate_limit import TokenBucket, KeyedTokenBuckets
+from core.runtime.deadline import DeadlineExceeded, current_deadline, remaining, record_exceeded
+
+logger = structlog.get_logger(__name__)
+
+
+class OutboundDeliveryError(Exception):
+    """Raised when a message could not be delivered after all retries"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None,
+                 response: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = response
+
+
+class PlatformLimits:
+    """Rate limits for one platform"""
+
+    def __init__(self, global_rate: float, per_chat_rate: float,
+                 global_burst: Optional[float] = None, per_chat_burst: Optional[float] = None):
+        self.global_rate = global_rate
+        self.per_chat_rate = per_chat_rate
+        self.global_burst = global_burst
+        self.per_chat_burst = per_chat_burst
+
+
+def default_platform_limits() -> Dict[str, PlatformLimits]:
+    """Build platform limits from settings"""
+    return {
+        "telegram": PlatformLimits(
+            global_rate=settings.TELEGRAM_GLOBAL_RATE,
+            per_chat_rate=settings.TELEGRAM_PER_CHAT_RATE
+        ),
+        "whatsapp": PlatformLimits(
+            global_rate=settings.WHATSAPP_GLOBAL_RATE,
+            per_chat_rate=settings.WHATSAPP_PER_NUMBER_RATE
+        )
+    }
+
+
+# Credentials never reach the dead-letter store: these headers are dropped
+# and the Bot API token path segment is replaced by a placeholder.
+SECRET_HEADERS = {"authorization", "proxy-authorization", "x-api-key"}
+BOT_TOKEN_PLACEHOLDER = "{bot_token}"
+_BOT_TOKEN_SEGMENT = re.compile(r"/bot[^/]+/(?=[^/]+$)")
+
+
+def redact_url(url: str) -> str:
+    """Replace the Bot API token in a method URL with a placeholder"""
+    return _BOT_TOKEN_SEGMENT.sub(f"/bot{BOT_TOKEN_PLACEHOLDER}/", url)
+
+
+def public_headers(headers: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """Request headers without credentials"""
+    return {name: value for name, value in (headers or {}).items() if name.lower() not in SECRET_HEADERS}
+
+
+def default_credentials() -> Dict[str, Dict[str, Any]]:
+    """Per-platform secrets re-applied to dead letters on redelivery, read from settings"""
+    credentials: Dict[str, Dict[str, Any]] = {}
+    if settings.TELEGRAM_BOT_TOKEN:
+        credentials["telegram"] = {"bot_token": settings.TELEGRAM_BOT_TOKEN}
+    if settings.WHATSAPP_API_TOKEN:
+        credentials["whatsapp"] = {"headers": {"Authorization": f"Bearer {settings.WHATSAPP_API_TOKEN}"}}
+    return credentials
+
+
+class DeadLetterStore:
+    """
+    Bounded in-memory store of messages that exhausted their retries
+
+    Letters keep their non-secret headers and a redacted URL; auth is
+    added back from settings when they are redelivered.
+    """
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self._items: Deque[Dict[str, Any]] = deque(maxlen=max_size)
+        self.total = 0
+
+    def add(self, platform: str, chat_id: str, url: str, payload: Dict[str, Any],
+            error: str, attempts: int, status_code: Optional[int] = None,
+            headers: Optional[Dict[str, str]] = None):
+        self._items.append({
+            "id": str(uuid.uuid4()),
+            "platform": platform,
+            "chat_id": chat_id,
+            "url": redact_url(url),
+            "headers": public_headers(headers),
+            "payload": payload,
+            "error": error,
+            "status_code": status_code,
+            "attempts": attempts,
+            "failed_at": datetime.now().isoformat()
+        })
+        self.total += 1
+
+    def requeue(self, item: Dict[str, Any]):
+        """Put back a drained letter that could not be retried"""
+        self._items.append(item)
+
+    def list(self, platform: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [item for item in self._items if platform is None or item["platform"] == platform]
+
+    def drain(self, platform: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Remove and return dead letters (for redelivery)"""
+        drained = self.list(platform)
+        if platform is None:
+            self._items.clear()
+        else:
+            kept = [item for item in self._items if item["platform"] != platform]
+            self._items.clear()
+            self._items.extend(kept)
+        return drained
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class SendMetrics:
+    """Per-platform delivery counters and latency samples"""
+
+    def __init__(self, sample_size: int = 1000):
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.rate_limited_seconds = 0.0
+        self._latencies: Deque[float] = deque(maxlen=sample_size)
+
+    def record_latency(self, seconds: float):
+        self._latencies.append(seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "rate_limited_seconds": round(self.rate_limited_seconds, 3),
+            "latency_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(latencies[-1] * 1000, 2) if latencies else None
+            }
+        }
+
+
+class OutboundSender:
+    """
+    Pooled async sender shared by the WhatsApp and Telegram integrations
+
+    Each send waits for a per-chat token, then a platform-wide token, then
+    POSTs over the shared keep-alive client. 429 and 5xx responses and
+    transport errors are retried with full-jitter exponential backoff
+    (honouring ``retry_after`` hints); anything still failing is recorded
+    in the dead-letter store and raised as ``OutboundDeliveryError``.
+    """
+
+    RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None,
+                 limits: Optional[Dict[str, PlatformLimits]] = None,
+                 max_retries: int = None, base_backoff: float = 0.5,
+                 max_backoff: float = 10.0, timeout: float = None,
+                 max_connections: int = 100):
+        self.limits = limits or default_platform_limits()
+        self.max_retries = max_retries if max_retries is not None else settings.OUTBOUND_MAX_RETRIES
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout if timeout is not None else settings.OUTBOUND_TIMEOUT_SECONDS
+
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            )
+        )
+
+        self._global_buckets: Dict[str, TokenBucket] = {}
+        self._chat_buckets: Dict[str, KeyedTokenBuckets] = {}
+        for platform, platform_limits in self.limits.items():
+            self._global_buckets[platform] = TokenBucket(
+                platform_limits.global_rate, platform_limits.global_burst
+            )
+            self._chat_buckets[platform] = KeyedTokenBuckets(
+                platform_limits.per_chat_rate, platform_limits.per_chat_burst
+            )
+
+        self.dead_letters = DeadLetterStore(settings.OUTBOUND_DEAD_LETTER_SIZE)
+        self.metrics: Dict[str, SendMetrics] = {platform: SendMetrics() for platform in self.limits}
+
+        logger.info("Outbound sender initialized", platforms=list(self.limits.keys()))
+
+    async def _acquire(self, platform: str, chat_id: str) -> float:
+        """Wait for per-chat then platform-wide tokens"""
+        waited = 0.0
+        if platform in self._chat_buckets and chat_id:
+            waited += await self._chat_buckets[platform].acquire(chat_id)
+        if platform in self._global_buckets:
+            waited += await self._global_buckets[platform].acquire()
+        return waited
+
+    def _backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(self.max_backoff, retry_after) + random.uniform(0, self.base_backoff)
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+
+    @staticmethod
+    def _retry_after(response: httpx.Response, body: Optional[Dict[str, Any]]) -> Optional[float]:
+        """Extract a retry hint from a Bot API body or Retry-After header"""
+        if isinstance(body, dict):
+            retry_after = (body.get("parameters") or {}).get("retry_after")
+            if retry_after is not None:
+                return float(retry_after)
+        header = response.headers.get("Retry-After")
+        if header:
+            try:
+                return float(header)
+            except ValueError:
+                return None
+        return None
+
+    async def send(self, platform: str, chat_id: str, url: str, payload: Dict[str, Any],
+                   headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Deliver one API call
+
+        Args:
+            platform: "whatsapp" or "telegram" (selects the rate limits)
+            chat_id: Chat id / phone number for per-chat limiting
+            url: Full API method URL
+            payload: JSON body
+            headers: Extra request headers (auth)
+
+        Returns:
+            Dict: Decoded JSON response body
+
+        Under a request deadline each attempt only gets the remaining
+        budget, and no retry is started once it is spent; the message is
+        dead-lettered for later redelivery instead.
+        """
+        metrics = self.metrics.setdefault(platform, SendMetrics())
+        last_error = "unknown error"
+        last_status = None
+        last_body = None
+        deadline = current_deadline()
+
+        for attempt in range(self.max_retries + 1):
+            metrics.rate_limited_seconds += await self._acquire(platform, chat_id)
+            if deadline is not None and deadline.expired:
+                record_exceeded("outbound")
+                self.dead_letters.add(
+                    platform, chat_id, url, payload, "deadline exceeded",
+                    attempts=attempt, status_code=last_status, headers=headers
+                )
+                metrics.failed += 1
+                raise DeadlineExceeded("outbound")
+
+            started = time.perf_counter()
+            retry_after = None
+            try:
+                response = await self.client.post(
+                    url, json=payload, headers=headers, timeout=remaining(self.timeout)
+                )
+                metrics.record_latency(time.perf_counter() - started)
+
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = {"raw": response.text}
+
+                # Bot API bodies carry "ok"; anything else (lists, strings) goes by status
+                fields = body if isinstance(body, dict) else {}
+                if response.status_code < 400 and fields.get("ok", True):
+                    metrics.sent += 1
+                    return body
+
+                last_status = response.status_code
+                last_body = body
+                last_error = str(fields.get("description") or fields.get("error") or body)
+
+                if response.status_code not in self.RETRYABLE_STATUS:
+                    break
+                retry_after = self._retry_after(response, body)
+
+            except httpx.HTTPError as e:
+                metrics.record_latency(time.perf_counter() - started)
+                last_error = f"{e.__class__.__name__}: {str(e)}"
+                last_status = None
+
+            if attempt < self.max_retries:
+                metrics.retries += 1
+                delay = self._backoff(attempt, retry_after)
+                logger.warning(
+                    f"Retrying {platform} send to {chat_id} in {delay:.2f}s "
+                    f"(attempt {attempt + 1}/{self.max_retries}): {last_error}"
+                )
+                await asyncio.sleep(remaining(delay))
+
+        metrics.failed += 1
+        self.dead_letters.add(
+            platform, chat_id, url, payload, last_error,
+            attempts=attempt + 1, status_code=last_status, headers=headers
+        )
+        logger.error(f"Outbound {platform} send to {chat_id} dead-lettered: {last_error}")
+        raise OutboundDeliveryError(last_error, status_code=last_status, response=last_body)
+
+    async def redeliver_dead_letters(self, platform: Optional[str] = None,
+                                     credentials: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, int]:
+        """
+        Retry dead-lettered messages once more; failures go back to the store
+
+        Each letter is resent with its own headers plus its platform's auth
+        (``default_credentials()`` unless ``credentials`` is given). Letters
+        whose platform has no credentials configured are kept as they are.
+        """
+        if credentials is None:
+            credentials = default_credentials()
+        delivered = 0
+        failed = 0
+        for item in self.dead_letters.drain(platform):
+            secrets = credentials.get(item["platform"], {})
+            url = item["url"]
+            if BOT_TOKEN_PLACEHOLDER in url:
+                if not secrets.get("bot_token"):
+                    self.dead_letters.requeue(item)
+                    failed += 1
+                    continue
+                url = url.replace(BOT_TOKEN_PLACEHOLDER, secrets["bot_token"])
+            headers = {**item.get("headers", {}), **secrets.get("headers", {})}
+            try:
+                await self.send(item["platform"], item["chat_id"], url, item["payload"], headers or None)
+                delivered += 1
+            except OutboundDeliveryError:
+                failed += 1
+        return {"delivered": delivered, "failed": failed}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get delivery metrics for all platforms"""
+        return {
+            "platforms": {
+                platform: {
+                    **metrics.get_stats(),
+                    "tracked_chats": len(self._chat_buckets.get(platform, ()))
+                }
+                for platform, metrics in self.metrics.items()
+            },
+            "dead_letters": len(self.dead_letters),
+            "dead_letters_total": self.dead_letters.total
+        }
+
+    async def close(self):
+        """Close the underlying HTTP client if we created it"""
+        if self._owns_client:
+            await self.client.aclose()
+
+
+_outbound_sender: Optional[OutboundSender] = None
+
+
+def get_outbound_sender() -> OutboundSender:
+    """Get the process-wide outbound sender (created on first use)"""
+    global _outbound_sender
+    if _outbound_sender is None:
+        _outbound_sender = OutboundSender()
+    return _outbound_sender
+
+
+async def close_outbound_sender():
+    """Close the process-wide outbound sender"""
+    global _outbound_sender
+    if _outbound_sender is not None:
+        await _outbound_sender.close()
+        _outbound_sender = None
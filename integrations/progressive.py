@@ -0,0 +1,202 @@
+"""
+Progressive reply delivery for chat platforms
+
+Shows the user something immediately and keeps it updated while the LLM is
+still generating, instead of a single message after the full completion.
+"""
+
+import time
+from typing import Dict, Any, Optional, List, AsyncIterator
+import structlog
+
+from core.runtime.deadline import no_deadline
+
+logger = structlog.get_logger(__name__)
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+FAILURE_REPLY = "I apologize, but I'm experiencing technical difficulties. Please try again in a moment."
+
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """Split text into chunks of at most ``limit`` characters on natural boundaries"""
+    chunks = []
+    while len(text) > limit:
+        window = text[:limit]
+        cut = max(window.rfind("\n\n"), window.rfind("\n"), window.rfind(" "))
+        if cut <= limit // 2:
+            cut = limit
+        chunks.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text or not chunks:
+        chunks.append(text)
+    return chunks
+
+
+class TelegramProgressiveReply:
+    """
+    Placeholder message that is edited in place as tokens stream in
+
+    Edits are throttled to ``edit_interval`` seconds (Telegram rejects rapid
+    edits of the same message with 429). Once the text outgrows 4096
+    characters the current message is finalised and the overflow continues
+    in a new message. If the placeholder cannot be sent, or the final edit
+    fails, the reply is sent as plain messages instead.
+    """
+
+    def __init__(self, integration, chat_id: str, edit_interval: float = 1.5,
+                 placeholder: str = "…"):
+        self.integration = integration
+        self.chat_id = chat_id
+        self.edit_interval = edit_interval
+        self.placeholder = placeholder
+        self.message_ids: List[int] = []
+        self._shown: List[str] = []
+        self._last_edit = 0.0
+        self.edits = 0
+        self.fallback = False
+
+    async def start(self):
+        """Send the placeholder right away"""
+        if not await self._send_new(self.placeholder):
+            logger.warning(f"Telegram placeholder failed for chat {self.chat_id}; replying without edits")
+            self.fallback = True
+        self._last_edit = time.monotonic()
+
+    async def _send_new(self, text: str, parse_mode: Optional[str] = None) -> bool:
+        response = await self.integration.send_message(self.chat_id, text, parse_mode=parse_mode)
+        message_id = (response.get("result") or {}).get("message_id")
+        if message_id is None:
+            return False
+        self.message_ids.append(message_id)
+        self._shown.append(text)
+        return True
+
+    async def _render(self, text: str, final: bool = False):
+        chunks = split_message(text)
+        for index, chunk in enumerate(chunks):
+            if index < len(self.message_ids):
+                if self._shown[index] != chunk:
+                    response = await self.integration.edit_message_text(
+                        self.chat_id, self.message_ids[index], chunk
+                    )
+                    if response.get("ok", True):
+                        self._shown[index] = chunk
+                        self.edits += 1
+                    elif final:
+                        # The user would be left with a partial message
+                        await self.integration.send_message(self.chat_id, chunk, parse_mode=None)
+                    # A failed partial edit leaves ``_shown`` as it was, so the next one retries
+            else:
+                await self._send_new(chunk)
+
+    async def update(self, text: str):
+        """Show the partial text if the edit throttle allows it"""
+        now = time.monotonic()
+        if self.fallback or now - self._last_edit < self.edit_interval:
+            return
+        self._last_edit = now
+        await self._render(text + " …")
+
+    async def finish(self, text: str):
+        """Show the final text regardless of the throttle"""
+        if self.fallback:
+            for chunk in split_message(text):
+                await self.integration.send_message(self.chat_id, chunk, parse_mode=None)
+            return
+        await self._render(text, final=True)
+
+
+class WhatsAppProgressiveReply:
+    """
+    Typing indicator followed by paragraph-sized messages
+
+    WhatsApp cannot edit sent messages, so completed paragraphs are sent as
+    they arrive, batched to at least ``min_chunk_chars`` to avoid a flood of
+    tiny messages.
+    """
+
+    def __init__(self, integration, phone_number: str, message_id: str = None,
+                 min_chunk_chars: int = 300, max_chunk_chars: int = 4096):
+        self.integration = integration
+        self.phone_number = phone_number
+        self.message_id = message_id
+        self.min_chunk_chars = min_chunk_chars
+        self.max_chunk_chars = max_chunk_chars
+        self._buffer = ""
+        self.messages_sent = 0
+
+    async def start(self):
+        if self.message_id:
+            await self.integration.send_typing_indicator(self.message_id)
+
+    async def feed(self, delta: str):
+        """Add streamed text; send complete paragraphs once enough is buffered"""
+        self._buffer += delta
+        cut = self._buffer.rfind("\n\n")
+        if cut >= self.min_chunk_chars or len(self._buffer) >= self.max_chunk_chars:
+            if cut < 0:
+                cut = len(self._buffer)
+            ready, self._buffer = self._buffer[:cut], self._buffer[cut:].lstrip()
+            await self._send(ready)
+
+    async def finish(self):
+        await self._send(self._buffer)
+        self._buffer = ""
+
+    async def _send(self, text: str):
+        for chunk in split_message(text.strip(), self.max_chunk_chars):
+            if chunk:
+                await self.integration.send_message(self.phone_number, chunk)
+                self.messages_sent += 1
+
+
+async def stream_to_telegram(integration, chat_id: str, deltas: AsyncIterator[str],
+                             edit_interval: float = 1.5,
+                             failure_text: str = FAILURE_REPLY) -> Dict[str, Any]:
+    """
+    Drive a Telegram progressive reply from a stream of text deltas
+
+    If the stream raises, the placeholder (or the partial text shown so
+    far) is replaced by the text received plus ``failure_text`` before the
+    error propagates, so the chat never keeps a reply ending in "…".
+    """
+    reply = TelegramProgressiveReply(integration, chat_id, edit_interval=edit_interval)
+    await reply.start()
+
+    started = time.monotonic()
+    text = ""
+    try:
+        async for delta in deltas:
+            text += delta
+            await reply.update(text)
+    except Exception:
+        # The request's deadline may be spent; closing the reply gets a fresh budget
+        with no_deadline():
+            await reply.finish("\n\n".join(part for part in (text.strip(), failure_text) if part))
+        raise
+    await reply.finish(text.strip() or "I apologize, but I couldn't generate a response. Please try again.")
+
+    return {
+        "text": text,
+        "messages": len(reply.message_ids),
+        "edits": reply.edits,
+        "fallback": reply.fallback,
+        "duration_seconds": round(time.monotonic() - started, 3)
+    }
+
+
+async def stream_to_whatsapp(integration, phone_number: str, deltas: AsyncIterator[str],
+                             message_id: str = None, min_chunk_chars: int = 300) -> Dict[str, Any]:
+    """Drive a WhatsApp progressive reply from a stream of text deltas"""
+    reply = WhatsAppProgressiveReply(
+        integration, phone_number, message_id=message_id, min_chunk_chars=min_chunk_chars
+    )
+    await reply.start()
+
+    text = ""
+    async for delta in deltas:
+        text += delta
+        await reply.feed(delta)
+    await reply.finish()
+
+    return {"text": text, "messages": reply.messages_sent}
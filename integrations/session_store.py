@@ -0,0 +1,280 @@
+"""
+Session store for web chat: idle TTL, LRU cap, background sweeper, persistence
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Callable, Iterator
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+def _iso(wall_time: float) -> str:
+    return datetime.fromtimestamp(wall_time, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class SessionRecord:
+    """Compact per-session state"""
+
+    __slots__ = ("session_id", "user_info", "status", "message_count",
+                 "started_at", "last_active_at", "last_active")
+
+    def __init__(self, session_id: str, user_info: Optional[Dict[str, Any]] = None,
+                 started_at: Optional[float] = None):
+        now_wall = time.time()
+        self.session_id = session_id
+        self.user_info = user_info or {}
+        self.status = "active"
+        self.message_count = 0
+        self.started_at = started_at or now_wall      # wall clock, for display/persistence
+        self.last_active_at = now_wall                # wall clock, for display/persistence
+        self.last_active = time.monotonic()           # monotonic, for expiry
+
+    def touch(self):
+        self.last_active = time.monotonic()
+        self.last_active_at = time.time()
+
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self.last_active
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "user_info": self.user_info,
+            "start_time": _iso(self.started_at),
+            "last_message_time": _iso(self.last_active_at),
+            "message_count": self.message_count,
+            "status": self.status
+        }
+
+    def to_row(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "user_info": self.user_info,
+            "status": self.status,
+            "message_count": self.message_count,
+            "started_at": self.started_at,
+            "last_active_at": self.last_active_at
+        }
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "SessionRecord":
+        record = cls(row["session_id"], row.get("user_info"), started_at=row["started_at"])
+        record.status = row.get("status", "active")
+        record.message_count = row.get("message_count", 0)
+        record.last_active_at = row["last_active_at"]
+        # Rebase the wall-clock idle time onto this process' monotonic clock
+        record.last_active = time.monotonic() - max(0.0, time.time() - row["last_active_at"])
+        return record
+
+
+class SessionBackend:
+    """Persistence interface; the default keeps nothing"""
+
+    def load_all(self) -> Iterator[Dict[str, Any]]:
+        return iter(())
+
+    def save_many(self, rows: List[Dict[str, Any]]):
+        pass
+
+    def delete_many(self, session_ids: List[str]):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """Stores sessions in a SQLite file so they survive restarts"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS webchat_sessions ("
+            "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, last_active_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def load_all(self) -> Iterator[Dict[str, Any]]:
+        for (data,) in self.conn.execute("SELECT data FROM webchat_sessions ORDER BY last_active_at"):
+            yield json.loads(data)
+
+    def save_many(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO webchat_sessions (session_id, data, last_active_at) VALUES (?, ?, ?)",
+            [(row["session_id"], json.dumps(row), row["last_active_at"]) for row in rows]
+        )
+        self.conn.commit()
+
+    def delete_many(self, session_ids: List[str]):
+        if not session_ids:
+            return
+        self.conn.executemany(
+            "DELETE FROM webchat_sessions WHERE session_id = ?",
+            [(session_id,) for session_id in session_ids]
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class SessionStore:
+    """
+    Web chat sessions with idle expiry and an LRU size cap
+
+    Sessions live in an ``OrderedDict`` kept in last-activity order (touching
+    a session moves it to the end). With a single idle TTL that order is
+    also expiry order, so the sweeper only pops expired sessions off the
+    front and stops at the first live one: O(expired), never a full scan.
+    The same order gives LRU eviction when ``max_sessions`` is exceeded.
+
+    Changes are written behind to the backend on each sweep.
+    """
+
+    def __init__(self, idle_ttl: float = 1800.0, max_sessions: int = 10000,
+                 sweep_interval: float = 30.0, backend: Optional[SessionBackend] = None):
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        self.backend = backend or SessionBackend()
+        self._sessions: "OrderedDict[str, SessionRecord]" = OrderedDict()
+        self._dirty: set = set()
+        self._deleted: set = set()
+        self._sweeper: Optional[asyncio.Task] = None
+        self._evict_callbacks: List[Callable[[str, str], None]] = []
+        self.stats = {"created": 0, "expired": 0, "evicted": 0, "ended": 0}
+
+        self._load()
+
+    def _load(self):
+        for row in self.backend.load_all():
+            record = SessionRecord.from_row(row)
+            if record.idle_seconds() < self.idle_ttl:
+                self._sessions[record.session_id] = record
+            else:
+                self._deleted.add(record.session_id)
+        if self._sessions:
+            logger.info(f"Restored {len(self._sessions)} web chat sessions")
+
+    def on_evict(self, callback: Callable[[str, str], None]):
+        """Register ``callback(session_id, reason)`` for expired/evicted/ended sessions"""
+        self._evict_callbacks.append(callback)
+
+    def _drop(self, session_id: str, reason: str) -> Optional[SessionRecord]:
+        record = self._sessions.pop(session_id, None)
+        if record is None:
+            return None
+        self._dirty.discard(session_id)
+        self._deleted.add(session_id)
+        self.stats[reason] += 1
+        for callback in self._evict_callbacks:
+            try:
+                callback(session_id, reason)
+            except Exception as e:
+                logger.error(f"Session evict callback failed: {str(e)}")
+        return record
+
+    def get(self, session_id: str) -> Optional[SessionRecord]:
+        """Get a live session (expired sessions are dropped on access)"""
+        record = self._sessions.get(session_id)
+        if record is not None and record.idle_seconds() >= self.idle_ttl:
+            self._drop(session_id, "expired")
+            return None
+        return record
+
+    def create(self, session_id: str, user_info: Optional[Dict[str, Any]] = None) -> SessionRecord:
+        record = SessionRecord(session_id, user_info)
+        self._sessions[session_id] = record
+        self._sessions.move_to_end(session_id)
+        self._deleted.discard(session_id)
+        self._dirty.add(session_id)
+        self.stats["created"] += 1
+
+        while len(self._sessions) > self.max_sessions:
+            oldest = next(iter(self._sessions))
+            self._drop(oldest, "evicted")
+
+        self.ensure_sweeper()
+        return record
+
+    def touch(self, record: SessionRecord):
+        """Mark activity on a session"""
+        record.touch()
+        if record.session_id in self._sessions:
+            self._sessions.move_to_end(record.session_id)
+            self._dirty.add(record.session_id)
+
+    def remove(self, session_id: str) -> Optional[SessionRecord]:
+        return self._drop(session_id, "ended")
+
+    def sweep(self) -> int:
+        """Expire idle sessions and flush pending writes; returns sessions expired"""
+        expired = 0
+        now = time.monotonic()
+        while self._sessions:
+            session_id, record = next(iter(self._sessions.items()))
+            if now - record.last_active < self.idle_ttl:
+                break
+            self._drop(session_id, "expired")
+            expired += 1
+        self.flush()
+        return expired
+
+    def flush(self):
+        """Write behind dirty and deleted sessions"""
+        try:
+            if self._deleted:
+                self.backend.delete_many(list(self._deleted))
+                self._deleted.clear()
+            if self._dirty:
+                self.backend.save_many([self._sessions[sid].to_row() for sid in self._dirty if sid in self._sessions])
+                self._dirty.clear()
+        except Exception as e:
+            logger.error(f"Error persisting web chat sessions: {str(e)}")
+
+    def ensure_sweeper(self):
+        """Start the background sweeper if an event loop is running"""
+        if self._sweeper is not None and not self._sweeper.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._sweeper = loop.create_task(self._sweep_loop())
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            expired = self.sweep()
+            if expired:
+                logger.info(f"Expired {expired} idle web chat sessions")
+
+    async def close(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        self.flush()
+        self.backend.close()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "active": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "idle_ttl_seconds": self.idle_ttl
+        }
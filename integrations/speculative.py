@@ -0,0 +1,171 @@
+"""
+Speculative pre-generation of replies for likely next user inputs
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Callable, Awaitable, List, Tuple
+import structlog
+
+from core.runtime.deadline import no_deadline
+
+logger = structlog.get_logger(__name__)
+
+
+def normalize_key(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return sum(len(text or "") for text in texts) // 4
+
+
+class _Speculation:
+    __slots__ = ("task", "created_at", "prompt", "wanted")
+
+    def __init__(self, prompt: str):
+        self.task: Optional[asyncio.Task] = None
+        self.created_at = time.monotonic()
+        self.prompt = prompt
+        # Set once the user asks for the reply; it then stops yielding to foreground work
+        self.wanted = asyncio.Event()
+
+
+class SpeculativeCache:
+    """
+    Per-session cache of replies computed before the user asks for them
+
+    Generation runs in background tasks behind a small semaphore and only
+    starts once no foreground work (marked with ``foreground()``) is in
+    progress, so speculation never competes with live requests. Entries
+    expire after ``ttl`` seconds. Everything generated but never served is counted as wasted
+    tokens so the feature can be tuned (or switched off) from the metrics.
+    """
+
+    def __init__(self, ttl: float = 120.0, concurrency: int = 2):
+        self.ttl = ttl
+        self._busy = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._sessions: Dict[str, Dict[str, _Speculation]] = {}
+        self.stats = {
+            "scheduled": 0,
+            "completed": 0,
+            "hits": 0,
+            "misses": 0,
+            "discarded": 0,
+            "tokens_generated": 0,
+            "tokens_served": 0,
+            "tokens_wasted": 0
+        }
+
+    @contextmanager
+    def foreground(self):
+        """Mark live work in progress; speculation waits until there is none"""
+        self._busy += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._busy -= 1
+            if self._busy == 0:
+                self._idle.set()
+
+    async def _wait_turn(self, speculation: _Speculation):
+        """Wait until nothing runs in the foreground, the reply is wanted, or the TTL passes"""
+        waiters = [asyncio.ensure_future(self._idle.wait()), asyncio.ensure_future(speculation.wanted.wait())]
+        try:
+            await asyncio.wait(waiters, timeout=self.ttl, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    async def _run(self, speculation: _Speculation, generate: Callable[[], Awaitable[Any]]) -> Any:
+        # Low priority: yield to foreground requests before spending tokens
+        await self._wait_turn(speculation)
+        async with self._semaphore:
+            result = await generate()
+            tokens = estimate_tokens(speculation.prompt, getattr(result, "response", ""))
+            self.stats["completed"] += 1
+            self.stats["tokens_generated"] += tokens
+            return result
+
+    def schedule(self, session_id: str, prompt: str, generate: Callable[[], Awaitable[Any]],
+                 aliases: Optional[List[str]] = None):
+        """Start generating a reply for ``prompt`` (also reachable via ``aliases``)"""
+        session = self._sessions.setdefault(session_id, {})
+        key = normalize_key(prompt)
+        if key in session:
+            return
+
+        # Speculation outlives the current turn, so it must not inherit its deadline
+        speculation = _Speculation(prompt)
+        with no_deadline():
+            speculation.task = asyncio.create_task(self._run(speculation, generate))
+        speculation.task.add_done_callback(lambda t: t.exception() if not t.cancelled() else None)
+        for name in [key] + [normalize_key(alias) for alias in aliases or []]:
+            session[name] = speculation
+        self.stats["scheduled"] += 1
+
+    async def take(self, session_id: str, text: str) -> Optional[Tuple[str, Any]]:
+        """
+        Serve a speculated reply if one matches ``text`` (the prompt or an alias)
+
+        Returns ``(prompt, reply)``: the prompt the reply was generated for,
+        which differs from ``text`` when an alias such as an action id
+        matched. Any other speculation for the session is discarded, since
+        the conversation has moved on either way.
+        """
+        session = self._sessions.pop(session_id, None)
+        if not session:
+            return None
+
+        speculation = session.get(normalize_key(text))
+        result = None
+        if speculation is not None and time.monotonic() - speculation.created_at < self.ttl:
+            speculation.wanted.set()
+            try:
+                result = await speculation.task
+            except Exception as e:
+                logger.warning(f"Speculative generation failed: {str(e)}")
+                result = None
+
+        if result is not None and getattr(result, "success", True):
+            self.stats["hits"] += 1
+            self.stats["tokens_served"] += estimate_tokens(speculation.prompt, getattr(result, "response", ""))
+        else:
+            self.stats["misses"] += 1
+            result = None
+
+        self._discard(session, keep=speculation if result is not None else None)
+        return (speculation.prompt, result) if result is not None else None
+
+    def _discard(self, session: Dict[str, _Speculation], keep: Optional[_Speculation] = None):
+        for speculation in {id(s): s for s in session.values()}.values():
+            if speculation is keep:
+                continue
+            self.stats["discarded"] += 1
+            if speculation.task.done():
+                if not speculation.task.cancelled() and speculation.task.exception() is None:
+                    self.stats["tokens_wasted"] += estimate_tokens(
+                        speculation.prompt, getattr(speculation.task.result(), "response", "")
+                    )
+            else:
+                speculation.task.cancel()
+
+    def discard_session(self, session_id: str):
+        """Drop all speculation for a session (ended or evicted)"""
+        session = self._sessions.pop(session_id, None)
+        if session:
+            self._discard(session)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else None,
+            "sessions": len(self._sessions)
+        }
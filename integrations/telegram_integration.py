@@ -6,19 +6,43 @@ import asyncio
 from typing import Dict, Any, Optional, List
 import structlog
 from core.engine.core_agent import CoreAIAgent, AgentResponse
+from core.runtime.bulkhead import BulkheadFull
+from core.runtime.deadline import DeadlineExceeded, no_deadline
+from core.runtime.events import MESSAGE_RECEIVED, publish_event
+from config.settings import settings
+from .outbound import OutboundSender, get_outbound_sender
+from .progressive import stream_to_telegram
 
 logger = structlog.get_logger(__name__)
 
+FALLBACK_REPLY = "I apologize, but I'm experiencing technical difficulties. Please try again in a moment."
+
 
 class TelegramIntegration:
     """Integration with Telegram Bot API for customer support"""
     
-    def __init__(self, bot_token: str):
+    def __init__(self, bot_token: str, outbound: Optional[OutboundSender] = None,
+                 api_base_url: str = None, progressive: bool = None):
         self.bot_token = bot_token
         self.agent = CoreAIAgent()
-        self.base_url = f"https://api.telegram.org/bot{bot_token}"
+        self.progressive = settings.PROGRESSIVE_REPLIES_ENABLED if progressive is None else progressive
+        self.base_url = f"{api_base_url or settings.TELEGRAM_API_BASE_URL}/bot{bot_token}"
+        
+        # Real delivery needs an outbound sender; otherwise sends are simulated
+        if outbound is None and settings.OUTBOUND_DELIVERY_ENABLED and bot_token:
+            outbound = get_outbound_sender()
+        self.outbound = outbound
         
-        logger.info("Telegram integration initialized")
+        logger.info("Telegram integration initialized", live_delivery=self.outbound is not None)
+    
+    async def _call_api(self, method: str, chat_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Call a Bot API method through the outbound sender"""
+        return await self.outbound.send(
+            platform="telegram",
+            chat_id=chat_id,
+            url=f"{self.base_url}/{method}",
+            payload=payload
+        )
     
     async def send_message(self, chat_id: str, text: str, 
                           parse_mode: str = "Markdown") -> Dict[str, Any]:
@@ -26,6 +50,12 @@ class TelegramIntegration:
         try:
             logger.info(f"Sending Telegram message to {chat_id}: {text[:50]}...")
             
+            if self.outbound is not None:
+                payload = {"chat_id": chat_id, "text": text}
+                if parse_mode:
+                    payload["parse_mode"] = parse_mode
+                return await self._call_api("sendMessage", chat_id, payload)
+            
             # Simulate Telegram API call
             response = {
                 "ok": True,
@@ -52,6 +82,16 @@ class TelegramIntegration:
             logger.error(f"Error sending Telegram message: {str(e)}")
             return {"ok": False, "error": str(e)}
     
+    async def handle_update(self, update: Dict[str, Any]) -> Dict[str, Any]:
+        """Route an update to the message or callback query handler"""
+        if "callback_query" in update:
+            return await self.handle_callback_query(update)
+        if "message" in update:
+            return await self.handle_message(update)
+        
+        logger.info(f"Ignoring unsupported Telegram update {update.get('update_id')}")
+        return {"status": "ignored", "update_id": update.get("update_id")}
+    
     async def handle_message(self, update: Dict[str, Any]) -> Dict[str, Any]:
         """Process incoming Telegram message"""
         try:
@@ -67,6 +107,14 @@ class TelegramIntegration:
             if text.startswith("/"):
                 return await self._handle_command(chat_id, text, user)
             
+            publish_event(MESSAGE_RECEIVED, {
+                "platform": "telegram",
+                "user_id": chat_id,
+                "text": text,
+                "message_id": str(message_id) if message_id is not None else None,
+                "username": user.get("username")
+            }, source="telegram")
+            
             # Process with AI agent
             context = {
                 "platform": "telegram",
@@ -75,6 +123,9 @@ class TelegramIntegration:
                 "message_id": message_id
             }
             
+            if self.progressive:
+                return await self._handle_message_progressive(chat_id, text, context)
+            
             agent_response = await self.agent.process_message(
                 message=text,
                 user_id=chat_id,
@@ -87,7 +138,7 @@ class TelegramIntegration:
             else:
                 await self.send_message(
                     chat_id,
-                    "I apologize, but I'm experiencing technical difficulties. Please try again in a moment."
+                    FALLBACK_REPLY
                 )
             
             return {
@@ -97,10 +148,68 @@ class TelegramIntegration:
                 "actions_taken": agent_response.actions_taken
             }
             
+        except DeadlineExceeded as e:
+            # Don't leave the customer without an answer; the apology gets a fresh budget
+            logger.warning(f"Telegram reply ran out of time: {str(e)}")
+            with no_deadline():
+                await self.send_message(chat_id, FALLBACK_REPLY)
+            return {"error": str(e), "status": "error"}
         except Exception as e:
             logger.error(f"Error processing Telegram message: {str(e)}")
             return {"error": str(e), "status": "error"}
     
+    async def _handle_message_progressive(self, chat_id: str, text: str,
+                                          context: Dict[str, Any]) -> Dict[str, Any]:
+        """Reply with a placeholder that is edited as the response streams in"""
+        try:
+            delivery = await stream_to_telegram(
+                self,
+                chat_id,
+                self.agent.stream_message(message=text, user_id=chat_id, context=context),
+                edit_interval=settings.TELEGRAM_EDIT_INTERVAL,
+                failure_text=FALLBACK_REPLY
+            )
+        except (DeadlineExceeded, BulkheadFull) as e:
+            # The placeholder already carries the apology; don't send a second one
+            logger.warning(f"Telegram progressive reply failed: {str(e)}")
+            return {"error": str(e), "status": "error", "chat_id": chat_id}
+        
+        return {
+            "status": "processed",
+            "chat_id": chat_id,
+            "agent_response": delivery["text"],
+            "actions_taken": [],
+            "delivery": {
+                "mode": "progressive",
+                "messages": delivery["messages"],
+                "edits": delivery["edits"]
+            }
+        }
+    
+    async def edit_message_text(self, chat_id: str, message_id: int, text: str) -> Dict[str, Any]:
+        """Replace the text of a previously sent message"""
+        try:
+            if self.outbound is not None:
+                return await self._call_api("editMessageText", chat_id, {
+                    "chat_id": chat_id,
+                    "message_id": message_id,
+                    "text": text
+                })
+            
+            # Simulate editMessageText
+            return {
+                "ok": True,
+                "result": {
+                    "message_id": message_id,
+                    "chat": {"id": int(chat_id)},
+                    "text": text
+                }
+            }
+            
+        except Exception as e:
+            logger.error(f"Error editing Telegram message: {str(e)}")
+            return {"ok": False, "error": str(e)}
+    
     async def _handle_command(self, chat_id: str, command: str, user: Dict[str, Any]) -> Dict[str, Any]:
         """Handle Telegram bot commands"""
         try:
@@ -153,6 +262,15 @@ Which service interests you most?
                                   keyboard: List[List[Dict[str, str]]]) -> Dict[str, Any]:
         """Send message with inline keyboard"""
         try:
+            if self.outbound is not None:
+                response = await self._call_api("sendMessage", chat_id, {
+                    "chat_id": chat_id,
+                    "text": text,
+                    "reply_markup": {"inline_keyboard": keyboard}
+                })
+                logger.info(f"Sent inline keyboard to {chat_id}")
+                return response
+            
             # Simulate sending inline keyboard
             response = {
                 "ok": True,
@@ -205,7 +323,11 @@ Which service interests you most?
     
     async def _answer_callback_query(self, callback_query_id: str, text: str = None):
         """Answer callback query to remove loading state"""
-        # In real implementation, this would call answerCallbackQuery API
+        if self.outbound is not None and callback_query_id:
+            payload = {"callback_query_id": callback_query_id}
+            if text:
+                payload["text"] = text
+            await self._call_api("answerCallbackQuery", None, payload)
         logger.info(f"Answered callback query {callback_query_id}")
     
     async def _handle_callback_action(self, data: str, chat_id: str, user: Dict[str, Any]) -> str:
@@ -224,6 +346,14 @@ Which service interests you most?
                            caption: str = None) -> Dict[str, Any]:
         """Send document to chat"""
         try:
+            if self.outbound is not None:
+                payload = {"chat_id": chat_id, "document": document_url}
+                if caption:
+                    payload["caption"] = caption
+                response = await self._call_api("sendDocument", chat_id, payload)
+                logger.info(f"Sent document to {chat_id}")
+                return response
+            
             # Simulate document sending
             response = {
                 "ok": True,
@@ -285,5 +415,6 @@ Which service interests you most?
             "integration": "telegram",
             "status": "active",
             "bot_token": "configured" if self.bot_token else "missing",
-            "base_url": self.base_url
+            "base_url": self.base_url,
+            "delivery": "live" if self.outbound is not None else "simulated"
         }
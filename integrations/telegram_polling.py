@@ -0,0 +1,198 @@
+"""
+Telegram long-polling ingestion for deployments without a public webhook
+
+Run with:  python -m integrations.telegram_polling
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Any, Optional, List
+import httpx
+import structlog
+
+from config.settings import settings
+from core.runtime.bulkhead import WEBHOOK, workload
+from .telegram_integration import TelegramIntegration
+
+logger = structlog.get_logger(__name__)
+
+
+class OffsetStore:
+    """Persists the next getUpdates offset so a restart resumes where it stopped"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Optional[int]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f).get("offset")
+        except FileNotFoundError:
+            return None
+        except (ValueError, OSError) as e:
+            logger.warning(f"Could not read Telegram offset file {self.path}: {str(e)}")
+            return None
+
+    def save(self, offset: int):
+        # Write-then-rename so a crash never leaves a truncated file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"offset": offset, "saved_at": time.time()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class TelegramPoller:
+    """
+    Long-polling runner built on getUpdates
+
+    Each call fetches up to ``batch_size`` updates. Updates from different
+    chats are dispatched concurrently through ``TelegramIntegration.handle_update``
+    (same path as the webhook), updates from one chat stay in order. The
+    offset is only advanced and persisted once the whole batch has been
+    handled, so a crash re-delivers the unfinished batch (at-least-once).
+    """
+
+    def __init__(self, integration: TelegramIntegration, offset_store: Optional[OffsetStore] = None,
+                 batch_size: int = None, poll_timeout: int = None, max_concurrency: int = None,
+                 client: Optional[httpx.AsyncClient] = None):
+        self.integration = integration
+        self.offset_store = offset_store or OffsetStore(settings.TELEGRAM_POLL_OFFSET_FILE)
+        self.batch_size = min(100, batch_size or settings.TELEGRAM_POLL_BATCH_SIZE)
+        self.poll_timeout = poll_timeout if poll_timeout is not None else settings.TELEGRAM_POLL_TIMEOUT
+        self.max_concurrency = max_concurrency or settings.TELEGRAM_POLL_CONCURRENCY
+
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(timeout=self.poll_timeout + 10)
+
+        self.offset = self.offset_store.load()
+        self._running = False
+        self.stats = {
+            "batches": 0,
+            "updates": 0,
+            "failed_updates": 0,
+            "poll_errors": 0,
+            "processing_seconds": 0.0
+        }
+
+        logger.info("Telegram poller initialized", offset=self.offset, batch_size=self.batch_size)
+
+    async def delete_webhook(self):
+        """getUpdates is rejected while a webhook is set"""
+        response = await self.client.post(f"{self.integration.base_url}/deleteWebhook")
+        response.raise_for_status()
+
+    async def fetch_updates(self) -> List[Dict[str, Any]]:
+        """Fetch the next batch of updates"""
+        params = {"timeout": self.poll_timeout, "limit": self.batch_size}
+        if self.offset is not None:
+            params["offset"] = self.offset
+
+        response = await self.client.post(f"{self.integration.base_url}/getUpdates", json=params)
+        response.raise_for_status()
+        body = response.json()
+        if not body.get("ok"):
+            raise RuntimeError(body.get("description", "getUpdates failed"))
+        return body.get("result", [])
+
+    @staticmethod
+    def _chat_key(update: Dict[str, Any]) -> str:
+        message = update.get("message") or (update.get("callback_query") or {}).get("message") or {}
+        return str(message.get("chat", {}).get("id", update.get("update_id")))
+
+    async def dispatch(self, updates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Handle a batch: chats concurrently, updates per chat in order"""
+        by_chat: Dict[str, List[int]] = {}
+        for index, update in enumerate(updates):
+            by_chat.setdefault(self._chat_key(update), []).append(index)
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(updates)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def process_chat(indexes: List[int]):
+            async with semaphore:
+                for index in indexes:
+                    try:
+                        results[index] = await self.integration.handle_update(updates[index])
+                    except Exception as e:
+                        logger.error(f"Error handling Telegram update: {str(e)}")
+                        results[index] = {"error": str(e), "status": "error"}
+
+        # Polled updates are webhook traffic: keep them in the webhook bulkhead
+        with workload(WEBHOOK):
+            await asyncio.gather(*(process_chat(indexes) for indexes in by_chat.values()))
+        return results
+
+    async def poll_once(self) -> int:
+        """Fetch and handle one batch; returns the number of updates handled"""
+        updates = await self.fetch_updates()
+        if not updates:
+            return 0
+
+        started = time.perf_counter()
+        results = await self.dispatch(updates)
+
+        self.offset = max(update["update_id"] for update in updates) + 1
+        self.offset_store.save(self.offset)
+
+        self.stats["batches"] += 1
+        self.stats["updates"] += len(updates)
+        self.stats["failed_updates"] += sum(1 for r in results if r.get("status") == "error")
+        self.stats["processing_seconds"] += time.perf_counter() - started
+
+        return len(updates)
+
+    async def run(self, delete_webhook: bool = True, max_backoff: float = 30.0):
+        """Poll until ``stop`` is called"""
+        if delete_webhook:
+            await self.delete_webhook()
+
+        self._running = True
+        backoff = 1.0
+        logger.info("Telegram long polling started", offset=self.offset)
+
+        while self._running:
+            try:
+                await self.poll_once()
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["poll_errors"] += 1
+                logger.error(f"Telegram polling error, retrying in {backoff:.0f}s: {str(e)}")
+                await asyncio.sleep(backoff)
+                backoff = min(max_backoff, backoff * 2)
+
+        logger.info("Telegram long polling stopped", offset=self.offset)
+
+    def stop(self):
+        """Stop after the current batch"""
+        self._running = False
+
+    async def close(self):
+        if self._owns_client:
+            await self.client.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        processing = self.stats["processing_seconds"]
+        return {
+            **self.stats,
+            "offset": self.offset,
+            "updates_per_second": round(self.stats["updates"] / processing, 2) if processing else None
+        }
+
+
+async def main():
+    integration = TelegramIntegration(settings.TELEGRAM_BOT_TOKEN)
+    poller = TelegramPoller(integration)
+    try:
+        await poller.run()
+    finally:
+        await poller.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,34 +3,62 @@ Web Chat Integration for embedding in websites and customer portals
 """
 
 import asyncio
-from typing import Dict, Any, Optional, List
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, AsyncIterator, Tuple
 import structlog
 from core.engine.core_agent import CoreAIAgent, AgentResponse
+from core.runtime.events import MESSAGE_RECEIVED, publish_event
+from config.settings import settings
+from .session_store import SessionStore, SessionRecord, SQLiteSessionBackend
+from .speculative import SpeculativeCache
 
 logger = structlog.get_logger(__name__)
 
 
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
 class WebChatIntegration:
     """Integration for web-based chat widget and customer portal"""
     
-    def __init__(self):
+    def __init__(self, session_store: Optional[SessionStore] = None, speculative: bool = None):
         self.agent = CoreAIAgent()
-        self.active_sessions = {}  # Store active chat sessions
+        self.sessions = session_store if session_store is not None else SessionStore(
+            idle_ttl=settings.WEBCHAT_SESSION_TTL,
+            max_sessions=settings.WEBCHAT_MAX_SESSIONS,
+            sweep_interval=settings.WEBCHAT_SWEEP_INTERVAL,
+            backend=SQLiteSessionBackend(settings.WEBCHAT_SESSION_DB) if settings.WEBCHAT_SESSION_DB else None
+        )
+        # Drop conversation memory together with the session
+        self.sessions.on_evict(lambda session_id, reason: self.agent.clear_memory(session_id))
+        
+        self.action_handlers = {
+            "get_quote": self._handle_quote_request,
+            "view_services": self._handle_services_request,
+            "schedule_meeting": self._handle_meeting_request,
+            "contact_support": self._handle_support_request,
+            "view_pricing": self._handle_pricing_request,
+            "request_demo": self._handle_demo_request
+        }
+        
+        # Optional pre-generation of replies for suggested actions
+        self.speculative = None
+        if settings.WEBCHAT_SPECULATIVE_ENABLED if speculative is None else speculative:
+            self.speculative = SpeculativeCache(
+                ttl=settings.WEBCHAT_SPECULATIVE_TTL,
+                concurrency=settings.WEBCHAT_SPECULATIVE_CONCURRENCY
+            )
+            self.sessions.on_evict(lambda session_id, reason: self.speculative.discard_session(session_id))
         
-        logger.info("Web chat integration initialized")
+        logger.info("Web chat integration initialized", speculative=self.speculative is not None)
     
     async def start_session(self, session_id: str, user_info: Dict[str, Any] = None) -> Dict[str, Any]:
         """Start a new chat session"""
         try:
-            session_data = {
-                "session_id": session_id,
-                "user_info": user_info or {},
-                "start_time": "2025-06-27T10:00:00Z",
-                "message_count": 0,
-                "status": "active"
-            }
-            
-            self.active_sessions[session_id] = session_data
+            session_data = self.sessions.create(session_id, user_info).to_dict()
             
             # Send welcome message
             welcome_message = await self._get_welcome_message(user_info)
@@ -52,41 +80,35 @@ class WebChatIntegration:
                            user_info: Dict[str, Any] = None) -> Dict[str, Any]:
         """Process incoming chat message"""
         try:
-            if session_id not in self.active_sessions:
-                await self.start_session(session_id, user_info)
-            
-            session = self.active_sessions[session_id]
-            session["message_count"] += 1
+            session, context = await self._begin_turn(session_id, message, user_info)
             
             logger.info(f"Processing web chat message in session {session_id}: {message[:50]}...")
             
-            # Prepare context
-            context = {
-                "platform": "web_chat",
-                "session_id": session_id,
-                "user_info": user_info or session.get("user_info", {}),
-                "message_count": session["message_count"]
-            }
-            
-            # Process with AI agent
-            agent_response = await self.agent.process_message(
-                message=message,
-                user_id=session_id,
-                context=context
-            )
+            # Process with AI agent (or serve a reply computed ahead of time)
+            with self._foreground():
+                agent_response = await self._take_speculated(session_id, message)
+                if agent_response is None:
+                    agent_response = await self.agent.process_message(
+                        message=message,
+                        user_id=session_id,
+                        context=context
+                    )
             
             # Update session
-            session["last_message_time"] = "2025-06-27T10:00:00Z"
+            self.sessions.touch(session)
+            
+            suggested_actions = await self._get_suggested_actions(message, agent_response)
+            self._speculate(session_id, suggested_actions, context)
             
             response_data = {
                 "session_id": session_id,
                 "message": agent_response.response,
                 "message_type": "text",
-                "timestamp": "2025-06-27T10:00:00Z",
+                "timestamp": _now_iso(),
                 "agent_type": agent_response.agent_type,
                 "success": agent_response.success,
                 "actions_taken": agent_response.actions_taken,
-                "suggested_actions": await self._get_suggested_actions(message, agent_response)
+                "suggested_actions": suggested_actions
             }
             
             return response_data
@@ -101,6 +123,130 @@ class WebChatIntegration:
                 "success": False
             }
     
+    async def stream_message(self, session_id: str, message: str,
+                             user_info: Dict[str, Any] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a chat message and yield events as the response is generated
+        
+        Yields ``delta`` events with partial text, then one ``message`` event
+        with the complete response and a ``suggested_actions`` event.
+        """
+        session, context = await self._begin_turn(session_id, message, user_info)
+        
+        logger.info(f"Streaming web chat message in session {session_id}: {message[:50]}...")
+        
+        chunks = []
+        outcome: Dict[str, Any] = {"success": True}
+        with self._foreground():
+            speculated = await self._take_speculated(session_id, message)
+            if speculated is not None:
+                chunks.append(speculated.response)
+                outcome["success"] = speculated.success
+                yield {"type": "delta", "text": speculated.response}
+            else:
+                async for delta in self.agent.stream_message(message=message, user_id=session_id,
+                                                             context=context, outcome=outcome):
+                    chunks.append(delta)
+                    yield {"type": "delta", "text": delta}
+        
+        self.sessions.touch(session)
+        
+        metadata = {"session_id": session_id, "streamed": True}
+        if outcome.get("error"):
+            metadata["error"] = outcome["error"]
+        agent_response = AgentResponse(
+            agent_type="core",
+            response="".join(chunks).strip(),
+            actions_taken=[],
+            metadata=metadata,
+            success=outcome["success"]
+        )
+        
+        yield {
+            "type": "message",
+            "session_id": session_id,
+            "message": agent_response.response,
+            "message_type": "text",
+            "timestamp": _now_iso(),
+            "agent_type": agent_response.agent_type,
+            "success": agent_response.success
+        }
+        suggested_actions = await self._get_suggested_actions(message, agent_response)
+        self._speculate(session_id, suggested_actions, context)
+        
+        yield {
+            "type": "suggested_actions",
+            "session_id": session_id,
+            "suggested_actions": suggested_actions
+        }
+    
+    def _foreground(self):
+        """Hold speculation back while a live turn is being answered"""
+        return self.speculative.foreground() if self.speculative is not None else nullcontext()
+    
+    async def _take_speculated(self, session_id: str, message: str) -> Optional[AgentResponse]:
+        """Return a pre-generated reply for this message, if one was speculated"""
+        if self.speculative is None:
+            return None
+        
+        taken = await self.speculative.take(session_id, message)
+        if taken is None:
+            return None
+        
+        # The speculative run did not touch memory; record the exchange now,
+        # with the prompt it answered (``message`` may be an action id)
+        prompt, agent_response = taken
+        self.agent.record_exchange(session_id, prompt, agent_response.response)
+        logger.info(f"Served speculative reply in session {session_id}")
+        return agent_response
+    
+    def _speculate(self, session_id: str, suggested_actions: List[Dict[str, str]],
+                   context: Dict[str, Any]):
+        """Pre-generate replies for the most likely suggested actions"""
+        if self.speculative is None:
+            return
+        
+        # Actions with a static handler are already instant
+        candidates = [
+            action for action in suggested_actions
+            if action["action"] not in self.action_handlers
+        ][:settings.WEBCHAT_SPECULATIVE_TOP_N]
+        
+        for action in candidates:
+            prompt = action["text"]
+            self.speculative.schedule(
+                session_id,
+                prompt,
+                lambda prompt=prompt: self.agent.process_message(
+                    message=prompt, user_id=session_id, context=context, remember=False
+                ),
+                aliases=[action["action"]]
+            )
+    
+    async def _begin_turn(self, session_id: str, message: str,
+                          user_info: Dict[str, Any] = None) -> Tuple[SessionRecord, Dict[str, Any]]:
+        """Get or start the session, count and publish the message and build agent context"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            await self.start_session(session_id, user_info)
+            session = self.sessions.get(session_id)
+        
+        session.message_count += 1
+        self.sessions.touch(session)
+        publish_event(MESSAGE_RECEIVED, {
+            "platform": "web_chat",
+            "user_id": session_id,
+            "text": message
+        }, source="web_chat")
+        
+        context = {
+            "platform": "web_chat",
+            "session_id": session_id,
+            "user_info": user_info or session.user_info,
+            "message_count": session.message_count
+        }
+        return session, context
+    
     async def _get_welcome_message(self, user_info: Dict[str, Any] = None) -> str:
         """Generate personalized welcome message"""
         name = user_info.get("name") if user_info else None
@@ -153,17 +299,15 @@ class WebChatIntegration:
         try:
             logger.info(f"Handling web chat action in session {session_id}: {action}")
             
-            action_handlers = {
-                "get_quote": self._handle_quote_request,
-                "view_services": self._handle_services_request,
-                "schedule_meeting": self._handle_meeting_request,
-                "contact_support": self._handle_support_request,
-                "view_pricing": self._handle_pricing_request,
-                "request_demo": self._handle_demo_request
-            }
+            handler = self.action_handlers.get(action)
+            speculated = None
+            if handler is None:
+                speculated = await self._take_speculated(session_id, action)
             
-            handler = action_handlers.get(action, self._handle_default_action)
-            result = await handler(session_id, data)
+            if speculated is not None:
+                result = {"message": speculated.response, "speculative": True}
+            else:
+                result = await (handler or self._handle_default_action)(session_id, data)
             
             return {
                 "session_id": session_id,
@@ -301,21 +445,20 @@ class WebChatIntegration:
     async def end_session(self, session_id: str) -> Dict[str, Any]:
         """End chat session"""
         try:
-            if session_id in self.active_sessions:
-                session = self.active_sessions[session_id]
-                session["status"] = "ended"
-                session["end_time"] = "2025-06-27T10:00:00Z"
+            session = self.sessions.remove(session_id)
+            if session is not None:
+                session.status = "ended"
+                duration_minutes = (time.time() - session.started_at) / 60
                 
                 # Store session summary for analytics
                 session_summary = {
-                    "duration": "30 minutes",  # Calculate actual duration
-                    "message_count": session.get("message_count", 0),
+                    "duration": f"{duration_minutes:.0f} minutes",
+                    "message_count": session.message_count,
+                    "end_time": _now_iso(),
                     "resolution": "completed",
                     "satisfaction": "pending"
                 }
                 
-                del self.active_sessions[session_id]
-                
                 logger.info(f"Ended web chat session: {session_id}")
                 
                 return {
@@ -332,13 +475,16 @@ class WebChatIntegration:
     
     def get_session_info(self, session_id: str) -> Dict[str, Any]:
         """Get information about active session"""
-        return self.active_sessions.get(session_id, {"error": "Session not found"})
+        session = self.sessions.get(session_id)
+        return session.to_dict() if session else {"error": "Session not found"}
     
     def get_integration_status(self) -> Dict[str, Any]:
         """Get integration status and health"""
         return {
             "integration": "web_chat",
             "status": "active",
-            "active_sessions": len(self.active_sessions),
-            "total_sessions": len(self.active_sessions)
+            "active_sessions": len(self.sessions),
+            "total_sessions": self.sessions.stats["created"],
+            "session_store": self.sessions.get_stats(),
+            "speculative": self.speculative.get_stats() if self.speculative else None
         }
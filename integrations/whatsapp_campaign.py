@@ -0,0 +1,247 @@
+"""
+WhatsApp broadcast campaigns: bulk template sends with crash-safe resume
+"""
+
+import asyncio
+import csv
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, Any, Optional, List, Iterator, Set, Callable
+import structlog
+
+from config.settings import settings
+from core.runtime.rate_limit import TokenBucket
+from core.runtime.bulkhead import BATCH, workload
+from .whatsapp_integration import WhatsAppIntegration
+
+logger = structlog.get_logger(__name__)
+
+
+def iter_recipients(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream recipients from a CSV or JSONL file
+
+    CSV needs a ``phone_number`` column; every other column is a template
+    parameter. JSONL lines are either ``{"phone_number": ..., "parameters": {...}}``
+    or flat objects handled like CSV rows. Each recipient gets a ``seq``
+    (its position in the file) used for checkpointing.
+    """
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for seq, row in enumerate(csv.DictReader(f)):
+                phone_number = row.pop("phone_number", None)
+                yield {"seq": seq, "phone_number": phone_number, "parameters": row}
+    else:
+        with open(path, encoding="utf-8") as f:
+            for seq, line in enumerate(f):
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                phone_number = record.pop("phone_number", None)
+                parameters = record.pop("parameters", record)
+                yield {"seq": seq, "phone_number": phone_number, "parameters": parameters}
+
+
+class CampaignCheckpoint:
+    """
+    Append-only progress log
+
+    One JSON line per finished recipient. Lines are buffered and flushed
+    every ``flush_every`` records (and on close), so a crash can re-send at
+    most that many messages.
+    """
+
+    def __init__(self, path: str, flush_every: int = 50):
+        self.path = path
+        self.flush_every = flush_every
+        self.sent: Set[int] = set()
+        self.failed: Set[int] = set()
+        self._pending: List[str] = []
+        torn = self._load()
+        self._file = open(path, "a", encoding="utf-8")
+        if torn:
+            # Start on a fresh line, or the next record would be glued to the torn one
+            self._file.write("\n")
+
+    def _load(self) -> bool:
+        """Read the log; True when it ends mid-line (torn by a crash)"""
+        if not os.path.exists(self.path):
+            return False
+        line = ""
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn final line from a crash mid-write
+                    continue
+                if record.get("status") == "sent":
+                    self.sent.add(record["seq"])
+                    self.failed.discard(record["seq"])
+                else:
+                    self.failed.add(record["seq"])
+        return bool(line) and not line.endswith("\n")
+
+    def record(self, seq: int, status: str, detail: Optional[str] = None):
+        (self.sent if status == "sent" else self.failed).add(seq)
+        entry = {"seq": seq, "status": status}
+        if detail:
+            entry["detail"] = detail
+        self._pending.append(json.dumps(entry))
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        self._file.write("\n".join(self._pending) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending.clear()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+class WhatsAppCampaign:
+    """
+    Bulk template sender
+
+    A producer streams recipients into a bounded queue and ``concurrency``
+    workers send them, so memory stays flat regardless of list size. The
+    send rate is capped by ``rate`` (messages/second) on top of the outbound
+    sender's platform limits. Recipients already in the checkpoint are
+    skipped, so re-running after a crash resumes instead of re-sending.
+    """
+
+    def __init__(self, integration: WhatsAppIntegration, template_name: str, source_path: str,
+                 checkpoint_path: str = None, parameter_fields: Optional[List[str]] = None,
+                 language: str = "en", concurrency: int = None, rate: float = None,
+                 retry_failed: bool = False, on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 progress_interval: float = 5.0):
+        self.integration = integration
+        self.template_name = template_name
+        self.source_path = source_path
+        self.checkpoint_path = checkpoint_path or f"{source_path}.{template_name}.progress.jsonl"
+        self.parameter_fields = parameter_fields
+        self.language = language
+        self.concurrency = concurrency or settings.CAMPAIGN_CONCURRENCY
+        self.rate_limiter = TokenBucket(rate or settings.CAMPAIGN_SEND_RATE)
+        self.retry_failed = retry_failed
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+
+        self.stats = {
+            "sent": 0,
+            "failed": 0,
+            "skipped": 0,
+            "invalid": 0,
+            "in_flight": 0,
+            "errors": {}
+        }
+        self._started_at: Optional[float] = None
+        self._recent: deque = deque(maxlen=1000)
+
+    def _template_parameters(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        if self.parameter_fields is None:
+            return parameters
+        return {field: parameters.get(field, "") for field in self.parameter_fields}
+
+    async def _send(self, recipient: Dict[str, Any], checkpoint: CampaignCheckpoint):
+        await self.rate_limiter.acquire()
+        self.stats["in_flight"] += 1
+        try:
+            response = await self.integration.send_template_message(
+                recipient["phone_number"],
+                self.template_name,
+                self._template_parameters(recipient["parameters"]),
+                language=self.language
+            )
+        finally:
+            self.stats["in_flight"] -= 1
+
+        if response.get("status") == "sent":
+            self.stats["sent"] += 1
+            checkpoint.record(recipient["seq"], "sent")
+        else:
+            error = str(response.get("error", "unknown error"))
+            self.stats["failed"] += 1
+            self.stats["errors"][error[:80]] = self.stats["errors"].get(error[:80], 0) + 1
+            checkpoint.record(recipient["seq"], "failed", error)
+        self._recent.append(time.monotonic())
+
+    async def run(self) -> Dict[str, Any]:
+        """Run (or resume) the campaign to completion"""
+        checkpoint = CampaignCheckpoint(self.checkpoint_path)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        self._started_at = time.monotonic()
+
+        logger.info(
+            f"Starting WhatsApp campaign {self.template_name}",
+            already_sent=len(checkpoint.sent),
+            concurrency=self.concurrency
+        )
+
+        async def produce():
+            for recipient in iter_recipients(self.source_path):
+                seq = recipient["seq"]
+                if seq in checkpoint.sent or (seq in checkpoint.failed and not self.retry_failed):
+                    self.stats["skipped"] += 1
+                    continue
+                if not recipient["phone_number"]:
+                    self.stats["invalid"] += 1
+                    continue
+                await queue.put(recipient)
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        async def work():
+            while True:
+                recipient = await queue.get()
+                if recipient is None:
+                    return
+                try:
+                    await self._send(recipient, checkpoint)
+                except Exception as e:
+                    logger.error(f"Campaign send failed: {str(e)}")
+                    self.stats["failed"] += 1
+                    checkpoint.record(recipient["seq"], "failed", str(e))
+
+        async def report():
+            while True:
+                await asyncio.sleep(self.progress_interval)
+                stats = self.get_stats()
+                logger.info("Campaign progress", **{k: v for k, v in stats.items() if k != "errors"})
+                if self.on_progress:
+                    self.on_progress(stats)
+
+        reporter = asyncio.create_task(report())
+        try:
+            with workload(BATCH):
+                await asyncio.gather(produce(), *(work() for _ in range(self.concurrency)))
+        finally:
+            reporter.cancel()
+            checkpoint.close()
+
+        stats = self.get_stats()
+        if self.on_progress:
+            self.on_progress(stats)
+        logger.info(f"Campaign {self.template_name} finished", sent=stats["sent"], failed=stats["failed"])
+        return stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Live throughput and error counts"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        now = time.monotonic()
+        recent = [t for t in self._recent if now - t <= 10]
+        return {
+            "template": self.template_name,
+            **self.stats,
+            "elapsed_seconds": round(elapsed, 2),
+            "throughput_per_second": round((self.stats["sent"] + self.stats["failed"]) / elapsed, 2) if elapsed else 0.0,
+            "recent_per_second": round(len(recent) / 10, 2)
+        }
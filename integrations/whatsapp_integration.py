@@ -3,32 +3,76 @@ WhatsApp Integration for external customer assistant
 """
 
 import asyncio
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterator
 import structlog
 from core.engine.core_agent import CoreAIAgent, AgentResponse
+from core.runtime.deadline import DeadlineExceeded, no_deadline
+from core.runtime.events import MESSAGE_RECEIVED, publish_event
+from config.settings import settings
+from .outbound import OutboundSender, get_outbound_sender
+from .progressive import stream_to_whatsapp
 
 logger = structlog.get_logger(__name__)
 
+FALLBACK_REPLY = "I apologize, but I'm experiencing technical difficulties. Please try again in a moment."
+
 
 class WhatsAppIntegration:
     """Integration with WhatsApp Business API for customer support"""
     
-    def __init__(self, api_token: str, webhook_verify_token: str = None):
+    def __init__(self, api_token: str, webhook_verify_token: str = None,
+                 max_concurrent_senders: int = 10, outbound: Optional[OutboundSender] = None,
+                 phone_number_id: str = None, base_url: str = None, progressive: bool = None):
         self.api_token = api_token
+        self.progressive = settings.PROGRESSIVE_REPLIES_ENABLED if progressive is None else progressive
         self.webhook_verify_token = webhook_verify_token
+        self.max_concurrent_senders = max_concurrent_senders
+        self.phone_number_id = phone_number_id or settings.WHATSAPP_PHONE_NUMBER_ID
         self.agent = CoreAIAgent()
-        self.base_url = "https://graph.facebook.com/v17.0"
+        self.base_url = base_url or settings.WHATSAPP_API_BASE_URL
+        
+        # Real delivery needs an outbound sender; otherwise sends are simulated
+        if outbound is None and settings.OUTBOUND_DELIVERY_ENABLED and api_token:
+            outbound = get_outbound_sender()
+        self.outbound = outbound
         
-        logger.info("WhatsApp integration initialized")
+        logger.info("WhatsApp integration initialized", live_delivery=self.outbound is not None)
+    
+    async def _post_message(self, phone_number: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Deliver a message object through the Graph API"""
+        body = await self.outbound.send(
+            platform="whatsapp",
+            chat_id=phone_number,
+            url=f"{self.base_url}/{self.phone_number_id}/messages",
+            payload=payload,
+            headers={"Authorization": f"Bearer {self.api_token}"}
+        )
+        messages = body.get("messages") if isinstance(body, dict) else None
+        message_ids = [m.get("id") for m in messages or [] if isinstance(m, dict)]
+        return {
+            "messaging_product": "whatsapp",
+            "to": phone_number,
+            "type": payload.get("type"),
+            "status": "sent",
+            "message_id": message_ids[0] if message_ids else None
+        }
     
     async def send_message(self, phone_number: str, message: str, 
                           message_type: str = "text") -> Dict[str, Any]:
         """Send message via WhatsApp Business API"""
         try:
-            # Simulate WhatsApp API call
             logger.info(f"Sending WhatsApp message to {phone_number}: {message[:50]}...")
             
-            # In a real implementation, this would make an API call to Facebook Graph API
+            if self.outbound is not None:
+                return await self._post_message(phone_number, {
+                    "messaging_product": "whatsapp",
+                    "recipient_type": "individual",
+                    "to": phone_number,
+                    "type": message_type,
+                    message_type: {"body": message} if message_type == "text" else message
+                })
+            
+            # Simulate WhatsApp API call
             response = {
                 "messaging_product": "whatsapp",
                 "to": phone_number,
@@ -56,12 +100,90 @@ class WhatsAppIntegration:
             if not messages:
                 return {"status": "no_messages"}
             
-            message = messages[0]
+            # _process_message answers with the fallback reply on DeadlineExceeded
+            return await self._process_message(messages[0])
+            
+        except Exception as e:
+            logger.error(f"Error processing WhatsApp message: {str(e)}")
+            return {"error": str(e), "status": "error"}
+    
+    async def handle_webhook_batch(self, webhook_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Process every message in a webhook payload
+        
+        Meta batches several entries, changes and messages (from several
+        senders) into one POST. Messages from different senders are processed
+        concurrently, while messages from the same sender are processed one
+        after another in payload order so conversation memory stays coherent.
+        
+        Returns:
+            Dict with one outcome per message, in payload order
+        """
+        try:
+            messages = list(self._iter_messages(webhook_data))
+            
+            if not messages:
+                return {"status": "no_messages", "message_count": 0, "results": []}
+            
+            # Group message positions by sender, preserving arrival order
+            by_sender: Dict[str, List[int]] = {}
+            for index, message in enumerate(messages):
+                by_sender.setdefault(message.get("from") or "unknown", []).append(index)
+            
+            results: List[Optional[Dict[str, Any]]] = [None] * len(messages)
+            semaphore = asyncio.Semaphore(self.max_concurrent_senders)
+            
+            async def process_sender(indexes: List[int]):
+                async with semaphore:
+                    for index in indexes:
+                        results[index] = await self._process_message(messages[index])
+            
+            await asyncio.gather(*(process_sender(indexes) for indexes in by_sender.values()))
+            
+            failed = sum(1 for result in results if result.get("status") == "error")
+            
+            logger.info(
+                f"Processed WhatsApp webhook batch: {len(messages)} messages "
+                f"from {len(by_sender)} senders ({failed} failed)"
+            )
+            
+            return {
+                "status": "processed",
+                "message_count": len(messages),
+                "sender_count": len(by_sender),
+                "failed": failed,
+                "results": results
+            }
+            
+        except Exception as e:
+            logger.error(f"Error processing WhatsApp webhook batch: {str(e)}")
+            return {"error": str(e), "status": "error"}
+    
+    def _iter_messages(self, webhook_data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Walk all entries, changes and messages of a webhook payload"""
+        for entry in webhook_data.get("entry") or []:
+            for change in entry.get("changes") or []:
+                value = change.get("value") or {}
+                for message in value.get("messages") or []:
+                    yield message
+    
+    async def _process_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Process a single message object from a webhook payload"""
+        try:
+            if message.get("type") == "interactive":
+                return await self._process_button_message(message)
+            
             phone_number = message.get("from")
             message_text = message.get("text", {}).get("body", "")
             message_id = message.get("id")
             
             logger.info(f"Processing WhatsApp message from {phone_number}: {message_text[:50]}...")
+            publish_event(MESSAGE_RECEIVED, {
+                "platform": "whatsapp",
+                "user_id": phone_number,
+                "text": message_text,
+                "message_id": message_id
+            }, source="whatsapp")
             
             # Process with AI agent
             context = {
@@ -71,6 +193,23 @@ class WhatsAppIntegration:
                 "timestamp": message.get("timestamp")
             }
             
+            if self.progressive:
+                delivery = await stream_to_whatsapp(
+                    self,
+                    phone_number,
+                    self.agent.stream_message(message=message_text, user_id=phone_number, context=context),
+                    message_id=message_id,
+                    min_chunk_chars=settings.WHATSAPP_MIN_CHUNK_CHARS
+                )
+                return {
+                    "status": "processed",
+                    "phone_number": phone_number,
+                    "message_id": message_id,
+                    "agent_response": delivery["text"],
+                    "actions_taken": [],
+                    "delivery": {"mode": "progressive", "messages": delivery["messages"]}
+                }
+            
             agent_response = await self.agent.process_message(
                 message=message_text,
                 user_id=phone_number,
@@ -83,22 +222,65 @@ class WhatsAppIntegration:
             else:
                 await self.send_message(
                     phone_number, 
-                    "I apologize, but I'm experiencing technical difficulties. Please try again in a moment."
+                    FALLBACK_REPLY
                 )
             
             return {
                 "status": "processed",
                 "phone_number": phone_number,
+                "message_id": message_id,
                 "agent_response": agent_response.response,
                 "actions_taken": agent_response.actions_taken
             }
             
+        except DeadlineExceeded as e:
+            # Don't leave the customer without an answer; the apology gets a fresh budget
+            logger.warning(f"WhatsApp reply ran out of time: {str(e)}")
+            with no_deadline():
+                await self.send_message(message.get("from"), FALLBACK_REPLY)
+            return {
+                "error": str(e),
+                "status": "error",
+                "phone_number": message.get("from"),
+                "message_id": message.get("id")
+            }
         except Exception as e:
             logger.error(f"Error processing WhatsApp message: {str(e)}")
-            return {"error": str(e), "status": "error"}
+            return {
+                "error": str(e),
+                "status": "error",
+                "phone_number": message.get("from"),
+                "message_id": message.get("id")
+            }
+    
+    async def send_typing_indicator(self, message_id: str) -> Dict[str, Any]:
+        """Mark the incoming message as read and show the typing indicator"""
+        try:
+            if self.outbound is not None:
+                body = await self.outbound.send(
+                    platform="whatsapp",
+                    chat_id=None,
+                    url=f"{self.base_url}/{self.phone_number_id}/messages",
+                    payload={
+                        "messaging_product": "whatsapp",
+                        "status": "read",
+                        "message_id": message_id,
+                        "typing_indicator": {"type": "text"}
+                    },
+                    headers={"Authorization": f"Bearer {self.api_token}"}
+                )
+                return {"status": "sent", "success": body.get("success", True) if isinstance(body, dict) else True}
+            
+            # Simulate typing indicator
+            return {"status": "sent", "message_id": message_id}
+            
+        except Exception as e:
+            logger.error(f"Error sending typing indicator: {str(e)}")
+            return {"error": str(e), "status": "failed"}
     
     async def send_template_message(self, phone_number: str, template_name: str, 
-                                   parameters: Dict[str, Any] = None) -> Dict[str, Any]:
+                                   parameters: Dict[str, Any] = None,
+                                   language: str = "en") -> Dict[str, Any]:
         """Send WhatsApp template message"""
         try:
             logger.info(f"Sending template {template_name} to {phone_number}")
@@ -109,7 +291,7 @@ class WhatsAppIntegration:
                 "type": "template",
                 "template": {
                     "name": template_name,
-                    "language": {"code": "en"},
+                    "language": {"code": language},
                     "components": []
                 }
             }
@@ -123,6 +305,9 @@ class WhatsAppIntegration:
                     }
                 ]
             
+            if self.outbound is not None:
+                return await self._post_message(phone_number, template_message)
+            
             # Simulate API call
             response = {
                 "messaging_product": "whatsapp",
@@ -172,6 +357,9 @@ class WhatsAppIntegration:
                 }
             }
             
+            if self.outbound is not None:
+                return await self._post_message(phone_number, interactive_message)
+            
             # Simulate sending interactive message
             response = {
                 "messaging_product": "whatsapp",
@@ -198,7 +386,15 @@ class WhatsAppIntegration:
             if not messages:
                 return {"status": "no_messages"}
             
-            message = messages[0]
+            return await self._process_button_message(messages[0])
+            
+        except Exception as e:
+            logger.error(f"Error handling button response: {str(e)}")
+            return {"error": str(e), "status": "error"}
+    
+    async def _process_button_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Process a single interactive (button reply) message"""
+        try:
             phone_number = message.get("from")
             interactive = message.get("interactive", {})
             button_reply = interactive.get("button_reply", {})
@@ -216,13 +412,19 @@ class WhatsAppIntegration:
             return {
                 "status": "button_processed",
                 "phone_number": phone_number,
+                "message_id": message.get("id"),
                 "button_id": button_id,
                 "response_sent": response_text
             }
             
         except Exception as e:
             logger.error(f"Error handling button response: {str(e)}")
-            return {"error": str(e), "status": "error"}
+            return {
+                "error": str(e),
+                "status": "error",
+                "phone_number": message.get("from"),
+                "message_id": message.get("id")
+            }
     
     async def _handle_button_action(self, button_id: str, phone_number: str) -> str:
         """Handle specific button actions"""
@@ -243,5 +445,6 @@ class WhatsAppIntegration:
             "status": "active",
             "api_token": "configured" if self.api_token else "missing",
             "webhook_token": "configured" if self.webhook_verify_token else "missing",
-            "base_url": self.base_url
+            "base_url": self.base_url,
+            "delivery": "live" if self.outbound is not None else "simulated"
         }
@@ -64,10 +64,19 @@ def test_api():
     except Exception as e:
         print(f"❌ API test failed: {e}")
 
+def start_telegram_polling():
+    """Run Telegram ingestion via long polling instead of the webhook"""
+    print("📨 Starting Telegram long polling...")
+    try:
+        subprocess.run([sys.executable, "-m", "integrations.telegram_polling"], check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Telegram polling failed: {e}")
+        sys.exit(1)
+
 def main():
     parser = argparse.ArgumentParser(description="Agentic AI Management Script")
     parser.add_argument("command", choices=[
-        "start", "check", "install", "test"
+        "start", "check", "install", "test", "telegram-poll"
     ], help="Command to execute")
     
     args = parser.parse_args()
@@ -80,6 +89,8 @@ def main():
         install_deps()
     elif args.command == "test":
         test_api()
+    elif args.command == "telegram-poll":
+        start_telegram_polling()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
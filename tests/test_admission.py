@@ -0,0 +1,197 @@
+"""
+Admission control: shedding, the wait queue, Retry-After and degraded chat replies
+"""
+
+import asyncio
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from api import quotas
+from api.admission import AdmissionController, AdmissionMiddleware, RouteClass, classify
+from api.auth import verify_api_key
+from api.quotas import KeyPolicy, QuotaManager, hash_key
+from config.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def open_api(monkeypatch):
+    monkeypatch.setattr(settings, "REQUIRE_API_KEY", False)
+
+
+def make_app(controller, release=None):
+    """App behind the admission middleware; ``release`` (an Event) holds chat requests in flight"""
+    app = FastAPI()
+
+    @app.post("/agent/chat")
+    async def chat(payload: dict, _=Depends(verify_api_key)):
+        if release is not None:
+            await release.wait()
+        return {"response": "from the agent"}
+
+    @app.get("/agent/chat/history")
+    async def history(_=Depends(verify_api_key)):
+        return []
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    return app
+
+
+def full_controller(degraded_mode=False, avg_service=0.0) -> AdmissionController:
+    """Chat class with one slot, already taken, and no queue"""
+    controller = AdmissionController({"chat": {"max_in_flight": 1, "max_queue": 0}}, degraded_mode=degraded_mode)
+    chat = controller.get_class("chat")
+    assert asyncio.run(chat.acquire())
+    chat.avg_service = avg_service
+    return controller
+
+
+@pytest.mark.parametrize("method, path, route_class", [
+    ("GET", "/health", None),
+    ("POST", "/webhooks/whatsapp", None),
+    ("GET", "/", None),
+    ("POST", "/agent/chat", "chat"),
+    ("POST", "/agent/chat/batch", "batch"),
+    ("GET", "/webchat/session", "chat"),
+    ("POST", "/workflows/run", "workflow"),
+    ("GET", "/jobs/1", "default"),
+])
+def test_classify(method, path, route_class):
+    assert classify(method, path) == route_class
+
+
+def test_full_class_sheds_with_retry_after():
+    controller = full_controller(avg_service=2.5)
+    client = TestClient(make_app(controller))
+
+    response = client.post("/agent/chat", json={"message": "hi"})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
+    assert response.json() == {"detail": "Server is busy, please retry later", "retry_after": 3}
+    assert controller.get_class("chat").stats["rejected"] == 1
+    # Exempt paths and other classes are unaffected
+    assert client.get("/health").status_code == 200
+    assert controller.get_stats()["classes"]["default"]["rejected"] == 0
+
+
+@pytest.mark.parametrize("waiting, avg_service, expected", [(0, 0.0, 1), (0, 2.5, 2), (3, 1.0, 2), (7, 1.5, 6)])
+def test_retry_after_scales_with_the_backlog(waiting, avg_service, expected):
+    route_class = RouteClass("chat", max_in_flight=2, max_queue=10, max_wait=5.0)
+    route_class.waiting = waiting
+    route_class.avg_service = avg_service
+
+    assert route_class.retry_after() == expected
+
+
+async def test_queued_requests_wait_for_a_slot_and_overflow_is_shed():
+    controller = AdmissionController({"chat": {"max_in_flight": 1, "max_queue": 1, "max_wait": 5.0}})
+    release = asyncio.Event()
+    app = make_app(controller, release)
+    chat = controller.get_class("chat")
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        first = asyncio.ensure_future(client.post("/agent/chat", json={"message": "1"}))
+        second = asyncio.ensure_future(client.post("/agent/chat", json={"message": "2"}))
+        for _ in range(50):
+            if chat.in_flight == 1 and chat.waiting == 1:
+                break
+            await asyncio.sleep(0.01)
+        assert chat.in_flight == 1 and chat.waiting == 1
+
+        third = await client.post("/agent/chat", json={"message": "3"})
+        assert third.status_code == 503
+
+        release.set()
+        assert [(await request).status_code for request in (first, second)] == [200, 200]
+
+    assert chat.stats["admitted"] == 2 and chat.stats["rejected"] == 1
+    assert chat.in_flight == 0 and chat.waiting == 0
+
+
+async def test_queue_wait_times_out():
+    route_class = RouteClass("chat", max_in_flight=1, max_queue=5, max_wait=0.05)
+    assert await route_class.acquire()
+
+    assert not await route_class.acquire()
+
+    assert route_class.stats["timed_out"] == 1
+    assert route_class.waiting == 0
+    # Queued requests are now waiting as long as the budget: new ones fail fast
+    route_class.avg_wait = route_class.max_wait
+    assert not await route_class.acquire()
+    assert route_class.stats["timed_out"] == 1
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("What is the pricing?", "follow up with a quote"),
+    ("Can we book a meeting", "confirm your meeting"),
+    ("hello", "please try again in a moment"),
+])
+def test_degraded_mode_answers_shed_chat_with_a_rule_based_reply(message, expected):
+    controller = full_controller(degraded_mode=True)
+    client = TestClient(make_app(controller))
+
+    response = client.post("/agent/chat", json={"message": message})
+
+    assert response.status_code == 200
+    assert response.headers["x-degraded"] == "true"
+    assert expected in response.json()["response"]
+    assert response.json()["metadata"] == {"degraded": True, "mode": "rule_based"}
+    assert controller.get_class("chat").stats["degraded"] == 1
+
+
+def test_degraded_mode_only_covers_posted_chat():
+    controller = full_controller(degraded_mode=True)
+    client = TestClient(make_app(controller))
+
+    assert client.get("/agent/chat/history").status_code == 503
+    assert controller.get_class("chat").stats["degraded"] == 0
+
+
+@pytest.fixture
+def keys(monkeypatch):
+    monkeypatch.setattr(settings, "REQUIRE_API_KEY", True)
+    manager = QuotaManager(policies={
+        hash_key("good"): KeyPolicy(name="crm", key_hash=hash_key("good"), requests_per_minute=2)
+    })
+    monkeypatch.setattr(quotas, "_manager", manager)
+    return manager
+
+
+@pytest.mark.parametrize("headers, status, detail", [
+    ({}, 401, "API key required"),
+    ({"Authorization": "Bearer wrong"}, 401, "Invalid API key"),
+    ({"Authorization": "Basic Z29vZA=="}, 401, "API key required"),
+])
+def test_degraded_mode_checks_the_api_key_first(keys, headers, status, detail):
+    controller = full_controller(degraded_mode=True)
+    client = TestClient(make_app(controller))
+
+    response = client.post("/agent/chat", json={"message": "pricing"}, headers=headers)
+
+    assert response.status_code == status
+    assert response.json() == {"detail": detail}
+    assert "x-degraded" not in response.headers
+    assert controller.get_class("chat").stats["degraded"] == 0
+
+
+def test_degraded_replies_count_against_the_key_quota(keys):
+    controller = full_controller(degraded_mode=True)
+    client = TestClient(make_app(controller))
+    auth = {"Authorization": "Bearer good"}
+
+    first = client.post("/agent/chat", json={"message": "hi"}, headers=auth)
+    second = client.post("/agent/chat", json={"message": "hi"}, headers=auth)
+    third = client.post("/agent/chat", json={"message": "hi"}, headers=auth)
+
+    assert first.status_code == second.status_code == 200
+    assert first.headers["x-ratelimit-remaining"] == "1"
+    assert third.status_code == 429
+    assert int(third.headers["retry-after"]) >= 1
+    assert controller.get_class("chat").stats["degraded"] == 2
@@ -0,0 +1,73 @@
+"""
+Bulkheads: a batch flood stays in its own pool and interactive calls keep flowing
+"""
+
+import asyncio
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routes import agent
+from config.settings import settings
+from core.runtime.bulkhead import (
+    BATCH, INTERACTIVE, BulkheadFull, get_bulkhead, shutdown_bulkheads, workload
+)
+
+
+@pytest.fixture(autouse=True)
+def bulkheads(monkeypatch):
+    monkeypatch.setattr(settings, "BULKHEADS", {
+        BATCH: {"max_concurrent": 2, "max_queue": 20},
+        INTERACTIVE: {"max_concurrent": 2, "max_queue": 20}
+    })
+    shutdown_bulkheads()
+    yield
+    shutdown_bulkheads()
+
+
+def slow_llm_call():
+    time.sleep(0.2)
+    return "batch"
+
+
+async def test_batch_flood_does_not_delay_interactive_calls():
+    with workload(BATCH):
+        flood = [asyncio.ensure_future(get_bulkhead().call(slow_llm_call)) for _ in range(30)]
+    await asyncio.sleep(0.05)
+
+    batch = get_bulkhead(BATCH)
+    assert batch.active == 2 and batch.waiting == 20
+    assert batch.stats["rejected"] == 8
+
+    started = time.monotonic()
+    with workload(INTERACTIVE):
+        reply = await get_bulkhead().call(lambda: "interactive")
+    assert reply == "interactive"
+    assert time.monotonic() - started < 0.1
+    assert get_bulkhead(INTERACTIVE).stats["rejected"] == 0
+
+    results = await asyncio.gather(*flood, return_exceptions=True)
+    assert sum(isinstance(result, BulkheadFull) for result in results) == 8
+    assert results.count("batch") == 22
+
+
+def test_chat_batch_concurrency_is_capped_by_the_batch_bulkhead(monkeypatch):
+    monkeypatch.setattr(settings, "REQUIRE_API_KEY", False)
+    monkeypatch.setattr(agent, "AGENT_AVAILABLE", True)
+    monkeypatch.setattr(agent, "core_agent", object())
+    used = []
+
+    async def run_batch(items, concurrency):
+        used.append(concurrency)
+        yield ""
+
+    monkeypatch.setattr(agent, "_run_batch", run_batch)
+    app = FastAPI()
+    app.include_router(agent.router)
+    client = TestClient(app)
+
+    client.post("/chat/batch?concurrency=50", json=[{"message": "hi"}])
+    client.post("/chat/batch", json=[{"message": "hi"}])
+
+    assert used == [2, 2]
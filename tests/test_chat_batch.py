@@ -0,0 +1,47 @@
+"""
+Batch chat: results stream back and anonymous items leave no memory behind
+"""
+
+import json
+import pytest
+
+from api.routes import agent
+
+
+@pytest.fixture
+def core_agent(monkeypatch):
+    core_agent = agent.core_agent
+    if core_agent is None:
+        pytest.skip("core agent not available")
+
+    async def call(conversation_context):
+        return "ok"
+
+    monkeypatch.setattr(core_agent, "_call_groq_api", call)
+    monkeypatch.setattr(core_agent, "conversation_memory", {})
+    return core_agent
+
+
+async def run_batch(items, concurrency=4):
+    return [json.loads(line) async for line in agent._run_batch(items, concurrency)]
+
+
+async def test_anonymous_items_do_not_grow_memory(core_agent):
+    items = [{"id": "a", "message": "hi", "user_id": "customer-1"}]
+    items += [{"id": f"anon-{i}", "message": "hi"} for i in range(50)]
+
+    results = await run_batch(items)
+
+    assert len(results) == 51
+    assert all(result["success"] for result in results)
+    assert list(core_agent.conversation_memory) == ["customer-1"]
+
+
+async def test_invalid_items_are_reported_per_item(core_agent):
+    results = await run_batch([{"id": "ok", "message": "hi"}, {"id": "bad"}, "nope"])
+
+    by_id = {result["id"]: result for result in results}
+    assert by_id["ok"]["success"]
+    assert not by_id["bad"]["success"] and by_id["bad"]["error"].startswith("Invalid item")
+    assert not by_id["2"]["success"]
+    assert core_agent.conversation_memory == {}
@@ -0,0 +1,124 @@
+"""
+Workflow step graphs: cycles are rejected, independent branches run in parallel
+"""
+
+import asyncio
+import time
+import pytest
+
+from workflows.automation import WorkflowAutomation, WorkflowStatus
+from workflows.dag import CycleError, resolve_dependencies, run_dag
+
+
+def test_steps_without_depends_on_run_in_sequence():
+    assert resolve_dependencies(["a", "b", "c"], [None, None, None]) == {"a": [], "b": ["a"], "c": ["b"]}
+    assert resolve_dependencies(["a", "b"], [None, []]) == {"a": [], "b": []}
+
+
+@pytest.mark.parametrize("declared, involved", [
+    ([["c"], ["a"], ["b"]], {"a", "b", "c"}),
+    ([[], ["b"], None], {"b", "c"}),
+    ([["a"], [], []], {"a"}),
+])
+def test_cycles_are_rejected(declared, involved):
+    with pytest.raises(CycleError) as error:
+        resolve_dependencies(["a", "b", "c"], declared)
+
+    assert set(error.value.step_ids) == involved
+
+
+def test_unknown_and_duplicate_steps_are_rejected():
+    with pytest.raises(ValueError, match="unknown steps: z"):
+        resolve_dependencies(["a", "b"], [[], ["z"]])
+    with pytest.raises(ValueError, match="unique"):
+        resolve_dependencies(["a", "a"], [[], []])
+
+
+class _Steps:
+    """Step runner that records start order and overlap"""
+
+    def __init__(self, fail=(), park=()):
+        self.fail, self.park = set(fail), set(park)
+        self.started = []
+        self.active = 0
+        self.peak = 0
+
+    async def __call__(self, step_id):
+        self.started.append(step_id)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.05)
+        self.active -= 1
+        if step_id in self.park:
+            return None
+        return step_id not in self.fail
+
+
+DIAMOND = {"start": [], "left": ["start"], "middle": ["start"], "right": ["start"],
+           "join": ["left", "middle", "right"]}
+
+
+async def test_parallel_branches_run_together_and_join_waits_for_all():
+    steps = _Steps()
+
+    assert await run_dag(DIAMOND, steps, max_concurrency=4)
+
+    assert steps.peak == 3
+    assert steps.started[0] == "start" and steps.started[-1] == "join"
+
+
+async def test_concurrency_limit_is_respected():
+    steps = _Steps()
+
+    assert await run_dag({f"s{i}": [] for i in range(6)}, steps, max_concurrency=2)
+
+    assert steps.peak == 2
+
+
+async def test_failure_stops_new_steps_but_lets_running_ones_finish():
+    steps = _Steps(fail={"left"})
+
+    assert not await run_dag(DIAMOND, steps, max_concurrency=4)
+
+    assert set(steps.started) == {"start", "left", "middle", "right"}
+
+
+async def test_parked_step_blocks_only_its_dependents():
+    steps = _Steps(park={"wait"})
+    graph = {"wait": [], "after_wait": ["wait"], "other": [], "after_other": ["other"]}
+
+    assert not await run_dag(graph, steps)
+
+    assert set(steps.started) == {"wait", "other", "after_other"}
+
+
+@pytest.fixture
+async def engine():
+    engine = WorkflowAutomation(None)
+    yield engine
+    await engine.close()
+
+
+def wait(step_id, depends_on, seconds=0.1):
+    return {"id": step_id, "type": "wait", "depends_on": depends_on,
+            "parameters": {"seconds": seconds, "hibernate": False}}
+
+
+async def test_workflow_branches_run_concurrently(engine):
+    workflow_id = await engine.create_workflow("fan-out", [
+        wait("a", []), wait("b", []), wait("c", []), wait("join", ["a", "b", "c"], seconds=0)
+    ])
+
+    started = time.monotonic()
+    result = await engine.execute_workflow(workflow_id)
+
+    assert time.monotonic() - started < 0.25
+    assert result["status"] == WorkflowStatus.COMPLETED.value
+    assert all(step["status"] == "completed" for step in result["steps"])
+
+
+async def test_workflow_with_a_cycle_is_not_created(engine):
+    with pytest.raises(CycleError):
+        await engine.create_workflow("loop", [wait("a", ["b"]), wait("b", ["a"])])
+
+    assert engine.workflows == {}
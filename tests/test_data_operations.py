@@ -0,0 +1,110 @@
+"""
+data_operation steps: direct tool dispatch, the agent fallback and errors caught at creation
+"""
+
+import pytest
+
+from core.engine.core_agent import AgentResponse
+from workflows import operations
+from workflows.automation import WorkflowAutomation
+
+
+class _Agent:
+    def __init__(self):
+        self.tasks = []
+
+    async def process_message(self, message, user_id, context):
+        self.tasks.append(message)
+        return AgentResponse(agent_type="core", response="done by the agent", actions_taken=[],
+                             metadata={}, success=True)
+
+
+@pytest.fixture
+async def engine():
+    engine = WorkflowAutomation(_Agent())
+    yield engine
+    await engine.close()
+
+
+@pytest.fixture(autouse=True)
+def fresh_tools(monkeypatch):
+    monkeypatch.setattr(operations, "_tools", {})
+
+
+def data_step(**parameters):
+    return [{"id": "op", "type": "data_operation", "parameters": parameters}]
+
+
+async def run(engine, **parameters):
+    workflow_id = await engine.create_workflow("op", data_step(**parameters))
+    await engine.execute_workflow(workflow_id)
+    return engine.store.get(workflow_id).steps[0]
+
+
+async def test_crm_query_runs_the_tool_directly(engine):
+    step = await run(engine, operation="query", target="crm",
+                     data={"query_type": "leads", "filters": {"status": "new"}})
+
+    assert step.status == "completed"
+    assert step.result["tool"] == "crm_query"
+    assert step.result["output"].startswith("Found 1 leads")
+    assert engine.ai_agent.tasks == []
+
+
+@pytest.mark.parametrize("operation, data, tool", [
+    ("update", {"record_type": "lead", "record_id": "lead_001", "updates": {"status": "won"}}, "crm_update"),
+    ("create", {"record_type": "lead", "data": {"name": "New Lead"}}, "crm_create"),
+])
+async def test_crm_writes_run_directly(engine, operation, data, tool):
+    step = await run(engine, operation=operation, target="crm", data=data)
+
+    assert step.status == "completed"
+    assert step.result["tool"] == tool
+    assert step.result["output"].startswith("Successfully")
+
+
+async def test_data_management_takes_the_target_as_source(engine):
+    step = await run(engine, operation="clean", target="contacts", data={})
+
+    assert step.result["tool"] == "manage_data"
+    assert step.result["arguments"] == {"operation": "clean", "data_source": "contacts", "parameters": {}}
+    assert "data_cleaning" in step.result["output"]
+
+
+async def test_invalid_arguments_fail_the_step(engine):
+    step = await run(engine, operation="update", target="crm", data={"record_type": "lead"})
+
+    assert step.status == "failed"
+    assert "Invalid arguments for crm_update" in step.error
+    assert "record_id" in step.error
+
+
+async def test_unknown_operation_is_rejected_at_creation(engine):
+    with pytest.raises(ValueError, match="No tool for delete on crm"):
+        await engine.create_workflow("op", data_step(operation="delete", target="crm"))
+
+
+async def test_misconfigured_tool_is_rejected_at_creation(engine, monkeypatch):
+    monkeypatch.setitem(operations.CRM_OPERATIONS, ("crm", "query"),
+                        ("tools.crm_records", "no_such_function", "CRMQueryInput", "crm_query"))
+
+    with pytest.raises(ValueError, match="misconfigured"):
+        await engine.create_workflow("op", data_step(operation="query", target="crm"))
+
+
+async def test_unavailable_tool_falls_back_to_the_agent(engine, monkeypatch):
+    monkeypatch.setitem(operations.CRM_OPERATIONS, ("crm", "query"),
+                        ("tools.not_installed", "query_crm", "CRMQueryInput", "crm_query"))
+
+    step = await run(engine, operation="query", target="crm", data={"query_type": "leads"})
+
+    assert step.status == "completed"
+    assert step.result["response"] == "done by the agent"
+    assert engine.ai_agent.tasks == ["Perform query operation on crm with data: {'query_type': 'leads'}"]
+
+
+async def test_use_agent_skips_the_tool(engine):
+    step = await run(engine, operation="query", target="crm", data={"query_type": "leads"}, use_agent=True)
+
+    assert step.result["response"] == "done by the agent"
+    assert operations._tools == {}
@@ -0,0 +1,118 @@
+"""
+Event-triggered workflows queue runs instead of bouncing events; dead letters are bounded
+"""
+
+import asyncio
+import pytest
+
+from config.settings import settings
+from core.runtime.events import (
+    Event, EventBus, InMemoryEventStore, SQLiteEventStore, MESSAGE_RECEIVED, RECORD_CREATED
+)
+from workflows.automation import WorkflowAutomation, WorkflowStatus
+
+
+@pytest.fixture
+async def engine():
+    bus = EventBus(retry_base=0.05, retry_max=0.1)
+    engine = WorkflowAutomation(None, event_bus=bus)
+    engine.start()
+    runs = []
+    execute = engine.execute_workflow
+
+    async def recording(workflow_id, data=None, resume=False):
+        if data and "event" in data:
+            runs.append(data["event"]["data"]["text"])
+        return await execute(workflow_id, data, resume=resume)
+
+    engine.execute_workflow = recording
+    engine.runs = runs
+    yield engine
+    await bus.stop()
+    await engine.close()
+
+
+async def triggered_workflow(engine, seconds=0.05):
+    return await engine.create_workflow(
+        "on-message",
+        [{"type": "wait", "parameters": {"seconds": seconds, "hibernate": False}}],
+        trigger_type="event",
+        parameters={"event_type": MESSAGE_RECEIVED}
+    )
+
+
+def publish(engine, text):
+    engine.events.publish(MESSAGE_RECEIVED, {"platform": "web_chat", "user_id": "u1", "text": text})
+
+
+async def settle(engine, count, timeout=5.0):
+    for _ in range(int(timeout / 0.02)):
+        if len(engine.runs) >= count and not engine._trigger_queues and not engine._triggering:
+            return
+        await asyncio.sleep(0.02)
+
+
+async def test_events_during_a_run_are_queued_in_order(engine):
+    workflow_id = await triggered_workflow(engine)
+
+    for text in ("one", "two", "three", "four"):
+        publish(engine, text)
+    await settle(engine, 4)
+
+    assert engine.runs == ["one", "two", "three", "four"]
+    assert engine.store.get(workflow_id).status == WorkflowStatus.COMPLETED
+    stats = engine.events.get_stats()
+    assert stats["retried"] == 0
+    assert stats["dead_letters"] == 0
+
+
+async def test_paused_workflow_keeps_events_until_it_finishes(engine):
+    workflow_id = await triggered_workflow(engine)
+    workflow = engine.store.get(workflow_id)
+    engine.store.set_status(workflow, WorkflowStatus.PAUSED)
+
+    publish(engine, "while paused")
+    await asyncio.sleep(0.2)
+    assert engine.runs == []
+    assert engine.events.get_stats()["retried"] == 0
+
+    engine.store.set_status(workflow, WorkflowStatus.FAILED)
+    await engine.execute_workflow(workflow_id)
+    await settle(engine, 1)
+
+    assert engine.runs == ["while paused"]
+
+
+async def test_full_queue_pushes_back_to_the_bus(engine, monkeypatch):
+    monkeypatch.setattr(settings, "WORKFLOW_EVENT_QUEUE_SIZE", 1)
+    workflow_id = await triggered_workflow(engine)
+    engine.store.set_status(engine.store.get(workflow_id), WorkflowStatus.PAUSED)
+
+    publish(engine, "queued")
+    publish(engine, "refused")
+    await asyncio.sleep(0.2)
+
+    assert len(engine._trigger_queues[workflow_id]) == 1
+    assert engine.events.get_stats()["retried"] >= 1
+
+
+def dead_event(number):
+    return Event(event_id=f"e{number}", type=RECORD_CREATED, source="test",
+                 data={"record_type": "lead", "record_id": str(number)}, status="dead")
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda tmp_path: InMemoryEventStore(max_dead=3),
+    lambda tmp_path: SQLiteEventStore(str(tmp_path / "events.db"), max_dead=3),
+])
+def test_dead_letters_are_bounded(tmp_path, make_store):
+    store = make_store(tmp_path)
+    pending = Event(event_id="p", type=RECORD_CREATED, source="test",
+                    data={"record_type": "lead", "record_id": "p"})
+    store.save(pending)
+    for number in range(10):
+        store.save(dead_event(number))
+
+    assert store.count_dead() == 3
+    assert [event.event_id for event in store.load_pending()] == ["p"]
+    store.close()
@@ -0,0 +1,91 @@
+"""
+Safe condition expressions: the whitelist, the compile cache and the result-size cap
+"""
+
+import pytest
+
+from workflows.expressions import (
+    MAX_SEQUENCE_LENGTH, ExpressionError, compile_expression, evaluate
+)
+
+NAMESPACE = {
+    "parameters": {"tier": "gold", "amount": 1200, "tags": ["vip", "eu"]},
+    "step_results": {"score": {"result": {"value": 0.9}}},
+    "workflow_id": "wf-1"
+}
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("parameters.amount > 1000 and parameters.tier == 'gold'", True),
+    ("'vip' in parameters.tags", True),
+    ("step_results['score'].result['value'] >= 0.5", True),
+    ("get(parameters, 'missing', 3) * 2", 6),
+    ("len(parameters.tags) + 1", 3),
+    ("upper(parameters.tier) if parameters.amount else 'none'", "GOLD"),
+    ("1 < parameters.amount < 2000", True),
+    ("'ab' * 3 + 'c'", "abababc"),
+])
+def test_allowed_expressions(expression, expected):
+    assert evaluate(expression, NAMESPACE) == expected
+
+
+@pytest.mark.parametrize("expression", [
+    "parameters.keys()",
+    "''.join(parameters.tags)",
+    "workflow_id.__class__",
+    "parameters.__class__.__mro__",
+    "__import__('os').system('true')",
+    "open('/etc/passwd')",
+    "(lambda: 1)()",
+    "lambda: 1",
+    "[x for x in parameters.tags]",
+    "{x: 1 for x in parameters.tags}",
+    "(x for x in parameters.tags)",
+    "len(parameters.tags, key=1)",
+    "2 ** 1000",
+    "{**parameters}",
+    "(y := 1)",
+])
+def test_forbidden_constructs_are_rejected(expression):
+    with pytest.raises(ExpressionError):
+        evaluate(expression, NAMESPACE)
+
+
+def test_unknown_names_and_fields_fail_cleanly():
+    with pytest.raises(ExpressionError, match="Unknown name"):
+        evaluate("secret", NAMESPACE)
+    with pytest.raises(ExpressionError, match="No field"):
+        evaluate("parameters.nope", NAMESPACE)
+
+
+def test_compiled_expressions_are_cached():
+    compile_expression.cache_clear()
+    expression = "parameters.amount > 10"
+
+    first = compile_expression(expression)
+    for _ in range(5):
+        evaluate(expression, NAMESPACE)
+
+    assert compile_expression(expression) is first
+    info = compile_expression.cache_info()
+    assert info.misses == 1 and info.hits == 6
+
+
+@pytest.mark.parametrize("expression", [
+    "'a' * 1000000",
+    "1000000 * 'a'",
+    "('ab' * 10000) * 10000",
+    "([0] * 10000) * 10000",
+    "(0,) * 100001",
+    "('a' * 60000) + ('a' * 60000)",
+    "[0] * 60000 + [0] * 60000",
+])
+def test_results_over_the_size_cap_are_refused(expression):
+    with pytest.raises(ExpressionError, match="max"):
+        evaluate(expression, {})
+
+
+def test_results_at_the_size_cap_are_allowed():
+    assert len(evaluate(f"'a' * {MAX_SEQUENCE_LENGTH}", {})) == MAX_SEQUENCE_LENGTH
+    assert len(evaluate("('ab' * 100) * 500", {})) == MAX_SEQUENCE_LENGTH
+    assert evaluate("'a' * -5", {}) == ""
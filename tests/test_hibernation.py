@@ -0,0 +1,107 @@
+"""
+Long waits hibernate: the run ends, the scheduler wakes it, and both survive a restart
+"""
+
+import asyncio
+import pytest
+
+from core.runtime.events import EventBus
+from workflows.automation import WorkflowAutomation, WorkflowStatus
+from workflows.memo import SQLiteStepCache
+from workflows.persistence import SQLiteWorkflowBackend
+from workflows.scheduler import SQLiteScheduleStore
+
+
+@pytest.fixture
+async def make_engine(tmp_path):
+    engines = []
+
+    def make(sqlite=False):
+        stores = {}
+        if sqlite:
+            path = str(tmp_path / "workflows.db")
+            stores = {"schedule_store": SQLiteScheduleStore(path), "backend": SQLiteWorkflowBackend(path),
+                      "step_cache": SQLiteStepCache(path, 100)}
+        engine = WorkflowAutomation(None, event_bus=EventBus(), **stores)
+        engines.append(engine)
+        engine.start()
+        return engine
+
+    yield make
+    for engine in engines:
+        await engine.events.stop()
+        if engine.scheduler._task is not None:
+            await engine.close()
+
+
+def wait(step_id, seconds, depends_on=None, hibernate=True):
+    step = {"id": step_id, "type": "wait", "parameters": {"seconds": seconds, "hibernate": hibernate}}
+    if depends_on is not None:
+        step["depends_on"] = depends_on
+    return step
+
+
+async def settle(engine, workflow_id, status=WorkflowStatus.COMPLETED, timeout=3.0):
+    for _ in range(int(timeout / 0.02)):
+        if engine.store.get(workflow_id).status == status:
+            return engine.store.get(workflow_id)
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"workflow is {engine.store.get(workflow_id).status}, expected {status}")
+
+
+async def test_long_wait_returns_and_the_scheduler_wakes_the_run(make_engine):
+    engine = make_engine()
+    workflow_id = await engine.create_workflow("nap", [wait("nap", 0.3), wait("after", 0, hibernate=False)])
+
+    result = await engine.execute_workflow(workflow_id)
+
+    assert result["status"] == WorkflowStatus.WAITING.value
+    assert f"wake:{workflow_id}:nap" in engine.scheduler
+    assert not engine._background
+
+    workflow = await settle(engine, workflow_id)
+    assert [step.status for step in workflow.steps] == ["completed", "completed"]
+    assert f"wake:{workflow_id}:nap" not in engine.scheduler
+
+
+async def test_independent_branches_finish_before_hibernating(make_engine):
+    engine = make_engine()
+    workflow_id = await engine.create_workflow("branches", [
+        wait("nap", 0.3, depends_on=[]),
+        wait("other", 0, depends_on=[], hibernate=False),
+        wait("after_nap", 0, depends_on=["nap"], hibernate=False)
+    ])
+
+    result = await engine.execute_workflow(workflow_id)
+
+    statuses = {step["step_id"]: step["status"] for step in result["steps"]}
+    assert statuses == {"nap": "waiting", "other": "completed", "after_nap": "pending"}
+    await settle(engine, workflow_id)
+
+
+async def test_paused_workflow_ignores_its_wake_up(make_engine):
+    engine = make_engine()
+    workflow_id = await engine.create_workflow("nap", [wait("nap", 0.1)])
+    await engine.execute_workflow(workflow_id)
+
+    assert await engine.pause_workflow(workflow_id)
+    await asyncio.sleep(0.3)
+
+    assert engine.store.get(workflow_id).status == WorkflowStatus.PAUSED
+
+
+@pytest.mark.parametrize("lose_wake_entry", [False, True])
+async def test_hibernating_workflow_wakes_after_a_restart(make_engine, lose_wake_entry):
+    before = make_engine(sqlite=True)
+    workflow_id = await before.create_workflow("nap", [wait("nap", 0.4), wait("after", 0, hibernate=False)])
+    await before.execute_workflow(workflow_id)
+    if lose_wake_entry:
+        before.scheduler.remove(f"wake:{workflow_id}:nap")
+    await before.close()  # the process stops while the workflow sleeps
+
+    after = make_engine(sqlite=True)
+    assert after.store.get(workflow_id).status == WorkflowStatus.WAITING
+    assert f"wake:{workflow_id}:nap" in after.scheduler
+
+    workflow = await settle(after, workflow_id)
+    assert [step.status for step in workflow.steps] == ["completed", "completed"]
@@ -0,0 +1,66 @@
+"""
+Idempotency-Key replay
+"""
+
+import asyncio
+import pytest
+from fastapi import Response
+
+from api import idempotency
+from api.idempotency import IdempotencyStore, idempotent
+from api.quotas import KeyPolicy
+
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch):
+    store = IdempotencyStore(ttl=60.0, max_keys=100)
+    monkeypatch.setattr(idempotency, "_store", store)
+    return store
+
+
+def counting(result):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return dict(result)
+
+    return compute, calls
+
+
+async def test_successful_result_is_replayed():
+    compute, calls = counting({"success": True, "response": "hi"})
+
+    first = await idempotent("k1", "agent.chat", {"message": "hi"}, compute)
+    response = Response()
+    second = await idempotent("k1", "agent.chat", {"message": "hi"}, compute, response)
+
+    assert first == second
+    assert len(calls) == 1
+    assert response.headers["Idempotent-Replayed"] == "true"
+
+
+async def test_unsuccessful_result_is_not_stored():
+    compute, calls = counting({"success": False, "response": "try again"})
+
+    await idempotent("k1", "agent.chat", {"message": "hi"}, compute)
+    await asyncio.sleep(0)
+    response = Response()
+    await idempotent("k1", "agent.chat", {"message": "hi"}, compute, response)
+
+    assert len(calls) == 2
+    assert "Idempotent-Replayed" not in response.headers
+
+
+async def test_keys_are_private_to_the_caller():
+    alice = KeyPolicy(name="alice", key_hash="a" * 64)
+    bob = KeyPolicy(name="bob", key_hash="b" * 64)
+    compute, calls = counting({"success": True})
+
+    await idempotent("shared", "agent.chat", {"message": "hi"}, compute, caller=alice)
+    response = Response()
+    await idempotent("shared", "agent.chat", {"message": "hi"}, compute, response, caller=bob)
+
+    assert len(calls) == 2
+    assert "Idempotent-Replayed" not in response.headers
@@ -0,0 +1,72 @@
+"""
+Job recovery after a restart
+"""
+
+import asyncio
+
+from core.runtime.jobs import JobManager, JobStatus, SQLiteJobStore
+
+
+async def wait_for(manager, job_id, timeout=2.0):
+    for _ in range(int(timeout / 0.01)):
+        job = manager.get(job_id)
+        if job.status.is_terminal:
+            return job
+        await asyncio.sleep(0.01)
+    return manager.get(job_id)
+
+
+async def test_restart_requeues_queued_jobs_and_fails_running_ones(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    started = asyncio.Event()
+
+    async def hang(payload, report):
+        started.set()
+        await asyncio.Event().wait()
+
+    before = JobManager(store=SQLiteJobStore(path), workers=1, handlers={"work": hang})
+    running = before.submit("work", {"n": 1})
+    queued = before.submit("work", {"n": 2})
+    await asyncio.wait_for(started.wait(), 1.0)
+    await before.stop()  # the process goes away mid-job
+
+    done = []
+
+    async def finish(payload, report):
+        done.append(payload["n"])
+        return payload["n"] * 10
+
+    after = JobManager(store=SQLiteJobStore(path), workers=1, handlers={"work": finish})
+    after.start()
+    try:
+        interrupted = await wait_for(after, running.job_id)
+        requeued = await wait_for(after, queued.job_id)
+    finally:
+        await after.stop()
+
+    assert interrupted.status == JobStatus.FAILED
+    assert "restart" in interrupted.error
+    assert requeued.status == JobStatus.SUCCEEDED
+    assert requeued.result == 20
+    assert done == [2]
+
+
+async def test_recovered_jobs_of_unknown_kind_fail(tmp_path):
+    path = str(tmp_path / "jobs.db")
+
+    async def never(payload, report):
+        await asyncio.Event().wait()
+
+    before = JobManager(store=SQLiteJobStore(path), workers=1, handlers={"old": never})
+    first = before.submit("old", {})
+    second = before.submit("old", {})
+    await asyncio.sleep(0.05)
+    await before.stop()
+
+    after = JobManager(store=SQLiteJobStore(path), workers=1, handlers={})
+    after.start()
+    try:
+        assert after.get(first.job_id).status == JobStatus.FAILED
+        assert after.get(second.job_id).error == "Unknown job kind: old"
+    finally:
+        await after.stop()
@@ -0,0 +1,219 @@
+"""
+Map step: streaming with bounded memory, data directory confinement and resume
+"""
+
+import asyncio
+import json
+import tracemalloc
+import pytest
+
+from config.settings import settings
+from workflows.mapping import MapRun, iter_source, resolve_data_path, run_map, validate_map_step
+
+STEP_TYPES = ["agent_task", "data_operation", "map"]
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "WORKFLOW_DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+def write_jsonl(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({"id": i, "amount": 1, "note": "x" * 64}) + "\n")
+
+
+@pytest.mark.parametrize("path", ["../secrets.jsonl", "/etc/passwd", "nested/../../escape.jsonl"])
+def test_paths_outside_the_data_dir_are_rejected(path):
+    with pytest.raises(ValueError):
+        resolve_data_path(path)
+    with pytest.raises(ValueError):
+        validate_map_step({"source": {"type": "jsonl", "path": path}, "step": {"type": "agent_task"}}, STEP_TYPES)
+    with pytest.raises(ValueError):
+        validate_map_step({"source": {"type": "inline"}, "step": {"type": "agent_task"}, "output_path": path},
+                          STEP_TYPES)
+    with pytest.raises(ValueError):
+        MapRun(output_path=path)
+
+
+def test_paths_inside_the_data_dir_resolve(data_dir):
+    assert resolve_data_path("in/items.jsonl") == str(data_dir / "in" / "items.jsonl")
+
+
+async def test_source_is_streamed_through_a_bounded_queue(data_dir):
+    write_jsonl(data_dir / "items.jsonl", 5000)
+    concurrency = 4
+    pulled = finished = ahead = 0
+
+    async def counted(items):
+        nonlocal pulled, ahead
+        async for item in items:
+            pulled += 1
+            ahead = max(ahead, pulled - finished)
+            yield item
+
+    async def worker(index, item):
+        nonlocal finished
+        await asyncio.sleep(0)
+        finished += 1
+        return True, item["amount"], None
+
+    run = MapRun(aggregate={"total": "result"})
+    await run_map(counted(iter_source({"type": "jsonl", "path": "items.jsonl"})), worker, run,
+                  concurrency=concurrency)
+
+    assert run.summary()["succeeded"] == 5000
+    assert run.aggregates["total"] == 5000
+    # Queue (2 per worker) + items being worked on + the one waiting to be queued
+    assert ahead <= concurrency * 3 + 1
+
+
+async def _peak_memory(data_dir, count):
+    write_jsonl(data_dir / f"{count}.jsonl", count)
+
+    async def worker(index, item):
+        return True, {"id": item["id"]}, None
+
+    run = MapRun(output_path=f"out/{count}.jsonl")
+    tracemalloc.start()
+    try:
+        await run_map(iter_source({"type": "jsonl", "path": f"{count}.jsonl"}), worker, run, concurrency=8)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert run.succeeded == count
+    with open(data_dir / "out" / f"{count}.jsonl", encoding="utf-8") as f:
+        assert sum(1 for _ in f) == count
+    return peak
+
+
+async def test_memory_does_not_grow_with_the_source(data_dir):
+    small = await _peak_memory(data_dir, 4000)
+    large = await _peak_memory(data_dir, 20000)
+
+    # Five times the items, about the same peak (a read batch plus the queue)
+    assert large < small * 1.5
+
+
+async def test_resume_appends_and_skips_completed_items(data_dir):
+    items = {"type": "inline", "items": list(range(10))}
+    calls = []
+
+    async def flaky(index, item):
+        calls.append(index)
+        if index == 3:
+            return False, None, "boom"
+        return True, item, None
+
+    first = MapRun(output_path="out.jsonl", aggregate={"total": "result"})
+    await run_map(iter_source(items), flaky, first, concurrency=2)
+    assert (first.succeeded, first.failed) == (9, 1)
+
+    calls.clear()
+
+    async def healthy(index, item):
+        calls.append(index)
+        return True, item, None
+
+    resumed = MapRun(output_path="out.jsonl", aggregate={"total": "result"}, resume=True)
+    await run_map(iter_source(items), healthy, resumed, concurrency=2)
+
+    assert calls == [3]
+    assert resumed.succeeded == 10
+    assert resumed.aggregates["total"] == sum(range(10))
+    with open(data_dir / "out.jsonl", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == 11
+    assert lines[-1] == {"index": 3, "item": 3, "status": "completed", "result": 3}
+
+
+async def test_fresh_run_truncates_the_output(data_dir):
+    (data_dir / "out.jsonl").write_text('{"index": 0, "status": "completed"}\n', encoding="utf-8")
+
+    async def worker(index, item):
+        return True, item, None
+
+    run = MapRun(output_path="out.jsonl")
+    await run_map(iter_source({"type": "inline", "items": ["a", "b"]}), worker, run)
+
+    assert run.succeeded == 2
+    assert len((data_dir / "out.jsonl").read_text(encoding="utf-8").splitlines()) == 2
+
+
+async def test_resume_without_an_output_file_uses_the_step_state():
+    items = {"type": "inline", "items": list(range(10))}
+    calls = []
+
+    async def flaky(index, item):
+        calls.append(index)
+        if index in (3, 7):
+            return False, None, "boom"
+        return True, item, None
+
+    first = MapRun(aggregate={"total": "result"})
+    await run_map(iter_source(items), flaky, first, concurrency=3)
+    state = first.state()
+    assert state["completed"]["low"] == 3
+
+    calls.clear()
+
+    async def healthy(index, item):
+        calls.append(index)
+        return True, item, None
+
+    resumed = MapRun(aggregate={"total": "result"}, resume=True, state=json.loads(json.dumps(state)))
+    await run_map(iter_source(items), healthy, resumed, concurrency=3)
+
+    assert sorted(calls) == [3, 7]
+    assert resumed.succeeded == 10
+    assert resumed.aggregates["total"] == sum(range(10))
+    assert resumed.state()["completed"] == {"low": 10, "ahead": []}
+
+
+async def test_crm_source_pages_through_records():
+    leads = [item async for item in iter_source({"type": "crm", "query_type": "leads", "page_size": 1})]
+    qualified = [item async for item in iter_source(
+        {"type": "crm", "query_type": "leads", "filters": {"status": "qualified"}}
+    )]
+
+    assert [lead["id"] for lead in leads] == ["lead_001", "lead_002"]
+    assert [lead["id"] for lead in qualified] == ["lead_002"]
+
+
+async def test_engine_resume_does_not_repeat_completed_items():
+    from workflows.automation import WorkflowAutomation, WorkflowStatus
+
+    engine = WorkflowAutomation(None)
+    runs = []
+    broken = {3}
+
+    async def notify(step, workflow, context):
+        index = step.parameters["n"]
+        runs.append(index)
+        step.status = "failed" if index in broken else "completed"
+        step.result = {"n": index}
+
+    engine.step_handlers["notification"] = notify
+    try:
+        workflow_id = await engine.create_workflow("map", [{"id": "each", "type": "map", "parameters": {
+            "source": {"type": "inline", "items": list(range(8))},
+            "step": {"type": "notification", "parameters": {"n": "{{ item }}"}},
+            "concurrency": 1,
+            "max_failures": 0
+        }}])
+        await engine.execute_workflow(workflow_id)
+        assert engine.store.get(workflow_id).status == WorkflowStatus.FAILED
+
+        broken.clear()
+        done_before = [index for index in runs if index != 3]
+        runs.clear()
+        await engine.resume_workflow(workflow_id)
+    finally:
+        await engine.close()
+
+    assert engine.store.get(workflow_id).status == WorkflowStatus.COMPLETED
+    assert not set(runs) & set(done_before)
+    assert sorted(done_before + runs) == list(range(8))
@@ -0,0 +1,210 @@
+"""
+Outbound delivery: retries, jittered backoff, dead letters and odd response bodies
+"""
+
+import httpx
+import pytest
+
+from config.settings import settings
+from integrations.outbound import OutboundDeliveryError, OutboundSender, PlatformLimits
+from integrations.whatsapp_integration import WhatsAppIntegration
+
+URL = "https://api.example.test/sendMessage"
+
+
+class _Api:
+    """Mock Bot API: answers with ``responses`` in turn, then repeats the last one"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def __call__(self, request):
+        self.calls += 1
+        status, body = self.responses[min(self.calls, len(self.responses)) - 1]
+        if isinstance(body, str):
+            return httpx.Response(status, text=body)
+        return httpx.Response(status, json=body)
+
+
+@pytest.fixture
+async def make_sender():
+    senders = []
+
+    def make(api, max_retries=3):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(api))
+        sender = OutboundSender(
+            client=client, limits={"telegram": PlatformLimits(1000, 1000)},
+            max_retries=max_retries, base_backoff=0.01, max_backoff=0.05
+        )
+        senders.append(sender)
+        return sender
+
+    yield make
+    for sender in senders:
+        await sender.client.aclose()
+
+
+async def test_retryable_errors_are_retried_until_delivered(make_sender):
+    api = _Api((503, {"ok": False}), (502, "Bad Gateway"), (200, {"ok": True, "result": {"message_id": 1}}))
+    sender = make_sender(api)
+
+    body = await sender.send("telegram", "42", URL, {"text": "hi"})
+
+    assert body["result"]["message_id"] == 1
+    assert api.calls == 3
+    assert sender.metrics["telegram"].retries == 2
+    assert len(sender.dead_letters) == 0
+
+
+async def test_client_errors_are_dead_lettered_without_retrying(make_sender):
+    api = _Api((400, {"ok": False, "description": "Bad Request: chat not found"}))
+    sender = make_sender(api)
+
+    with pytest.raises(OutboundDeliveryError) as error:
+        await sender.send("telegram", "42", URL, {"text": "hi"})
+
+    assert error.value.status_code == 400
+    assert api.calls == 1
+    [letter] = sender.dead_letters.list()
+    assert letter["error"] == "Bad Request: chat not found"
+    assert letter["attempts"] == 1
+
+
+async def test_exhausted_retries_are_dead_lettered_and_can_be_redelivered(make_sender):
+    api = _Api((503, "Service Unavailable"))
+    sender = make_sender(api, max_retries=2)
+
+    with pytest.raises(OutboundDeliveryError):
+        await sender.send("telegram", "42", URL, {"text": "hi"})
+
+    assert api.calls == 3
+    [letter] = sender.dead_letters.list("telegram")
+    assert letter["attempts"] == 3 and letter["status_code"] == 503
+    assert letter["error"] == "{'raw': 'Service Unavailable'}"
+
+    api.responses = [(200, {"ok": True})]
+    assert await sender.redeliver_dead_letters("telegram") == {"delivered": 1, "failed": 0}
+    assert len(sender.dead_letters) == 0
+    assert sender.get_stats()["dead_letters_total"] == 1
+
+
+async def test_retry_after_hint_is_honoured(make_sender):
+    api = _Api((429, {"ok": False, "parameters": {"retry_after": 0.03}}), (200, {"ok": True}))
+    sender = make_sender(api)
+    delays = []
+    backoff = sender._backoff
+
+    def recording_backoff(attempt, retry_after=None):
+        delays.append(backoff(attempt, retry_after))
+        return delays[-1]
+
+    sender._backoff = recording_backoff
+
+    await sender.send("telegram", "42", URL, {"text": "hi"})
+
+    assert len(delays) == 1
+    assert 0.03 <= delays[0] <= 0.03 + sender.base_backoff
+
+
+def test_backoff_is_full_jitter_and_capped():
+    sender = OutboundSender(client=httpx.AsyncClient(), limits={}, base_backoff=0.5, max_backoff=10.0)
+
+    for attempt in range(8):
+        delays = [sender._backoff(attempt) for _ in range(200)]
+        ceiling = min(10.0, 0.5 * 2 ** attempt)
+        assert all(0 <= delay <= ceiling for delay in delays)
+        # Spread over the whole window, not clustered at the exponential step
+        assert min(delays) < ceiling * 0.25 and max(delays) > ceiling * 0.75
+
+    assert sender._backoff(0, retry_after=60) <= 10.0 + 0.5
+
+
+async def test_dead_letters_keep_no_secrets_and_get_auth_back_per_platform(monkeypatch):
+    requests = []
+    up = False
+
+    def api(request):
+        requests.append(request)
+        return httpx.Response(200 if up else 400, json={"ok": up, "description": "down"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(api))
+    sender = OutboundSender(client=client, max_retries=0, limits={
+        "telegram": PlatformLimits(1000, 1000), "whatsapp": PlatformLimits(1000, 1000)
+    })
+    telegram_url = "https://api.telegram.org/bot123:secret/sendMessage"
+    whatsapp_url = "https://graph.example.test/v17.0/555/messages"
+
+    with pytest.raises(OutboundDeliveryError):
+        await sender.send("telegram", "42", telegram_url, {"text": "hi"})
+    with pytest.raises(OutboundDeliveryError):
+        await sender.send("whatsapp", "15550001", whatsapp_url, {"type": "text"},
+                          headers={"Authorization": "Bearer old-token", "X-Trace": "abc"})
+
+    telegram, whatsapp = sender.dead_letters.list()
+    assert "secret" not in str(sender.dead_letters.list())
+    assert telegram["url"] == "https://api.telegram.org/bot{bot_token}/sendMessage"
+    assert telegram["headers"] == {}
+    assert whatsapp["url"] == whatsapp_url and whatsapp["headers"] == {"X-Trace": "abc"}
+
+    monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", "123:rotated")
+    monkeypatch.setattr(settings, "WHATSAPP_API_TOKEN", "new-token")
+    up = True
+    requests.clear()
+    try:
+        assert await sender.redeliver_dead_letters() == {"delivered": 2, "failed": 0}
+    finally:
+        await client.aclose()
+
+    to_telegram, to_whatsapp = requests
+    assert str(to_telegram.url) == "https://api.telegram.org/bot123:rotated/sendMessage"
+    assert "authorization" not in to_telegram.headers
+    assert to_whatsapp.headers["authorization"] == "Bearer new-token"
+    assert to_whatsapp.headers["x-trace"] == "abc"
+
+
+async def test_dead_letters_without_credentials_stay_stored(make_sender, monkeypatch):
+    api = _Api((400, {"ok": False}))
+    sender = make_sender(api, max_retries=0)
+    monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", None)
+
+    with pytest.raises(OutboundDeliveryError):
+        await sender.send("telegram", "42", "https://api.telegram.org/bot123:secret/sendMessage", {"text": "hi"})
+
+    assert await sender.redeliver_dead_letters("telegram") == {"delivered": 0, "failed": 1}
+    assert api.calls == 1
+    assert len(sender.dead_letters) == 1
+
+
+@pytest.mark.parametrize("status, body, decoded", [
+    (200, [1, 2], [1, 2]),
+    (200, '"plain text"', "plain text"),
+    (500, ["oops"], None),
+    (500, '"oops"', None)
+])
+async def test_bodies_that_are_not_objects_do_not_crash(make_sender, status, body, decoded):
+    sender = make_sender(_Api((status, body)), max_retries=0)
+
+    if status < 400:
+        assert await sender.send("telegram", "42", URL, {"text": "hi"}) == decoded
+    else:
+        with pytest.raises(OutboundDeliveryError, match="oops"):
+            await sender.send("telegram", "42", URL, {"text": "hi"})
+
+
+@pytest.mark.parametrize("body", [[1, 2], '"plain text"', [{"id": "wamid.1"}, "x"]])
+async def test_whatsapp_sends_tolerate_bodies_that_are_not_objects(body):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: (
+        httpx.Response(200, text=body) if isinstance(body, str) else httpx.Response(200, json=body)
+    )))
+    sender = OutboundSender(client=client, limits={"whatsapp": PlatformLimits(1000, 1000)}, max_retries=0)
+    whatsapp = WhatsAppIntegration(api_token="t", outbound=sender, phone_number_id="1", progressive=False)
+
+    try:
+        sent = await whatsapp.send_message("15550001", "hi")
+        typing = await whatsapp.send_typing_indicator("wamid.0")
+    finally:
+        await client.aclose()
+
+    assert sent["status"] == "sent" and sent["message_id"] is None
+    assert typing == {"status": "sent", "success": True}
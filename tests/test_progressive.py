@@ -0,0 +1,221 @@
+"""
+Progressive replies: placeholder edits on Telegram and the fallbacks when sending fails
+"""
+
+import pytest
+
+from core.runtime.bulkhead import BulkheadFull
+from core.runtime.deadline import DeadlineExceeded, current_deadline, deadline_scope
+from integrations.progressive import FAILURE_REPLY, TelegramProgressiveReply, stream_to_telegram
+from integrations.session_store import SessionStore
+from integrations.telegram_integration import FALLBACK_REPLY, TelegramIntegration
+from integrations.web_chat_integration import WebChatIntegration
+
+
+class _Telegram:
+    """Records Bot API calls; ``fail`` names the methods that return an error"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+        self.deadlines = []
+        self._next_id = 100
+
+    async def send_message(self, chat_id, text, parse_mode="Markdown"):
+        self.calls.append(("send", text))
+        if "send" in self.fail:
+            return {"ok": False, "error": "Bad Gateway"}
+        self._next_id += 1
+        return {"ok": True, "result": {"message_id": self._next_id}}
+
+    async def edit_message_text(self, chat_id, message_id, text):
+        self.calls.append(("edit", message_id, text))
+        self.deadlines.append(current_deadline())
+        if "edit" in self.fail:
+            return {"ok": False, "error": "Bad Request"}
+        return {"ok": True, "result": {"message_id": message_id}}
+
+
+async def deltas(*parts):
+    for part in parts:
+        yield part
+
+
+async def test_final_reply_is_sent_when_the_placeholder_fails():
+    telegram = _Telegram(fail={"send"})
+    reply = TelegramProgressiveReply(telegram, "42", edit_interval=0)
+    await reply.start()
+    telegram.fail.clear()
+
+    await reply.update("Hello")
+    await reply.finish("Hello there")
+
+    assert reply.fallback
+    assert telegram.calls == [("send", "…"), ("send", "Hello there")]
+
+
+async def test_final_reply_is_sent_when_the_last_edit_fails():
+    telegram = _Telegram()
+    reply = TelegramProgressiveReply(telegram, "42", edit_interval=0)
+    await reply.start()
+    telegram.fail.add("edit")
+
+    await reply.finish("Hello there")
+
+    assert telegram.calls[-2:] == [("edit", 101, "Hello there"), ("send", "Hello there")]
+
+
+async def test_stream_reports_the_fallback():
+    telegram = _Telegram(fail={"send"})
+
+    delivery = await stream_to_telegram(telegram, "42", deltas("a", "b"), edit_interval=0)
+
+    assert delivery["fallback"]
+    assert delivery["text"] == "ab"
+
+
+async def test_a_failed_partial_edit_is_retried():
+    telegram = _Telegram(fail={"edit"})
+    reply = TelegramProgressiveReply(telegram, "42", edit_interval=0)
+    await reply.start()
+
+    await reply.update("Hello")
+    telegram.fail.clear()
+    await reply.update("Hello")
+    await reply.update("Hello")
+
+    assert telegram.calls[1:] == [("edit", 101, "Hello …"), ("edit", 101, "Hello …")]
+    assert reply.edits == 1
+
+
+async def failing_deltas(error, *parts):
+    for part in parts:
+        yield part
+    raise error
+
+
+@pytest.mark.parametrize("parts, final", [
+    ((), FAILURE_REPLY),
+    (("Partial ", "answer"), "Partial answer\n\n" + FAILURE_REPLY),
+])
+async def test_a_failed_stream_replaces_the_placeholder(parts, final):
+    telegram = _Telegram()
+
+    with deadline_scope(30):
+        with pytest.raises(DeadlineExceeded):
+            await stream_to_telegram(telegram, "42", failing_deltas(DeadlineExceeded("llm"), *parts),
+                                     edit_interval=0)
+
+    assert telegram.calls[-1] == ("edit", 101, final)
+    # The closing edit runs outside the spent request deadline
+    assert telegram.deadlines[-1] is None
+
+
+class _FailingCompletions:
+    def __init__(self, error=None):
+        self.error = error or RuntimeError("upstream 503")
+
+    def create(self, **kwargs):
+        raise self.error
+
+
+class _FailingClient:
+    def __init__(self, error=None):
+        self.chat = type("chat", (), {"completions": _FailingCompletions(error)})()
+
+
+@pytest.mark.parametrize("error", [DeadlineExceeded("llm"), BulkheadFull("interactive")])
+async def test_stream_message_propagates_deadline_and_bulkhead_errors(web_chat, error):
+    web_chat.agent.groq_client = _FailingClient(error)
+    outcome = {}
+
+    with pytest.raises(type(error)):
+        async for _ in web_chat.agent.stream_message("hello", user_id="u1", outcome=outcome):
+            pass
+
+    assert outcome == {"success": False, "error": str(error)}
+
+
+async def test_telegram_progressive_reply_apologises_once_on_deadline():
+    telegram = TelegramIntegration("token", progressive=True)
+    telegram.agent.groq_client = _FailingClient(DeadlineExceeded("llm"))
+    sent = []
+
+    async def send_message(chat_id, text, parse_mode="Markdown"):
+        sent.append(text)
+        return {"ok": True, "result": {"message_id": 7}}
+
+    async def edit_message_text(chat_id, message_id, text):
+        sent.append(("edit", text))
+        return {"ok": True}
+
+    telegram.send_message = send_message
+    telegram.edit_message_text = edit_message_text
+
+    result = await telegram.handle_message({"message": {"chat": {"id": 42}, "text": "hello"}})
+
+    assert result["status"] == "error"
+    assert sent == ["…", ("edit", FALLBACK_REPLY)]
+
+
+@pytest.fixture
+async def web_chat():
+    web_chat = WebChatIntegration(session_store=SessionStore(), speculative=False)
+    yield web_chat
+    await web_chat.sessions.close()
+
+
+async def test_streamed_web_chat_reply_reports_failure(web_chat):
+    web_chat.agent.groq_client = _FailingClient()
+
+    events = [event async for event in web_chat.stream_message("s1", "hello")]
+
+    message = next(event for event in events if event["type"] == "message")
+    assert message["success"] is False
+    assert "technical difficulties" in message["message"]
+
+
+async def test_streamed_web_chat_reply_reports_success(web_chat):
+    events = [event async for event in web_chat.stream_message("s1", "hello")]
+
+    message = next(event for event in events if event["type"] == "message")
+    assert message["success"] is True
+
+
+async def test_placeholder_is_edited_in_place_as_text_streams_in():
+    telegram = _Telegram()
+
+    delivery = await stream_to_telegram(telegram, "42", deltas("Hel", "lo ", "there"), edit_interval=0)
+
+    assert telegram.calls == [
+        ("send", "…"),
+        ("edit", 101, "Hel …"),
+        ("edit", 101, "Hello  …"),
+        ("edit", 101, "Hello there …"),
+        ("edit", 101, "Hello there")
+    ]
+    assert delivery["messages"] == 1 and delivery["edits"] == 4
+
+
+async def test_edits_are_throttled():
+    telegram = _Telegram()
+
+    delivery = await stream_to_telegram(telegram, "42", deltas(*"streaming"), edit_interval=60)
+
+    assert telegram.calls == [("send", "…"), ("edit", 101, "streaming")]
+    assert delivery["edits"] == 1
+
+
+async def test_long_replies_continue_in_a_new_message():
+    telegram = _Telegram()
+    reply = TelegramProgressiveReply(telegram, "42", edit_interval=0)
+    text = "word " * 1000
+    await reply.start()
+
+    await reply.update(text[:3000])
+    await reply.update(text)
+    await reply.finish(text.strip())
+
+    assert reply.message_ids == [101, 102]
+    assert all(len(shown) <= 4096 for shown in reply._shown)
+    assert " ".join(reply._shown).split() == text.split()
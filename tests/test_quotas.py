@@ -0,0 +1,123 @@
+"""
+Per-key quotas and LLM token metering over HTTP, WebSocket and jobs
+"""
+
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import quotas
+from api.auth import caller_id
+from api.quotas import KeyPolicy, QuotaManager, hash_key, load_key_policies
+from api.routes import webchat
+from config.settings import settings
+from core.runtime.jobs import JobManager
+from core.runtime.metering import record_llm_tokens
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(settings, "REQUIRE_API_KEY", True)
+    manager = QuotaManager(policies={
+        hash_key("key-a"): KeyPolicy(name="shared", key_hash=hash_key("key-a"), requests_per_minute=2),
+        hash_key("key-b"): KeyPolicy(name="shared", key_hash=hash_key("key-b"), requests_per_minute=2),
+    })
+    monkeypatch.setattr(quotas, "_manager", manager)
+    return manager
+
+
+def test_policy_without_name_gets_a_label(monkeypatch):
+    monkeypatch.setattr(settings, "API_KEY", None)
+    monkeypatch.setattr(settings, "API_KEYS", {"secret": {"requests_per_minute": 5}})
+
+    policy = load_key_policies()[hash_key("secret")]
+
+    assert policy.name == hash_key("secret")[:12]
+    assert policy.key_hash == hash_key("secret")
+    assert policy.requests_per_minute == 5
+
+
+async def test_keys_sharing_a_name_have_separate_quotas(manager):
+    a = manager.authenticate("key-a")
+    b = manager.authenticate("key-b")
+
+    for _ in range(2):
+        assert (await manager.check_request(a))[0].allowed
+    assert not (await manager.check_request(a))[0].allowed
+    assert (await manager.check_request(b))[0].allowed
+
+    assert (await manager.get_usage(a))["requests"] == 2
+    assert (await manager.get_usage(b))["requests"] == 1
+
+
+class _Sessions:
+    def get(self, session_id):
+        return None
+
+
+class _WebChat:
+    """Answers every message, using 100 LLM tokens"""
+
+    sessions = _Sessions()
+
+    async def start_session(self, session_id):
+        return {"session_id": session_id, "status": "started"}
+
+    async def stream_message(self, session_id, text, user_info=None):
+        record_llm_tokens(100)
+        yield {"type": "message", "text": f"echo {text}"}
+
+
+def test_websocket_messages_take_quota_and_are_metered(manager, monkeypatch):
+    monkeypatch.setattr(webchat, "_web_chat", _WebChat())
+    app = FastAPI()
+    app.include_router(webchat.router)
+    client = TestClient(app)
+
+    with client.websocket_connect("/ws?api_key=key-a") as ws:
+        assert ws.receive_json()["type"] == "session"
+        frames = []
+        for text in ("one", "two", "three"):
+            ws.send_json({"type": "message", "text": text})
+            frames.append(ws.receive_json())
+
+    assert [f["type"] for f in frames] == ["message", "message", "error"]
+    assert frames[2]["error"] == "Request quota exceeded"
+    assert frames[2]["retry_after"] >= 1
+
+    usage = asyncio.run(manager.get_usage(manager.authenticate("key-a")))
+    assert usage["requests"] == 2
+    assert usage["rejected"] == 1
+    assert usage["llm_tokens"] == 200
+
+
+def test_websocket_rejects_unknown_key(manager, monkeypatch):
+    monkeypatch.setattr(webchat, "_web_chat", _WebChat())
+    app = FastAPI()
+    app.include_router(webchat.router)
+
+    with pytest.raises(Exception):
+        with TestClient(app).websocket_connect("/ws?api_key=nope") as ws:
+            ws.receive_json()
+
+
+async def test_jobs_are_metered_against_the_submitter(manager):
+    async def handler(payload, report):
+        record_llm_tokens(250)
+        return "done"
+
+    jobs = JobManager(workers=1, handlers={"test": handler})
+    policy = manager.authenticate("key-b")
+    job = jobs.submit("test", {}, owner=caller_id(policy))
+    try:
+        for _ in range(100):
+            if jobs.get(job.job_id).status.is_terminal:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await jobs.stop()
+
+    assert jobs.get(job.job_id).result == "done"
+    assert (await manager.get_usage(policy))["llm_tokens"] == 250
+    assert (await manager.get_usage(manager.authenticate("key-a")))["llm_tokens"] == 0
@@ -0,0 +1,213 @@
+"""
+Scheduler: cron parsing, misfire policies under a fake clock and persistence across restarts
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from core.runtime.events import EventBus
+from workflows import scheduler as scheduler_module
+from workflows.automation import WorkflowAutomation
+from workflows.persistence import SQLiteWorkflowBackend
+from workflows.scheduler import (
+    CronSchedule, InMemoryScheduleStore, SQLiteScheduleStore, WorkflowScheduler, parse_schedule
+)
+
+
+def utc(*args) -> float:
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def fires(schedule: str, start: float, count: int = 1):
+    parsed = parse_schedule(schedule)
+    due, times = start, []
+    for _ in range(count):
+        due = parsed.next_after(due)
+        times.append(datetime.fromtimestamp(due, timezone.utc).replace(tzinfo=None))
+    return times
+
+
+@pytest.mark.parametrize("schedule, start, expected", [
+    ("*/15 * * * *", utc(2024, 3, 8, 10, 7), [datetime(2024, 3, 8, 10, 15), datetime(2024, 3, 8, 10, 30)]),
+    ("*/15 * * * *", utc(2024, 3, 8, 10, 45), [datetime(2024, 3, 8, 11, 0)]),
+    # Friday 10:00 -> Monday 09:00
+    ("0 9 * * mon-fri", utc(2024, 3, 8, 10, 0), [datetime(2024, 3, 11, 9, 0), datetime(2024, 3, 12, 9, 0)]),
+    # Both day fields restricted: the 13th OR any Friday
+    ("0 0 13 * fri", utc(2024, 3, 1, 0, 0),
+     [datetime(2024, 3, 8), datetime(2024, 3, 13), datetime(2024, 3, 15)]),
+    ("@monthly", utc(2024, 1, 31, 12, 0), [datetime(2024, 2, 1), datetime(2024, 3, 1)]),
+    ("@monthly", utc(2024, 12, 15, 0, 0), [datetime(2025, 1, 1)]),
+    ("0 0 29 2 *", utc(2025, 1, 1), [datetime(2028, 2, 29), datetime(2032, 2, 29)]),
+    ("0 0 * * 7", utc(2024, 3, 8), [datetime(2024, 3, 10), datetime(2024, 3, 17)]),
+    ("0 0 * * 5-7", utc(2024, 3, 7), [datetime(2024, 3, 8), datetime(2024, 3, 9), datetime(2024, 3, 10)]),
+    ("every_15minutes", utc(2024, 3, 8, 10, 7), [datetime(2024, 3, 8, 10, 22)]),
+])
+def test_cron_next_fire_times(schedule, start, expected):
+    assert fires(schedule, start, len(expected)) == expected
+
+
+def test_weekday_seven_is_sunday():
+    assert CronSchedule("0 0 * * 7").weekdays == CronSchedule("0 0 * * sun").weekdays == {0}
+
+
+@pytest.mark.parametrize("schedule", [
+    "61 * * * *", "* * *", "0 0 * * 8", "*/0 * * * *", "5-1 * * * *", "every_5fortnights", "0 0 30 2 *"
+])
+def test_invalid_schedules_are_rejected(schedule):
+    with pytest.raises(ValueError):
+        parse_schedule(schedule).next_after(utc(2024, 1, 1))
+
+
+T0 = utc(2024, 3, 8, 10, 0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=T0)
+    monkeypatch.setattr(scheduler_module, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+async def make_scheduler():
+    schedulers = []
+
+    def make(store=None, **kwargs):
+        calls = []
+
+        async def callback(entry):
+            calls.append((entry.schedule_id, entry.last_run))
+
+        scheduler = WorkflowScheduler(store or InMemoryScheduleStore(), callback=callback,
+                                      misfire_grace=5, **kwargs)
+        scheduler.calls = calls
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        await scheduler.stop()
+
+
+async def advance(scheduler, clock, seconds: float):
+    """Move the fake clock and let the loop and its dispatches run"""
+    clock.now += seconds
+    scheduler._wakeup.set()
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+async def test_on_time_runs_fire_once_and_stay_on_the_grid(make_scheduler, clock):
+    scheduler = make_scheduler()
+    entry = scheduler.add("s", "every_1minutes", misfire_policy="skip")
+    assert entry.next_run == T0 + 60
+
+    await advance(scheduler, clock, 61)
+    await advance(scheduler, clock, 60)
+
+    assert [schedule_id for schedule_id, _ in scheduler.calls] == ["s", "s"]
+    assert scheduler.get("s").next_run == T0 + 180
+    assert scheduler.get_stats()["skipped"] == 0
+
+
+@pytest.mark.parametrize("policy, runs", [("skip", 0), ("run_once", 1), ("catch_up", 6)])
+async def test_misfire_policies(make_scheduler, clock, policy, runs):
+    scheduler = make_scheduler()
+    scheduler.add("s", "every_1minutes", misfire_policy=policy)
+
+    # Due at T0+60; the loop only gets to it five minutes later (six nominal runs)
+    await advance(scheduler, clock, 360)
+
+    assert len(scheduler.calls) == runs
+    assert scheduler.get("s").next_run == T0 + 420
+    stats = scheduler.get_stats()
+    assert stats["skipped"] == (1 if policy == "skip" else 0)
+    assert stats["caught_up"] == (5 if policy == "catch_up" else 0)
+    assert stats["lag_ms"]["last"] == 300000
+
+
+async def test_catch_up_is_capped(make_scheduler, clock):
+    scheduler = make_scheduler(max_catch_up=3)
+    scheduler.add("s", "every_1minutes", misfire_policy="catch_up")
+
+    await advance(scheduler, clock, 3600)
+
+    assert len(scheduler.calls) == 3
+    assert scheduler.get("s").next_run == T0 + 3660
+
+
+async def test_unknown_misfire_policy_is_rejected(make_scheduler):
+    with pytest.raises(ValueError, match="misfire policy"):
+        make_scheduler().add("s", "@daily", misfire_policy="sometimes")
+
+
+async def test_schedules_survive_a_restart(make_scheduler, clock, tmp_path):
+    path = str(tmp_path / "schedules.db")
+    first = make_scheduler(SQLiteScheduleStore(path))
+    first.add("daily", "0 9 * * mon-fri", payload={"workflow": "report"}, misfire_policy="run_once")
+    first.add("minutely", "every_1minutes", misfire_policy="skip")
+    first.add_once("wake", T0 + 30)
+    await advance(first, clock, 61)
+    assert sorted(schedule_id for schedule_id, _ in first.calls) == ["minutely", "wake"]
+    await first.stop()
+
+    # Down for an hour: the loop's last saved state is what the next process sees
+    clock.now += 3600
+    second = make_scheduler(SQLiteScheduleStore(path))
+    restored = {entry.schedule_id: entry for entry in second.load()}
+
+    assert set(restored) == {"daily", "minutely"}
+    assert restored["daily"].payload == {"workflow": "report"}
+    assert restored["daily"].next_run == utc(2024, 3, 11, 9, 0)
+    assert restored["minutely"].next_run == T0 + 120
+    assert restored["minutely"].last_run == T0 + 61
+
+    second.start()
+    await advance(second, clock, 0)
+
+    # Missed an hour of runs and skips them, staying on its grid
+    assert second.calls == []
+    assert second.get("minutely").next_run == T0 + 3720
+    await second.stop()
+
+    third = make_scheduler(SQLiteScheduleStore(path))
+    assert {entry.schedule_id: entry.next_run for entry in third.load()}["minutely"] == T0 + 3720
+
+
+async def test_invalid_persisted_schedules_are_dropped_on_load(make_scheduler, tmp_path):
+    path = str(tmp_path / "schedules.db")
+    store = SQLiteScheduleStore(path)
+    store.save(scheduler_module.ScheduleEntry(schedule_id="bad", schedule="0 0 * * 9", next_run=T0))
+
+    scheduler = make_scheduler(store)
+
+    assert scheduler.load() == []
+    assert store.load_all() == []
+
+
+async def test_scheduled_workflows_are_restored_by_a_new_engine(tmp_path):
+    path = str(tmp_path / "workflows.db")
+    engine = WorkflowAutomation(None, schedule_store=SQLiteScheduleStore(path),
+                                backend=SQLiteWorkflowBackend(path), event_bus=EventBus())
+    engine.start()
+    workflow_id = await engine.create_workflow(
+        "nightly", [{"id": "nap", "type": "wait", "parameters": {"seconds": 0}}],
+        trigger_type="scheduled", schedule="@daily"
+    )
+    next_run = engine.scheduler.get(workflow_id).next_run
+    await engine.events.stop()
+    await engine.close()
+
+    restarted = WorkflowAutomation(None, schedule_store=SQLiteScheduleStore(path),
+                                   backend=SQLiteWorkflowBackend(path), event_bus=EventBus())
+    restarted.start()
+    try:
+        assert workflow_id in restarted.store
+        assert restarted.scheduler.get(workflow_id).next_run == next_run
+        assert restarted.scheduler.get_stats()["running"]
+    finally:
+        await restarted.events.stop()
+        await restarted.close()
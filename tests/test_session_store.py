@@ -0,0 +1,150 @@
+"""
+Web chat sessions: idle expiry, the LRU cap, evict callbacks and SQLite persistence
+"""
+
+import asyncio
+from types import SimpleNamespace
+import pytest
+
+from integrations import session_store
+from integrations.session_store import SessionStore, SQLiteSessionBackend
+from integrations.web_chat_integration import WebChatIntegration
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Drives both the wall and monotonic clocks of the session store"""
+    clock = SimpleNamespace(wall=1700000000.0, mono=5000.0)
+
+    def advance(seconds):
+        clock.wall += seconds
+        clock.mono += seconds
+
+    clock.advance = advance
+    monkeypatch.setattr(session_store, "time", SimpleNamespace(time=lambda: clock.wall,
+                                                               monotonic=lambda: clock.mono))
+    return clock
+
+
+def evictions(store):
+    dropped = []
+    store.on_evict(lambda session_id, reason: dropped.append((session_id, reason)))
+    return dropped
+
+
+def test_idle_sessions_expire_on_access_and_on_sweep(clock):
+    store = SessionStore(idle_ttl=60)
+    dropped = evictions(store)
+    for session_id in ("a", "b", "c"):
+        store.create(session_id)
+        clock.advance(10)
+
+    store.touch(store.get("a"))
+    clock.advance(35)
+
+    # b was last active 55s ago, c 45s ago, a 35s ago: nothing has expired yet
+    assert store.sweep() == 0
+    clock.advance(20)
+    assert store.get("b") is None
+    assert dropped == [("b", "expired")]
+    # The sweep stops at the first live session (a, touched after c)
+    assert store.sweep() == 1
+    assert dropped[-1] == ("c", "expired")
+    assert "a" in store and len(store) == 1
+    assert store.get_stats()["expired"] == 2
+
+
+def test_touch_keeps_a_session_alive(clock):
+    store = SessionStore(idle_ttl=60)
+    record = store.create("a")
+
+    for _ in range(5):
+        clock.advance(50)
+        store.touch(record)
+
+    assert store.get("a") is record
+    assert store.sweep() == 0
+
+
+def test_max_sessions_evicts_the_least_recently_active(clock):
+    store = SessionStore(idle_ttl=600, max_sessions=3)
+    dropped = evictions(store)
+    for session_id in ("a", "b", "c"):
+        store.create(session_id)
+        clock.advance(1)
+
+    store.touch(store.get("a"))
+    store.create("d")
+    store.create("e")
+
+    assert dropped == [("b", "evicted"), ("c", "evicted")]
+    assert sorted(store._sessions) == ["a", "d", "e"]
+    assert store.get_stats()["evicted"] == 2
+
+
+def test_a_failing_callback_does_not_stop_the_others(clock):
+    store = SessionStore()
+    store.on_evict(lambda session_id, reason: 1 / 0)
+    dropped = evictions(store)
+    store.create("a")
+
+    assert store.remove("a") is not None
+    assert store.remove("a") is None
+    assert dropped == [("a", "ended")]
+
+
+def test_sqlite_backend_round_trip(clock, tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SessionStore(idle_ttl=600, backend=SQLiteSessionBackend(path))
+    kept = store.create("kept", {"name": "Ana", "email": "ana@example.com"})
+    kept.message_count = 4
+    store.touch(kept)
+    store.create("stale")
+    store.create("ended")
+    store.remove("ended")
+    clock.advance(300)
+    store.touch(kept)
+    asyncio.run(store.close())
+
+    # Restarted 400s later: "stale" has now been idle 700s, past the TTL
+    clock.advance(400)
+    restored = SessionStore(idle_ttl=600, backend=SQLiteSessionBackend(path))
+
+    assert len(restored) == 1
+    record = restored.get("kept")
+    assert record.user_info == {"name": "Ana", "email": "ana@example.com"}
+    assert record.message_count == 4
+    assert record.idle_seconds() == pytest.approx(400)
+    assert record.to_dict()["start_time"] == "2023-11-14T22:13:20Z"
+    # The expired row is deleted on the next flush
+    restored.flush()
+    assert [row["session_id"] for row in restored.backend.load_all()] == ["kept"]
+    restored.backend.close()
+
+
+@pytest.fixture
+async def web_chat(monkeypatch):
+    web_chat = WebChatIntegration(session_store=SessionStore(idle_ttl=60, max_sessions=1), speculative=True)
+    monkeypatch.setattr(web_chat.agent, "conversation_memory", {})
+    yield web_chat
+    await web_chat.sessions.close()
+
+
+async def test_dropped_sessions_clear_agent_memory_and_speculation(web_chat):
+    async def generate():
+        await asyncio.sleep(10)
+
+    for session_id in ("s1", "s2"):
+        web_chat.agent.conversation_memory[session_id] = [{"role": "user", "content": "hi"}]
+        web_chat.speculative.schedule(session_id, "Contact Sales", generate)
+        if session_id == "s1":
+            web_chat.sessions.create(session_id)
+
+    # s2 takes the only slot: s1 is evicted
+    web_chat.sessions.create("s2")
+    assert "s1" not in web_chat.agent.conversation_memory
+    assert "s1" not in web_chat.speculative._sessions
+
+    web_chat.sessions.remove("s2")
+    assert web_chat.agent.conversation_memory == {}
+    assert web_chat.speculative._sessions == {}
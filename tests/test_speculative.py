@@ -0,0 +1,65 @@
+"""
+Speculative replies: generation yields to live turns and served replies land in memory correctly
+"""
+
+import asyncio
+import pytest
+
+from integrations.session_store import SessionStore
+from integrations.speculative import SpeculativeCache
+from integrations.web_chat_integration import WebChatIntegration
+
+
+class _Reply:
+    success = True
+
+    def __init__(self, response):
+        self.response = response
+
+
+async def test_generation_waits_for_foreground_work_and_starts_when_it_ends():
+    cache = SpeculativeCache(ttl=30)
+    started = asyncio.Event()
+
+    async def generate():
+        started.set()
+        return _Reply("pre-generated")
+
+    with cache.foreground():
+        cache.schedule("s1", "Contact Sales", generate)
+        await asyncio.sleep(0.1)
+        assert not started.is_set()
+
+    await asyncio.wait_for(started.wait(), 0.1)
+
+
+async def test_taking_a_pending_reply_from_a_live_turn_does_not_wait_for_the_ttl():
+    cache = SpeculativeCache(ttl=30)
+
+    async def generate():
+        return _Reply("pre-generated")
+
+    with cache.foreground():
+        cache.schedule("s1", "Contact Sales", generate, aliases=["contact_sales"])
+        prompt, reply = await asyncio.wait_for(cache.take("s1", "contact_sales"), 1.0)
+
+    assert prompt == "Contact Sales"
+    assert reply.response == "pre-generated"
+
+
+@pytest.fixture
+async def web_chat(monkeypatch):
+    web_chat = WebChatIntegration(session_store=SessionStore(), speculative=True)
+    monkeypatch.setattr(web_chat.agent, "conversation_memory", {})
+    yield web_chat
+    await web_chat.sessions.close()
+
+
+async def test_speculative_action_reply_records_the_prompt(web_chat):
+    await web_chat.handle_message("s1", "hello")
+
+    result = await web_chat.handle_action("s1", "contact_sales")
+
+    assert result["result"]["speculative"]
+    turns = web_chat.agent.conversation_memory["s1"]
+    assert [turn["content"] for turn in turns[-2:]] == ["Contact Sales", result["result"]["message"]]
@@ -0,0 +1,117 @@
+"""
+Memoized steps: hits, misses, TTL expiry and results that later runs cannot change
+"""
+
+from types import SimpleNamespace
+import pytest
+
+from core.engine.core_agent import AgentResponse
+from workflows import memo
+from workflows.automation import WorkflowAutomation
+from workflows.memo import InMemoryStepCache, SQLiteStepCache, step_cache_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1700000000.0)
+    monkeypatch.setattr(memo, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path):
+    cache = InMemoryStepCache(100) if request.param == "memory" else SQLiteStepCache(str(tmp_path / "cache.db"), 100)
+    yield cache
+    cache.close()
+
+
+def test_hit_miss_and_ttl(cache, clock):
+    key = step_cache_key("agent_task", {"task": "summarize"}, "1")
+
+    assert cache.get(key) is None
+    cache.put(key, {"response": "summary"}, ttl=60, tokens=120)
+    clock.now += 59
+    cached = cache.get(key)
+    clock.now += 1
+    assert cache.get(key) is None
+
+    assert cached.result == {"response": "summary"} and cached.tokens == 120
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["stores"], stats["tokens_saved"]) == (1, 2, 1, 120)
+    assert stats["hit_rate"] == pytest.approx(1 / 3, abs=0.001)
+
+
+def test_keys_depend_on_inputs_and_prompt_version():
+    base = step_cache_key("agent_task", {"task": "a", "context": {"x": 1, "y": 2}}, "1")
+
+    assert base == step_cache_key("agent_task", {"context": {"y": 2, "x": 1}, "task": "a"}, "1")
+    assert base != step_cache_key("agent_task", {"task": "a", "context": {"x": 1, "y": 3}}, "1")
+    assert base != step_cache_key("agent_task", {"task": "a", "context": {"x": 1, "y": 2}}, "2")
+
+
+def test_cached_results_are_isolated_from_callers(cache):
+    result = {"response": "summary", "actions_taken": ["lookup"]}
+    cache.put("k", result, ttl=60)
+    result["actions_taken"].append("changed after storing")
+
+    first = cache.get("k")
+    first.result["actions_taken"].append("changed by a reader")
+
+    assert cache.get("k").result == {"response": "summary", "actions_taken": ["lookup"]}
+
+
+class _Agent:
+    def __init__(self):
+        self.calls = 0
+
+    async def process_message(self, message, user_id, context):
+        self.calls += 1
+        return AgentResponse(agent_type="core", response=f"answer {self.calls}", actions_taken=["lookup"],
+                             metadata={}, success=True)
+
+
+@pytest.fixture
+async def engine():
+    engine = WorkflowAutomation(_Agent(), step_cache=InMemoryStepCache(100))
+    yield engine
+    await engine.close()
+
+
+async def run_step(engine, task="summarize", cache_ttl=300):
+    steps = [{"id": "ask", "type": "agent_task", "parameters": {"task": task, "cache_ttl": cache_ttl}}]
+    workflow_id = await engine.create_workflow("memo", steps)
+    await engine.execute_workflow(workflow_id)
+    return engine.store.get(workflow_id).steps[0]
+
+
+async def test_repeated_steps_reuse_the_cached_result(engine):
+    first = await run_step(engine)
+    second = await run_step(engine)
+    other = await run_step(engine, task="translate")
+
+    assert engine.ai_agent.calls == 2
+    assert first.metadata["cache"]["hit"] is False and first.metadata["cache"]["stored"] is True
+    assert second.metadata["cache"]["hit"] is True
+    assert second.result["response"] == "answer 1"
+    assert other.result["response"] == "answer 2"
+
+
+async def test_a_hit_cannot_change_the_cached_result(engine):
+    first = await run_step(engine)
+    first.result["actions_taken"].append("edited by the first run")
+    second = await run_step(engine)
+    second.result["response"] = "edited by the second run"
+
+    third = await run_step(engine)
+
+    assert engine.ai_agent.calls == 1
+    assert third.result["response"] == "answer 1"
+    assert third.result["actions_taken"] == ["lookup"]
+
+
+async def test_steps_without_a_ttl_are_not_cached(engine):
+    await run_step(engine, cache_ttl=0)
+    await run_step(engine, cache_ttl=0)
+
+    assert engine.ai_agent.calls == 2
+    assert engine.step_cache.get_stats()["stores"] == 0
@@ -0,0 +1,117 @@
+"""
+Telegram long polling: offsets survive restarts, chats run concurrently, one chat stays in order
+"""
+
+import asyncio
+import json
+import httpx
+import pytest
+
+from integrations.telegram_polling import OffsetStore, TelegramPoller
+
+
+def update(update_id, chat_id, text):
+    return {"update_id": update_id, "message": {"chat": {"id": chat_id}, "text": text}}
+
+
+class _BotApi:
+    """getUpdates stub: serves queued batches and records the requested offsets"""
+
+    def __init__(self, *batches):
+        self.batches = list(batches)
+        self.offsets = []
+
+    def __call__(self, request):
+        params = json.loads(request.content)
+        self.offsets.append(params.get("offset"))
+        if not self.batches:
+            return httpx.Response(200, json={"ok": True, "result": []})
+        batch = self.batches.pop(0)
+        if isinstance(batch, int):
+            return httpx.Response(batch, json={"ok": False, "description": "Bad Gateway"})
+        return httpx.Response(200, json={"ok": True, "result": batch})
+
+
+class _Integration:
+    base_url = "https://api.telegram.test/bot123"
+
+    def __init__(self):
+        self.handled = []
+        self.active = 0
+        self.peak = 0
+
+    async def handle_update(self, update):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.02)
+        self.active -= 1
+        text = update["message"]["text"]
+        self.handled.append((update["message"]["chat"]["id"], text))
+        if text == "boom":
+            raise RuntimeError("handler crashed")
+        return {"status": "processed"}
+
+
+@pytest.fixture
+async def make_poller(tmp_path):
+    pollers = []
+
+    def make(api, integration=None, max_concurrency=4):
+        poller = TelegramPoller(
+            integration or _Integration(), OffsetStore(str(tmp_path / "offset.json")),
+            batch_size=100, poll_timeout=0, max_concurrency=max_concurrency,
+            client=httpx.AsyncClient(transport=httpx.MockTransport(api))
+        )
+        pollers.append(poller)
+        return poller
+
+    yield make
+    for poller in pollers:
+        await poller.client.aclose()
+
+
+async def test_offset_is_advanced_and_survives_a_restart(make_poller):
+    api = _BotApi([update(10, 1, "a"), update(11, 2, "b")])
+    poller = make_poller(api)
+
+    assert await poller.poll_once() == 2
+    assert poller.offset == 12
+
+    restarted = make_poller(api)
+    assert restarted.offset == 12
+    assert await restarted.poll_once() == 0
+    assert api.offsets == [None, 12]
+
+
+async def test_chats_run_concurrently_and_each_chat_in_order(make_poller):
+    updates = [update(i, i % 3, f"{i % 3}:{i}") for i in range(12)]
+    integration = _Integration()
+    poller = make_poller(_BotApi(updates), integration)
+
+    await poller.poll_once()
+
+    assert integration.peak == 3
+    for chat in range(3):
+        texts = [text for chat_id, text in integration.handled if chat_id == chat]
+        assert texts == [f"{chat}:{i}" for i in range(chat, 12, 3)]
+
+
+async def test_failed_updates_are_counted_and_do_not_block_the_batch(make_poller):
+    poller = make_poller(_BotApi([update(1, 1, "boom"), update(2, 1, "after")]))
+
+    await poller.poll_once()
+
+    assert poller.get_stats()["failed_updates"] == 1
+    assert poller.integration.handled == [(1, "boom"), (1, "after")]
+    assert poller.offset == 3
+
+
+async def test_a_failed_fetch_keeps_the_offset(make_poller):
+    poller = make_poller(_BotApi([update(5, 1, "a")], 502))
+    await poller.poll_once()
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await poller.poll_once()
+
+    assert poller.offset == 6
+    assert OffsetStore(poller.offset_store.path).load() == 6
@@ -0,0 +1,140 @@
+"""
+Web chat WebSocket: malformed frames, back-pressure and many concurrent sockets
+"""
+
+import asyncio
+import pytest
+from fastapi import FastAPI, WebSocketDisconnect
+from fastapi.testclient import TestClient
+
+from api.routes import webchat
+from api.routes.webchat import WebChatConnection
+from config.settings import settings
+
+
+class _Sessions:
+    def get(self, session_id):
+        return None
+
+
+class _WebChat:
+    """Streams ``deltas`` small frames per message, as fast as they are accepted"""
+
+    sessions = _Sessions()
+
+    def __init__(self, deltas=3):
+        self.deltas = deltas
+        self.produced = 0
+
+    async def start_session(self, session_id):
+        return {"session_id": session_id, "status": "started"}
+
+    async def stream_message(self, session_id, text, user_info=None):
+        for i in range(self.deltas):
+            self.produced += 1
+            yield {"type": "delta", "text": f"{text}-{i}"}
+        self.produced += 1
+        yield {"type": "message", "text": text}
+
+
+class _Socket:
+    """In-memory WebSocket; ``send_delay`` simulates a slow browser"""
+
+    def __init__(self, send_delay=0.0, on_send=None):
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.sent = []
+        self.closed = None
+        self.send_delay = send_delay
+        self.on_send = on_send
+
+    async def receive_json(self):
+        frame = await self.incoming.get()
+        if frame is None:
+            raise WebSocketDisconnect(1000)
+        return frame
+
+    async def send_json(self, frame):
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        self.sent.append(frame)
+        if self.on_send is not None:
+            self.on_send(frame)
+
+    async def close(self, code=1000):
+        self.closed = code
+
+
+async def wait_until(condition, timeout=5.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not met in time")
+
+
+def test_malformed_frames_get_an_error_and_the_socket_stays_open(monkeypatch):
+    monkeypatch.setattr(settings, "REQUIRE_API_KEY", False)
+    monkeypatch.setattr(webchat, "_web_chat", _WebChat())
+    app = FastAPI()
+    app.include_router(webchat.router)
+
+    with TestClient(app).websocket_connect("/ws") as ws:
+        assert ws.receive_json()["type"] == "session"
+        ws.send_text("not json")
+        assert ws.receive_json() == {"type": "error", "error": "Frames must be JSON objects"}
+        ws.send_text("[1, 2]")
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json() == {"type": "pong"}
+
+
+async def test_slow_client_throttles_the_stream(monkeypatch):
+    monkeypatch.setattr(settings, "WEBCHAT_WS_SEND_QUEUE_SIZE", 8)
+    chat = _WebChat(deltas=200)
+    monkeypatch.setattr(webchat, "_web_chat", chat)
+    ahead = []
+    socket = _Socket(send_delay=0.001, on_send=lambda frame: ahead.append(chat.produced - len(socket.sent)))
+    connection = WebChatConnection(socket, "s1")
+
+    task = asyncio.ensure_future(connection.run())
+    await socket.incoming.put({"type": "message", "text": "hi"})
+    await wait_until(lambda: any(frame.get("type") == "message" for frame in socket.sent))
+    await socket.incoming.put(None)
+    await task
+
+    assert len(socket.sent) == 1 + 201
+    # The stream never ran further ahead of the browser than the send queue (+ the frame in hand)
+    assert max(ahead) <= 8 + 2
+
+
+async def test_client_that_stops_reading_is_disconnected(monkeypatch):
+    monkeypatch.setattr(settings, "WEBCHAT_WS_SEND_TIMEOUT", 0.1)
+    monkeypatch.setattr(webchat, "_web_chat", _WebChat())
+    socket = _Socket(send_delay=60)
+
+    await asyncio.wait_for(WebChatConnection(socket, "s2").run(), 2.0)
+
+    assert socket.closed == 1013
+    assert socket not in {conn.websocket for conn in WebChatConnection.active}
+
+
+async def test_many_concurrent_sockets(monkeypatch):
+    monkeypatch.setattr(settings, "WEBCHAT_WS_SEND_QUEUE_SIZE", 4)
+    monkeypatch.setattr(webchat, "_web_chat", _WebChat(deltas=20))
+    sockets = [_Socket(send_delay=0.0005) for _ in range(200)]
+    tasks = [asyncio.ensure_future(WebChatConnection(socket, f"load-{i}").run()) for i, socket in enumerate(sockets)]
+
+    for socket in sockets:
+        for n in range(3):
+            await socket.incoming.put({"type": "message", "text": f"m{n}"})
+    await wait_until(lambda: all(
+        sum(frame.get("type") == "message" for frame in socket.sent) == 3 for socket in sockets
+    ), timeout=20.0)
+    assert WebChatConnection.get_stats()["active_connections"] >= 200
+
+    for socket in sockets:
+        await socket.incoming.put(None)
+    await asyncio.gather(*tasks)
+
+    assert all(len(socket.sent) == 1 + 3 * 21 for socket in sockets)
+    assert not [conn for conn in WebChatConnection.active if conn.session_id.startswith("load-")]
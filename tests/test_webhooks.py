@@ -0,0 +1,97 @@
+"""
+Webhook processing runs detached from the request deadline
+"""
+
+import asyncio
+
+from api.routes import webhooks
+from config.settings import settings
+from core.runtime.deadline import DeadlineExceeded, current_deadline, deadline_scope, within_deadline
+from integrations import telegram_integration, whatsapp_integration
+from integrations.telegram_integration import TelegramIntegration
+from integrations.whatsapp_integration import WhatsAppIntegration
+
+
+async def test_background_processing_gets_its_own_budget(monkeypatch):
+    monkeypatch.setattr(settings, "WEBHOOK_PROCESSING_TIMEOUT", 30.0)
+    seen = {}
+
+    async def handler(payload):
+        seen["remaining"] = current_deadline().remaining()
+        await within_deadline("llm", asyncio.sleep(0.05))
+        seen["done"] = payload
+
+    with deadline_scope(0.01):
+        await asyncio.sleep(0.02)
+        await webhooks._process_in_background(handler, {"update_id": 1})
+
+    assert seen["remaining"] > 25
+    assert seen["done"] == {"update_id": 1}
+
+
+async def test_whatsapp_sends_fallback_when_deadline_runs_out():
+    integration = WhatsAppIntegration(api_token="", progressive=False)
+    sent = []
+
+    async def process_message(**kwargs):
+        raise DeadlineExceeded("llm")
+
+    async def send_message(phone_number, message, message_type="text"):
+        # The apology must not be cut short by the spent deadline
+        assert current_deadline() is None
+        sent.append((phone_number, message))
+        return {"status": "sent"}
+
+    integration.agent.process_message = process_message
+    integration.send_message = send_message
+
+    with deadline_scope(0.01):
+        result = await integration._process_message({"from": "15550001", "id": "wamid.1", "text": {"body": "hi"}})
+
+    assert result["status"] == "error"
+    assert "llm" in result["error"]
+    assert sent == [("15550001", whatsapp_integration.FALLBACK_REPLY)]
+
+
+async def test_telegram_sends_fallback_when_deadline_runs_out():
+    integration = TelegramIntegration("", progressive=False)
+    sent = []
+
+    async def process_message(**kwargs):
+        raise DeadlineExceeded("llm")
+
+    async def send_message(chat_id, text, parse_mode="Markdown"):
+        sent.append((chat_id, text))
+        return {"ok": True}
+
+    integration.agent.process_message = process_message
+    integration.send_message = send_message
+
+    result = await integration.handle_message({"message": {"chat": {"id": 42}, "from": {}, "text": "hi", "message_id": 7}})
+
+    assert result["status"] == "error"
+    assert sent == [("42", telegram_integration.FALLBACK_REPLY)]
+
+
+async def test_whatsapp_single_message_webhook_answers_on_deadline():
+    integration = WhatsAppIntegration(api_token="", progressive=False)
+    sent = []
+
+    async def process_message(**kwargs):
+        raise DeadlineExceeded("llm")
+
+    async def send_message(phone_number, message, message_type="text"):
+        sent.append((phone_number, message))
+        return {"status": "sent"}
+
+    integration.agent.process_message = process_message
+    integration.send_message = send_message
+    webhook = {"entry": [{"changes": [{"value": {"messages": [
+        {"from": "15550001", "id": "wamid.1", "text": {"body": "hi"}}
+    ]}}]}]}
+
+    result = await integration.handle_incoming_message(webhook)
+
+    assert result["status"] == "error"
+    assert result["phone_number"] == "15550001"
+    assert sent == [("15550001", whatsapp_integration.FALLBACK_REPLY)]
@@ -0,0 +1,91 @@
+"""
+WhatsApp webhook batches: every message handled, per-sender order kept, senders run concurrently
+"""
+
+import asyncio
+import pytest
+
+from core.engine.core_agent import AgentResponse
+from integrations.whatsapp_integration import WhatsAppIntegration
+
+
+def webhook(*messages, per_change=2):
+    """Spread (sender, text) messages over several entries/changes like Meta does"""
+    changes = []
+    for start in range(0, len(messages), per_change):
+        changes.append({"value": {"messages": [
+            {"from": sender, "id": f"wamid.{start + i}", "type": "text", "text": {"body": text}}
+            for i, (sender, text) in enumerate(messages[start:start + per_change])
+        ]}})
+    return {"entry": [{"changes": changes[:1]}, {"changes": changes[1:]}]}
+
+
+@pytest.fixture
+def integration():
+    integration = WhatsAppIntegration(api_token="", max_concurrent_senders=3, progressive=False)
+    integration.order = []
+    integration.active = 0
+    integration.peak = 0
+    integration.sent = []
+
+    async def process_message(message, user_id, context):
+        integration.active += 1
+        integration.peak = max(integration.peak, integration.active)
+        integration.order.append((user_id, message))
+        await asyncio.sleep(0.05)
+        integration.active -= 1
+        if message == "boom":
+            raise RuntimeError("agent crashed")
+        return AgentResponse(agent_type="core", response=f"re: {message}", actions_taken=[],
+                             metadata={}, success=True)
+
+    async def send_message(phone_number, message, message_type="text"):
+        integration.sent.append((phone_number, message))
+        return {"status": "sent"}
+
+    integration.agent.process_message = process_message
+    integration.send_message = send_message
+    return integration
+
+
+async def test_all_messages_are_processed_in_payload_order(integration):
+    payload = webhook(("a", "a1"), ("b", "b1"), ("a", "a2"), ("c", "c1"), ("b", "b2"), ("a", "a3"))
+
+    result = await integration.handle_webhook_batch(payload)
+
+    assert result["status"] == "processed"
+    assert result["message_count"] == 6 and result["sender_count"] == 3
+    assert [r["agent_response"] for r in result["results"]] == ["re: a1", "re: b1", "re: a2", "re: c1", "re: b2", "re: a3"]
+    for sender in "abc":
+        seen = [text for user, text in integration.order if user == sender]
+        assert seen == sorted(seen)
+
+
+async def test_senders_run_concurrently_up_to_the_limit(integration):
+    payload = webhook(*[(f"sender-{i}", f"m{i}") for i in range(9)])
+
+    started = asyncio.get_running_loop().time()
+    await integration.handle_webhook_batch(payload)
+    elapsed = asyncio.get_running_loop().time() - started
+
+    assert integration.peak == 3
+    assert elapsed < 9 * 0.05 / 2
+
+
+async def test_one_senders_messages_never_overlap(integration):
+    payload = webhook(*[("same", f"m{i}") for i in range(4)])
+
+    await integration.handle_webhook_batch(payload)
+
+    assert integration.peak == 1
+    assert [text for _, text in integration.order] == ["m0", "m1", "m2", "m3"]
+
+
+async def test_a_failing_message_does_not_stop_the_batch(integration):
+    payload = webhook(("a", "boom"), ("a", "after"), ("b", "b1"))
+
+    result = await integration.handle_webhook_batch(payload)
+
+    assert result["failed"] == 1
+    assert [r["status"] for r in result["results"]] == ["error", "processed", "processed"]
+    assert ("a", "re: after") in integration.sent
@@ -0,0 +1,42 @@
+"""
+State-changing workflow routes require an API key
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import quotas
+from api.quotas import KeyPolicy, QuotaManager, hash_key
+from api.routes import workflows
+from config.settings import settings
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "REQUIRE_API_KEY", True)
+    monkeypatch.setattr(quotas, "_manager", QuotaManager(policies={
+        hash_key("valid"): KeyPolicy(name="test", key_hash=hash_key("valid"))
+    }))
+    app = FastAPI()
+    app.include_router(workflows.router)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path", [
+    "/workflows/create",
+    "/workflows/wf-1/execute",
+    "/workflows/wf-1/execute?async=true",
+    "/workflows/wf-1/pause",
+    "/workflows/wf-1/resume",
+    "/workflows/wf-1/resume?async=true",
+])
+def test_requires_api_key(client, path):
+    assert client.post(path, json={}).status_code == 401
+    assert client.post(path, json={}, headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+
+@pytest.mark.parametrize("path", ["/workflows/missing/execute", "/workflows/missing/pause", "/workflows/missing/resume"])
+def test_valid_key_reaches_the_route(client, path):
+    response = client.post(path, json={}, headers={"Authorization": "Bearer valid"})
+    assert response.status_code == 404
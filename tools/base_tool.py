@@ -7,6 +7,8 @@ from typing import Any, Dict, Optional, List
 from pydantic import BaseModel, Field
 import structlog
 
+from core.runtime.deadline import DeadlineExceeded, within_deadline
+
 logger = structlog.get_logger(__name__)
 
 
@@ -99,12 +101,18 @@ class BaseTool(ABC):
                     metadata={"tool": self.name}
                 )
             
-            # Execute tool
-            result = await self.execute(**kwargs)
+            # Execute tool within whatever is left of the request deadline
+            result = await within_deadline("tool", self.execute(**kwargs))
             
             self.logger.info(f"Tool {self.name} executed successfully")
             return result
             
+        except DeadlineExceeded as e:
+            return ToolResult(
+                success=False,
+                error=str(e),
+                metadata={"tool": self.name, "deadline_exceeded": True}
+            )
         except Exception as e:
             self.logger.error(f"Tool {self.name} execution failed: {str(e)}")
             return ToolResult(
@@ -0,0 +1,107 @@
+"""
+CRM record operations without any agent framework dependency
+
+The langchain tools in ``crm_tools`` wrap these functions; workflows call
+them directly.
+"""
+
+import uuid
+from typing import Dict, List, Any
+from pydantic import BaseModel, Field
+import structlog
+
+from core.runtime.events import RECORD_CREATED, RECORD_UPDATED, publish_event
+
+logger = structlog.get_logger(__name__)
+
+# Mock data for demonstration - replace with actual CRM API calls
+MOCK_CRM_DATA: Dict[str, List[Dict[str, Any]]] = {
+    "leads": [
+        {"id": "lead_001", "name": "John Doe", "status": "new", "score": 85},
+        {"id": "lead_002", "name": "Jane Smith", "status": "qualified", "score": 92}
+    ],
+    "deals": [
+        {"id": "deal_001", "name": "Enterprise Deal", "value": 50000, "stage": "proposal"},
+        {"id": "deal_002", "name": "SMB Deal", "value": 15000, "stage": "negotiation"}
+    ],
+    "contacts": [
+        {"id": "contact_001", "name": "John Doe", "company": "Acme Corp", "role": "Manager"},
+        {"id": "contact_002", "name": "Jane Smith", "company": "Tech Inc", "role": "Director"}
+    ]
+}
+
+
+class CRMQueryInput(BaseModel):
+    """Input schema for CRM queries"""
+    query_type: str = Field(description="Type of CRM query (leads, deals, contacts, etc.)")
+    filters: Dict[str, Any] = Field(default={}, description="Filters to apply to the query")
+    limit: int = Field(default=10, description="Maximum number of results to return")
+
+
+class CRMUpdateInput(BaseModel):
+    """Input schema for CRM updates"""
+    record_type: str = Field(description="Type of record to update (lead, deal, contact)")
+    record_id: str = Field(description="ID of the record to update")
+    updates: Dict[str, Any] = Field(description="Fields to update")
+
+
+class CRMCreateRecordInput(BaseModel):
+    """Input schema for creating CRM records"""
+    record_type: str = Field(description="Type of record to create")
+    data: Dict[str, Any] = Field(description="Data for the new record")
+
+
+def query_records(query_type: str, filters: Dict[str, Any] = None,
+                  limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+    """One page of CRM records matching ``filters`` (exact field matches)"""
+    records = MOCK_CRM_DATA.get(query_type, [])
+    if filters:
+        records = [record for record in records
+                   if all(record.get(field) == value for field, value in filters.items())]
+    return records[offset:offset + limit]
+
+
+def query_crm(query_type: str, filters: Dict[str, Any] = None, limit: int = 10) -> str:
+    """Execute CRM query"""
+    try:
+        # Simulate CRM query - replace with actual CRM API calls
+        logger.info(f"Querying CRM for {query_type} with filters: {filters}")
+
+        results = query_records(query_type, filters, limit)
+        return f"Found {len(results)} {query_type}: {results}"
+
+    except Exception as e:
+        logger.error(f"Error querying CRM: {str(e)}")
+        return f"Error querying CRM: {str(e)}"
+
+
+def update_crm_record(record_type: str, record_id: str, updates: Dict[str, Any]) -> str:
+    """Execute CRM update"""
+    try:
+        logger.info(f"Updating {record_type} {record_id} with: {updates}")
+
+        # Simulate CRM update - replace with actual CRM API calls
+        publish_event(RECORD_UPDATED, {"record_type": record_type, "record_id": record_id, "updates": updates},
+                      source="crm")
+        return f"Successfully updated {record_type} {record_id} with {len(updates)} fields"
+
+    except Exception as e:
+        logger.error(f"Error updating CRM: {str(e)}")
+        return f"Error updating CRM: {str(e)}"
+
+
+def create_crm_record(record_type: str, data: Dict[str, Any]) -> str:
+    """Create new CRM record"""
+    try:
+        logger.info(f"Creating new {record_type} with data: {data}")
+
+        # Simulate record creation
+        new_id = str(uuid.uuid4())[:8]
+
+        publish_event(RECORD_CREATED, {"record_type": record_type, "record_id": new_id, "data": data},
+                      source="crm")
+        return f"Successfully created new {record_type} with ID: {new_id}"
+
+    except Exception as e:
+        logger.error(f"Error creating CRM record: {str(e)}")
+        return f"Error creating CRM record: {str(e)}"
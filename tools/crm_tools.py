@@ -4,25 +4,15 @@ CRM Tools for interacting with CRM systems and data
 
 from typing import Dict, List, Any, Optional
 from langchain.tools import BaseTool
-from pydantic import BaseModel, Field
 import requests
 import structlog
 
-logger = structlog.get_logger(__name__)
-
-
-class CRMQueryInput(BaseModel):
-    """Input schema for CRM queries"""
-    query_type: str = Field(description="Type of CRM query (leads, deals, contacts, etc.)")
-    filters: Dict[str, Any] = Field(default={}, description="Filters to apply to the query")
-    limit: int = Field(default=10, description="Maximum number of results to return")
-
+from .crm_records import (
+    MOCK_CRM_DATA, CRMQueryInput, CRMUpdateInput, CRMCreateRecordInput,
+    query_records, query_crm, update_crm_record, create_crm_record
+)
 
-class CRMUpdateInput(BaseModel):
-    """Input schema for CRM updates"""
-    record_type: str = Field(description="Type of record to update (lead, deal, contact)")
-    record_id: str = Field(description="ID of the record to update")
-    updates: Dict[str, Any] = Field(description="Fields to update")
+logger = structlog.get_logger(__name__)
 
 
 class CRMQueryTool(BaseTool):
@@ -35,32 +25,7 @@ class CRMQueryTool(BaseTool):
     def _run(self, query_type: str, filters: Dict[str, Any] = None, 
              limit: int = 10) -> str:
         """Execute CRM query"""
-        try:
-            # Simulate CRM query - replace with actual CRM API calls
-            logger.info(f"Querying CRM for {query_type} with filters: {filters}")
-            
-            # Mock data for demonstration
-            mock_data = {
-                "leads": [
-                    {"id": "lead_001", "name": "John Doe", "status": "new", "score": 85},
-                    {"id": "lead_002", "name": "Jane Smith", "status": "qualified", "score": 92}
-                ],
-                "deals": [
-                    {"id": "deal_001", "name": "Enterprise Deal", "value": 50000, "stage": "proposal"},
-                    {"id": "deal_002", "name": "SMB Deal", "value": 15000, "stage": "negotiation"}
-                ],
-                "contacts": [
-                    {"id": "contact_001", "name": "John Doe", "company": "Acme Corp", "role": "Manager"},
-                    {"id": "contact_002", "name": "Jane Smith", "company": "Tech Inc", "role": "Director"}
-                ]
-            }
-            
-            results = mock_data.get(query_type, [])[:limit]
-            return f"Found {len(results)} {query_type}: {results}"
-            
-        except Exception as e:
-            logger.error(f"Error querying CRM: {str(e)}")
-            return f"Error querying CRM: {str(e)}"
+        return query_crm(query_type, filters, limit)
 
 
 class CRMUpdateTool(BaseTool):
@@ -72,23 +37,7 @@ class CRMUpdateTool(BaseTool):
     
     def _run(self, record_type: str, record_id: str, updates: Dict[str, Any]) -> str:
         """Execute CRM update"""
-        try:
-            logger.info(f"Updating {record_type} {record_id} with: {updates}")
-            
-            # Simulate CRM update - replace with actual CRM API calls
-            # In a real implementation, this would make API calls to your CRM
-            
-            return f"Successfully updated {record_type} {record_id} with {len(updates)} fields"
-            
-        except Exception as e:
-            logger.error(f"Error updating CRM: {str(e)}")
-            return f"Error updating CRM: {str(e)}"
-
-
-class CRMCreateRecordInput(BaseModel):
-    """Input schema for creating CRM records"""
-    record_type: str = Field(description="Type of record to create")
-    data: Dict[str, Any] = Field(description="Data for the new record")
+        return update_crm_record(record_type, record_id, updates)
 
 
 class CRMCreateTool(BaseTool):
@@ -100,18 +49,7 @@ class CRMCreateTool(BaseTool):
     
     def _run(self, record_type: str, data: Dict[str, Any]) -> str:
         """Create new CRM record"""
-        try:
-            logger.info(f"Creating new {record_type} with data: {data}")
-            
-            # Simulate record creation
-            import uuid
-            new_id = str(uuid.uuid4())[:8]
-            
-            return f"Successfully created new {record_type} with ID: {new_id}"
-            
-        except Exception as e:
-            logger.error(f"Error creating CRM record: {str(e)}")
-            return f"Error creating CRM record: {str(e)}"
+        return create_crm_record(record_type, data)
 
 
 class CRMTools:
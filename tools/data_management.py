@@ -0,0 +1,59 @@
+"""
+Data management operations without any agent framework dependency
+
+``DataManagementTool`` in ``operations_tools`` wraps this function;
+workflows call it directly.
+"""
+
+from typing import Dict, Any
+from pydantic import BaseModel, Field
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class DataManagementInput(BaseModel):
+    """Input for data management operations"""
+    operation: str = Field(description="Data operation (clean, validate, merge, backup)")
+    data_source: str = Field(description="Source of the data")
+    parameters: Dict[str, Any] = Field(default={}, description="Operation parameters")
+
+
+def manage_data(operation: str, data_source: str, parameters: Dict[str, Any] = None) -> str:
+    """Perform data management operations"""
+    try:
+        logger.info(f"Performing data {operation} on {data_source}")
+
+        # Simulate data management operations
+        if operation == "clean":
+            result = {
+                "operation": "data_cleaning",
+                "source": data_source,
+                "records_processed": 1500,
+                "duplicates_removed": 45,
+                "invalid_entries_fixed": 23,
+                "completion_time": "2 minutes"
+            }
+        elif operation == "validate":
+            result = {
+                "operation": "data_validation",
+                "source": data_source,
+                "records_validated": 1500,
+                "validation_errors": 12,
+                "quality_score": "94%"
+            }
+        elif operation == "merge":
+            result = {
+                "operation": "data_merge",
+                "sources": [data_source, (parameters or {}).get("target", "unknown")],
+                "records_merged": 1200,
+                "conflicts_resolved": 8
+            }
+        else:
+            result = {"operation": operation, "status": "completed"}
+
+        return f"Data management completed: {result}"
+
+    except Exception as e:
+        logger.error(f"Error in data management: {str(e)}")
+        return f"Error in data management: {str(e)}"
@@ -7,6 +7,8 @@ from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
 import structlog
 
+from .data_management import DataManagementInput, manage_data
+
 logger = structlog.get_logger(__name__)
 
 
@@ -96,13 +98,6 @@ class ProcessOptimizationTool(BaseTool):
             return f"Error optimizing process: {str(e)}"
 
 
-class DataManagementInput(BaseModel):
-    """Input for data management operations"""
-    operation: str = Field(description="Data operation (clean, validate, merge, backup)")
-    data_source: str = Field(description="Source of the data")
-    parameters: Dict[str, Any] = Field(default={}, description="Operation parameters")
-
-
 class DataManagementTool(BaseTool):
     """Tool for data cleaning, validation, and management"""
     
@@ -112,42 +107,7 @@ class DataManagementTool(BaseTool):
     
     def _run(self, operation: str, data_source: str, parameters: Dict[str, Any] = None) -> str:
         """Perform data management operations"""
-        try:
-            logger.info(f"Performing data {operation} on {data_source}")
-            
-            # Simulate data management operations
-            if operation == "clean":
-                result = {
-                    "operation": "data_cleaning",
-                    "source": data_source,
-                    "records_processed": 1500,
-                    "duplicates_removed": 45,
-                    "invalid_entries_fixed": 23,
-                    "completion_time": "2 minutes"
-                }
-            elif operation == "validate":
-                result = {
-                    "operation": "data_validation",
-                    "source": data_source,
-                    "records_validated": 1500,
-                    "validation_errors": 12,
-                    "quality_score": "94%"
-                }
-            elif operation == "merge":
-                result = {
-                    "operation": "data_merge",
-                    "sources": [data_source, parameters.get("target", "unknown")],
-                    "records_merged": 1200,
-                    "conflicts_resolved": 8
-                }
-            else:
-                result = {"operation": operation, "status": "completed"}
-            
-            return f"Data management completed: {result}"
-            
-        except Exception as e:
-            logger.error(f"Error in data management: {str(e)}")
-            return f"Error in data management: {str(e)}"
+        return manage_data(operation, data_source, parameters)
 
 
 class WorkflowInput(BaseModel):
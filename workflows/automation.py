@@ -4,14 +4,29 @@ Handles complex multi-step workflows and process automation
 """
 
 import asyncio
+import time
 import uuid
-from typing import Dict, List, Any, Optional
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple, Callable, Awaitable, Deque
 from datetime import datetime, timedelta
 from enum import Enum
+from itertools import islice
 import json
 import structlog
 
-from ..core.agent import CoreAIAgent
+from core.engine.core_agent import CoreAIAgent, PROMPT_VERSION
+from core.runtime.metering import counting
+from core.runtime.deadline import no_deadline
+from core.runtime.bulkhead import WORKFLOW, workload
+from core.runtime.events import Event, get_event_bus, WORKFLOW_COMPLETED, WORKFLOW_FAILED
+from config.settings import settings
+from .dag import resolve_dependencies, run_dag
+from .expressions import compile_expression, evaluate
+from .scheduler import WorkflowScheduler, ScheduleEntry, InMemoryScheduleStore, SQLiteScheduleStore
+from .persistence import InMemoryWorkflowBackend, SQLiteWorkflowBackend
+from .memo import InMemoryStepCache, SQLiteStepCache, step_cache_key
+from .mapping import MapRun, iter_source, render, run_map, validate_map_step
+from .operations import ToolUnavailable, run_data_operation, validate_data_operation
 
 logger = structlog.get_logger(__name__)
 
@@ -22,46 +37,123 @@ class WorkflowStatus(Enum):
     COMPLETED = "completed"
     FAILED = "failed"
     PAUSED = "paused"
+    # Hibernating in a long wait step; the scheduler wakes it
+    WAITING = "waiting"
+
+
+StepHandler = Callable[["WorkflowStep", "Workflow", Dict[str, Any]], Awaitable[None]]
 
 
 class WorkflowStep:
     """Individual step in a workflow"""
-    
-    def __init__(self, step_id: str, step_type: str, parameters: Dict[str, Any]):
+
+    def __init__(self, step_id: str, step_type: str, parameters: Dict[str, Any],
+                 depends_on: Optional[List[str]] = None):
         self.step_id = step_id
         self.step_type = step_type
         self.parameters = parameters
+        # None: after the previous step; []: no dependencies
+        self.depends_on = depends_on
         self.status = "pending"
         self.result = None
         self.error = None
         self.executed_at = None
+        self.metadata: Dict[str, Any] = {}
+        # Resolved once from the engine's dispatch table when the workflow is registered
+        self.handler: Optional[StepHandler] = None
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """Durable record of this step's outcome"""
+        return {
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "metadata": self.metadata,
+            "executed_at": self.executed_at.isoformat() if self.executed_at else None
+        }
+
+    def restore(self, checkpoint: Dict[str, Any]):
+        self.status = checkpoint.get("status", "pending")
+        self.result = checkpoint.get("result")
+        self.error = checkpoint.get("error")
+        self.metadata = checkpoint.get("metadata") or {}
+        executed_at = checkpoint.get("executed_at")
+        self.executed_at = datetime.fromisoformat(executed_at) if executed_at else None
 
 
 class Workflow:
     """Workflow definition and execution"""
-    
-    def __init__(self, workflow_id: str, name: str, steps: List[Dict[str, Any]], 
-                 trigger_type: str = "manual", schedule: str = None):
+
+    def __init__(self, workflow_id: str, name: str, steps: List[Dict[str, Any]],
+                 trigger_type: str = "manual", schedule: str = None,
+                 parameters: Optional[Dict[str, Any]] = None):
         self.workflow_id = workflow_id
         self.name = name
         self.status = WorkflowStatus.CREATED
         self.trigger_type = trigger_type
         self.schedule = schedule
+        self.parameters = parameters or {}
         self.created_at = datetime.now()
         self.started_at = None
         self.completed_at = None
         self.current_step = 0
-        
+        # The current (or last) run: its id and the parameters it was started with
+        self.run_id: Optional[str] = None
+        self.run_parameters: Dict[str, Any] = {}
+        self.max_concurrency = int(self.parameters.get("max_concurrency", settings.WORKFLOW_MAX_CONCURRENCY))
+        self.dependencies: Dict[str, List[str]] = {}
+
         # Convert step dictionaries to WorkflowStep objects
+        self.step_definitions = steps
         self.steps = []
         for i, step_data in enumerate(steps):
             step = WorkflowStep(
-                step_id=f"step_{i+1}",
+                step_id=step_data.get("id") or f"step_{i+1}",
                 step_type=step_data.get("type", "agent_task"),
-                parameters=step_data.get("parameters", {})
+                parameters=step_data.get("parameters", {}),
+                depends_on=step_data.get("depends_on")
             )
             self.steps.append(step)
-    
+        self.steps_by_id = {step.step_id: step for step in self.steps}
+
+    def definition(self) -> Dict[str, Any]:
+        """Constructor arguments to rebuild this workflow (persisted with its schedule)"""
+        return {
+            "name": self.name,
+            "steps": self.step_definitions,
+            "trigger_type": self.trigger_type,
+            "schedule": self.schedule,
+            "parameters": self.parameters
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Durable record of the workflow and its current run (step outcomes are checkpointed separately)"""
+        return {
+            "workflow_id": self.workflow_id,
+            "definition": self.definition(),
+            "status": self.status.value,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "run_id": self.run_id,
+            "run_parameters": self.run_parameters
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any], checkpoints: Dict[str, Dict[str, Any]]) -> "Workflow":
+        workflow = cls(workflow_id=snapshot["workflow_id"], **snapshot["definition"])
+        workflow.status = WorkflowStatus(snapshot["status"])
+        workflow.created_at = datetime.fromisoformat(snapshot["created_at"])
+        for field in ("started_at", "completed_at"):
+            if snapshot.get(field):
+                setattr(workflow, field, datetime.fromisoformat(snapshot[field]))
+        workflow.run_id = snapshot.get("run_id")
+        workflow.run_parameters = snapshot.get("run_parameters") or {}
+        for step_id, checkpoint in checkpoints.items():
+            if step_id in workflow.steps_by_id:
+                workflow.steps_by_id[step_id].restore(checkpoint)
+        return workflow
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert workflow to dictionary"""
         return {
@@ -70,16 +162,22 @@ class Workflow:
             "status": self.status.value,
             "trigger_type": self.trigger_type,
             "schedule": self.schedule,
+            "parameters": self.parameters,
             "created_at": self.created_at.isoformat(),
             "started_at": self.started_at.isoformat() if self.started_at else None,
             "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "run_id": self.run_id,
             "current_step": self.current_step,
             "total_steps": len(self.steps),
+            "max_concurrency": self.max_concurrency,
             "steps": [
                 {
                     "step_id": step.step_id,
                     "step_type": step.step_type,
+                    "depends_on": self.dependencies.get(step.step_id, step.depends_on),
                     "status": step.status,
+                    "error": step.error,
+                    "metadata": step.metadata,
                     "executed_at": step.executed_at.isoformat() if step.executed_at else None
                 }
                 for step in self.steps
@@ -87,268 +185,771 @@ class Workflow:
         }
 
 
+class WorkflowStore:
+    """
+    Workflows indexed by id, status and trigger type
+
+    Status changes go through ``set_status`` so the indexes stay current;
+    counts and filtered listings then never scan the whole store. Dicts
+    are used as ordered sets, so listings come back in creation order.
+    Every change is written through to the durable ``backend``.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or InMemoryWorkflowBackend()
+        self._workflows: Dict[str, Workflow] = {}
+        self._by_status: Dict[WorkflowStatus, Dict[str, None]] = {status: {} for status in WorkflowStatus}
+        self._by_trigger: Dict[str, Dict[str, None]] = {}
+
+    def __len__(self) -> int:
+        return len(self._workflows)
+
+    def __contains__(self, workflow_id: str) -> bool:
+        return workflow_id in self._workflows
+
+    def add(self, workflow: Workflow, persist: bool = True):
+        self._workflows[workflow.workflow_id] = workflow
+        self._by_status[workflow.status][workflow.workflow_id] = None
+        self._by_trigger.setdefault(workflow.trigger_type, {})[workflow.workflow_id] = None
+        if persist:
+            self.save(workflow)
+
+    def save(self, workflow: Workflow):
+        self.backend.save_workflow(workflow.workflow_id, workflow.snapshot())
+
+    def checkpoint(self, workflow: Workflow, step: WorkflowStep):
+        self.backend.save_checkpoint(workflow.workflow_id, step.step_id, step.checkpoint())
+
+    def clear_checkpoints(self, workflow: Workflow):
+        self.backend.clear_checkpoints(workflow.workflow_id)
+
+    def get(self, workflow_id: str) -> Optional[Workflow]:
+        return self._workflows.get(workflow_id)
+
+    def remove(self, workflow_id: str) -> Optional[Workflow]:
+        workflow = self._workflows.pop(workflow_id, None)
+        if workflow is not None:
+            self._by_status[workflow.status].pop(workflow_id, None)
+            self._by_trigger.get(workflow.trigger_type, {}).pop(workflow_id, None)
+            self.backend.delete_workflow(workflow_id)
+        return workflow
+
+    def set_status(self, workflow: Workflow, status: WorkflowStatus):
+        if workflow.status == status:
+            return
+        self._by_status[workflow.status].pop(workflow.workflow_id, None)
+        workflow.status = status
+        if workflow.workflow_id in self._workflows:
+            self._by_status[status][workflow.workflow_id] = None
+            self.save(workflow)
+
+    def count(self, status: WorkflowStatus) -> int:
+        return len(self._by_status[status])
+
+    def query(self, status: Optional[WorkflowStatus] = None, trigger_type: Optional[str] = None,
+              offset: int = 0, limit: int = 50) -> Tuple[List[Workflow], int]:
+        """One page of workflows matching the filters, plus the total match count"""
+        if status is not None and trigger_type is not None:
+            by_trigger = self._by_trigger.get(trigger_type, {})
+            by_status = self._by_status[status]
+            smaller, other = sorted((by_status, by_trigger), key=len)
+            ids = [workflow_id for workflow_id in smaller if workflow_id in other]
+        elif status is not None:
+            ids = self._by_status[status]
+        elif trigger_type is not None:
+            ids = self._by_trigger.get(trigger_type, {})
+        else:
+            ids = self._workflows
+
+        page = [self._workflows[workflow_id] for workflow_id in islice(ids, offset, offset + limit)]
+        return page, len(ids)
+
+
 class WorkflowAutomation:
     """Main workflow automation engine"""
-    
-    def __init__(self, ai_agent: CoreAIAgent):
+
+    def __init__(self, ai_agent: CoreAIAgent, schedule_store=None, backend=None, step_cache=None,
+                 event_bus=None):
         self.ai_agent = ai_agent
-        self.workflows: Dict[str, Workflow] = {}
-        self.running_workflows: Dict[str, asyncio.Task] = {}
-        
+        self.store = WorkflowStore(backend)
+        self.step_cache = step_cache or InMemoryStepCache(settings.WORKFLOW_CACHE_MAX_ENTRIES)
+        self.scheduler = WorkflowScheduler(schedule_store, callback=self._run_scheduled)
+        self.events = event_bus or get_event_bus()
+        self._background: set = set()
+        # Events waiting for their workflow to be idle, and workflows with a triggered run in flight
+        self._trigger_queues: Dict[str, Deque[Event]] = {}
+        self._triggering: set = set()
+
+        # Step type -> handler; steps are bound to their handler once, at creation
+        self.step_handlers: Dict[str, StepHandler] = {
+            "agent_task": self._run_agent_task,
+            "wait": self._run_wait,
+            "condition": self._run_condition,
+            "notification": self._run_notification,
+            "data_operation": self._run_data_operation,
+            "map": self._run_map
+        }
+
         logger.info("WorkflowAutomation initialized")
-    
-    async def create_workflow(self, name: str, steps: List[Dict[str, Any]], 
-                            trigger_type: str = "manual", schedule: str = None) -> str:
+
+    @property
+    def workflows(self) -> Dict[str, Workflow]:
+        return self.store._workflows
+
+    def _compile(self, workflow: Workflow):
+        """
+        Bind every step to its handler and resolve the dependency graph
+
+        Unknown step types, unknown dependencies, cycles, invalid condition
+        expressions and data operations no tool performs are rejected up
+        front, when the workflow is created.
+        """
+        workflow.dependencies = resolve_dependencies(
+            [step.step_id for step in workflow.steps],
+            [step.depends_on for step in workflow.steps]
+        )
+        for step in workflow.steps:
+            handler = self.step_handlers.get(step.step_type)
+            if handler is None:
+                raise ValueError(f"Unknown step type: {step.step_type} ({step.step_id})")
+            step.handler = handler
+            if step.step_type == "condition" and step.parameters.get("condition"):
+                compile_expression(step.parameters["condition"])
+            elif step.step_type == "map":
+                validate_map_step(step.parameters, list(self.step_handlers))
+            elif step.step_type == "data_operation":
+                validate_data_operation(step.parameters)
+
+    async def create_workflow(self, name: str, steps: List[Dict[str, Any]],
+                            trigger_type: str = "manual", schedule: str = None,
+                            parameters: Optional[Dict[str, Any]] = None) -> str:
         """Create a new workflow"""
         try:
             workflow_id = str(uuid.uuid4())
-            
+
             workflow = Workflow(
                 workflow_id=workflow_id,
                 name=name,
                 steps=steps,
                 trigger_type=trigger_type,
-                schedule=schedule
+                schedule=schedule or (parameters or {}).get("schedule"),
+                parameters=parameters
             )
-            
-            self.workflows[workflow_id] = workflow
-            
+            self._compile(workflow)
+
+            # If it's a scheduled workflow, set up the schedule (rejects invalid schedules)
+            if trigger_type == "scheduled" and workflow.schedule:
+                entry = self.scheduler.add(
+                    workflow_id,
+                    workflow.schedule,
+                    payload={"workflow": workflow.definition()},
+                    misfire_policy=workflow.parameters.get("misfire_policy"),
+                    jitter=workflow.parameters.get("jitter_seconds")
+                )
+                logger.info(f"Scheduled workflow {workflow_id} to run {workflow.schedule} "
+                            f"(next run at {datetime.fromtimestamp(entry.next_run).isoformat()})")
+            elif trigger_type == "event":
+                self._subscribe(workflow)
+                logger.info(f"Workflow {workflow_id} runs on {workflow.parameters['event_type']} events")
+
+            self.store.add(workflow)
+
             logger.info(f"Created workflow: {name} ({workflow_id})")
-            
-            # If it's a scheduled workflow, set up the schedule
-            if trigger_type == "scheduled" and schedule:
-                await self._schedule_workflow(workflow_id, schedule)
-            
+
             return workflow_id
-            
+
         except Exception as e:
             logger.error(f"Error creating workflow: {str(e)}")
             raise
-    
-    async def execute_workflow(self, workflow_id: str) -> Dict[str, Any]:
-        """Execute a workflow"""
+
+    async def execute_workflow(self, workflow_id: str, data: Optional[Dict[str, Any]] = None,
+                               resume: bool = False) -> Dict[str, Any]:
+        """
+        Execute a workflow (``data`` overrides the workflow parameters for this run)
+
+        Each step's outcome is checkpointed as soon as it finishes. With
+        ``resume=True`` the current run continues instead: completed steps
+        keep their stored results and only the remaining steps execute.
+        """
         try:
-            if workflow_id not in self.workflows:
+            workflow = self.store.get(workflow_id)
+            if workflow is None:
                 raise ValueError(f"Workflow {workflow_id} not found")
-            
-            workflow = self.workflows[workflow_id]
-            
+
             if workflow.status == WorkflowStatus.RUNNING:
                 return {"status": "already_running", "workflow_id": workflow_id}
-            
+
+            resume = resume and workflow.run_id is not None
+            if not resume:
+                workflow.run_id = str(uuid.uuid4())
+                workflow.run_parameters = {**workflow.parameters, **(data or {})}
+                workflow.started_at = datetime.now()
+                workflow.current_step = 0
+                for step in workflow.steps:
+                    step.status = "pending"
+                    step.result = None
+                    step.error = None
+                    step.metadata = {}
+                self.store.clear_checkpoints(workflow)
+
+            done = {step.step_id for step in workflow.steps if step.status == "completed"}
+            for step in workflow.steps:
+                if step.step_id not in done:
+                    step.status = "pending"
+            context = {
+                "workflow_id": workflow_id,
+                "parameters": workflow.run_parameters,
+                # Completed steps' stored outputs are reused, never recomputed
+                "step_results": {step.step_id: step.result for step in workflow.steps if step.step_id in done}
+            }
+
             # Start workflow execution
-            workflow.status = WorkflowStatus.RUNNING
-            workflow.started_at = datetime.now()
-            workflow.current_step = 0
-            
-            logger.info(f"Starting workflow execution: {workflow.name}")
-            
-            # Execute steps sequentially
-            for i, step in enumerate(workflow.steps):
-                try:
-                    workflow.current_step = i
-                    await self._execute_step(step, workflow)
-                    
-                    if step.status == "failed":
-                        workflow.status = WorkflowStatus.FAILED
-                        logger.error(f"Workflow {workflow_id} failed at step {i+1}")
-                        break
-                        
-                except Exception as e:
-                    step.status = "failed"
-                    step.error = str(e)
-                    workflow.status = WorkflowStatus.FAILED
-                    logger.error(f"Step {i+1} failed: {str(e)}")
-                    break
-            
+            workflow.completed_at = None
+            self.store.set_status(workflow, WorkflowStatus.RUNNING)
+
+            if resume:
+                logger.info(f"Resuming workflow {workflow.name} with {len(done)}/{len(workflow.steps)} steps done")
+            else:
+                logger.info(f"Starting workflow execution: {workflow.name}")
+
+            async def run_step(step_id: str) -> bool:
+                step = workflow.steps_by_id[step_id]
+                workflow.current_step = workflow.steps.index(step)
+                await self._execute_step(step, workflow, context)
+                context["step_results"][step_id] = step.result
+                self.store.checkpoint(workflow, step)
+                if step.status == "failed":
+                    logger.error(f"Workflow {workflow_id} failed at step {step_id}")
+                    return False
+                if step.status == "waiting":
+                    return None
+                return True
+
+            remaining = {
+                step_id: [dep for dep in deps if dep not in done]
+                for step_id, deps in workflow.dependencies.items() if step_id not in done
+            }
+
+            # Independent steps run concurrently, up to the workflow's limit;
+            # a pause stops new steps from starting
+            with workload(WORKFLOW):
+                succeeded = await run_dag(remaining, run_step, workflow.max_concurrency,
+                                          should_stop=lambda: workflow.status == WorkflowStatus.PAUSED)
+            waiting = [step for step in workflow.steps if step.status == "waiting"]
+            if workflow.status == WorkflowStatus.PAUSED:
+                logger.info(f"Workflow {workflow_id} paused")
+            elif not succeeded:
+                if waiting and not any(step.status == "failed" for step in workflow.steps):
+                    # Nothing is left to run until a wait is over; the run's
+                    # coroutine ends here and the scheduler resumes it
+                    self.store.set_status(workflow, WorkflowStatus.WAITING)
+                    wake_at = min(step.metadata["wake_at"] for step in waiting)
+                    logger.info(f"Workflow {workflow_id} hibernating until "
+                                f"{datetime.fromtimestamp(wake_at).isoformat()}")
+                else:
+                    self.store.set_status(workflow, WorkflowStatus.FAILED)
+
             # Mark workflow as completed if all steps succeeded
             if all(step.status == "completed" for step in workflow.steps):
-                workflow.status = WorkflowStatus.COMPLETED
                 workflow.completed_at = datetime.now()
+                self.store.set_status(workflow, WorkflowStatus.COMPLETED)
                 logger.info(f"Workflow {workflow_id} completed successfully")
-            
+
+            if workflow.status in (WorkflowStatus.COMPLETED, WorkflowStatus.FAILED):
+                self._publish_finished(workflow)
+                self._start_next_triggered(workflow_id)
             return workflow.to_dict()
-            
+
         except Exception as e:
             logger.error(f"Error executing workflow: {str(e)}")
-            if workflow_id in self.workflows:
-                self.workflows[workflow_id].status = WorkflowStatus.FAILED
+            workflow = self.store.get(workflow_id)
+            if workflow is not None:
+                self.store.set_status(workflow, WorkflowStatus.FAILED)
+                self._publish_finished(workflow)
+                self._start_next_triggered(workflow_id)
             raise
-    
-    async def _execute_step(self, step: WorkflowStep, workflow: Workflow):
+
+    def _publish_finished(self, workflow: Workflow):
+        event_type = WORKFLOW_COMPLETED if workflow.status == WorkflowStatus.COMPLETED else WORKFLOW_FAILED
+        try:
+            self.events.publish(event_type, {
+                "workflow_id": workflow.workflow_id,
+                "name": workflow.name,
+                "run_id": workflow.run_id,
+                "status": workflow.status.value
+            }, source="workflow_engine")
+        except Exception as e:
+            logger.error(f"Could not publish {event_type} for workflow {workflow.workflow_id}: {str(e)}")
+
+    async def _execute_step(self, step: WorkflowStep, workflow: Workflow, context: Dict[str, Any]):
         """Execute an individual workflow step"""
         try:
             step.status = "running"
+            step.error = None
             step.executed_at = datetime.now()
-            
+
             logger.info(f"Executing step: {step.step_id} ({step.step_type})")
-            
-            if step.step_type == "agent_task":
-                # Delegate to AI agent
-                agent_type = step.parameters.get("agent_type", "core")
-                task = step.parameters.get("task", "")
-                context = step.parameters.get("context", {})
-                
-                if agent_type == "core":
-                    result = await self.ai_agent.process_message(
-                        message=task,
-                        user_id="workflow_system",
-                        context=context
-                    )
-                else:
-                    result = await self.ai_agent.delegate_to_specialist(
-                        agent_type=agent_type,
-                        task=task,
-                        context=context
-                    )
-                
-                step.result = result.dict()
-                step.status = "completed" if result.success else "failed"
-            
-            elif step.step_type == "wait":
-                # Wait for specified duration
-                wait_seconds = step.parameters.get("seconds", 1)
-                await asyncio.sleep(wait_seconds)
-                step.result = {"waited_seconds": wait_seconds}
-                step.status = "completed"
-            
-            elif step.step_type == "condition":
-                # Conditional logic
-                condition = step.parameters.get("condition", "")
-                # Simple condition evaluation (in production, use safer evaluation)
-                condition_result = eval(condition) if condition else True
-                step.result = {"condition_met": condition_result}
-                step.status = "completed"
-            
-            elif step.step_type == "notification":
-                # Send notifications
-                message = step.parameters.get("message", "")
-                recipients = step.parameters.get("recipients", [])
-                
-                # Simulate notification sending
-                step.result = {
-                    "message_sent": message,
-                    "recipients": recipients,
-                    "sent_at": datetime.now().isoformat()
-                }
-                step.status = "completed"
-            
-            elif step.step_type == "data_operation":
-                # Data operations (create, update, query)
-                operation = step.parameters.get("operation", "query")
-                target = step.parameters.get("target", "crm")
-                data = step.parameters.get("data", {})
-                
-                # Use CRM tools through agent
-                task = f"Perform {operation} operation on {target} with data: {data}"
+
+            await step.handler(step, workflow, context)
+
+            logger.info(f"Step {step.step_id} completed with status: {step.status}")
+
+        except Exception as e:
+            step.status = "failed"
+            step.error = str(e)
+            logger.error(f"Error executing step {step.step_id}: {str(e)}")
+
+    async def _memoized(self, step: WorkflowStep, inputs: Dict[str, Any],
+                        compute: Callable[[], Awaitable[Tuple[Dict[str, Any], bool]]]):
+        """
+        Run ``compute`` (returning result and success), reusing a cached result if the step opts in
+
+        Steps opt in with ``cache_ttl`` (seconds). The key covers the step
+        type, the effective ``inputs`` and the prompt version; only
+        successful results are stored.
+        """
+        ttl = float(step.parameters.get("cache_ttl") or 0)
+        if ttl <= 0:
+            step.result, success = await compute()
+            step.status = "completed" if success else "failed"
+            return
+
+        key = step_cache_key(step.step_type, inputs, PROMPT_VERSION)
+        cached = self.step_cache.get(key)
+        if cached is not None:
+            step.result = cached.result
+            step.status = "completed"
+            step.metadata["cache"] = {
+                "hit": True,
+                "key": key[:16],
+                "age_seconds": round(time.time() - cached.stored_at, 1),
+                "tokens_saved": cached.tokens
+            }
+            return
+
+        with counting() as usage:
+            step.result, success = await compute()
+        step.status = "completed" if success else "failed"
+        if success:
+            self.step_cache.put(key, step.result, ttl, usage.tokens)
+        step.metadata["cache"] = {"hit": False, "key": key[:16], "stored": success, "tokens": usage.tokens}
+
+    async def _run_agent_task(self, step: WorkflowStep, workflow: Workflow, context: Dict[str, Any]):
+        """Delegate to AI agent"""
+        agent_type = step.parameters.get("agent_type", "core")
+        task = step.parameters.get("task", "")
+        step_context = dict(step.parameters.get("context", {}))
+        upstream = workflow.dependencies.get(step.step_id, [])
+        if upstream:
+            # Hand the results this step depends on to the agent
+            step_context["step_results"] = {dep: context["step_results"].get(dep) for dep in upstream}
+
+        async def compute():
+            if agent_type == "core":
                 result = await self.ai_agent.process_message(
                     message=task,
                     user_id="workflow_system",
-                    context={"operation": operation, "target": target, "data": data}
+                    context=step_context
                 )
-                
-                step.result = result.dict()
-                step.status = "completed" if result.success else "failed"
-            
             else:
-                # Unknown step type
-                step.status = "failed"
-                step.error = f"Unknown step type: {step.step_type}"
-            
-            logger.info(f"Step {step.step_id} completed with status: {step.status}")
-            
-        except Exception as e:
+                result = await self.ai_agent.delegate_to_specialist(
+                    agent_type=agent_type,
+                    task=task,
+                    context=step_context
+                )
+            return result.dict(), result.success
+
+        await self._memoized(step, {"agent_type": agent_type, "task": task, "context": step_context}, compute)
+
+    async def _run_wait(self, step: WorkflowStep, workflow: Workflow, context: Dict[str, Any]):
+        """
+        Wait for specified duration
+
+        Waits of at least WORKFLOW_HIBERNATE_AFTER seconds (or any wait with
+        ``hibernate: true``) don't sleep: the step records its wake-up time,
+        is left "waiting" and the scheduler resumes the workflow when it is
+        due. The wake-up time is kept in the step's metadata, so a resumed or
+        restarted run only waits for whatever is left.
+        """
+        wait_seconds = step.parameters.get("seconds", 1)
+        wake_at = step.metadata.get("wake_at") or time.time() + float(wait_seconds)
+        remaining = wake_at - time.time()
+        hibernate = step.parameters.get("hibernate", float(wait_seconds) >= settings.WORKFLOW_HIBERNATE_AFTER)
+
+        # Map sub-steps are not part of the workflow's graph and always sleep
+        if remaining > 0 and hibernate and workflow.steps_by_id.get(step.step_id) is step:
+            step.metadata["wake_at"] = wake_at
+            step.status = "waiting"
+            self._schedule_wake(workflow, step)
+            return
+
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        step.result = {"waited_seconds": wait_seconds}
+        step.status = "completed"
+
+    def _schedule_wake(self, workflow: Workflow, step: WorkflowStep):
+        self.scheduler.add_once(
+            f"wake:{workflow.workflow_id}:{step.step_id}",
+            step.metadata["wake_at"],
+            payload={"wake": workflow.workflow_id, "run_id": workflow.run_id}
+        )
+
+    async def _run_condition(self, step: WorkflowStep, workflow: Workflow, context: Dict[str, Any]):
+        """Conditional logic over the workflow parameters and earlier step results"""
+        condition = step.parameters.get("condition", "")
+        namespace = {
+            "parameters": context["parameters"],
+            "step_results": context["step_results"],
+            "workflow_id": workflow.workflow_id
+        }
+        condition_result = bool(evaluate(condition, namespace)) if condition else True
+        step.result = {"condition_met": condition_result}
+        step.status = "completed"
+
+    async def _run_notification(self, step: WorkflowStep, workflow: Workflow, context: Dict[str, Any]):
+        """Send notifications"""
+        message = step.parameters.get("message", "")
+        recipients = step.parameters.get("recipients", [])
+
+        # Simulate notification sending
+        step.result = {
+            "message_sent": message,
+            "recipients": recipients,
+            "sent_at": datetime.now().isoformat()
+        }
+        step.status = "completed"
+
+    async def _run_data_operation(self, step: WorkflowStep, workflow: Workflow, context: Dict[str, Any]):
+        """Data operations (create, update, query), run directly by the matching tool"""
+        operation = step.parameters.get("operation", "query")
+        target = step.parameters.get("target", "crm")
+        data = step.parameters.get("data", {})
+        use_agent = bool(step.parameters.get("use_agent", False))
+
+        async def compute():
+            if not use_agent:
+                try:
+                    return await run_data_operation(operation, target, data)
+                except ToolUnavailable as e:
+                    logger.warning(f"{str(e)}; handing step {step.step_id} to the agent")
+
+            # Only steps that ask for it (or whose tool is unavailable) go through the agent
+            task = f"Perform {operation} operation on {target} with data: {data}"
+            result = await self.ai_agent.process_message(
+                message=task,
+                user_id="workflow_system",
+                context={"operation": operation, "target": target, "data": data}
+            )
+            return result.dict(), result.success
+
+        await self._memoized(
+            step, {"operation": operation, "target": target, "data": data, "use_agent": use_agent}, compute
+        )
+
+    async def _run_map(self, step: WorkflowStep, workflow: Workflow, context: Dict[str, Any]):
+        """Apply a sub-step to every item of a streamed source, with bounded concurrency"""
+        namespace = {
+            "parameters": context["parameters"],
+            "step_results": context["step_results"],
+            "workflow_id": workflow.workflow_id
+        }
+        sub_step = step.parameters["step"]
+        sub_type = sub_step.get("type", "agent_task")
+        handler = self.step_handlers[sub_type]
+
+        async def process(index: int, item: Any):
+            item_step = WorkflowStep(
+                step_id=f"{step.step_id}[{index}]",
+                step_type=sub_type,
+                parameters=render(sub_step.get("parameters", {}), {**namespace, "item": item, "index": index}),
+                depends_on=[]
+            )
+            await handler(item_step, workflow, context)
+            return item_step.status == "completed", item_step.result, item_step.error
+
+        def report(run: MapRun):
+            step.metadata["progress"] = run.progress()
+            state = run.state()
+            if state is not None:
+                step.metadata["map_state"] = state
+            # Keep progress visible (and durable) while a long map runs
+            self.store.checkpoint(workflow, step)
+
+        # Progress is recorded from the start, so a resumed run knows the map already began
+        resume = "progress" in step.metadata
+        run = MapRun(
+            output_path=render(step.parameters.get("output_path"), namespace),
+            aggregate=step.parameters.get("aggregate"),
+            max_failures=step.parameters.get("max_failures"),
+            resume=resume,
+            state=step.metadata.get("map_state")
+        )
+        if not resume:
+            report(run)
+        await run_map(
+            iter_source(render(step.parameters["source"], namespace)),
+            process,
+            run,
+            concurrency=int(step.parameters.get("concurrency", settings.WORKFLOW_MAP_CONCURRENCY)),
+            on_progress=report,
+            progress_every=int(step.parameters.get("progress_every", 100))
+        )
+
+        step.result = run.summary()
+        if run.aborted:
             step.status = "failed"
-            step.error = str(e)
-            logger.error(f"Error executing step {step.step_id}: {str(e)}")
-    
-    async def _schedule_workflow(self, workflow_id: str, schedule: str):
-        """Schedule a workflow for recurring execution"""
-        # Simple scheduling implementation
-        # In production, use a proper scheduler like Celery or APScheduler
+            step.error = f"{run.failed} items failed (max_failures={run.max_failures})"
+        else:
+            step.status = "completed"
+
+    def start(self):
+        """
+        Restore persisted workflows and start the scheduler
+
+        Workflows that were running when the process stopped are resumed
+        from their checkpoints in the background.
+        """
+        interrupted = []
+        for snapshot, checkpoints in self.store.backend.load_all():
+            try:
+                workflow = Workflow.from_snapshot(snapshot, checkpoints)
+                self._compile(workflow)
+            except Exception as e:
+                logger.error(f"Could not restore workflow {snapshot.get('workflow_id')}: {str(e)}")
+                continue
+            if workflow.status == WorkflowStatus.RUNNING:
+                # Not running in this process; resume_workflow picks it up
+                workflow.status = WorkflowStatus.PAUSED
+                interrupted.append(workflow.workflow_id)
+            if workflow.trigger_type == "event":
+                try:
+                    self._subscribe(workflow)
+                except ValueError as e:
+                    logger.error(f"Workflow {workflow.workflow_id} no longer subscribes to events: {str(e)}")
+            self.store.add(workflow, persist=False)
+        if len(self.store):
+            logger.info(f"Restored {len(self.store)} workflows ({len(interrupted)} interrupted)")
+
+        for entry in self.scheduler.load():
+            definition = entry.payload.get("workflow")
+            if definition is None or entry.schedule_id in self.store:
+                continue
+            try:
+                workflow = Workflow(workflow_id=entry.schedule_id, **definition)
+                self._compile(workflow)
+                self.store.add(workflow)
+            except Exception as e:
+                logger.error(f"Could not restore scheduled workflow {entry.schedule_id}: {str(e)}")
+                self.scheduler.remove(entry.schedule_id)
+
+        # Hibernating workflows whose wake-up entry was lost still wake up
+        waiting, _ = self.store.query(status=WorkflowStatus.WAITING, limit=len(self.store))
+        for workflow in waiting:
+            for step in workflow.steps:
+                if step.status == "waiting" and f"wake:{workflow.workflow_id}:{step.step_id}" not in self.scheduler:
+                    self._schedule_wake(workflow, step)
+        self.scheduler.start()
+        # Subscriptions are back, so events left undelivered can be redelivered
+        self.events.start()
+
+        for workflow_id in interrupted:
+            self._spawn(self.resume_workflow(workflow_id))
+
+    def _spawn(self, coro):
+        """Run engine-owned background work, detached from any request"""
+        with no_deadline(), workload(WORKFLOW):
+            task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _run_scheduled(self, entry: ScheduleEntry):
+        """Scheduler callback: run the workflow a schedule belongs to, or wake a hibernating one"""
+        if "wake" in entry.payload:
+            await self._wake(entry.payload["wake"], entry.payload.get("run_id"))
+            return
+        if entry.schedule_id not in self.store:
+            logger.warning(f"Removing schedule for unknown workflow {entry.schedule_id}")
+            self.scheduler.remove(entry.schedule_id)
+            return
+        await self.execute_workflow(entry.schedule_id)
+
+    def _subscribe(self, workflow: Workflow):
+        """
+        Run ``workflow`` for each event of ``parameters.event_type``
+
+        The optional ``parameters.event_filter`` expression sees ``event``
+        (the event data), ``event_type``, ``source`` and ``parameters``.
+        Raises ValueError for an unknown event type or invalid filter.
+        """
+        event_type = workflow.parameters.get("event_type")
+        if not event_type:
+            raise ValueError("Event-triggered workflows need parameters.event_type")
+        expression = workflow.parameters.get("event_filter")
+        if expression:
+            compile_expression(expression)
+
+        def matches(event: Event) -> bool:
+            if event.data.get("workflow_id") == workflow.workflow_id:
+                return False  # never triggered by its own runs
+            if not expression:
+                return True
+            return bool(evaluate(expression, {
+                "event": event.data,
+                "event_type": event.type,
+                "source": event.source,
+                "parameters": workflow.parameters
+            }))
+
+        self.events.subscribe(workflow.workflow_id, event_type, self._on_event, matches)
+
+    async def _on_event(self, workflow_id: str, event: Event):
+        """
+        Event bus handler: queue a run with the event as its input (``parameters.event``)
+
+        Runs of one workflow never overlap, so events that arrive while it is
+        running, waiting or paused are queued and start one after another
+        once it is idle. Only when ``WORKFLOW_EVENT_QUEUE_SIZE`` events are
+        already queued is the delivery refused, and the bus retries it.
+        """
+        if self.store.get(workflow_id) is None:
+            return
+        queue = self._trigger_queues.setdefault(workflow_id, deque())
+        if len(queue) >= settings.WORKFLOW_EVENT_QUEUE_SIZE:
+            raise RuntimeError(f"Workflow {workflow_id} already has {len(queue)} triggered runs queued")
+        queue.append(event)
+        self._start_next_triggered(workflow_id)
+
+    def _start_next_triggered(self, workflow_id: str):
+        """Start the oldest queued triggered run if the workflow is idle"""
+        if workflow_id in self._triggering:
+            return
+        queue = self._trigger_queues.get(workflow_id)
+        workflow = self.store.get(workflow_id)
+        if not queue or workflow is None:
+            self._trigger_queues.pop(workflow_id, None)
+            return
+        if workflow.status in (WorkflowStatus.RUNNING, WorkflowStatus.WAITING, WorkflowStatus.PAUSED):
+            return  # called again when the current run finishes
+        self._triggering.add(workflow_id)
+        self._spawn(self._run_triggered(workflow_id, queue.popleft()))
+
+    async def _run_triggered(self, workflow_id: str, event: Event):
         try:
-            if schedule.startswith("every_"):
-                interval_str = schedule.replace("every_", "")
-                
-                if interval_str.endswith("minutes"):
-                    interval = int(interval_str.replace("minutes", "")) * 60
-                elif interval_str.endswith("hours"):
-                    interval = int(interval_str.replace("hours", "")) * 3600
-                elif interval_str.endswith("days"):
-                    interval = int(interval_str.replace("days", "")) * 86400
-                else:
-                    interval = 3600  # Default to 1 hour
-                
-                # Create background task for scheduled execution
-                async def scheduled_execution():
-                    while True:
-                        await asyncio.sleep(interval)
-                        try:
-                            await self.execute_workflow(workflow_id)
-                        except Exception as e:
-                            logger.error(f"Scheduled workflow execution failed: {str(e)}")
-                
-                task = asyncio.create_task(scheduled_execution())
-                self.running_workflows[workflow_id] = task
-                
-                logger.info(f"Scheduled workflow {workflow_id} to run {schedule}")
-                
+            result = await self.execute_workflow(workflow_id, data={"event": {
+                "event_id": event.event_id,
+                "type": event.type,
+                "source": event.source,
+                "data": event.data
+            }})
+            if result.get("status") == "already_running":
+                # Another run started first; this event goes next
+                self._trigger_queues.setdefault(workflow_id, deque()).appendleft(event)
         except Exception as e:
-            logger.error(f"Error scheduling workflow: {str(e)}")
-    
+            logger.error(f"Run of workflow {workflow_id} for event {event.event_id} failed: {str(e)}")
+        finally:
+            self._triggering.discard(workflow_id)
+            self._start_next_triggered(workflow_id)
+
+    async def _wake(self, workflow_id: str, run_id: Optional[str]):
+        """Rehydrate a hibernating run from its checkpoints and carry on"""
+        workflow = self.store.get(workflow_id)
+        if workflow is None or workflow.status != WorkflowStatus.WAITING or workflow.run_id != run_id:
+            return  # removed, paused or started over since it went to sleep
+        await self.execute_workflow(workflow_id, resume=True)
+
     async def pause_workflow(self, workflow_id: str) -> bool:
-        """Pause a running workflow"""
+        """Pause a running or waiting workflow"""
         try:
-            if workflow_id in self.workflows:
-                workflow = self.workflows[workflow_id]
-                if workflow.status == WorkflowStatus.RUNNING:
-                    workflow.status = WorkflowStatus.PAUSED
-                    return True
+            workflow = self.store.get(workflow_id)
+            if workflow is not None and workflow.status in (WorkflowStatus.RUNNING, WorkflowStatus.WAITING):
+                self.store.set_status(workflow, WorkflowStatus.PAUSED)
+                return True
             return False
         except Exception as e:
             logger.error(f"Error pausing workflow: {str(e)}")
             return False
-    
-    async def resume_workflow(self, workflow_id: str) -> bool:
-        """Resume a paused workflow"""
+
+    async def resume_workflow(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        """Resume a paused or failed workflow from its first incomplete step"""
         try:
-            if workflow_id in self.workflows:
-                workflow = self.workflows[workflow_id]
-                if workflow.status == WorkflowStatus.PAUSED:
-                    workflow.status = WorkflowStatus.RUNNING
-                    # Resume from current step
-                    await self.execute_workflow(workflow_id)
-                    return True
-            return False
+            workflow = self.store.get(workflow_id)
+            if workflow is not None and workflow.status in (WorkflowStatus.PAUSED, WorkflowStatus.FAILED):
+                return await self.execute_workflow(workflow_id, resume=True)
+            return None
         except Exception as e:
             logger.error(f"Error resuming workflow: {str(e)}")
-            return False
-    
-    async def list_workflows(self) -> List[Dict[str, Any]]:
-        """List all workflows"""
-        return [workflow.to_dict() for workflow in self.workflows.values()]
-    
+            return None
+
+    async def list_workflows(self, status: Optional[str] = None, trigger_type: Optional[str] = None,
+                             offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """List workflows, newest last, one page at a time"""
+        workflows, total = self.store.query(
+            status=WorkflowStatus(status) if status else None,
+            trigger_type=trigger_type,
+            offset=offset,
+            limit=limit
+        )
+        return {
+            "workflows": [workflow.to_dict() for workflow in workflows],
+            "total": total,
+            "offset": offset,
+            "limit": limit
+        }
+
     async def get_workflow_status(self, workflow_id: str) -> Optional[Dict[str, Any]]:
         """Get status of a specific workflow"""
-        if workflow_id in self.workflows:
-            return self.workflows[workflow_id].to_dict()
-        return None
-    
+        workflow = self.store.get(workflow_id)
+        return workflow.to_dict() if workflow is not None else None
+
     async def get_status(self) -> Dict[str, Any]:
         """Get overall automation system status"""
-        total_workflows = len(self.workflows)
-        running_workflows = sum(1 for w in self.workflows.values() 
-                              if w.status == WorkflowStatus.RUNNING)
-        completed_workflows = sum(1 for w in self.workflows.values() 
-                                if w.status == WorkflowStatus.COMPLETED)
-        failed_workflows = sum(1 for w in self.workflows.values() 
-                             if w.status == WorkflowStatus.FAILED)
-        
         return {
-            "total_workflows": total_workflows,
-            "running": running_workflows,
-            "completed": completed_workflows,
-            "failed": failed_workflows,
-            "scheduled": len(self.running_workflows),
+            "total_workflows": len(self.store),
+            "running": self.store.count(WorkflowStatus.RUNNING),
+            "completed": self.store.count(WorkflowStatus.COMPLETED),
+            "failed": self.store.count(WorkflowStatus.FAILED),
+            "waiting": self.store.count(WorkflowStatus.WAITING),
+            "scheduled": len(self.scheduler),
+            "scheduler": self.scheduler.get_stats(),
+            "step_cache": self.step_cache.get_stats(),
+            "events": self.events.get_stats(),
+            "queued_triggered_runs": sum(len(queue) for queue in self._trigger_queues.values()),
             "system_status": "healthy"
         }
+
+    async def close(self):
+        """Stop the scheduler and the runs it dispatched"""
+        await self.scheduler.stop()
+        tasks = list(self._background)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.store.backend.close()
+        self.step_cache.close()
+
+
+_workflow_engine: Optional[WorkflowAutomation] = None
+
+
+def get_workflow_engine() -> WorkflowAutomation:
+    """Get the process-wide workflow engine (created on first use)"""
+    global _workflow_engine
+    if _workflow_engine is None:
+        if settings.WORKFLOW_STORE == "sqlite":
+            schedule_store = SQLiteScheduleStore(settings.WORKFLOW_DB_PATH)
+            backend = SQLiteWorkflowBackend(settings.WORKFLOW_DB_PATH)
+            step_cache = SQLiteStepCache(settings.WORKFLOW_DB_PATH, settings.WORKFLOW_CACHE_MAX_ENTRIES)
+        else:
+            schedule_store, backend = InMemoryScheduleStore(), InMemoryWorkflowBackend()
+            step_cache = InMemoryStepCache(settings.WORKFLOW_CACHE_MAX_ENTRIES)
+        _workflow_engine = WorkflowAutomation(CoreAIAgent(), schedule_store=schedule_store,
+                                              backend=backend, step_cache=step_cache)
+    return _workflow_engine
+
+
+async def close_workflow_engine():
+    global _workflow_engine
+    if _workflow_engine is not None:
+        await _workflow_engine.close()
+        _workflow_engine = None
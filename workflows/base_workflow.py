@@ -9,6 +9,8 @@ from enum import Enum
 import structlog
 import asyncio
 
+from .dag import resolve_dependencies, run_dag
+
 logger = structlog.get_logger(__name__)
 
 
@@ -31,6 +33,8 @@ class WorkflowStep(BaseModel):
     result: Optional[Any] = None
     error: Optional[str] = None
     metadata: Dict[str, Any] = Field(default_factory=dict)
+    # None: after the previous step; []: can start immediately
+    depends_on: Optional[List[str]] = None
 
 
 class WorkflowResult(BaseModel):
@@ -50,8 +54,13 @@ class BaseWorkflow(ABC):
     
     This provides a common interface for workflows that orchestrate
     multiple steps and tools to accomplish complex tasks.
+    
+    Steps run as a dependency graph: steps whose ``depends_on`` are met
+    run concurrently, at most ``max_concurrency`` at a time.
     """
     
+    max_concurrency: int = 4
+    
     def __init__(self, workflow_id: str, name: str, description: str):
         self.workflow_id = workflow_id
         self.name = name
@@ -106,6 +115,12 @@ class BaseWorkflow(ABC):
             # Define workflow steps
             self.steps = await self.define_steps(**kwargs)
             
+            dependencies = resolve_dependencies(
+                [step.step_id for step in self.steps],
+                [step.depends_on for step in self.steps]
+            )
+            steps_by_id = {step.step_id: i for i, step in enumerate(self.steps)}
+            
             # Execution context
             context = {
                 "workflow_id": self.workflow_id,
@@ -113,8 +128,9 @@ class BaseWorkflow(ABC):
                 "step_results": {}
             }
             
-            # Execute steps sequentially
-            for step in self.steps:
+            async def run_step(step_id: str) -> bool:
+                step_index = steps_by_id[step_id]
+                step = self.steps[step_index]
                 try:
                     step.status = WorkflowStatus.RUNNING
                     self.logger.info(f"Executing step: {step.name}")
@@ -123,22 +139,22 @@ class BaseWorkflow(ABC):
                     updated_step = await self.execute_step(step, context)
                     
                     # Update step in list
-                    step_index = next(i for i, s in enumerate(self.steps) if s.step_id == step.step_id)
                     self.steps[step_index] = updated_step
                     
                     # Add result to context
                     context["step_results"][step.step_id] = updated_step.result
                     
-                    if updated_step.status == WorkflowStatus.FAILED:
-                        self.status = WorkflowStatus.FAILED
-                        break
+                    return updated_step.status != WorkflowStatus.FAILED
                         
                 except Exception as e:
                     step.status = WorkflowStatus.FAILED
                     step.error = str(e)
-                    self.status = WorkflowStatus.FAILED
                     self.logger.error(f"Step {step.name} failed: {str(e)}")
-                    break
+                    return False
+            
+            # Independent steps run concurrently
+            if not await run_dag(dependencies, run_step, self.max_concurrency):
+                self.status = WorkflowStatus.FAILED
             
             # Determine final status
             if self.status != WorkflowStatus.FAILED:
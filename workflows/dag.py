@@ -0,0 +1,139 @@
+"""
+Dependency graphs for workflow steps
+
+A step runs once every step it depends on has completed. A step that does
+not declare ``depends_on`` depends on the step before it, so workflows
+written as plain lists keep running in order; ``depends_on: []`` makes a
+step a root that can start immediately. Independent steps run
+concurrently, up to a per-workflow limit.
+"""
+
+import asyncio
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Callable, Awaitable
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class CycleError(ValueError):
+    """The step dependencies contain a cycle"""
+
+    def __init__(self, step_ids: Sequence[str]):
+        self.step_ids = list(step_ids)
+        super().__init__(f"Step dependencies contain a cycle involving: {', '.join(self.step_ids)}")
+
+
+def resolve_dependencies(step_ids: Sequence[str],
+                         declared: Sequence[Optional[Sequence[str]]]) -> Dict[str, List[str]]:
+    """
+    Dependencies per step, in declaration order
+
+    ``declared[i]`` is step i's ``depends_on`` (None: the previous step).
+    Raises ValueError for duplicate ids or unknown dependencies and
+    CycleError when the graph is not acyclic.
+    """
+    if len(set(step_ids)) != len(step_ids):
+        raise ValueError("Step ids must be unique")
+
+    known = set(step_ids)
+    dependencies: Dict[str, List[str]] = {}
+    for i, (step_id, depends_on) in enumerate(zip(step_ids, declared)):
+        if depends_on is None:
+            depends_on = [step_ids[i - 1]] if i else []
+        unknown = [dep for dep in depends_on if dep not in known]
+        if unknown:
+            raise ValueError(f"Step {step_id} depends on unknown steps: {', '.join(unknown)}")
+        dependencies[step_id] = list(dict.fromkeys(depends_on))
+
+    topological_order(dependencies)
+    return dependencies
+
+
+def topological_order(dependencies: Dict[str, List[str]]) -> List[str]:
+    """Kahn's algorithm; raises CycleError if some steps can never become ready"""
+    waiting = {step_id: len(deps) for step_id, deps in dependencies.items()}
+    dependents: Dict[str, List[str]] = {step_id: [] for step_id in dependencies}
+    for step_id, deps in dependencies.items():
+        for dep in deps:
+            dependents[dep].append(step_id)
+
+    ready = deque(step_id for step_id, count in waiting.items() if count == 0)
+    order = []
+    while ready:
+        step_id = ready.popleft()
+        order.append(step_id)
+        for dependent in dependents[step_id]:
+            waiting[dependent] -= 1
+            if waiting[dependent] == 0:
+                ready.append(dependent)
+
+    if len(order) != len(dependencies):
+        raise CycleError([step_id for step_id, count in waiting.items() if count > 0])
+    return order
+
+
+async def run_dag(dependencies: Dict[str, List[str]],
+                  run_step: Callable[[str], Awaitable[Optional[bool]]],
+                  max_concurrency: int = 4,
+                  should_stop: Optional[Callable[[], bool]] = None) -> bool:
+    """
+    Run every step once its dependencies have succeeded
+
+    ``run_step`` returns True on success, False on failure and None when
+    the step is parked (its dependents stay blocked but other branches
+    carry on). After the first failure (or once ``should_stop()`` is true)
+    no new steps are started; steps already running are allowed to finish.
+    Returns True when every step ran and succeeded.
+    """
+    waiting = {step_id: len(deps) for step_id, deps in dependencies.items()}
+    dependents: Dict[str, List[str]] = {step_id: [] for step_id in dependencies}
+    for step_id, deps in dependencies.items():
+        for dep in deps:
+            dependents[dep].append(step_id)
+
+    ready = deque(step_id for step_id, count in waiting.items() if count == 0)
+    running: Dict[asyncio.Future, str] = {}
+    succeeded = 0
+    failed = False
+    error: Optional[BaseException] = None
+
+    try:
+        while ready or running:
+            if should_stop is not None and should_stop():
+                ready.clear()
+            while ready and not failed and len(running) < max(1, max_concurrency):
+                step_id = ready.popleft()
+                running[asyncio.ensure_future(run_step(step_id))] = step_id
+            if not running:
+                break
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                step_id = running.pop(task)
+                try:
+                    ok = task.result()
+                except Exception as e:
+                    logger.error(f"Step {step_id} raised: {str(e)}")
+                    error = error or e
+                    ok = False
+
+                if ok is None:
+                    continue
+                if not ok:
+                    failed = True
+                    continue
+                succeeded += 1
+                for dependent in dependents[step_id]:
+                    waiting[dependent] -= 1
+                    if waiting[dependent] == 0:
+                        ready.append(dependent)
+    finally:
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+    if error is not None:
+        raise error
+    return not failed and succeeded == len(dependencies)
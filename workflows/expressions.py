@@ -0,0 +1,245 @@
+"""
+Safe expressions for workflow conditions
+
+Condition steps used to ``eval`` user-provided strings. Expressions are now
+parsed with ``ast``, checked against a small whitelist (literals, names,
+comparisons, boolean and arithmetic operators, indexing, a few builtins)
+and compiled once into a tree of closures. Compiled expressions are cached
+by their text, so a scheduled workflow re-evaluating the same condition
+never re-parses it.
+
+Names resolve against the evaluation namespace only (for workflows:
+``parameters``, ``step_results`` and ``workflow_id``). ``a.b`` on a dict
+reads key ``b``; real attribute access is never performed.
+"""
+
+import ast
+import operator
+from functools import lru_cache
+from typing import Any, Callable, Dict, Mapping
+
+Evaluator = Callable[[Mapping[str, Any]], Any]
+
+MAX_EXPRESSION_LENGTH = 2000
+# Largest string or list (in characters / items) that ``*`` and ``+`` may build
+MAX_SEQUENCE_LENGTH = 100000
+
+
+class ExpressionError(ValueError):
+    """An expression is invalid, uses a forbidden construct or failed to evaluate"""
+
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod
+}
+
+_UNARY_OPS = {
+    ast.Not: operator.not_,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos
+}
+
+_COMPARE_OPS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not
+}
+
+
+def _get(container: Any, key: Any, default: Any = None) -> Any:
+    try:
+        return container[key]
+    except (KeyError, IndexError, TypeError):
+        return default
+
+
+FUNCTIONS: Dict[str, Callable] = {
+    "len": len,
+    "min": min,
+    "max": max,
+    "abs": abs,
+    "round": round,
+    "int": int,
+    "float": float,
+    "str": str,
+    "bool": bool,
+    "lower": lambda value: str(value).lower(),
+    "upper": lambda value: str(value).upper(),
+    "get": _get
+}
+
+
+_SEQUENCES = (str, bytes, list, tuple)
+
+
+def _check_length(length: int):
+    if length > MAX_SEQUENCE_LENGTH:
+        raise ExpressionError(f"Result would have {length} items (max {MAX_SEQUENCE_LENGTH})")
+
+
+def _checked_mul(left: Any, right: Any) -> Any:
+    """Multiplication that refuses to build huge strings or lists"""
+    for sequence, count in ((left, right), (right, left)):
+        if isinstance(sequence, _SEQUENCES) and isinstance(count, int):
+            # The result size, not the multiplier: ("ab" * 10000) * 10000 must fail too
+            _check_length(len(sequence) * max(count, 0))
+    return left * right
+
+
+def _checked_add(left: Any, right: Any) -> Any:
+    """Addition that refuses to build huge strings or lists"""
+    if isinstance(left, _SEQUENCES) and isinstance(right, _SEQUENCES):
+        _check_length(len(left) + len(right))
+    return left + right
+
+
+_CHECKED_OPS = {ast.Mult: _checked_mul, ast.Add: _checked_add}
+
+
+def _compile_node(node: ast.AST) -> Evaluator:
+    if isinstance(node, ast.Expression):
+        return _compile_node(node.body)
+
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return lambda ns: value
+
+    if isinstance(node, ast.Name):
+        name = node.id
+
+        def load(ns):
+            try:
+                return ns[name]
+            except KeyError:
+                raise ExpressionError(f"Unknown name: {name}")
+        return load
+
+    if isinstance(node, ast.Attribute):
+        target = _compile_node(node.value)
+        attr = node.attr
+
+        def attribute(ns):
+            value = target(ns)
+            if isinstance(value, Mapping) and attr in value:
+                return value[attr]
+            raise ExpressionError(f"No field '{attr}'")
+        return attribute
+
+    if isinstance(node, ast.Subscript):
+        target = _compile_node(node.value)
+        index = _compile_node(node.slice)
+
+        def subscript(ns):
+            try:
+                return target(ns)[index(ns)]
+            except (KeyError, IndexError, TypeError) as e:
+                raise ExpressionError(f"Lookup failed: {e}")
+        return subscript
+
+    if isinstance(node, ast.BoolOp):
+        operands = [_compile_node(value) for value in node.values]
+        if isinstance(node.op, ast.And):
+            def and_(ns):
+                result = True
+                for operand in operands:
+                    result = operand(ns)
+                    if not result:
+                        return result
+                return result
+            return and_
+
+        def or_(ns):
+            result = False
+            for operand in operands:
+                result = operand(ns)
+                if result:
+                    return result
+            return result
+        return or_
+
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        op = _UNARY_OPS[type(node.op)]
+        operand = _compile_node(node.operand)
+        return lambda ns: op(operand(ns))
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        op = _CHECKED_OPS.get(type(node.op)) or _BIN_OPS[type(node.op)]
+        left, right = _compile_node(node.left), _compile_node(node.right)
+        return lambda ns: op(left(ns), right(ns))
+
+    if isinstance(node, ast.Compare):
+        if not all(type(op) in _COMPARE_OPS for op in node.ops):
+            raise ExpressionError("Unsupported comparison")
+        left = _compile_node(node.left)
+        comparisons = [(_COMPARE_OPS[type(op)], _compile_node(right))
+                       for op, right in zip(node.ops, node.comparators)]
+
+        def compare(ns):
+            current = left(ns)
+            for op, right in comparisons:
+                value = right(ns)
+                if not op(current, value):
+                    return False
+                current = value
+            return True
+        return compare
+
+    if isinstance(node, ast.IfExp):
+        test, body, orelse = _compile_node(node.test), _compile_node(node.body), _compile_node(node.orelse)
+        return lambda ns: body(ns) if test(ns) else orelse(ns)
+
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        items = [_compile_node(item) for item in node.elts]
+        kind = {ast.List: list, ast.Tuple: tuple, ast.Set: set}[type(node)]
+        return lambda ns: kind(item(ns) for item in items)
+
+    if isinstance(node, ast.Dict):
+        if any(key is None for key in node.keys):
+            raise ExpressionError("Dict unpacking is not allowed")
+        pairs = [(_compile_node(key), _compile_node(value)) for key, value in zip(node.keys, node.values)]
+        return lambda ns: {key(ns): value(ns) for key, value in pairs}
+
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+            raise ExpressionError("Only the built-in functions "
+                                  f"{', '.join(sorted(FUNCTIONS))} can be called, with positional arguments")
+        func = FUNCTIONS[node.func.id]
+        args = [_compile_node(arg) for arg in node.args]
+        return lambda ns: func(*[arg(ns) for arg in args])
+
+    raise ExpressionError(f"Unsupported expression element: {type(node).__name__}")
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(expression: str) -> Evaluator:
+    """Parse and compile ``expression`` once; raises ExpressionError if it is not allowed"""
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError("Expression is too long")
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid expression: {e.msg}")
+    return _compile_node(tree)
+
+
+def evaluate(expression: str, namespace: Mapping[str, Any]) -> Any:
+    """Evaluate a (cached) compiled expression against ``namespace``"""
+    evaluator = compile_expression(expression)
+    try:
+        return evaluator(namespace)
+    except ExpressionError:
+        raise
+    except Exception as e:
+        raise ExpressionError(f"Error evaluating '{expression}': {e}")
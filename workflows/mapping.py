@@ -0,0 +1,361 @@
+"""
+"map" workflow steps: apply a sub-step to every item of a large source
+
+Items are streamed from the source (an inline list, a JSONL file or a
+paged CRM query) through a small bounded queue to ``concurrency`` workers,
+so only a handful of items are in memory at any time. Per-item outcomes
+are appended to an optional JSONL output file as they finish; the step
+itself only keeps running counts, summed aggregates and a short sample of
+errors. When a workflow resumes, items already completed are skipped:
+with an output file it is the record (new lines are appended), without
+one the completed indexes are kept in the step's checkpointed state.
+
+JSONL sources and output files live under ``WORKFLOW_DATA_DIR``; paths
+are relative to it and may not point outside it.
+
+Sub-step parameters (and the source) may contain ``{{ expression }}``
+placeholders, evaluated with the safe expression language over ``item``,
+``index``, ``parameters``, ``step_results`` and ``workflow_id``. A value
+that is exactly one placeholder keeps the expression's type.
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Set, AsyncIterator, Callable, Awaitable, Iterator, Tuple
+import structlog
+
+from config.settings import settings
+from .expressions import compile_expression, evaluate
+
+logger = structlog.get_logger(__name__)
+
+SOURCE_TYPES = ("inline", "jsonl", "crm")
+READ_BATCH = 500
+ERROR_SAMPLE_SIZE = 10
+
+_PLACEHOLDER = re.compile(r"\{\{\s*(.+?)\s*\}\}")
+
+# (index, item) -> (succeeded, result, error)
+ItemWorker = Callable[[int, Any], Awaitable[Tuple[bool, Any, Optional[str]]]]
+
+
+def compile_template(value: Any):
+    """Compile every placeholder in ``value`` (raises ExpressionError early)"""
+    if isinstance(value, str):
+        for expression in _PLACEHOLDER.findall(value):
+            compile_expression(expression)
+    elif isinstance(value, dict):
+        for item in value.values():
+            compile_template(item)
+    elif isinstance(value, list):
+        for item in value:
+            compile_template(item)
+
+
+def render(value: Any, namespace: Dict[str, Any]) -> Any:
+    """Substitute ``{{ expression }}`` placeholders throughout a JSON-like value"""
+    if isinstance(value, str):
+        whole = _PLACEHOLDER.fullmatch(value.strip())
+        if whole:
+            return evaluate(whole.group(1), namespace)
+        return _PLACEHOLDER.sub(lambda match: str(evaluate(match.group(1), namespace)), value)
+    if isinstance(value, dict):
+        return {key: render(item, namespace) for key, item in value.items()}
+    if isinstance(value, list):
+        return [render(item, namespace) for item in value]
+    return value
+
+
+def resolve_data_path(path: str) -> str:
+    """Absolute path of a map source or output file; rejects paths outside WORKFLOW_DATA_DIR"""
+    if not isinstance(path, str) or not path:
+        raise ValueError("map step file paths must be non-empty strings")
+    base = Path(settings.WORKFLOW_DATA_DIR).resolve()
+    resolved = (base / path).resolve()
+    if not resolved.is_relative_to(base):
+        raise ValueError(f"map step path {path!r} is outside the workflow data directory")
+    return str(resolved)
+
+
+def _check_path(path: Any):
+    # Paths built from placeholders are checked when rendered
+    if path is not None and not (isinstance(path, str) and _PLACEHOLDER.search(path)):
+        resolve_data_path(path)
+
+
+def validate_map_step(parameters: Dict[str, Any], step_types: List[str]):
+    """Check a map step's definition when the workflow is created"""
+    source = parameters.get("source")
+    if not isinstance(source, dict) or source.get("type", "inline") not in SOURCE_TYPES:
+        raise ValueError(f"map step needs a source with type one of {', '.join(SOURCE_TYPES)}")
+    sub_step = parameters.get("step")
+    if not isinstance(sub_step, dict):
+        raise ValueError("map step needs a 'step' to apply to each item")
+    sub_type = sub_step.get("type", "agent_task")
+    if sub_type == "map" or sub_type not in step_types:
+        raise ValueError(f"map step cannot apply step type: {sub_type}")
+    compile_template(source)
+    compile_template(sub_step.get("parameters", {}))
+    if source.get("type") == "jsonl":
+        _check_path(source.get("path"))
+    _check_path(parameters.get("output_path"))
+    for expression in (parameters.get("aggregate") or {}).values():
+        compile_expression(expression)
+
+
+def _read_jsonl(path: str) -> Iterator[Any]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+async def iter_source(source: Dict[str, Any]) -> AsyncIterator[Any]:
+    """Stream items from a map source without loading it all"""
+    source_type = source.get("type", "inline")
+
+    if source_type == "inline":
+        for item in source.get("items") or []:
+            yield item
+
+    elif source_type == "jsonl":
+        reader = _read_jsonl(resolve_data_path(source.get("path")))
+        try:
+            while True:
+                # File reads happen off the event loop, a batch at a time
+                batch = await asyncio.to_thread(lambda: list(islice(reader, READ_BATCH)))
+                if not batch:
+                    break
+                for item in batch:
+                    yield item
+        finally:
+            reader.close()
+
+    elif source_type == "crm":
+        from tools.crm_records import query_records
+
+        page_size = int(source.get("page_size", READ_BATCH))
+        offset = 0
+        while True:
+            page = await asyncio.to_thread(
+                query_records, source.get("query_type", "leads"), source.get("filters") or {}, page_size, offset
+            )
+            for item in page:
+                yield item
+            if len(page) < page_size:
+                break
+            offset += page_size
+
+    else:
+        raise ValueError(f"Unknown map source type: {source_type}")
+
+
+class CompletedIndexes:
+    """
+    Set of completed item indexes, kept small for mostly in-order completion
+
+    Everything below ``low`` is completed; only indexes finished ahead of a
+    gap (items still running, or failed) are stored individually.
+    """
+
+    def __init__(self, low: int = 0, ahead: Optional[List[int]] = None):
+        self.low = low
+        self.ahead: Set[int] = set(ahead or ())
+
+    def add(self, index: int):
+        if index < self.low:
+            return
+        self.ahead.add(index)
+        while self.low in self.ahead:
+            self.ahead.discard(self.low)
+            self.low += 1
+
+    def __contains__(self, index: int) -> bool:
+        return index < self.low or index in self.ahead
+
+    def __len__(self) -> int:
+        return self.low + len(self.ahead)
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"low": self.low, "ahead": sorted(self.ahead)}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "CompletedIndexes":
+        return cls(int(state.get("low", 0)), state.get("ahead"))
+
+
+class MapRun:
+    """
+    Counts, aggregates and the output file of one map step execution
+
+    With ``resume`` an existing output file is kept: items it records as
+    completed are counted again (not re-run) and new lines are appended.
+    Without an output file, ``state`` (from ``state()`` of the interrupted
+    run) gives the completed items and their aggregates instead. Failed
+    items are retried; the last line for an index is its outcome.
+    """
+
+    def __init__(self, output_path: Optional[str] = None, aggregate: Optional[Dict[str, str]] = None,
+                 max_failures: Optional[int] = None, resume: bool = False,
+                 state: Optional[Dict[str, Any]] = None):
+        self.output_path = resolve_data_path(output_path) if output_path else None
+        self.aggregate_expressions = aggregate or {}
+        self.max_failures = max_failures
+        self.processed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.aggregates: Dict[str, float] = {name: 0 for name in self.aggregate_expressions}
+        self.errors: List[Dict[str, Any]] = []
+        self.completed = CompletedIndexes()
+        self.started = time.monotonic()
+        self._output = None
+        if not self.output_path and resume and state:
+            self.completed = CompletedIndexes.from_state(state["completed"])
+            self.processed = self.succeeded = len(self.completed)
+            self.aggregates.update(state.get("aggregates") or {})
+            logger.info(f"Map step state already has {len(self.completed)} completed items")
+        if self.output_path:
+            resume = resume and os.path.exists(self.output_path)
+            if resume:
+                self._replay()
+            else:
+                os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+            self._output = open(self.output_path, "a" if resume else "w", encoding="utf-8")
+            if resume and self._output.tell() and not self._ends_with_newline():
+                self._output.write("\n")  # the previous run stopped mid-line
+
+    def _replay(self):
+        with open(self.output_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                index = entry.get("index")
+                if entry.get("status") != "completed" or not isinstance(index, int) or index in self.completed:
+                    continue
+                self.completed.add(index)
+                self._count_success(index, entry.get("item"), entry.get("result"))
+        logger.info(f"Map output {self.output_path} already has {len(self.completed)} completed items")
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.output_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _count_success(self, index: int, item: Any, result: Any):
+        self.processed += 1
+        self.succeeded += 1
+        for name, expression in self.aggregate_expressions.items():
+            try:
+                self.aggregates[name] += evaluate(expression, {"item": item, "result": result}) or 0
+            except Exception as e:
+                logger.warning(f"Aggregate {name} skipped item {index}: {str(e)}")
+
+    @property
+    def aborted(self) -> bool:
+        return self.max_failures is not None and self.failed > self.max_failures
+
+    def state(self) -> Optional[Dict[str, Any]]:
+        """What a resumed run needs when there is no output file to replay"""
+        if self.output_path:
+            return None
+        return {"completed": self.completed.to_state(), "aggregates": dict(self.aggregates)}
+
+    def record(self, index: int, item: Any, succeeded: bool, result: Any, error: Optional[str]):
+        if succeeded:
+            self._count_success(index, item, result)
+            if not self.output_path:
+                self.completed.add(index)
+        else:
+            self.processed += 1
+            self.failed += 1
+            if len(self.errors) < ERROR_SAMPLE_SIZE:
+                self.errors.append({"index": index, "error": error})
+
+        if self._output is not None:
+            line = {"index": index, "item": item, "status": "completed" if succeeded else "failed"}
+            if succeeded:
+                line["result"] = result
+            else:
+                line["error"] = error
+            self._output.write(json.dumps(line, default=str) + "\n")
+
+    def progress(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        return {
+            "processed": self.processed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "items_per_second": round(self.processed / elapsed, 1) if elapsed > 0 else 0.0
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            **self.progress(),
+            "aggregates": self.aggregates,
+            "errors_sample": self.errors,
+            "output_path": self.output_path,
+            "aborted": self.aborted
+        }
+
+    def close(self):
+        if self._output is not None:
+            self._output.close()
+            self._output = None
+
+
+async def run_map(items: AsyncIterator[Any], worker: ItemWorker, run: MapRun, concurrency: int = 8,
+                  on_progress: Optional[Callable[[MapRun], None]] = None, progress_every: int = 100):
+    """
+    Feed ``items`` to ``concurrency`` workers through a bounded queue
+
+    Stops pulling new items once ``run.aborted`` (too many failures).
+    ``on_progress`` is called every ``progress_every`` items and at the end.
+    """
+    concurrency = max(1, concurrency)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def produce():
+        index = 0
+        async for item in items:
+            if run.aborted:
+                break
+            if index not in run.completed:
+                await queue.put((index, item))
+            index += 1
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def consume():
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            index, item = entry
+            if run.aborted:
+                continue
+            try:
+                succeeded, result, error = await worker(index, item)
+            except Exception as e:
+                succeeded, result, error = False, None, str(e)
+            run.record(index, item, succeeded, result, error)
+            if on_progress is not None and run.processed % progress_every == 0:
+                on_progress(run)
+
+    producer = asyncio.ensure_future(produce())
+    consumers = [asyncio.ensure_future(consume()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(producer, *consumers)
+    finally:
+        for task in [producer, *consumers]:
+            task.cancel()
+        run.close()
+    if on_progress is not None:
+        on_progress(run)
@@ -0,0 +1,149 @@
+"""
+Memoized workflow step results
+
+Steps that opt in with ``cache_ttl`` (seconds) store their successful
+result under a key built from the step type, its effective inputs (agent
+type, task text, a canonical hash of the context, or the data operation)
+and the prompt version. A later run with the same inputs within the TTL
+reuses the stored result instead of calling the agent again.
+"""
+
+import copy
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from pydantic import BaseModel
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+def canonical_hash(value: Any) -> str:
+    """Stable hash of a JSON-like value (key order and whitespace independent)"""
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def step_cache_key(step_type: str, inputs: Dict[str, Any], prompt_version: str) -> str:
+    return canonical_hash({"step_type": step_type, "inputs": inputs, "prompt_version": prompt_version})
+
+
+class CachedResult(BaseModel):
+    """A stored step result and what it cost to compute"""
+    result: Any
+    tokens: int = 0
+    stored_at: float
+    expires_at: float
+
+
+class _CacheStats:
+    def __init__(self):
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "tokens_saved": 0}
+
+    def _record_hit(self, cached: CachedResult):
+        self.stats["hits"] += 1
+        self.stats["tokens_saved"] += cached.tokens
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "entries": len(self),
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0
+        }
+
+
+class InMemoryStepCache(_CacheStats):
+    """
+    LRU of step results in process memory
+
+    Results are deep-copied in and out, so a run that changes its step
+    result never changes what later runs get from the cache.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        cached = self._entries.get(key)
+        if cached is None or cached.expires_at <= time.time():
+            if cached is not None:
+                del self._entries[key]
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self._record_hit(cached)
+        return cached.model_copy(update={"result": copy.deepcopy(cached.result)})
+
+    def put(self, key: str, result: Any, ttl: float, tokens: int = 0):
+        now = time.time()
+        self._entries[key] = CachedResult(result=copy.deepcopy(result), tokens=tokens,
+                                          stored_at=now, expires_at=now + ttl)
+        self._entries.move_to_end(key)
+        self.stats["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def close(self):
+        pass
+
+
+class SQLiteStepCache(_CacheStats):
+    """Step results in a SQLite file, so memoization survives restarts"""
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        super().__init__()
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS step_cache ("
+            "cache_key TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS step_cache_expires_at ON step_cache (expires_at)")
+        self.conn.commit()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM step_cache").fetchone()[0]
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        row = self.conn.execute(
+            "SELECT data FROM step_cache WHERE cache_key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        cached = CachedResult.model_validate_json(row[0])
+        self._record_hit(cached)
+        return cached
+
+    def put(self, key: str, result: Any, ttl: float, tokens: int = 0):
+        now = time.time()
+        cached = CachedResult(result=result, tokens=tokens, stored_at=now, expires_at=now + ttl)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO step_cache (cache_key, data, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(cached.model_dump(), default=str), cached.expires_at)
+        )
+        self.stats["stores"] += 1
+        if self.stats["stores"] % 100 == 0:
+            self._prune(now)
+        self.conn.commit()
+
+    def _prune(self, now: float):
+        """Drop expired entries, then the soonest-to-expire beyond ``max_entries``"""
+        self.conn.execute("DELETE FROM step_cache WHERE expires_at <= ?", (now,))
+        self.conn.execute(
+            "DELETE FROM step_cache WHERE cache_key IN ("
+            "SELECT cache_key FROM step_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,149 @@
+"""
+Direct dispatch of workflow data_operation steps to tools
+
+A data_operation step names an ``operation`` on a ``target`` with
+structured ``data``. Instead of describing that to the LLM, the step is
+mapped to the tool that performs it, its arguments are validated against
+the tool's input schema and the tool is called directly. Steps that set
+``use_agent: true`` keep going through the agent.
+
+The tools are the plain functions behind the agent's langchain tools
+(``tools.crm_records``, ``tools.data_management``), so direct dispatch
+works without langchain installed. If a tool module cannot be imported
+the step falls back to the agent.
+"""
+
+import asyncio
+import importlib
+import time
+from typing import Dict, Any, Tuple, Callable, Type
+from pydantic import BaseModel, ValidationError
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# A tool: (module, function, input schema, name)
+ToolSpec = Tuple[str, str, str, str]
+
+# (target, operation) -> tool; arguments are the step's data
+CRM_OPERATIONS: Dict[Tuple[str, str], ToolSpec] = {
+    ("crm", "query"): ("tools.crm_records", "query_crm", "CRMQueryInput", "crm_query"),
+    ("crm", "update"): ("tools.crm_records", "update_crm_record", "CRMUpdateInput", "crm_update"),
+    ("crm", "create"): ("tools.crm_records", "create_crm_record", "CRMCreateRecordInput", "crm_create"),
+}
+
+# Operations on any data source; the target becomes the tool's data_source
+DATA_MANAGEMENT_OPERATIONS = ("clean", "validate", "merge", "backup")
+DATA_MANAGEMENT_TOOL: ToolSpec = ("tools.data_management", "manage_data", "DataManagementInput", "manage_data")
+
+
+class ToolUnavailable(RuntimeError):
+    """The module behind a tool could not be imported"""
+
+
+class DirectTool:
+    """A tool function with its input schema"""
+
+    def __init__(self, name: str, func: Callable[..., str], args_schema: Type[BaseModel]):
+        self.name = name
+        self.func = func
+        self.args_schema = args_schema
+
+    def run(self, arguments: Dict[str, Any]) -> str:
+        return self.func(**arguments)
+
+
+_tools: Dict[ToolSpec, DirectTool] = {}
+
+
+def resolve_operation(operation: str, target: str) -> ToolSpec:
+    """The tool that performs ``operation`` on ``target``"""
+    tool = CRM_OPERATIONS.get((target, operation))
+    if tool is None and operation in DATA_MANAGEMENT_OPERATIONS:
+        tool = DATA_MANAGEMENT_TOOL
+    if tool is None:
+        supported = [f"{op} on {tgt}" for tgt, op in CRM_OPERATIONS] + list(DATA_MANAGEMENT_OPERATIONS)
+        raise ValueError(
+            f"No tool for {operation} on {target} (supported: {', '.join(supported)}); "
+            f"set use_agent to hand the step to the agent"
+        )
+    return tool
+
+
+def build_arguments(operation: str, target: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    if (target, operation) in CRM_OPERATIONS:
+        return dict(data)
+    return {"operation": operation, "data_source": target, "parameters": dict(data)}
+
+
+def get_tool(spec: ToolSpec) -> DirectTool:
+    """
+    Load a tool once and reuse it
+
+    Raises ToolUnavailable when its module cannot be imported and
+    ValueError when the module lacks the function or schema.
+    """
+    tool = _tools.get(spec)
+    if tool is None:
+        module_name, function_name, schema_name, name = spec
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError as e:
+            raise ToolUnavailable(f"Tool {name} is unavailable: {str(e)}") from e
+        try:
+            tool = DirectTool(name, getattr(module, function_name), getattr(module, schema_name))
+        except AttributeError as e:
+            raise ValueError(f"Tool {name} is misconfigured: {str(e)}")
+        _tools[spec] = tool
+    return tool
+
+
+def validate_data_operation(parameters: Dict[str, Any]):
+    """Check a data_operation step when the workflow is created"""
+    if parameters.get("use_agent"):
+        return
+    operation = parameters.get("operation", "query")
+    target = parameters.get("target", "crm")
+    try:
+        get_tool(resolve_operation(operation, target))
+    except ToolUnavailable as e:
+        logger.warning(f"{str(e)}; {operation} on {target} steps will go through the agent")
+
+
+def _validate_arguments(tool, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        return tool.args_schema.model_validate(arguments).model_dump()
+    except ValidationError as e:
+        problems = "; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or 'data'}: {error['msg']}" for error in e.errors()
+        )
+        raise ValueError(f"Invalid arguments for {tool.name}: {problems}")
+
+
+async def run_data_operation(operation: str, target: str, data: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """
+    Call the tool for a data operation with validated arguments
+
+    Returns the step result and whether it succeeded. Invalid arguments
+    raise ValueError and a tool that cannot be loaded ToolUnavailable. The
+    tools report their own failures as text starting with "Error".
+    """
+    tool = get_tool(resolve_operation(operation, target))
+    arguments = _validate_arguments(tool, build_arguments(operation, target, data))
+
+    started = time.perf_counter()
+    # Tools are synchronous (and may call external APIs), so keep them off the event loop
+    output = await asyncio.to_thread(tool.run, arguments)
+    success = not str(output).startswith("Error")
+    duration_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    logger.info(f"Data operation {operation} on {target} ran {tool.name} in {duration_ms}ms")
+    return {
+        "success": success,
+        "tool": tool.name,
+        "operation": operation,
+        "target": target,
+        "arguments": arguments,
+        "output": output,
+        "duration_ms": duration_ms
+    }, success
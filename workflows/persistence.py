@@ -0,0 +1,101 @@
+"""
+Durable workflow state: definitions, run status and per-step checkpoints
+
+Each workflow is stored as a snapshot (definition, status, current run)
+and each step's outcome as a checkpoint written the moment the step
+finishes. A resumed or restarted run rebuilds its state from these rows
+and only executes the steps that have not completed.
+"""
+
+import json
+import sqlite3
+from typing import Dict, Any, List, Tuple
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+WorkflowRecord = Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    # Step results come from agents and tools; anything JSON can't encode is stored as text
+    return json.dumps(data, default=str)
+
+
+class InMemoryWorkflowBackend:
+    """Workflow snapshots and checkpoints in process memory"""
+
+    def __init__(self):
+        self._workflows: Dict[str, Dict[str, Any]] = {}
+        self._checkpoints: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def save_workflow(self, workflow_id: str, snapshot: Dict[str, Any]):
+        self._workflows[workflow_id] = snapshot
+
+    def delete_workflow(self, workflow_id: str):
+        self._workflows.pop(workflow_id, None)
+        self._checkpoints.pop(workflow_id, None)
+
+    def save_checkpoint(self, workflow_id: str, step_id: str, checkpoint: Dict[str, Any]):
+        self._checkpoints.setdefault(workflow_id, {})[step_id] = checkpoint
+
+    def clear_checkpoints(self, workflow_id: str):
+        self._checkpoints.pop(workflow_id, None)
+
+    def load_all(self) -> List[WorkflowRecord]:
+        return [(snapshot, dict(self._checkpoints.get(workflow_id, {})))
+                for workflow_id, snapshot in self._workflows.items()]
+
+    def close(self):
+        pass
+
+
+class SQLiteWorkflowBackend:
+    """Workflow snapshots and checkpoints in a SQLite file, shared across restarts"""
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS workflows ("
+            "workflow_id TEXT PRIMARY KEY, data TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS step_checkpoints ("
+            "workflow_id TEXT NOT NULL, step_id TEXT NOT NULL, data TEXT NOT NULL, "
+            "PRIMARY KEY (workflow_id, step_id))"
+        )
+        self.conn.commit()
+
+    def save_workflow(self, workflow_id: str, snapshot: Dict[str, Any]):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO workflows (workflow_id, data) VALUES (?, ?)",
+            (workflow_id, _dumps(snapshot))
+        )
+        self.conn.commit()
+
+    def delete_workflow(self, workflow_id: str):
+        self.conn.execute("DELETE FROM workflows WHERE workflow_id = ?", (workflow_id,))
+        self.conn.execute("DELETE FROM step_checkpoints WHERE workflow_id = ?", (workflow_id,))
+        self.conn.commit()
+
+    def save_checkpoint(self, workflow_id: str, step_id: str, checkpoint: Dict[str, Any]):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO step_checkpoints (workflow_id, step_id, data) VALUES (?, ?, ?)",
+            (workflow_id, step_id, _dumps(checkpoint))
+        )
+        self.conn.commit()
+
+    def clear_checkpoints(self, workflow_id: str):
+        self.conn.execute("DELETE FROM step_checkpoints WHERE workflow_id = ?", (workflow_id,))
+        self.conn.commit()
+
+    def load_all(self) -> List[WorkflowRecord]:
+        checkpoints: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for workflow_id, step_id, data in self.conn.execute(
+                "SELECT workflow_id, step_id, data FROM step_checkpoints"):
+            checkpoints.setdefault(workflow_id, {})[step_id] = json.loads(data)
+        return [(json.loads(data), checkpoints.get(workflow_id, {}))
+                for workflow_id, data in self.conn.execute("SELECT workflow_id, data FROM workflows")]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,476 @@
+"""
+Workflow scheduler: one timer loop over a min-heap of due times
+
+Replaces the per-workflow ``while True: sleep(interval)`` tasks. Every
+schedule is an entry in a heap keyed by its next fire time; a single loop
+sleeps until the earliest one is due, so thousands of schedules cost one
+task. Next fire times are computed from the nominal due time, not from
+when the run actually happened, so schedules do not drift.
+
+Schedules:
+    every_15minutes, every_2hours, every_1days, every_30seconds
+    cron expressions (minute hour day-of-month month day-of-week), in UTC
+    @hourly, @daily, @weekly, @monthly, @yearly
+
+Entries are persisted (memory or SQLite). When the loop finds an entry
+that is overdue by more than the grace period (the process was down or
+the loop was starved), the misfire policy decides what happens:
+``run_once`` coalesces all missed runs into one, ``skip`` drops them and
+``catch_up`` replays each missed run (up to a cap). A per-entry jitter
+spreads schedules that share a due time. The loop reports how late it
+fires (lag).
+
+One-shot entries (``add_once``) fire a single time at a given moment,
+however late the loop gets to them, and are then removed. The workflow
+engine uses them to wake workflows hibernating in a long wait.
+"""
+
+import asyncio
+import heapq
+import sqlite3
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, List, Callable, Awaitable, Set
+from pydantic import BaseModel, Field
+import structlog
+
+from config.settings import settings
+from core.runtime.deadline import no_deadline
+from core.runtime.bulkhead import WORKFLOW, workload
+
+logger = structlog.get_logger(__name__)
+
+MISFIRE_POLICIES = ("run_once", "skip", "catch_up")
+
+# Schedule of entries added with ``add_once``
+ONCE = "once"
+
+_INTERVAL_UNITS = {"seconds": 1, "minutes": 60, "hours": 3600, "days": 86400}
+
+_CRON_MACROS = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *"
+}
+
+_MONTH_NAMES = {name: i + 1 for i, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"])}
+_DAY_NAMES = {name: i for i, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+
+class IntervalSchedule:
+    """Fixed interval, anchored on the previous due time"""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("Schedule interval must be positive")
+        self.seconds = seconds
+
+    def next_after(self, due: float) -> float:
+        return due + self.seconds
+
+    def first_after(self, due: float, now: float) -> float:
+        """First occurrence after ``now`` on this schedule's grid"""
+        if due > now:
+            return due
+        return due + (int((now - due) // self.seconds) + 1) * self.seconds
+
+
+class CronSchedule:
+    """Five-field cron expression evaluated in UTC"""
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {len(fields)}: {expression!r}")
+        self.expression = expression
+        self.minutes = self._parse(fields[0], 0, 59)
+        self.hours = self._parse(fields[1], 0, 23)
+        self.days = self._parse(fields[2], 1, 31)
+        self.months = self._parse(fields[3], 1, 12, _MONTH_NAMES)
+        self.weekdays = {day % 7 for day in self._parse(fields[4], 0, 7, _DAY_NAMES)}
+        # Standard cron: when both day fields are restricted, either may match
+        self._any_day = fields[2] == "*" or fields[4] == "*"
+        self._days_restricted = fields[2] != "*"
+        self._weekdays_restricted = fields[4] != "*"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int, names: Optional[Dict[str, int]] = None) -> Set[int]:
+        def value(text: str) -> int:
+            text = text.lower()
+            if names and text in names:
+                return names[text]
+            number = int(text)
+            if not low <= number <= high:
+                raise ValueError(f"{number} is outside {low}-{high}")
+            return number
+
+        values: Set[int] = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_text = part.split("/", 1)
+                step = int(step_text)
+                if step <= 0:
+                    raise ValueError("Cron step must be positive")
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start_text, end_text = part.split("-", 1)
+                start, end = value(start_text), value(end_text)
+            else:
+                start = value(part)
+                end = high if step > 1 else start
+            if start > end:
+                raise ValueError(f"Invalid cron range: {part}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.weekday() + 1) % 7 in self.weekdays
+        if self._any_day:
+            return day_ok and weekday_ok
+        return (day_ok and self._days_restricted) or (weekday_ok and self._weekdays_restricted)
+
+    def next_after(self, due: float) -> float:
+        dt = datetime.fromtimestamp(due, timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        last_year = dt.year + 5
+        while dt.year <= last_year:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt.timestamp()
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+
+    def first_after(self, due: float, now: float) -> float:
+        return due if due > now else self.next_after(now)
+
+
+def parse_schedule(schedule: str):
+    """Parse a schedule string; raises ValueError if it is not understood"""
+    text = schedule.strip()
+    if text.startswith("every_"):
+        spec = text[len("every_"):]
+        for unit, seconds in _INTERVAL_UNITS.items():
+            if spec.endswith(unit):
+                return IntervalSchedule(int(spec[:-len(unit)]) * seconds)
+        raise ValueError(f"Unknown interval unit in schedule {schedule!r}")
+    return CronSchedule(_CRON_MACROS.get(text.lower(), text))
+
+
+class ScheduleEntry(BaseModel):
+    """A persisted schedule and its next nominal fire time"""
+    schedule_id: str
+    schedule: str
+    next_run: float
+    last_run: Optional[float] = None
+    misfire_policy: str = "run_once"
+    jitter: float = 0.0
+    payload: Dict[str, Any] = Field(default_factory=dict)
+
+    @property
+    def jitter_offset(self) -> float:
+        """Stable per-entry offset in [0, jitter) so equal schedules spread out"""
+        if not self.jitter:
+            return 0.0
+        return self.jitter * (zlib.crc32(self.schedule_id.encode("utf-8")) % 1000) / 1000.0
+
+
+class InMemoryScheduleStore:
+    """Schedule storage in process memory"""
+
+    def __init__(self):
+        self._entries: Dict[str, ScheduleEntry] = {}
+
+    def save(self, entry: ScheduleEntry):
+        self._entries[entry.schedule_id] = entry
+
+    def save_many(self, entries: List[ScheduleEntry]):
+        for entry in entries:
+            self.save(entry)
+
+    def delete(self, schedule_id: str):
+        self._entries.pop(schedule_id, None)
+
+    def delete_many(self, schedule_ids: List[str]):
+        for schedule_id in schedule_ids:
+            self.delete(schedule_id)
+
+    def load_all(self) -> List[ScheduleEntry]:
+        return list(self._entries.values())
+
+    def close(self):
+        pass
+
+
+class SQLiteScheduleStore:
+    """Schedule storage in a SQLite file, shared across restarts"""
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS schedules ("
+            "schedule_id TEXT PRIMARY KEY, data TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+    def save(self, entry: ScheduleEntry):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO schedules (schedule_id, data) VALUES (?, ?)",
+            (entry.schedule_id, entry.model_dump_json())
+        )
+        self.conn.commit()
+
+    def save_many(self, entries: List[ScheduleEntry]):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO schedules (schedule_id, data) VALUES (?, ?)",
+            [(entry.schedule_id, entry.model_dump_json()) for entry in entries]
+        )
+        self.conn.commit()
+
+    def delete(self, schedule_id: str):
+        self.conn.execute("DELETE FROM schedules WHERE schedule_id = ?", (schedule_id,))
+        self.conn.commit()
+
+    def delete_many(self, schedule_ids: List[str]):
+        self.conn.executemany("DELETE FROM schedules WHERE schedule_id = ?",
+                              [(schedule_id,) for schedule_id in schedule_ids])
+        self.conn.commit()
+
+    def load_all(self) -> List[ScheduleEntry]:
+        rows = self.conn.execute("SELECT data FROM schedules").fetchall()
+        return [ScheduleEntry.model_validate_json(row[0]) for row in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+ScheduleCallback = Callable[[ScheduleEntry], Awaitable[Any]]
+
+
+class WorkflowScheduler:
+    """
+    Single-loop scheduler over a min-heap of fire times
+
+    Heap items are ``(fire_at, seq, schedule_id, next_run)``; an item whose
+    ``next_run`` no longer matches its entry is stale (the entry was
+    rescheduled or removed) and is dropped when popped.
+    """
+
+    def __init__(self, store=None, callback: Optional[ScheduleCallback] = None,
+                 misfire_grace: float = None, max_catch_up: int = None):
+        self.store = store or InMemoryScheduleStore()
+        self.callback = callback
+        self.misfire_grace = misfire_grace if misfire_grace is not None else settings.SCHEDULER_MISFIRE_GRACE
+        self.max_catch_up = max_catch_up if max_catch_up is not None else settings.SCHEDULER_MAX_CATCH_UP
+        self._entries: Dict[str, ScheduleEntry] = {}
+        self._schedules: Dict[str, Any] = {}
+        self._heap: List[tuple] = []
+        self._seq = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._dispatches: Set[asyncio.Task] = set()
+        self.stats = {"fired": 0, "skipped": 0, "caught_up": 0, "failed": 0,
+                      "lag_last": 0.0, "lag_max": 0.0, "lag_avg": 0.0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, schedule_id: str) -> bool:
+        return schedule_id in self._entries
+
+    def load(self) -> List[ScheduleEntry]:
+        """Load persisted entries into the heap (call before ``start``)"""
+        entries = []
+        for entry in self.store.load_all():
+            try:
+                self._track(entry, None if entry.schedule == ONCE else parse_schedule(entry.schedule))
+                entries.append(entry)
+            except ValueError as e:
+                logger.error(f"Dropping invalid schedule {entry.schedule_id}: {str(e)}")
+                self.store.delete(entry.schedule_id)
+        if entries:
+            logger.info(f"Loaded {len(entries)} persisted schedules")
+        return entries
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        # The loop and the runs it dispatches outlive whichever request started it
+        with no_deadline(), workload(WORKFLOW):
+            self._task = asyncio.create_task(self._run())
+        logger.info(f"Workflow scheduler started with {len(self._entries)} schedules")
+
+    async def stop(self):
+        tasks = [task for task in [self._task, *self._dispatches] if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._dispatches.clear()
+        self.store.close()
+
+    def add(self, schedule_id: str, schedule: str, payload: Optional[Dict[str, Any]] = None,
+            misfire_policy: Optional[str] = None, jitter: Optional[float] = None) -> ScheduleEntry:
+        """Add or replace a schedule; raises ValueError for an invalid schedule or policy"""
+        parsed = parse_schedule(schedule)
+        policy = misfire_policy or settings.SCHEDULER_MISFIRE_POLICY
+        if policy not in MISFIRE_POLICIES:
+            raise ValueError(f"Unknown misfire policy {policy!r}; use one of {', '.join(MISFIRE_POLICIES)}")
+
+        now = time.time()
+        entry = ScheduleEntry(
+            schedule_id=schedule_id,
+            schedule=schedule,
+            next_run=parsed.next_after(now),
+            misfire_policy=policy,
+            jitter=settings.SCHEDULER_JITTER if jitter is None else float(jitter),
+            payload=payload or {}
+        )
+        self.store.save(entry)
+        self._track(entry, parsed)
+        self.start()
+        return entry
+
+    def add_once(self, schedule_id: str, run_at: float, payload: Optional[Dict[str, Any]] = None) -> ScheduleEntry:
+        """Fire once at ``run_at`` (epoch seconds), however late; the entry is then removed"""
+        entry = ScheduleEntry(schedule_id=schedule_id, schedule=ONCE, next_run=run_at, payload=payload or {})
+        self.store.save(entry)
+        self._track(entry, None)
+        self.start()
+        return entry
+
+    def remove(self, schedule_id: str) -> bool:
+        self._schedules.pop(schedule_id, None)
+        if self._entries.pop(schedule_id, None) is None:
+            return False
+        self.store.delete(schedule_id)
+        return True
+
+    def get(self, schedule_id: str) -> Optional[ScheduleEntry]:
+        return self._entries.get(schedule_id)
+
+    def _track(self, entry: ScheduleEntry, parsed):
+        self._entries[entry.schedule_id] = entry
+        self._schedules[entry.schedule_id] = parsed
+        self._push(entry)
+
+    def _push(self, entry: ScheduleEntry):
+        self._seq += 1
+        heapq.heappush(self._heap, (entry.next_run + entry.jitter_offset, self._seq,
+                                    entry.schedule_id, entry.next_run))
+        if self._wakeup is not None and self._heap[0][1] == self._seq:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            fired, finished = [], []
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, _, schedule_id, next_run = heapq.heappop(self._heap)
+                entry = self._entries.get(schedule_id)
+                if entry is None or entry.next_run != next_run:
+                    continue  # stale heap item
+                if entry.schedule == ONCE:
+                    self._fire_once(entry, fire_at, now)
+                    finished.append(schedule_id)
+                else:
+                    self._fire(entry, fire_at, now)
+                    fired.append(entry)
+            # One write per pass, however many schedules came due together
+            if fired:
+                self.store.save_many(fired)
+            if finished:
+                self.store.delete_many(finished)
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _record_lag(self, lag: float):
+        self.stats["lag_last"] = lag
+        self.stats["lag_max"] = max(self.stats["lag_max"], lag)
+        self.stats["lag_avg"] = 0.8 * self.stats["lag_avg"] + 0.2 * lag
+
+    def _fire(self, entry: ScheduleEntry, fire_at: float, now: float):
+        lag = now - fire_at
+        self._record_lag(lag)
+
+        parsed = self._schedules[entry.schedule_id]
+        runs = 1
+        if lag > self.misfire_grace:
+            if entry.misfire_policy == "skip":
+                runs = 0
+                self.stats["skipped"] += 1
+            elif entry.misfire_policy == "catch_up":
+                due = parsed.next_after(entry.next_run)
+                while due <= now and runs < self.max_catch_up:
+                    runs += 1
+                    due = parsed.next_after(due)
+                self.stats["caught_up"] += runs - 1
+            logger.warning(f"Schedule {entry.schedule_id} misfired by {lag:.1f}s "
+                           f"({entry.misfire_policy}: {runs} run(s))")
+            entry.next_run = parsed.first_after(entry.next_run, now)
+        else:
+            entry.next_run = parsed.first_after(parsed.next_after(entry.next_run), now)
+
+        if runs:
+            entry.last_run = now
+            self._start_dispatch(entry, runs)
+
+        self._push(entry)
+
+    def _fire_once(self, entry: ScheduleEntry, fire_at: float, now: float):
+        # No misfire policy: a one-shot entry that is late still fires, once
+        self._record_lag(now - fire_at)
+        self._entries.pop(entry.schedule_id, None)
+        self._schedules.pop(entry.schedule_id, None)
+        entry.last_run = now
+        self._start_dispatch(entry, 1)
+
+    def _start_dispatch(self, entry: ScheduleEntry, runs: int):
+        self.stats["fired"] += runs
+        task = asyncio.create_task(self._dispatch(entry, runs))
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, entry: ScheduleEntry, runs: int):
+        for _ in range(runs):
+            try:
+                await self.callback(entry)
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Scheduled run of {entry.schedule_id} failed: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        next_fire = self._heap[0][0] - time.time() if self._heap else None
+        return {
+            "scheduled": len(self._entries),
+            "running": self._task is not None,
+            "next_fire_in_seconds": round(max(0.0, next_fire), 3) if next_fire is not None else None,
+            "fired": self.stats["fired"],
+            "skipped": self.stats["skipped"],
+            "caught_up": self.stats["caught_up"],
+            "failed": self.stats["failed"],
+            "lag_ms": {
+                "last": round(self.stats["lag_last"] * 1000, 1),
+                "avg": round(self.stats["lag_avg"] * 1000, 1),
+                "max": round(self.stats["lag_max"] * 1000, 1)
+            }
+        }